@@ -65,6 +65,10 @@ CREATE TABLE employee_pay (
     tax_bracket_details JSONB,
     tax_exemptions_applied JSONB,
     country_specific_benefits JSONB,
+    input_fingerprint VARCHAR(64),       -- sha256 of normalized calc inputs + config version
+    config_version VARCHAR(64),          -- sha256 of the country config section used
+    calc_inputs JSONB,                   -- normalized calc inputs (hours, rates, allowances, opt-ins)
+    ytd_increments JSONB,                -- amounts this row added to ytd_accumulator, by component
 	created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
     issued_at   TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     updated_at  TIMESTAMP DEFAULT CURRENT_TIMESTAMP
@@ -98,13 +102,54 @@ CREATE TABLE employee_benefits_deductions (
     payer VARCHAR(20)                  -- 'employee' or 'employer'
 );
 
+-- YEAR-TO-DATE ACCUMULATORS (one running total per tenant/employee/tax year/component)
+CREATE TABLE ytd_accumulator (
+    id SERIAL PRIMARY KEY,
+    tenant_id INT REFERENCES tenant(id),
+    employee_id VARCHAR(50) NOT NULL REFERENCES employee(id) ON DELETE CASCADE,
+    tax_year INT NOT NULL,
+    component VARCHAR(150) NOT NULL,   -- 'gross_pay', 'employee:401k', 'employer:Employer 401k', ...
+    amount NUMERIC(14, 2) NOT NULL DEFAULT 0,
+    updated_at TIMESTAMPTZ DEFAULT now(),
+    CONSTRAINT uq_ytd_accumulator_component UNIQUE (tenant_id, employee_id, tax_year, component)
+);
+
+-- RETROACTIVE ADJUSTMENTS (differences of recomputed past rows, paid in a later payrun)
+CREATE TABLE pay_adjustment (
+    id SERIAL PRIMARY KEY,
+    payrun_id INT NOT NULL REFERENCES payrun(id) ON DELETE CASCADE,
+    adjustment_set VARCHAR(36) NOT NULL,   -- one id per retro run
+    tenant_id INT REFERENCES tenant(id),
+    employee_id VARCHAR(50) NOT NULL REFERENCES employee(id) ON DELETE CASCADE,
+    source_employee_pay_id INT REFERENCES employee_pay(id) ON DELETE SET NULL,
+    source_pay_period VARCHAR(50),
+    component VARCHAR(150) NOT NULL,       -- 'gross_pay', 'income_tax', 'employee:401k', 'employer:FUTA', ...
+    amount NUMERIC(12, 2) NOT NULL,        -- new - originally paid
+    reason TEXT,
+    created_at TIMESTAMPTZ DEFAULT now()
+);
+
 -- INDEXES FOR PERFORMANCE 
 CREATE INDEX idx_employee_pay_employee ON employee_pay(employee_id);
 CREATE INDEX idx_employee_pay_payrun ON employee_pay(payrun_id);
+CREATE INDEX idx_employee_pay_payrun_employee ON employee_pay(payrun_id, employee_id);
 
 CREATE INDEX idx_employee_allowances_payslip ON employee_allowances(payslip_id);
 CREATE INDEX idx_employer_contributions_payslip ON employer_contributions(payslip_id);
 CREATE INDEX idx_employee_benefits_deductions_payslip ON employee_benefits_deductions(payslip_id);
+CREATE INDEX idx_pay_adjustment_payrun ON pay_adjustment(payrun_id, employee_id);
+
+-- MIGRATION: incremental payrun recalculation (existing databases)
+ALTER TABLE employee_pay ADD COLUMN IF NOT EXISTS input_fingerprint VARCHAR(64);
+ALTER TABLE employee_pay ADD COLUMN IF NOT EXISTS config_version VARCHAR(64);
+ALTER TABLE employee_pay ADD COLUMN IF NOT EXISTS calc_inputs JSONB;
+CREATE INDEX IF NOT EXISTS idx_employee_pay_payrun_employee ON employee_pay(payrun_id, employee_id);
+
+-- MIGRATION: year-to-date accumulators (existing databases; create ytd_accumulator as above)
+ALTER TABLE employee_pay ADD COLUMN IF NOT EXISTS ytd_increments JSONB;
+
+-- MIGRATION: retroactive adjustments (existing databases; create pay_adjustment as above)
+CREATE INDEX IF NOT EXISTS idx_pay_adjustment_payrun ON pay_adjustment(payrun_id, employee_id);
 
 -- Data rows:
 INSERT INTO tenant (id, name, address ) VALUES ('12', 'Bolivia Tenant', 'Avenida Busch 1456  
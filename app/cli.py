@@ -0,0 +1,163 @@
+# app/cli.py
+"""
+Command-line entry points: python -m app.cli <command>
+
+  payrun   Stream employees from a JSONL / CSV file through the calculators (in-process or on a
+           worker pool) and write one result per employee as JSONL / CSV. Payslip PDFs and DB
+           persistence are opt-in; the input is never loaded whole, so it can exceed RAM.
+"""
+
+import argparse
+import asyncio
+import sys
+from datetime import date
+from typing import Any, Dict, List, Optional
+
+from app.services.gross_to_net import ARITHMETIC_FLOAT, ARITHMETIC_MINOR_UNITS
+from app.services.payrun_executor import DEFAULT_CHUNK_SIZE, PayrunExecutor
+from app.services.payrun_stream import (
+    ResultWriter, StreamRecord, Throughput, calculate_stream, read_records, stream_format,
+)
+
+
+class _DatabaseSink:
+    """
+    --persist: one session for the whole run. YTD totals are read before each batch is
+    calculated and every batch is committed on its own, so a long run keeps what it has written.
+    """
+
+    def __init__(self, country_plans: Dict[str, Any], arithmetic: str, tenant_plans: Optional[Dict[int, Any]] = None):
+        # Imported lazily: a calculation-only run needs no database settings
+        from app.database.connection import AsyncSessionLocal
+
+        self._loop = asyncio.new_event_loop()
+        self._session = AsyncSessionLocal()
+        self._plans = country_plans
+        self._tenant_plans = tenant_plans
+        self._arithmetic = arithmetic
+        self._payruns: Dict[tuple, Any] = {}
+
+    def load_ytd(self, calc_emps: List[Any]) -> List[dict]:
+        from app.services.payrun_store import load_ytd
+
+        return self._loop.run_until_complete(load_ytd(self._session, calc_emps))
+
+    def persist(self, batch: List[StreamRecord]) -> None:
+        results = [(record.calc_emp, record.result) for record in batch if record.result is not None]
+        if results:
+            self._loop.run_until_complete(self._persist(results))
+
+    async def _persist(self, results) -> None:
+        from app.database.ytd_store import ytd_store
+        from app.services.payrun_store import persist_results
+
+        ytd_keys = []
+        try:
+            ytd_keys = await persist_results(
+                self._session, results, self._plans, self._arithmetic, self._payruns, tenant_plans=self._tenant_plans,
+            )
+            await self._session.commit()
+        finally:
+            ytd_store.invalidate(ytd_keys)
+
+    def close(self) -> None:
+        self._loop.run_until_complete(self._session.close())
+        self._loop.close()
+
+
+def _open(path: str, mode: str):
+    if path == "-":
+        return sys.stdin if mode == "r" else sys.stdout
+    return open(path, mode, encoding="utf-8", newline="")
+
+
+def run_payrun(args: argparse.Namespace) -> int:
+    input_format = stream_format(args.input, args.input_format)
+    output_format = stream_format(args.output, args.output_format)
+
+    from app.config.country_config import config_registry, tenant_overlays
+
+    # The effective-dated rules of the pay period (and every tenant overlay), resolved once for the whole run
+    period_start = args.period_start or date.today()
+    effective = config_registry.current.effective
+    country_plans = effective.plans_for(period_start)
+    tenant_plans = tenant_overlays.tenant_plans(effective, None, period_start)
+    sink = _DatabaseSink(country_plans, args.arithmetic, tenant_plans) if args.persist else None
+    executor = (
+        PayrunExecutor(
+            country_plans, max_workers=args.workers, chunk_size=args.chunk_size,
+            arithmetic=args.arithmetic, profile_curves=args.profile_curves,
+        )
+        if args.workers > 0
+        else None
+    )
+    progress = Throughput(sys.stderr, args.progress_every)
+    source, target = _open(args.input, "r"), _open(args.output, "w")
+    try:
+        writer = ResultWriter(target, output_format)
+        for batch in calculate_stream(
+            read_records(source, input_format),
+            country_plans=country_plans,
+            executor=executor,
+            chunk_size=args.chunk_size,
+            render_payslips=args.payslips,
+            arithmetic=args.arithmetic,
+            profile_curves=args.profile_curves,
+            ytd_loader=sink.load_ytd if sink is not None else None,
+            explain=args.explain,
+            tenant_plans=tenant_plans,
+        ):
+            writer.write(batch)
+            if sink is not None:
+                sink.persist(batch)
+            progress.add(batch)
+            progress.report()
+    finally:
+        for fh in (source, target):
+            if fh not in (sys.stdin, sys.stdout):
+                fh.close()
+        if executor is not None:
+            executor.shutdown()
+        if sink is not None:
+            sink.close()
+    progress.report(force=True)
+    return 1 if progress.failed and args.strict else 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m app.cli", description="Agentic payroll command-line tools")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    payrun = commands.add_parser("payrun", help="Calculate a payrun from a JSONL / CSV file of employees")
+    payrun.add_argument("input", help="employees file (.jsonl / .csv, or - for stdin with --input-format)")
+    payrun.add_argument("output", help="results file (.jsonl / .csv, or - for stdout with --output-format)")
+    payrun.add_argument("--input-format", choices=("jsonl", "csv"), help="override the input file extension")
+    payrun.add_argument("--output-format", choices=("jsonl", "csv"), help="override the output file extension")
+    payrun.add_argument("--workers", type=int, default=0, help="worker processes (0 = calculate in-process)")
+    payrun.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="employees per batch")
+    payrun.add_argument("--arithmetic", choices=(ARITHMETIC_FLOAT, ARITHMETIC_MINOR_UNITS), default=ARITHMETIC_FLOAT)
+    payrun.add_argument(
+        "--period-start", type=date.fromisoformat,
+        help="pay period start (YYYY-MM-DD) selecting the effective-dated country rules (default: today)",
+    )
+    payrun.add_argument("--profile-curves", action="store_true", help="evaluate on per-profile gross-to-net curves")
+    payrun.add_argument("--explain", action="store_true", help="add each employee's rule trace (JSONL output)")
+    payrun.add_argument("--payslips", action="store_true", help="render a PDF payslip per employee")
+    payrun.add_argument("--persist", action="store_true", help="store results and YTD totals in the database")
+    payrun.add_argument("--progress-every", type=float, default=5.0, help="seconds between throughput reports")
+    payrun.add_argument("--strict", action="store_true", help="exit with status 1 if any employee failed")
+    payrun.set_defaults(handler=run_payrun)
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    try:
+        return args.handler(args)
+    except ValueError as exc:
+        print(f"error: {exc}", file=sys.stderr)
+        return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
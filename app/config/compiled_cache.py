@@ -0,0 +1,163 @@
+# app/config/compiled_cache.py
+"""
+On-disk cache of the compiled country config, so a new worker process skips JSON parsing,
+schema validation and plan compilation when the config file has not changed.
+
+One file per key: "<prefix>-<key>.bin" holding a fixed header (magic, format, key) and then
+the pickled ConfigSnapshot contents. The key is a sha256 of:
+  - the config file's bytes
+  - the compiler: the source of the modules that shape a compiled plan (schema, rule_plan,
+    effective, config_patch, minor_units), so a code change never loads stale plans
+  - CACHE_FORMAT and the Python version (pickle compatibility)
+Files are read through mmap and the header is checked before anything is unpickled; a missing,
+foreign or broken file is a miss and the config is compiled (and the file rewritten) as usual.
+
+Pickles are only read from a directory owned by the current user and closed to others.
+"""
+
+import gc
+import hashlib
+import logging
+import mmap
+import os
+import pickle
+import stat
+import sys
+import tempfile
+from typing import Any, Dict, Optional
+
+from app.config import config_patch, effective, rule_plan, schema
+from app.utils import minor_units
+from app.utils.metrics import CONFIG_CACHE
+
+logger = logging.getLogger(__name__)
+
+# Bump when the cached payload's shape changes
+CACHE_FORMAT = 1
+MAGIC = b"APCC"
+_HEADER_SIZE = len(MAGIC) + 2 + 32  # magic, format (u16), sha256 key
+# Files kept per prefix; older ones (previous config versions) are pruned after a write
+KEEP_FILES = 8
+
+_COMPILER_MODULES = (schema, rule_plan, effective, config_patch, minor_units)
+
+
+def _compiler_fingerprint() -> bytes:
+    digest = hashlib.sha256()
+    for module in _COMPILER_MODULES:
+        with open(module.__file__, "rb") as f:
+            digest.update(f.read())
+    return digest.digest()
+
+
+def _loads_without_gc(data: bytes) -> Any:
+    """pickle.loads with the cyclic GC paused: the payload is many small acyclic objects, and
+    the collections triggered while they are allocated roughly double the load time."""
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        return pickle.loads(data)
+    finally:
+        if enabled:
+            gc.enable()
+
+
+class CompiledConfigCache:
+    """
+    load(raw) -> the cached payload for a config file's bytes, or None; store(raw, payload) writes
+    it atomically (temp file + rename, so concurrently booting workers never see a partial file).
+    The payload is {"version", "config", "timelines"}: see registry.load_snapshot.
+    """
+
+    def __init__(self, directory: str, prefix: str = "country_config"):
+        self.directory = directory
+        self.prefix = prefix
+        self._fingerprint = _compiler_fingerprint()
+
+    def key(self, raw: bytes) -> bytes:
+        digest = hashlib.sha256()
+        digest.update(hashlib.sha256(raw).digest())
+        digest.update(self._fingerprint)
+        digest.update(f"{CACHE_FORMAT}:{sys.version_info.major}.{sys.version_info.minor}".encode())
+        return digest.digest()
+
+    def path(self, key: bytes) -> str:
+        return os.path.join(self.directory, f"{self.prefix}-{key.hex()[:32]}.bin")
+
+    def _header(self, key: bytes) -> bytes:
+        return MAGIC + CACHE_FORMAT.to_bytes(2, "big") + key
+
+    def _private_directory(self, create: bool) -> bool:
+        """True if the directory is ours and not writable by anyone else (created 0700 when asked)."""
+        if create:
+            os.makedirs(self.directory, mode=0o700, exist_ok=True)
+        try:
+            info = os.stat(self.directory)
+        except OSError:
+            return False
+        if info.st_uid != os.getuid() or info.st_mode & (stat.S_IWGRP | stat.S_IWOTH):
+            logger.warning("compiled config cache %s is not private to this user; not using it", self.directory)
+            return False
+        return True
+
+    def load(self, raw: bytes) -> Optional[Dict[str, Any]]:
+        key = self.key(raw)
+        if not self._private_directory(create=False):
+            CONFIG_CACHE.labels(result="miss").inc()
+            return None
+        try:
+            with open(self.path(key), "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                if data[:_HEADER_SIZE] != self._header(key):
+                    CONFIG_CACHE.labels(result="stale").inc()
+                    return None
+                payload = _loads_without_gc(data[_HEADER_SIZE:])
+        except FileNotFoundError:
+            CONFIG_CACHE.labels(result="miss").inc()
+            return None
+        except Exception as exc:  # truncated / unreadable: recompile and overwrite
+            logger.warning("compiled config cache %s unreadable, recompiling: %s", self.path(key), exc)
+            CONFIG_CACHE.labels(result="error").inc()
+            return None
+        CONFIG_CACHE.labels(result="hit").inc()
+        return payload
+
+    def store(self, raw: bytes, payload: Dict[str, Any]) -> None:
+        """Best effort: a cache that cannot be written only costs the next worker a compile."""
+        key = self.key(raw)
+        try:
+            if not self._private_directory(create=True):
+                return
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix=f".{self.prefix}-", suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    f.write(self._header(key))
+                    pickle.dump(payload, f, protocol=pickle.HIGHEST_PROTOCOL)
+                os.replace(tmp_path, self.path(key))
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+            self._prune(keep=self.path(key))
+        except OSError as exc:
+            logger.warning("could not write compiled config cache to %s: %s", self.directory, exc)
+
+    def _prune(self, keep: str) -> None:
+        files = []
+        for name in os.listdir(self.directory):
+            if name.startswith(f"{self.prefix}-") and name.endswith(".bin"):
+                path = os.path.join(self.directory, name)
+                try:
+                    files.append((os.stat(path).st_mtime, path))
+                except OSError:
+                    continue
+        files.sort(reverse=True)
+        for _, path in files[KEEP_FILES:]:
+            if path != keep:
+                try:
+                    os.unlink(path)
+                except OSError:
+                    pass
+
+
+def default_cache_directory() -> str:
+    return os.path.join(tempfile.gettempdir(), f"agenticpayroll-{os.getuid()}")
+
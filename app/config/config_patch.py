@@ -0,0 +1,59 @@
+# app/config/config_patch.py
+
+import copy
+from typing import Any, Dict, Iterable, Optional
+
+# Country config sections a patch may change (rates, brackets, benefits; not currency/calendar settings)
+PATCHABLE_SECTIONS = ("statutory", "income_tax_brackets", "optional_benefits")
+
+
+def _merge(base: Any, patch: Any) -> Any:
+    """
+    Merge one patch value into a base value:
+      - dict + dict: key by key; a None value removes the key
+      - list of named rules + list of named rules: rules matched by "name" are updated in place,
+        unknown names are appended, {"name": ..., "remove": true} drops the rule
+      - anything else (e.g. income_tax_brackets): the patch replaces the base value
+    """
+    if isinstance(base, dict) and isinstance(patch, dict):
+        merged = copy.deepcopy(base)
+        for key, value in patch.items():
+            if value is None:
+                merged.pop(key, None)
+            else:
+                merged[key] = _merge(merged.get(key), value)
+        return merged
+
+    if (
+        isinstance(base, list) and isinstance(patch, list) and patch
+        and all(isinstance(item, dict) and "name" in item for item in base + patch)
+    ):
+        merged = [copy.deepcopy(item) for item in base]
+        for item in patch:
+            index = next((i for i, rule in enumerate(merged) if rule["name"] == item["name"]), None)
+            if item.get("remove"):
+                if index is not None:
+                    merged.pop(index)
+            elif index is None:
+                merged.append(copy.deepcopy(item))
+            else:
+                merged[index] = _merge(merged[index], {k: v for k, v in item.items() if k != "name"})
+        return merged
+
+    return copy.deepcopy(patch)
+
+
+def merge_config_section(
+    base: Dict[str, Any], patch: Dict[str, Any], sections: Optional[Iterable[str]] = PATCHABLE_SECTIONS
+) -> Dict[str, Any]:
+    """
+    Country config section with `patch` applied (base is not modified).
+    Raises ValueError if the patch touches a section outside `sections` (None allows any).
+    """
+    if not isinstance(patch, dict):
+        raise ValueError("Config patch must be an object keyed by config section")
+    if sections is not None:
+        unknown = sorted(set(patch) - set(sections))
+        if unknown:
+            raise ValueError(f"Config patch may only change {list(sections)}; got {unknown}")
+    return _merge(base, patch)
@@ -1,11 +1,32 @@
 import json
 import os
 
-def load_country_config():
-    current_dir = os.path.dirname(__file__)
-    config_path = os.path.join(current_dir, "country_config.json")
+from app.config.compiled_cache import CompiledConfigCache, default_cache_directory
+from app.config.registry import ConfigRegistry, JsonFileSource
+from app.config.tenant_overlays import DEFAULT_MAX_ENTRIES, TenantOverlays
+
+CONFIG_PATH = os.environ.get("COUNTRY_CONFIG_PATH") or os.path.join(os.path.dirname(__file__), "country_config.json")
+# Compiled-config cache shared by the worker processes of this host; set to "" to always compile
+CONFIG_CACHE_DIR = os.environ.get("COUNTRY_CONFIG_CACHE_DIR", default_cache_directory())
+# Per-tenant overlays of optional_benefits / allowance_rules / overtime_multiplier (see tenant_overlays.py)
+TENANT_OVERLAYS_PATH = os.environ.get("TENANT_OVERLAYS_PATH") or os.path.join(os.path.dirname(__file__), "tenant_overlays.json")
+TENANT_PLAN_CACHE_SIZE = int(os.environ.get("TENANT_PLAN_CACHE_SIZE", DEFAULT_MAX_ENTRIES))
+
 
-    with open(config_path, "r", encoding="utf-8") as f:
+def load_country_config():
+    with open(CONFIG_PATH, "r", encoding="utf-8") as f:
         return json.load(f)
 
-country_config = load_country_config()
\ No newline at end of file
+
+# Live configuration, compiled at load time and hot-reloadable (see registry.py).
+# Request handlers take config_registry.current once per request.
+config_registry = ConfigRegistry(
+    JsonFileSource(CONFIG_PATH), cache=CompiledConfigCache(CONFIG_CACHE_DIR) if CONFIG_CACHE_DIR else None,
+)
+# Compiled tenant views of the live config; handlers pick a tenant's plan with
+# tenant_overlays.plan_for(config_registry.current.effective, tenant_id, country, period_start)
+tenant_overlays = TenantOverlays(TENANT_OVERLAYS_PATH, TENANT_PLAN_CACHE_SIZE)
+
+# Snapshot loaded at startup, for scripts and tests that calculate against a fixed config
+country_config = config_registry.current.config
+country_plans = config_registry.current.plans
@@ -0,0 +1,148 @@
+# app/config/effective.py
+"""
+Effective-dated country rules. A country section is its base (undated) rules plus an optional
+list of dated changes:
+
+    "Canada": {
+        ...base section...,
+        "effective_versions": [
+            {"effective_from": "2026-01-01", "changes": {"income_tax_brackets": [...]}},
+            {"effective_from": "2026-07-01", "changes": {"statutory": {"employee_contributions": [{"name": "CPP", "rate": 0.06}]}}}
+        ]
+    }
+
+Each version's changes are merged (merge_config_section, any section) on top of the previous
+version, so a version only lists what changed. Every version is validated and compiled when
+the config is loaded; a payrun resolves the rules for its period_start once, by bisection.
+"""
+
+from bisect import bisect_right
+from dataclasses import dataclass
+from datetime import date
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+from app.config.config_patch import merge_config_section
+from app.config.rule_plan import CountryRulePlan, compile_parsed_section, reduce_fields, undated_section
+from app.config.schema import ConfigValidationError, parse_country_section
+
+# Distinct pay periods memoized by EffectivePlans before the memo is reset
+MAX_RESOLVED_PERIODS = 1024
+
+
+@dataclass(frozen=True, slots=True)
+class PlanTimeline:
+    """
+    Compiled versions of one country, oldest first: plans[i] applies to pay periods starting on
+    or after starts[i] and before starts[i + 1]. starts[0] is date.min (the base section).
+    configs[i] is the raw section of version i (base merged with every change up to it), for
+    patches and simulations; each plan's config_version is the hash of its configs entry.
+    """
+    country: str
+    starts: Tuple[date, ...]
+    plans: Tuple[CountryRulePlan, ...]
+    configs: Tuple[Dict[str, Any], ...]
+
+    __reduce__ = reduce_fields
+
+    def index_at(self, period_start: date) -> int:
+        return bisect_right(self.starts, period_start) - 1
+
+    def plan_at(self, period_start: date) -> CountryRulePlan:
+        """The plan in effect for a pay period starting on period_start; O(log versions)."""
+        return self.plans[self.index_at(period_start)]
+
+    def config_at(self, period_start: date) -> Dict[str, Any]:
+        return self.configs[self.index_at(period_start)]
+
+
+def compile_country_timeline(country: str, config: Dict[str, Any]) -> PlanTimeline:
+    """
+    Validate and compile a country section and each of its effective_versions; raises
+    ConfigValidationError listing every problem (version errors are prefixed "<country> from <date>").
+    """
+    section = parse_country_section(country, config)
+    current = undated_section(config)
+    starts, plans, configs = [date.min], [compile_parsed_section(country, section, current)], [current]
+    errors: List[str] = []
+    for version in section.effective_versions:
+        label = f"{country} from {version.effective_from}"
+        try:
+            current = merge_config_section(current, version.changes, sections=None)
+            plan = compile_parsed_section(country, parse_country_section(label, current), current)
+        except ConfigValidationError as exc:
+            errors.extend(exc.errors)
+            continue
+        except ValueError as exc:
+            errors.append(f"{label}: {exc}")
+            continue
+        starts.append(version.effective_from)
+        plans.append(plan)
+        configs.append(current)
+    if errors:
+        raise ConfigValidationError(errors)
+    return PlanTimeline(country, tuple(starts), tuple(plans), tuple(configs))
+
+
+def compile_country_timelines(country_config: Dict[str, Dict[str, Any]]) -> Dict[str, PlanTimeline]:
+    """compile_country_timeline for every country; one ConfigValidationError reports all of them."""
+    timelines: Dict[str, PlanTimeline] = {}
+    errors: List[str] = []
+    for country, cfg in country_config.items():
+        try:
+            timelines[country] = compile_country_timeline(country, cfg)
+        except ConfigValidationError as exc:
+            errors.extend(exc.errors)
+    if errors:
+        raise ConfigValidationError(errors)
+    return timelines
+
+
+class EffectivePlans:
+    """
+    country -> PlanTimeline, resolved by pay period:
+      - plans_for(period_start): country -> plan in effect, memoized per period (a payrun resolves
+        its plans once; every employee then uses the same dict)
+      - plan_for(country, period_start): one country's plan (None for an unknown country)
+      - base: the undated plans (starts[0]) of every country
+    Versions of different periods are independent objects, so current-period and retro
+    calculations run side by side in one process. Picklable, to seed payrun worker processes.
+    """
+
+    def __init__(self, timelines: Mapping[str, PlanTimeline]):
+        self.timelines = dict(timelines)
+        self.base: Dict[str, CountryRulePlan] = {country: t.plans[0] for country, t in self.timelines.items()}
+        self._resolved: Dict[date, Dict[str, CountryRulePlan]] = {}
+        # Countries without dated versions resolve to their base plan for every period
+        self._dated = tuple(country for country, t in self.timelines.items() if len(t.starts) > 1)
+
+    def plans_for(self, period_start: date) -> Dict[str, CountryRulePlan]:
+        plans = self._resolved.get(period_start)
+        if plans is None:
+            if not self._dated:
+                plans = self.base
+            else:
+                plans = dict(self.base)
+                for country in self._dated:
+                    plans[country] = self.timelines[country].plan_at(period_start)
+            if len(self._resolved) >= MAX_RESOLVED_PERIODS:
+                self._resolved.clear()
+            self._resolved[period_start] = plans
+        return plans
+
+    def plan_for(self, country: str, period_start: date) -> Optional[CountryRulePlan]:
+        return self.plans_for(period_start).get(country)
+
+    def versions(self, country: str) -> List[Dict[str, Any]]:
+        """[{"effective_from", "config_version"}] of a country, oldest first (effective_from None: the base)."""
+        timeline = self.timelines[country]
+        return [
+            {"effective_from": None if start == date.min else start.isoformat(), "config_version": plan.config_version}
+            for start, plan in zip(timeline.starts, timeline.plans)
+        ]
+
+    def __getstate__(self):
+        # The memo is rebuilt on demand in the receiving process
+        return {"timelines": self.timelines}
+
+    def __setstate__(self, state):
+        self.__init__(state["timelines"])
@@ -0,0 +1,213 @@
+# app/config/registry.py
+
+import json
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from datetime import date
+from typing import Any, Callable, Dict, Hashable, List, Optional
+
+from app.config.compiled_cache import CompiledConfigCache
+from app.config.effective import EffectivePlans, compile_country_timelines
+from app.config.rule_plan import CountryRulePlan, config_section_hash
+from app.utils.metrics import CONFIG_RELOADS
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True, slots=True)
+class ConfigSnapshot:
+    """
+    One loaded version of the country configuration. Never modified once published:
+    a request takes the registry's current snapshot once and uses it to the end.
+      - version:   sha256 of the whole config (key order and whitespace do not matter);
+                   each plan also carries its own per-country config_version
+      - config:    the raw country_config dict (for patches / simulations)
+      - plans:     country -> compiled CountryRulePlan of the base (undated) rules
+      - effective: every effective-dated version; plans_for(period_start) resolves a pay period
+      - source:    where it was read from, loaded_at: time.time() of the load
+    """
+    version: str
+    config: Dict[str, Dict[str, Any]]
+    plans: Dict[str, CountryRulePlan]
+    effective: EffectivePlans
+    source: str
+    loaded_at: float
+
+    def plans_for(self, period_start: date) -> Dict[str, CountryRulePlan]:
+        """country -> plan in effect for a pay period starting on period_start (memoized per period)."""
+        return self.effective.plans_for(period_start)
+
+
+class ConfigSource:
+    """
+    Where the registry reads the country configuration from.
+      - read():  the full {country: section} dict
+      - token(): cheap change marker polled by the watcher (a file's mtime/size, a DB row's
+                 updated_at, ...); read() is only called again when it changes
+      - read_bytes(): the serialized config, when there is one: the compiled-config cache key
+                 (None: the source is always compiled)
+    """
+
+    name = "config"
+
+    def read(self) -> Dict[str, Dict[str, Any]]:
+        raise NotImplementedError
+
+    def read_bytes(self) -> Optional[bytes]:
+        return None
+
+    def parse(self, raw: bytes) -> Dict[str, Dict[str, Any]]:
+        """read() from the bytes read_bytes() returned."""
+        return json.loads(raw)
+
+    def token(self) -> Hashable:
+        return None
+
+
+class JsonFileSource(ConfigSource):
+    """country_config.json (or any file of the same shape)."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.name = path
+
+    def read(self) -> Dict[str, Dict[str, Any]]:
+        return self.parse(self.read_bytes())
+
+    def read_bytes(self) -> bytes:
+        with open(self.path, "rb") as f:
+            return f.read()
+
+    def token(self) -> Hashable:
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+
+def validate_country_config(config: Any) -> None:
+    """Shape checks before compiling: a non-empty object of country sections."""
+    if not isinstance(config, dict) or not config:
+        raise ValueError("country config must be a non-empty object of country sections")
+    for country, section in config.items():
+        if not isinstance(section, dict):
+            raise ValueError(f"{country}: country section must be an object")
+
+
+def build_snapshot(config: Dict[str, Dict[str, Any]], source: str = "config") -> ConfigSnapshot:
+    """Validate and compile a config into a snapshot; raises ValueError / TypeError / KeyError on bad input."""
+    validate_country_config(config)
+    return _snapshot(config_section_hash(config), config, EffectivePlans(compile_country_timelines(config)), source)
+
+
+def _snapshot(version: str, config: Dict[str, Dict[str, Any]], effective: EffectivePlans, source: str) -> ConfigSnapshot:
+    return ConfigSnapshot(
+        version=version, config=config, plans=effective.base, effective=effective, source=source, loaded_at=time.time(),
+    )
+
+
+def load_snapshot(source: ConfigSource, cache: Optional[CompiledConfigCache] = None) -> ConfigSnapshot:
+    """
+    Read and compile a source; with a cache, an unchanged file (same bytes, same compiler) is loaded
+    from the compiled-config cache instead, and a fresh compile is written back for the next process.
+    """
+    raw = source.read_bytes() if cache is not None else None
+    if raw is None:
+        return build_snapshot(source.read(), source.name)
+    payload = cache.load(raw)
+    if payload is not None:
+        return _snapshot(payload["version"], payload["config"], EffectivePlans(payload["timelines"]), source.name)
+    snapshot = build_snapshot(source.parse(raw), source.name)
+    cache.store(raw, {"version": snapshot.version, "config": snapshot.config, "timelines": snapshot.effective.timelines})
+    return snapshot
+
+
+class ConfigRegistry:
+    """
+    Holder of the live country configuration, reloadable without a restart.
+      - current: the published ConfigSnapshot (a plain attribute read; readers take no lock)
+      - reload(): read the source, validate and compile off to the side, then publish it with one
+                  reference swap. A config that fails to load is logged and counted; the current
+                  snapshot stays in place. An unchanged config (same version) is not republished.
+      - watch():  a daemon thread polls source.token() and reloads when it changes
+      - subscribe(): callbacks run on the reloading thread after each swap (one reload at a time),
+                     e.g. to re-seed worker pools
+      - cache:   optional CompiledConfigCache used by every load (see load_snapshot)
+    Calculations that already hold a snapshot finish on it; only new work sees the new version.
+    """
+
+    def __init__(self, source: ConfigSource, cache: Optional[CompiledConfigCache] = None):
+        self.source = source
+        self.cache = cache
+        self._token = source.token()
+        self._snapshot = load_snapshot(source, cache)
+        self._reload_lock = threading.Lock()
+        self._listeners: List[Callable[[ConfigSnapshot, ConfigSnapshot], None]] = []
+        self._stop: Optional[threading.Event] = None
+        self._watcher: Optional[threading.Thread] = None
+
+    @property
+    def current(self) -> ConfigSnapshot:
+        return self._snapshot
+
+    def subscribe(self, listener: Callable[[ConfigSnapshot, ConfigSnapshot], None]) -> None:
+        """listener(old, new) is called after every published swap."""
+        self._listeners.append(listener)
+
+    def reload(self, force: bool = False) -> bool:
+        """
+        Load the source if its token changed (or force); returns True when a new version was published.
+        Raises on an invalid config (the current snapshot is kept); the watcher logs instead.
+        """
+        with self._reload_lock:
+            token = self.source.token()
+            if not force and token is not None and token == self._token:
+                return False
+            # A half-written or invalid file is retried once it changes again, not on every poll
+            self._token = token
+            try:
+                snapshot = load_snapshot(self.source, self.cache)
+            except (OSError, ValueError, TypeError, KeyError):
+                CONFIG_RELOADS.labels(status="error").inc()
+                raise
+            if snapshot.version == self._snapshot.version:
+                CONFIG_RELOADS.labels(status="unchanged").inc()
+                return False
+            old, self._snapshot = self._snapshot, snapshot
+            CONFIG_RELOADS.labels(status="ok").inc()
+            logger.info("country config reloaded from %s: version %s", snapshot.source, snapshot.version[:12])
+            # Still under the lock, so listeners see the swaps one at a time and in order
+            for listener in list(self._listeners):
+                try:
+                    listener(old, snapshot)
+                except Exception:  # a failing listener must not undo the swap or stop the watcher
+                    logger.exception("country config reload listener failed")
+        return True
+
+    def watch(self, interval: float = 5.0) -> None:
+        """Start the polling thread (idempotent); interval <= 0 does nothing."""
+        if interval <= 0 or self._watcher is not None:
+            return
+        self._stop = threading.Event()
+        self._watcher = threading.Thread(
+            target=self._watch, args=(interval, self._stop), name="country-config-watcher", daemon=True
+        )
+        self._watcher.start()
+
+    def stop(self) -> None:
+        if self._watcher is not None:
+            self._stop.set()
+            self._watcher.join()
+            self._watcher = self._stop = None
+
+    def _watch(self, interval: float, stop: threading.Event) -> None:
+        while not stop.wait(interval):
+            try:
+                self.reload()
+            except Exception as exc:
+                logger.error("country config reload from %s failed, keeping version %s: %s",
+                             self.source.name, self._snapshot.version[:12], exc)
@@ -0,0 +1,389 @@
+# app/config/rule_plan.py
+
+import hashlib
+import json
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.config.schema import (
+    DEFAULT_MINOR_UNIT_DIGITS,
+    DEFAULT_PAY_FREQUENCY,
+    DEFAULT_ROUNDING_MODE,
+    PAY_FREQUENCY_PERIODS,
+    BenefitConfig,
+    ConfigValidationError,
+    CountrySection,
+    DeductionRuleConfig,
+    EmployerRuleConfig,
+    parse_country_section,
+)
+from app.utils.minor_units import round_units, to_minor
+
+
+def reduce_fields(self):
+    """
+    __reduce__ of the frozen, slotted plan dataclasses: rebuild through __init__ from the field
+    values. Unpickling (compiled-config cache, worker seeding) is then several times cheaper
+    than dataclasses' generic frozen-slots __setstate__, which re-reads fields() per object.
+    """
+    return type(self), tuple(getattr(self, name) for name in self.__slots__)
+
+
+@dataclass(frozen=True, slots=True)
+class DeductionRule:
+    """
+    Employee-side statutory rule, from
+    config["statutory"]["employee_contributions"] / ["other_employee_deductions"].
+      - amount: fixed per-period amount, already prorated when basis == 'annual'
+      - rate:   percentage of gross (0.0 for a fixed-amount rule)
+      - amount_minor: amount in minor units (integer arithmetic mode)
+    """
+    name: str
+    amount: Optional[float]
+    rate: float
+    pre_tax: bool
+    optional: bool
+    amount_minor: Optional[int]
+
+    __reduce__ = reduce_fields
+
+
+@dataclass(frozen=True, slots=True)
+class EmployerRule:
+    """
+    Employer-side rule (statutory employer contribution or employer match of an optional benefit).
+      - amount:     fixed amount, already prorated to the period when basis == 'annual'
+      - rate:       percentage of gross
+      - annualize:  percentage applies to annualized gross (basis == 'annual')
+      - max_amount: per-period cap, annual_cap: annual cap (None when not configured)
+      - *_minor:    the same amounts in minor units; period_cap_minor is annual_cap / periods
+    """
+    label: str
+    amount: Optional[float]
+    rate: float
+    annualize: bool
+    max_amount: Optional[float]
+    annual_cap: Optional[float]
+    amount_minor: Optional[int] = None
+    max_amount_minor: Optional[int] = None
+    period_cap_minor: Optional[int] = None
+
+    __reduce__ = reduce_fields
+
+
+@dataclass(frozen=True, slots=True)
+class BenefitRule:
+    """
+    Entry of config["optional_benefits"]. rate/amount stay separate (None when absent)
+    because an employee opt-in may override either one at calculation time.
+    amount_minor is the per-period amount in minor units (prorated when basis == 'annual').
+    annual_limit caps the employee's year-to-date contribution (enforced when YTD totals are supplied).
+    """
+    name: str
+    rate: Optional[float]
+    amount: Optional[float]
+    basis: str
+    pre_tax: bool
+    employer: Optional[EmployerRule]
+    amount_minor: Optional[int]
+    annual_limit: Optional[float]
+    annual_limit_minor: Optional[int]
+
+    __reduce__ = reduce_fields
+
+
+@dataclass(frozen=True, slots=True)
+class TaxBracketTable:
+    """
+    Progressive tax table with cumulative tax precomputed at every threshold.
+    Only brackets with a positive span are kept (e.g. a leading 'up_to: 0' taxes nothing).
+      - lowers/uppers/rates: bracket i covers (lowers[i], uppers[i]] at rates[i]
+      - cumulative[i]:       tax owed on income up to lowers[i]
+      - full_amounts[i]:     rounded tax of a fully used bracket (for tax_bracket_details)
+      - total:               tax owed once every bracket is full (only reached without an open-ended bracket)
+    """
+    lowers: Tuple[float, ...]
+    uppers: Tuple[float, ...]
+    rates: Tuple[float, ...]
+    cumulative: Tuple[float, ...]
+    full_amounts: Tuple[float, ...]
+    total: float
+
+    __reduce__ = reduce_fields
+
+
+@dataclass(frozen=True, slots=True)
+class CountryRulePlan:
+    """
+    Immutable, pre-parsed form of one country_config entry. Built once at load time
+    so the calculators never touch the raw JSON dicts on the hot path.
+    config_version is the sha256 of the country's config section (see config_section_hash).
+    """
+    country: str
+    config_version: str
+    periods_per_year: int
+    overtime_multiplier: float
+    exempt_allowances: Tuple[str, ...]
+    employee_contributions: Tuple[DeductionRule, ...]
+    other_employee_deductions: Tuple[DeductionRule, ...]
+    employer_contributions: Tuple[EmployerRule, ...]
+    optional_benefits: Tuple[BenefitRule, ...]
+    # Annual (up_to, rate), ascending (the schema enforces it); up_to: null becomes infinity
+    income_tax_brackets: Tuple[Tuple[float, float], ...]
+    # Per-period table: brackets / periods_per_year (taxable_income is a per-period amount)
+    tax_table: TaxBracketTable
+    # Integer minor-unit arithmetic: 10 ** digits units per major unit, per-country rounding rule
+    minor_unit_digits: int
+    minor_unit_scale: int
+    rounding_mode: str
+    tax_table_minor: TaxBracketTable
+    # Pay calendar (config["pay_frequency"]), one of PAY_FREQUENCY_PERIODS
+    pay_frequency: str = DEFAULT_PAY_FREQUENCY
+    # Annual brackets periodized for every pay frequency (tax_table / tax_table_minor are the
+    # plan's own periods_per_year entry, so the calculators need no per-employee arithmetic)
+    tax_tables: Dict[str, TaxBracketTable] = field(default_factory=dict)
+    tax_tables_minor: Dict[str, TaxBracketTable] = field(default_factory=dict)
+
+    __reduce__ = reduce_fields
+
+    def tax_table_for(self, pay_frequency: Optional[str] = None, minor: bool = False) -> TaxBracketTable:
+        """Per-period table for a pay frequency (default: the plan's own); O(1) lookup."""
+        if pay_frequency is None or pay_frequency == self.pay_frequency:
+            return self.tax_table_minor if minor else self.tax_table
+        tables = self.tax_tables_minor if minor else self.tax_tables
+        if pay_frequency not in tables:
+            raise ValueError(f"Unknown pay_frequency {pay_frequency!r}; expected one of {tuple(PAY_FREQUENCY_PERIODS)}")
+        return tables[pay_frequency]
+
+
+def config_section_hash(config: Dict[str, Any]) -> str:
+    """Stable content hash of one country section: key order and whitespace do not matter."""
+    canonical = json.dumps(config, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def periodize_brackets(brackets: Tuple[Tuple[float, float], ...], periods_per_year: int) -> Tuple[Tuple[float, float], ...]:
+    """Annual (up_to, rate) brackets -> per-period brackets (thresholds / periods; rates unchanged)."""
+    return tuple((up_to / periods_per_year, rate) for up_to, rate in brackets)
+
+
+def compile_tax_table(
+    brackets: Tuple[Tuple[float, float], ...],
+    minor_unit_scale: Optional[int] = None,
+    rounding_mode: str = DEFAULT_ROUNDING_MODE,
+) -> TaxBracketTable:
+    """
+    Build the cumulative table from sorted (up_to, rate) brackets.
+    With minor_unit_scale, thresholds and amounts are integer minor units and every
+    full bracket's tax is rounded once with the country's rounding rule.
+    """
+    lowers, uppers, rates, cumulative, full_amounts = [], [], [], [], []
+    owed = 0 if minor_unit_scale else 0.0
+    last_threshold = owed
+    for up_to, rate in brackets:
+        if minor_unit_scale and up_to != float("inf"):
+            up_to = to_minor(up_to, minor_unit_scale, rounding_mode)
+        if up_to - last_threshold > 0:
+            lowers.append(last_threshold)
+            uppers.append(up_to)
+            rates.append(rate)
+            cumulative.append(owed)
+            if up_to != float("inf"):
+                tax_for_bracket = (up_to - last_threshold) * rate
+                if minor_unit_scale:
+                    tax_for_bracket = round_units(tax_for_bracket, rounding_mode)
+                    full_amounts.append(tax_for_bracket)
+                else:
+                    full_amounts.append(round(tax_for_bracket, 2))
+                owed += tax_for_bracket
+        last_threshold = up_to
+    return TaxBracketTable(
+        lowers=tuple(lowers),
+        uppers=tuple(uppers),
+        rates=tuple(rates),
+        cumulative=tuple(cumulative),
+        full_amounts=tuple(full_amounts),
+        total=owed,
+    )
+
+
+def _compile_deduction_rule(rule: DeductionRuleConfig, periods_per_year: int, scale: int, mode: str) -> DeductionRule:
+    amount = rule.amount
+    amount_minor = benefit_amount_minor(amount, rule.basis, periods_per_year, scale, mode)
+    if amount is not None and rule.basis == "annual":
+        amount = amount / float(periods_per_year)
+    return DeductionRule(
+        name=rule.name,
+        amount=amount,
+        rate=rule.rate or 0.0,
+        pre_tax=rule.pre_tax,
+        optional=rule.optional,
+        amount_minor=amount_minor,
+    )
+
+
+def _compile_employer_rule(
+    rule: EmployerRuleConfig,
+    periods_per_year: int,
+    scale: int = 10 ** DEFAULT_MINOR_UNIT_DIGITS,
+    mode: str = DEFAULT_ROUNDING_MODE,
+) -> EmployerRule:
+    max_amount, annual_cap = rule.max_amount, rule.annual_cap
+    minor_caps = dict(
+        max_amount_minor=None if max_amount is None else to_minor(max_amount, scale, mode),
+        period_cap_minor=None if annual_cap is None else round_units(annual_cap * scale / periods_per_year, mode),
+    )
+
+    if rule.amount is not None:
+        amount = rule.amount
+        if rule.basis == "annual":
+            amount_minor = round_units(amount * scale / periods_per_year, mode)
+            amount = amount / float(periods_per_year)
+        else:
+            amount_minor = to_minor(amount, scale, mode)
+        return EmployerRule(rule.label, amount, 0.0, False, max_amount, annual_cap, amount_minor, **minor_caps)
+
+    return EmployerRule(rule.label, None, rule.rate, rule.basis == "annual", max_amount, annual_cap, None, **minor_caps)
+
+
+def _compile_benefit_rule(
+    name: str,
+    cfg: BenefitConfig,
+    periods_per_year: int,
+    scale: int,
+    mode: str,
+) -> BenefitRule:
+    employer_rule = cfg.employer_rule(name)
+    annual_limit = cfg.annual_limit
+    return BenefitRule(
+        name=name,
+        rate=cfg.rate,
+        amount=cfg.amount,
+        basis=cfg.basis,
+        pre_tax=cfg.pre_tax,
+        employer=None if employer_rule is None else _compile_employer_rule(employer_rule, periods_per_year, scale, mode),
+        amount_minor=benefit_amount_minor(cfg.amount, cfg.basis, periods_per_year, scale, mode),
+        annual_limit=annual_limit,
+        annual_limit_minor=None if annual_limit is None else to_minor(annual_limit, scale, mode),
+    )
+
+
+def benefit_amount_minor(
+    amount: Optional[float],
+    basis: str,
+    periods_per_year: int,
+    scale: int,
+    mode: str,
+) -> Optional[int]:
+    """Per-period fixed benefit amount in minor units (annual amounts prorated, then rounded once)."""
+    if amount is None:
+        return None
+    if basis == "annual":
+        return round_units(amount * scale / periods_per_year, mode)
+    return to_minor(amount, scale, mode)
+
+
+def undated_section(config: Dict[str, Any]) -> Dict[str, Any]:
+    """A country section without its effective_versions: the base rules (what config_version hashes)."""
+    if "effective_versions" not in config:
+        return config
+    return {key: value for key, value in config.items() if key != "effective_versions"}
+
+
+def compile_country_plan(country: str, config: Dict[str, Any]) -> CountryRulePlan:
+    """
+    Validate one country_config entry against the schema (app/config/schema.py) and compile it
+    into a CountryRulePlan; raises ConfigValidationError listing every problem in the section.
+      - key variants normalized (employee_rate -> rate, employer_fixed -> employer_amount, ...)
+      - brackets: up_to: null -> infinity; the annual brackets are periodized into one tax table
+        per pay frequency (tax_table = the plan's periods_per_year)
+      - periods_per_year defaults to the pay_frequency's periods (bi-weekly = 26, ...)
+      - statutory/optional rules converted to slotted rule objects
+      - annual fixed amounts prorated, caps resolved in both arithmetic modes
+    The plan is the section's base rules; its effective_versions are validated but compiled
+    separately (see app/config/effective.py).
+    """
+    return compile_parsed_section(country, parse_country_section(country, config), undated_section(config))
+
+
+def compile_parsed_section(country: str, section: CountrySection, config: Dict[str, Any]) -> CountryRulePlan:
+    """compile_country_plan for an already validated section; config is its raw (undated) form, hashed as config_version."""
+    periods_per_year = section.periods
+    statutory = section.statutory
+    minor_unit_digits = section.minor_unit_digits
+    scale = 10 ** minor_unit_digits
+    mode = section.rounding_mode
+
+    brackets = tuple(
+        (float("inf") if b.up_to is None else b.up_to, b.rate) for b in section.income_tax_brackets
+    )
+
+    # Income tax brackets are annual: one per-period table per pay frequency, compiled once
+    tax_tables, tax_tables_minor = {}, {}
+    for frequency, periods in PAY_FREQUENCY_PERIODS.items():
+        tax_tables[frequency] = compile_tax_table(periodize_brackets(brackets, periods))
+        tax_tables_minor[frequency] = compile_tax_table(periodize_brackets(brackets, periods), scale, mode)
+    if PAY_FREQUENCY_PERIODS[section.pay_frequency] == periods_per_year:
+        tax_table, tax_table_minor = tax_tables[section.pay_frequency], tax_tables_minor[section.pay_frequency]
+    else:
+        tax_table = compile_tax_table(periodize_brackets(brackets, periods_per_year))
+        tax_table_minor = compile_tax_table(periodize_brackets(brackets, periods_per_year), scale, mode)
+
+    return CountryRulePlan(
+        country=country,
+        config_version=config_section_hash(config),
+        periods_per_year=periods_per_year,
+        overtime_multiplier=section.overtime_multiplier,
+        exempt_allowances=tuple(
+            name for name, rule in section.allowance_rules.items() if rule.tax_treatment == "exempt"
+        ),
+        employee_contributions=tuple(
+            _compile_deduction_rule(r, periods_per_year, scale, mode) for r in statutory.employee_contributions
+        ),
+        other_employee_deductions=tuple(
+            _compile_deduction_rule(r, periods_per_year, scale, mode) for r in statutory.other_employee_deductions
+        ),
+        employer_contributions=tuple(
+            _compile_employer_rule(r, periods_per_year, scale, mode) for r in statutory.employer_contributions
+        ),
+        optional_benefits=tuple(
+            _compile_benefit_rule(name, cfg, periods_per_year, scale, mode)
+            for name, cfg in section.optional_benefits.items()
+        ),
+        income_tax_brackets=brackets,
+        tax_table=tax_table,
+        minor_unit_digits=minor_unit_digits,
+        minor_unit_scale=scale,
+        rounding_mode=mode,
+        tax_table_minor=tax_table_minor,
+        pay_frequency=section.pay_frequency,
+        tax_tables=tax_tables,
+        tax_tables_minor=tax_tables_minor,
+    )
+
+
+def compile_country_config(country_config: Dict[str, Dict[str, Any]]) -> Dict[str, CountryRulePlan]:
+    """
+    Compile every country section; called once when the config is loaded. Every section is
+    checked before anything is returned, so one ConfigValidationError reports all of them.
+    """
+    plans: Dict[str, CountryRulePlan] = {}
+    errors: List[str] = []
+    for country, cfg in country_config.items():
+        try:
+            plans[country] = compile_country_plan(country, cfg)
+        except ConfigValidationError as exc:
+            errors.extend(exc.errors)
+    if errors:
+        raise ConfigValidationError(errors)
+    return plans
+
+
+def as_rule_plan(config: Any) -> CountryRulePlan:
+    """
+    Accept either a compiled plan (normal path) or a raw country_config dict
+    (legacy callers/tests) and return a plan.
+    """
+    if isinstance(config, CountryRulePlan):
+        return config
+    return compile_country_plan(config.get("country", ""), config)
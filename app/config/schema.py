@@ -0,0 +1,291 @@
+# app/config/schema.py
+"""
+Typed schema of one country_config section. compile_country_plan validates every section with
+CountrySection before compiling it, so a typo, an unknown key or a malformed bracket table fails
+the load (and the boot) instead of silently computing zero.
+
+Key variants are normalized once, here, before validation (see BENEFIT_KEY_ALIASES), so the
+compiler and the calculators only ever see the canonical names.
+"""
+
+from datetime import date
+from typing import Any, Dict, List, Literal, Optional
+
+from pydantic import BaseModel, ConfigDict, Field, ValidationError, field_validator, model_validator
+
+from app.utils.minor_units import ROUNDING_MODES
+
+DEFAULT_OVERTIME_MULTIPLIER = 1.25
+DEFAULT_MINOR_UNIT_DIGITS = 2
+DEFAULT_ROUNDING_MODE = "half_up"
+DEFAULT_PAY_FREQUENCY = "monthly"
+
+# config["pay_frequency"] -> pay periods in a year
+PAY_FREQUENCY_PERIODS = {"weekly": 52, "bi-weekly": 26, "semi-monthly": 24, "monthly": 12}
+
+# optional_benefits key variants -> canonical key
+BENEFIT_KEY_ALIASES = {
+    "employee_rate": "rate",
+    "employee_fixed": "amount",
+    "employee_amount": "amount",
+    "employer_match_rate": "employer_rate",
+    "employer_fixed": "employer_amount",
+    "employer_match_amount": "employer_amount",
+}
+
+Basis = Literal["gross", "amount", "annual"]
+
+
+class ConfigValidationError(ValueError):
+    """Every problem found in a config, one "<country>: <location>: <message>" line each."""
+
+    def __init__(self, errors: List[str]):
+        self.errors = errors
+        super().__init__("invalid country config:\n  " + "\n  ".join(errors))
+
+
+def _normalize_keys(values: Any, aliases: Dict[str, str]) -> Any:
+    if not isinstance(values, dict):
+        return values
+    normalized = {}
+    for key, value in values.items():
+        canonical = aliases.get(key, key)
+        if canonical in normalized:
+            raise ValueError(f"{key!r} and {canonical!r} both set; use {canonical!r}")
+        normalized[canonical] = value
+    return normalized
+
+
+def _default_basis(values: Any, rate_key: str = "rate", amount_key: str = "amount", basis_key: str = "basis") -> Any:
+    """Missing basis: 'gross' for a rate, 'amount' (per period) for a fixed amount; gross + amount means per period."""
+    if not isinstance(values, dict):
+        return values
+    basis = values.get(basis_key)
+    if amount_key in values and rate_key not in values and basis in (None, "gross"):
+        values = {**values, basis_key: "amount"}
+    elif basis is None and rate_key in values:
+        values = {**values, basis_key: "gross"}
+    return values
+
+
+def _check_rate_or_amount(rate: Optional[float], amount: Optional[float], basis: Optional[str], rate_bases: tuple, what: str = "") -> None:
+    if (rate is None) == (amount is None):
+        raise ValueError(f"set exactly one of {what}rate / {what}amount")
+    if rate is not None and basis not in rate_bases:
+        raise ValueError(f"{what}basis {basis!r} does not apply to a rate; use one of {rate_bases}")
+    if amount is not None and basis not in ("amount", "annual"):
+        raise ValueError(f"{what}basis {basis!r} does not apply to a fixed amount; use 'amount' or 'annual'")
+
+
+class _Section(BaseModel):
+    model_config = ConfigDict(extra="forbid", frozen=True)
+
+
+class DeductionRuleConfig(_Section):
+    """statutory.employee_contributions[] / statutory.other_employee_deductions[]."""
+    name: str = Field(min_length=1)
+    rate: Optional[float] = Field(default=None, ge=0, le=1)
+    amount: Optional[float] = Field(default=None, ge=0)
+    basis: Basis = "gross"
+    pre_tax: bool = False
+    optional: bool = False
+
+    _defaults = model_validator(mode="before")(_default_basis)
+
+    @model_validator(mode="after")
+    def _check(self):
+        _check_rate_or_amount(self.rate, self.amount, self.basis, ("gross",))
+        return self
+
+
+class EmployerRuleConfig(_Section):
+    """statutory.employer_contributions[] (and the employer_* side of an optional benefit)."""
+    name: Optional[str] = None
+    display_name: Optional[str] = None
+    rate: Optional[float] = Field(default=None, ge=0, le=1)
+    amount: Optional[float] = Field(default=None, ge=0)
+    basis: Basis = "gross"
+    max_amount: Optional[float] = Field(default=None, ge=0)
+    annual_cap: Optional[float] = Field(default=None, ge=0)
+
+    _defaults = model_validator(mode="before")(_default_basis)
+
+    @model_validator(mode="after")
+    def _check(self):
+        _check_rate_or_amount(self.rate, self.amount, self.basis, ("gross", "annual"))
+        return self
+
+    @property
+    def label(self) -> str:
+        return self.display_name or self.name or "Employer Contribution"
+
+
+class BenefitConfig(_Section):
+    """optional_benefits.<name>: the employee amount / rate, and an optional employer match."""
+    rate: Optional[float] = Field(default=None, ge=0, le=1)
+    amount: Optional[float] = Field(default=None, ge=0)
+    basis: Basis = "gross"
+    pre_tax: bool = False
+    annual_limit: Optional[float] = Field(default=None, ge=0)
+    employer_rate: Optional[float] = Field(default=None, ge=0, le=1)
+    employer_amount: Optional[float] = Field(default=None, ge=0)
+    employer_basis: Optional[Basis] = None
+    employer_max_amount: Optional[float] = Field(default=None, ge=0)
+    employer_annual_cap: Optional[float] = Field(default=None, ge=0)
+    employer_display_name: Optional[str] = None
+
+    @model_validator(mode="before")
+    @classmethod
+    def _normalize(cls, values: Any) -> Any:
+        values = _default_basis(_normalize_keys(values, BENEFIT_KEY_ALIASES))
+        return _default_basis(values, "employer_rate", "employer_amount", "employer_basis")
+
+    @model_validator(mode="after")
+    def _check(self):
+        _check_rate_or_amount(self.rate, self.amount, self.basis, ("gross",))
+        if self.employer_rate is None and self.employer_amount is None:
+            unused = [
+                key for key in ("employer_basis", "employer_max_amount", "employer_annual_cap", "employer_display_name")
+                if getattr(self, key) is not None
+            ]
+            if unused:
+                raise ValueError(f"{', '.join(unused)} set without employer_rate / employer_amount")
+        else:
+            _check_rate_or_amount(self.employer_rate, self.employer_amount, self.employer_basis, ("gross", "annual"), "employer_")
+        return self
+
+    def employer_rule(self, name: str) -> Optional[EmployerRuleConfig]:
+        """The employer match as an employer rule (None when the benefit has none)."""
+        if self.employer_rate is None and self.employer_amount is None:
+            return None
+        return EmployerRuleConfig(
+            name=f"Employer {name}", display_name=self.employer_display_name,
+            rate=self.employer_rate, amount=self.employer_amount, basis=self.employer_basis,
+            max_amount=self.employer_max_amount, annual_cap=self.employer_annual_cap,
+        )
+
+
+class AllowanceRuleConfig(_Section):
+    """allowance_rules.<name>; only 'exempt' allowances are excluded from taxable income today."""
+    tax_treatment: Literal["taxable", "exempt", "exempt_above_threshold", "conditionally_exempt"] = "taxable"
+    basis: Literal["amount"] = "amount"
+    threshold: Optional[float] = Field(default=None, ge=0)
+
+
+class TaxBracketConfig(_Section):
+    """income_tax_brackets[]: annual income up to up_to (null = no upper limit) is taxed at rate."""
+    up_to: Optional[float] = Field(gt=0)
+    rate: float = Field(ge=0, le=1)
+
+
+class StatutoryConfig(_Section):
+    employee_contributions: List[DeductionRuleConfig] = []
+    other_employee_deductions: List[DeductionRuleConfig] = []
+    employer_contributions: List[EmployerRuleConfig] = []
+
+    @model_validator(mode="after")
+    def _unique_names(self):
+        for section in ("employee_contributions", "other_employee_deductions", "employer_contributions"):
+            names = [rule.label if section == "employer_contributions" else rule.name for rule in getattr(self, section)]
+            duplicates = sorted({name for name in names if names.count(name) > 1})
+            if duplicates:
+                raise ValueError(f"{section}: duplicate rule names {duplicates}")
+        return self
+
+
+class EffectiveVersionConfig(_Section):
+    """
+    effective_versions[]: changes in effect for pay periods starting on or after effective_from.
+    changes is a config patch (see config_patch.py) applied on top of the previous version.
+    """
+    effective_from: date
+    changes: Dict[str, Any] = Field(min_length=1)
+
+    @field_validator("changes")
+    @classmethod
+    def _not_nested(cls, changes: Dict[str, Any]) -> Dict[str, Any]:
+        if "effective_versions" in changes:
+            raise ValueError("effective_versions cannot be changed by an effective version")
+        return changes
+
+
+class CountrySection(_Section):
+    """One country_config entry. Calendar / display keys are checked for type only."""
+    country: Optional[str] = None
+    currency: Optional[str] = None
+    currency_symbol: Optional[str] = None
+    timezone: Optional[str] = None
+    date_format: Optional[str] = None
+    payroll_cutoff_day: Optional[int] = Field(default=None, ge=1, le=31)
+    public_holidays: Any = None
+
+    pay_frequency: str = DEFAULT_PAY_FREQUENCY
+    periods_per_year: Optional[int] = Field(default=None, gt=0)
+    overtime_multiplier: float = Field(default=DEFAULT_OVERTIME_MULTIPLIER, gt=0)
+    minor_unit_digits: int = Field(default=DEFAULT_MINOR_UNIT_DIGITS, ge=0, le=6)
+    rounding_mode: str = DEFAULT_ROUNDING_MODE
+
+    statutory: StatutoryConfig = StatutoryConfig()
+    income_tax_brackets: List[TaxBracketConfig] = []
+    optional_benefits: Dict[str, BenefitConfig] = {}
+    allowance_rules: Dict[str, AllowanceRuleConfig] = {}
+    # Dated changes to this (undated, base) section; see app/config/effective.py
+    effective_versions: List[EffectiveVersionConfig] = []
+
+    @field_validator("pay_frequency", mode="before")
+    @classmethod
+    def _pay_frequency(cls, value: Any) -> Any:
+        value = str(value or DEFAULT_PAY_FREQUENCY).lower()
+        if value not in PAY_FREQUENCY_PERIODS:
+            raise ValueError(f"unknown pay_frequency {value!r}; expected one of {tuple(PAY_FREQUENCY_PERIODS)}")
+        return value
+
+    @field_validator("rounding_mode")
+    @classmethod
+    def _rounding_mode(cls, value: str) -> str:
+        if value not in ROUNDING_MODES:
+            raise ValueError(f"unknown rounding_mode {value!r}; expected one of {ROUNDING_MODES}")
+        return value
+
+    @field_validator("income_tax_brackets")
+    @classmethod
+    def _brackets(cls, brackets: List[TaxBracketConfig]) -> List[TaxBracketConfig]:
+        """Thresholds strictly increasing, ending in exactly one open-ended (up_to: null) bracket."""
+        if not brackets:
+            return brackets
+        if any(b.up_to is None for b in brackets[:-1]) or brackets[-1].up_to is not None:
+            raise ValueError("only the last bracket may (and must) be open-ended (up_to: null)")
+        thresholds = [b.up_to for b in brackets[:-1]]
+        if any(lower >= upper for lower, upper in zip(thresholds, thresholds[1:])):
+            raise ValueError(f"up_to thresholds must be strictly increasing, got {thresholds}")
+        return brackets
+
+    @field_validator("effective_versions")
+    @classmethod
+    def _versions(cls, versions: List[EffectiveVersionConfig]) -> List[EffectiveVersionConfig]:
+        starts = [v.effective_from for v in versions]
+        if any(earlier >= later for earlier, later in zip(starts, starts[1:])):
+            raise ValueError(f"effective_from dates must be strictly increasing, got {[str(d) for d in starts]}")
+        return versions
+
+    @property
+    def periods(self) -> int:
+        """periods_per_year if set, else the pay_frequency's periods (bi-weekly = 26, ...)."""
+        return self.periods_per_year or PAY_FREQUENCY_PERIODS[self.pay_frequency]
+
+
+def _error_lines(country: str, exc: ValidationError) -> List[str]:
+    lines = []
+    for error in exc.errors():
+        location = ".".join(str(part) for part in error["loc"])
+        message = error["msg"].removeprefix("Value error, ")
+        lines.append(f"{country}: {location}: {message}" if location else f"{country}: {message}")
+    return lines
+
+
+def parse_country_section(country: str, config: Any) -> CountrySection:
+    """Validated, normalized CountrySection; raises ConfigValidationError listing every problem."""
+    try:
+        return CountrySection.model_validate(config)
+    except ValidationError as exc:
+        raise ConfigValidationError(_error_lines(country, exc)) from None
@@ -1,7 +1,5 @@
 # app/config/settings.py
 
-import os
-import json
 from typing import List
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from pydantic import Field, field_validator
@@ -16,6 +14,24 @@ class Settings(BaseSettings):
     database_url: str = Field(default="sqlite:///./payroll.db", alias="DATABASE_URL")
     api_keys: List[str] = Field(default_factory=lambda: ["supersecretkey"], alias="API_KEYS")
 
+    # Payrun executor (process pool); 0 workers = one per CPU core
+    payrun_workers: int = Field(default=0, alias="PAYRUN_WORKERS")
+    payrun_chunk_size: int = Field(default=250, alias="PAYRUN_CHUNK_SIZE")
+
+    # Calculator arithmetic: "float" or "minor_units" (integer cents, per-country rounding rules)
+    payroll_arithmetic: str = Field(default="float", alias="PAYROLL_ARITHMETIC")
+
+    # Float arithmetic: evaluate employees on cached per-profile gross-to-net curves (see services/profile_curves.py)
+    payroll_profile_curves: bool = Field(default=False, alias="PAYROLL_PROFILE_CURVES")
+
+    # /calculate result cache (LRU + TTL); 0 entries disables it
+    calc_cache_max_entries: int = Field(default=10000, alias="CALC_CACHE_MAX_ENTRIES")
+    calc_cache_ttl_seconds: float = Field(default=300.0, alias="CALC_CACHE_TTL_SECONDS")
+    calc_cache_reuse_payslips: bool = Field(default=True, alias="CALC_CACHE_REUSE_PAYSLIPS")
+
+    # Seconds between checks of country_config.json for changes (hot reload); 0 disables the watcher
+    country_config_reload_seconds: float = Field(default=5.0, alias="COUNTRY_CONFIG_RELOAD_SECONDS")
+
     # Validate database_url format
     @field_validator("database_url")
     @classmethod
@@ -25,6 +41,13 @@ class Settings(BaseSettings):
             raise ValueError(f"❌ DATABASE_URL is missing or invalid: {v}")
         return v
 
+    @field_validator("payroll_arithmetic")
+    @classmethod
+    def validate_payroll_arithmetic(cls, v):
+        if v not in ("float", "minor_units"):
+            raise ValueError(f"❌ PAYROLL_ARITHMETIC must be 'float' or 'minor_units', got: {v}")
+        return v
+
     @field_validator("api_keys", mode="before")
     @classmethod
     def parse_api_keys(cls, v):
@@ -39,13 +62,3 @@ class Settings(BaseSettings):
 settings = Settings()
 DATABASE_URL = settings.database_url
 API_KEYS = settings.api_keys
-
-
-# Load country config from JSON
-def load_country_config():
-    config_path = os.path.join(os.path.dirname(__file__), "country_config.json")
-    with open(config_path, encoding="utf-8") as f:
-        return json.load(f)
-
-
-country_config = load_country_config()
\ No newline at end of file
@@ -0,0 +1,225 @@
+# app/config/tenant_overlays.py
+"""
+Per-tenant config overlays: a tenant's negotiated changes to a country's optional_benefits,
+allowance_rules and overtime_multiplier, layered on top of the base country config.
+
+    tenant_overlays.json: {"42": {"Canada": {"optional_benefits": {"rrsp": {"employer_match_rate": 0.05},
+                                                                   "private_plan": {...}},
+                                          "overtime_multiplier": 2.0}}}
+
+An overlay is merged (merge_config_section) onto every effective-dated version of the country,
+so dated base changes still apply to tenants with overlays. Merged views are compiled on first
+use and kept in an LRU keyed by (tenant_id, country, config_version of the base country); a
+request only looks them up. Tenants without an overlay read the base plans directly.
+"""
+
+import copy
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from datetime import date
+from typing import Any, Dict, Hashable, Iterable, Optional, Tuple
+
+from app.config.config_patch import merge_config_section
+from app.config.effective import EffectivePlans, PlanTimeline
+from app.config.rule_plan import CountryRulePlan, compile_parsed_section
+from app.config.schema import ConfigValidationError, parse_country_section
+from app.utils.metrics import TENANT_PLAN_CACHE
+
+# Country config sections a tenant overlay may change
+OVERLAY_SECTIONS = ("optional_benefits", "allowance_rules", "overtime_multiplier")
+DEFAULT_MAX_ENTRIES = 1024
+
+
+def overlay_timeline(timeline: PlanTimeline, overlay: Dict[str, Any], label: Optional[str] = None) -> PlanTimeline:
+    """
+    The timeline with `overlay` merged onto each of its versions and recompiled (same starts).
+    Raises ValueError for a section outside OVERLAY_SECTIONS and ConfigValidationError listing
+    every version the merged rules do not validate for (prefixed with label, default the country).
+    """
+    label = label or timeline.country
+    configs, plans, errors = [], [], []
+    for start, config in zip(timeline.starts, timeline.configs):
+        merged = merge_config_section(config, overlay, sections=OVERLAY_SECTIONS)
+        version_label = label if start == date.min else f"{label} from {start}"
+        try:
+            plans.append(compile_parsed_section(timeline.country, parse_country_section(version_label, merged), merged))
+        except ConfigValidationError as exc:
+            errors.extend(exc.errors)
+        configs.append(merged)
+    if errors:
+        raise ConfigValidationError(errors)
+    return PlanTimeline(timeline.country, timeline.starts, tuple(plans), tuple(configs))
+
+
+class TenantOverlays:
+    """
+    Tenant overlays and the cache of their compiled views. `effective` is the EffectivePlans the
+    caller calculates with (ConfigSnapshot.effective, PayrunExecutor.effective):
+      - timeline(effective, tenant_id, country): the country's PlanTimeline for the tenant (the base
+        timeline when the tenant has no overlay for it; None for an unknown country)
+      - plan_for(effective, tenant_id, country, period_start): the tenant's plan in effect for a period
+      - tenant_plans(effective, tenant_ids, period_start): tenant_id -> country -> plan, only for the
+        tenants that have overlays (tenant_ids None: all of them); bulk runs use the base plans for
+        everyone else
+      - set(...) / remove(...): validate against the given base, then publish; the tenant's cached
+        views of the country are dropped, and the file (when there is one) is rewritten
+      - reload(): re-read the file (e.g. on POST /config/reload, for the other app processes)
+    A config reload that changes a country compiles new views of it on demand; the old ones age
+    out of the LRU. Thread-safe; compiling happens outside the lock.
+    Raises ConfigValidationError when an overlay no longer validates against a reloaded base config.
+    """
+
+    def __init__(self, path: Optional[str] = None, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max(int(max_entries), 1)
+        self._overlays: Dict[Tuple[int, str], Dict[str, Any]] = {}
+        self._tenants: Dict[int, Tuple[str, ...]] = {}
+        self._views: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._hits, self._misses, self._evictions = (
+            TENANT_PLAN_CACHE.labels(result=result) for result in ("hit", "miss", "evicted")
+        )
+        self.reload()
+
+    def reload(self) -> None:
+        """Load the overlays file (a missing file or no path: no overlays); raises ValueError on a malformed one."""
+        overlays = {}
+        if self.path and os.path.exists(self.path):
+            with open(self.path, "r", encoding="utf-8") as f:
+                raw = json.load(f)
+            if not isinstance(raw, dict):
+                raise ValueError("tenant overlays must be an object keyed by tenant_id")
+            for tenant_id, countries in raw.items():
+                if not isinstance(countries, dict):
+                    raise ValueError(f"tenant {tenant_id}: overlays must be an object keyed by country")
+                for country, overlay in countries.items():
+                    overlays[(int(tenant_id), country)] = _checked(overlay)
+        self._publish(overlays, clear=True)
+
+    def get(self, tenant_id: int) -> Dict[str, Dict[str, Any]]:
+        """country -> overlay of one tenant."""
+        overlays = self._overlays
+        return {
+            country: overlays[(tenant_id, country)]
+            for country in self._tenants.get(tenant_id, ()) if (tenant_id, country) in overlays
+        }
+
+    def timeline(self, effective: EffectivePlans, tenant_id: Optional[int], country: str) -> Optional[PlanTimeline]:
+        base = effective.timelines.get(country)
+        overlay = self._overlays.get((tenant_id, country))
+        if base is None or overlay is None:
+            return base
+        key = (tenant_id, country, base.plans[0].config_version)
+        with self._lock:
+            entry = self._views.get(key)
+            # Dated versions are not in config_version: the entry must come from this very timeline
+            if entry is not None and entry[0] is overlay and entry[1] is base:
+                self._views.move_to_end(key)
+                self._hits.inc()
+                return entry[2]
+        self._misses.inc()
+        timeline = overlay_timeline(base, overlay, f"{country} (tenant {tenant_id})")
+        self._cache(key, overlay, base, timeline)
+        return timeline
+
+    def plan_for(
+        self, effective: EffectivePlans, tenant_id: Optional[int], country: str, period_start: date
+    ) -> Optional[CountryRulePlan]:
+        if (tenant_id, country) not in self._overlays:
+            return effective.plan_for(country, period_start)
+        timeline = self.timeline(effective, tenant_id, country)
+        return timeline.plan_at(period_start) if timeline is not None else None
+
+    def tenant_plans(
+        self, effective: EffectivePlans, tenant_ids: Optional[Iterable[Optional[int]]], period_start: date
+    ) -> Dict[int, Dict[str, CountryRulePlan]]:
+        plans: Dict[int, Dict[str, CountryRulePlan]] = {}
+        for tenant_id in set(self._tenants if tenant_ids is None else tenant_ids):
+            countries = self._tenants.get(tenant_id)
+            if countries:
+                tenant = plans[tenant_id] = dict(effective.plans_for(period_start))
+                for country in countries:
+                    if country in tenant:
+                        tenant[country] = self.timeline(effective, tenant_id, country).plan_at(period_start)
+        return plans
+
+    def set(self, effective: EffectivePlans, tenant_id: int, country: str, overlay: Dict[str, Any]) -> PlanTimeline:
+        """Validate the overlay against the country's base timeline and publish it; returns the compiled view."""
+        base = effective.timelines.get(country)
+        if base is None:
+            raise ValueError(f"Country configuration not found for {country}")
+        overlay = copy.deepcopy(_checked(overlay))
+        timeline = overlay_timeline(base, overlay, f"{country} (tenant {tenant_id})")
+        self._update({(tenant_id, country): overlay})
+        self._cache((tenant_id, country, base.plans[0].config_version), overlay, base, timeline)
+        return timeline
+
+    def remove(self, tenant_id: int, country: str) -> bool:
+        if (tenant_id, country) not in self._overlays:
+            return False
+        self._update({(tenant_id, country): None})
+        return True
+
+    def _cache(self, key: Tuple[int, str, str], overlay: Dict[str, Any], base: PlanTimeline, timeline: PlanTimeline) -> None:
+        with self._lock:
+            # A view compiled from an overlay that was replaced meanwhile is not cached
+            if self._overlays.get(key[:2]) is not overlay:
+                return
+            self._views[key] = (overlay, base, timeline)
+            self._views.move_to_end(key)
+            while len(self._views) > self.max_entries:
+                self._views.popitem(last=False)
+                self._evictions.inc()
+
+    def _update(self, changes: Dict[Tuple[int, str], Optional[Dict[str, Any]]]) -> None:
+        with self._write_lock:
+            overlays = dict(self._overlays)
+            for key, overlay in changes.items():
+                if overlay is None:
+                    overlays.pop(key, None)
+                else:
+                    overlays[key] = overlay
+            if self.path:
+                self._write(overlays)
+            self._publish(overlays, changed=changes)
+
+    def _publish(self, overlays, clear: bool = False, changed: Iterable[Tuple[int, str]] = ()) -> None:
+        tenants: Dict[int, Tuple[str, ...]] = {}
+        for tenant_id, country in overlays:
+            tenants[tenant_id] = tenants.get(tenant_id, ()) + (country,)
+        # Readers take self._overlays once; both maps are replaced, never modified
+        self._overlays, self._tenants = overlays, tenants
+        with self._lock:
+            if clear:
+                self._views.clear()
+            for tenant_id, country in changed:
+                for key in [key for key in self._views if key[:2] == (tenant_id, country)]:
+                    del self._views[key]
+
+    def _write(self, overlays) -> None:
+        raw: Dict[str, Dict[str, Any]] = {}
+        for (tenant_id, country), overlay in sorted(overlays.items()):
+            raw.setdefault(str(tenant_id), {})[country] = overlay
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tenant_overlays-", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(raw, f, indent=2)
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+
+def _checked(overlay: Any) -> Dict[str, Any]:
+    """Shape check of one overlay (the sections are checked again when it is merged)."""
+    if not isinstance(overlay, dict) or not overlay:
+        raise ValueError("A tenant overlay must be a non-empty object keyed by config section")
+    unknown = sorted(set(overlay) - set(OVERLAY_SECTIONS))
+    if unknown:
+        raise ValueError(f"A tenant overlay may only change {list(OVERLAY_SECTIONS)}; got {unknown}")
+    return overlay
@@ -0,0 +1,115 @@
+# app/database/ytd_store.py
+
+import threading
+from collections import defaultdict
+from typing import Dict, Iterable, List, Mapping, Tuple
+
+from sqlalchemy import and_, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.payrun import YtdAccumulator
+
+# Rows per upsert statement (5 bind parameters each; keeps well under driver parameter limits)
+UPSERT_BATCH_ROWS = 1000
+
+
+def _insert_for(db: AsyncSession):
+    """Dialect-specific INSERT (both support ON CONFLICT DO UPDATE)."""
+    return sqlite.insert if db.bind.dialect.name == "sqlite" else postgresql.insert
+
+
+class YtdStore:
+    """
+    Year-to-date accumulators: ytd_accumulator table plus an in-process read-through cache.
+      - load():  one query for every employee not cached yet; afterwards component lookups are dict
+                 hits, O(1) per component, so bulk runs stay fast
+      - add():   upserts increments (amount = amount + increment) in the caller's session, so they commit
+                 or roll back together with the EmployeePay rows. It returns the touched cache keys; callers
+                 invalidate them again after commit/rollback so no pre-commit read stays cached.
+    The cache is per process: with several app processes, run payruns for one tenant through one of them.
+    """
+
+    def __init__(self):
+        self._cache: Dict[Tuple[int, str, int], Dict[str, float]] = {}
+        self._lock = threading.Lock()
+
+    async def load(
+        self,
+        db: AsyncSession,
+        tenant_id: int,
+        tax_year: int,
+        employee_ids: Iterable[str],
+    ) -> Dict[str, Dict[str, float]]:
+        """employee_id -> {component: YTD amount} for one tenant and tax year."""
+        employee_ids = list(dict.fromkeys(employee_ids))
+        with self._lock:
+            found = {
+                emp: self._cache[(tenant_id, emp, tax_year)]
+                for emp in employee_ids
+                if (tenant_id, emp, tax_year) in self._cache
+            }
+        missing = [emp for emp in employee_ids if emp not in found]
+        if missing:
+            fetched: Dict[str, Dict[str, float]] = {emp: {} for emp in missing}
+            result = await db.execute(
+                select(YtdAccumulator.employee_id, YtdAccumulator.component, YtdAccumulator.amount).where(
+                    and_(
+                        YtdAccumulator.tenant_id == tenant_id,
+                        YtdAccumulator.tax_year == tax_year,
+                        YtdAccumulator.employee_id.in_(missing),
+                    )
+                )
+            )
+            for employee_id, component, amount in result:
+                fetched[employee_id][component] = float(amount or 0)
+            with self._lock:
+                for emp, totals in fetched.items():
+                    self._cache[(tenant_id, emp, tax_year)] = totals
+            found.update(fetched)
+        return {emp: dict(found[emp]) for emp in employee_ids}
+
+    async def add(
+        self,
+        db: AsyncSession,
+        tax_year: int,
+        increments: Iterable[Tuple[Tuple[int, str], Mapping[str, float]]],
+    ) -> List[Tuple[int, str, int]]:
+        """
+        Add increments for many employees in one statement: [((tenant_id, employee_id), {component: amount}), ...].
+        Repeated employees are summed. Does not commit; the caller's transaction owns the write.
+        """
+        totals: Dict[Tuple[int, str, str], float] = defaultdict(float)
+        employees = set()
+        for (tenant_id, employee_id), components in increments:
+            employees.add((tenant_id, employee_id))
+            for component, amount in components.items():
+                totals[(tenant_id, employee_id, component)] += float(amount)
+        rows = [
+            {"tenant_id": t, "employee_id": e, "tax_year": tax_year, "component": c, "amount": round(a, 2)}
+            for (t, e, c), a in totals.items()
+            if round(a, 2) != 0
+        ]
+        for start in range(0, len(rows), UPSERT_BATCH_ROWS):
+            insert = _insert_for(db)(YtdAccumulator).values(rows[start:start + UPSERT_BATCH_ROWS])
+            await db.execute(
+                insert.on_conflict_do_update(
+                    index_elements=["tenant_id", "employee_id", "tax_year", "component"],
+                    set_={"amount": YtdAccumulator.amount + insert.excluded.amount},
+                )
+            )
+        keys = [(tenant_id, employee_id, tax_year) for tenant_id, employee_id in employees]
+        self.invalidate(keys)
+        return keys
+
+    def invalidate(self, keys: Iterable[Tuple[int, str, int]]) -> None:
+        with self._lock:
+            for key in keys:
+                self._cache.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._cache.clear()
+
+
+ytd_store = YtdStore()
@@ -1,6 +1,8 @@
 from fastapi import FastAPI, Request
 from contextlib import asynccontextmanager
 from app.routes import payroll
+from app.config.country_config import config_registry
+from app.config.settings import settings
 from app.database.connection import Base,async_engine
 from prometheus_fastapi_instrumentator import Instrumentator
 from fastapi.exceptions import RequestValidationError
@@ -15,8 +17,12 @@ async def lifespan(app: FastAPI):
     # Startup logic
     async with async_engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+    # Hot reload of country_config.json (see app/config/registry.py)
+    config_registry.watch(settings.country_config_reload_seconds)
 
     yield  # Application is now running
+    config_registry.stop()
+    payroll.shutdown_payrun_executor()
     print("App shutdown complete!")
     # (Optional) Shutdown logic here if needed
     # e.g. await some_cleanup()
@@ -26,7 +32,8 @@ async def lifespan(app: FastAPI):
 app = FastAPI(
     title="Global Payroll Microservice",
     version="1.0.0",
-    description="Modular FastAPI payroll service with Gross-to-Net calculations across countries."
+    description="Modular FastAPI payroll service with Gross-to-Net calculations across countries.",
+    lifespan=lifespan,
 )
 @app.exception_handler(RequestValidationError)
 async def validation_exception_handler(request: Request, exc: RequestValidationError):
@@ -0,0 +1,97 @@
+# app/models/calc_input.py
+
+from dataclasses import dataclass, field, replace
+from typing import Any, Dict, Mapping, Optional
+
+# ORM master-record columns copied into metadata when the request carries none
+_MASTER_METADATA_FIELDS = ("full_name", "job_title", "department", "tax_id", "bank_account_last4")
+
+
+def benefits_map(raw_benefits) -> dict:
+    """Normalize benefits_opt_in from Pydantic v2/v1 models or plain dicts; drops None values."""
+    raw_benefits = raw_benefits or {}
+    if hasattr(raw_benefits, "model_dump"):          # Pydantic v2
+        return {k: v for k, v in raw_benefits.model_dump().items() if v is not None}
+    if hasattr(raw_benefits, "dict"):               # Pydantic v1
+        return {k: v for k, v in raw_benefits.dict().items() if v is not None}
+    if isinstance(raw_benefits, dict):
+        return raw_benefits
+    return {}
+
+
+def _number(value) -> float:
+    return float(value or 0)
+
+
+@dataclass(frozen=True, slots=True)
+class CalcInput:
+    """
+    One employee's inputs for one pay period, as read by the calculators
+    (gross pay, deductions, employer costs, payslips, batch engine, caches).
+    Every field is normalized once at construction, so services read attributes directly:
+      - numbers are floats (missing / None -> 0.0)
+      - allowances and benefits_opt_in are plain dicts
+      - metadata is a dict (or None when nothing is known)
+    Frozen and slotted: cheap to build, picklable for the payrun workers, safe to share between
+    cached and batched calculations. Use with_changes() for a modified copy.
+    """
+    employee_id: str = ""
+    country: Optional[str] = None
+    tenant_id: Optional[int] = None
+    hourly_rate: float = 0.0
+    hours_worked: float = 0.0
+    overtime_hours: float = 0.0
+    bonuses: float = 0.0
+    base_pay: float = 0.0
+    allowances: Dict[str, Any] = field(default_factory=dict)
+    benefits_opt_in: Dict[str, Any] = field(default_factory=dict)
+    metadata: Optional[Dict[str, Any]] = None
+
+    @classmethod
+    def from_employee(cls, employee, master=None) -> "CalcInput":
+        """
+        Build from a request Employee (Pydantic) with the ORM Employee master record as fallback:
+          - country: master record first (source of truth), else the request
+          - hourly_rate / base_pay: request first, else master record, else 0
+          - period inputs (hours, overtime, bonuses, allowances, opt-ins): request only
+          - metadata: request first, else the master record's name / job / bank fields
+        """
+        metadata = getattr(employee, "metadata", None)
+        hourly_rate = getattr(employee, "hourly_rate", None)
+        base_pay = getattr(employee, "base_pay", None)
+        return cls(
+            employee_id=str(employee.employee_id),
+            country=(master.country if (master is not None and getattr(master, "country", None)) else employee.country),
+            tenant_id=int(employee.tenant_id),
+            hourly_rate=float(hourly_rate if hourly_rate is not None else _number(getattr(master, "hourly_rate", 0))),
+            hours_worked=_number(getattr(employee, "hours_worked", 0)),
+            overtime_hours=_number(getattr(employee, "overtime_hours", 0)),
+            bonuses=_number(getattr(employee, "bonuses", 0)),
+            base_pay=float(base_pay if base_pay is not None else _number(getattr(master, "base_pay", 0))),
+            allowances=dict(getattr(employee, "allowances", None) or {}),
+            benefits_opt_in=benefits_map(getattr(employee, "benefits_opt_in", None)),
+            metadata=(
+                dict(metadata)
+                if metadata
+                else {name: (getattr(master, name, None) if master is not None else None) for name in _MASTER_METADATA_FIELDS}
+            ),
+        )
+
+    @classmethod
+    def from_inputs(cls, employee_id: str, inputs: Mapping[str, Any], **identity: Any) -> "CalcInput":
+        """Rebuild from a stored EmployeePay.calc_inputs snapshot; identity: country / tenant_id / metadata."""
+        return cls(
+            employee_id=str(employee_id),
+            hourly_rate=_number(inputs.get("hourly_rate")),
+            hours_worked=_number(inputs.get("hours_worked")),
+            overtime_hours=_number(inputs.get("overtime_hours")),
+            bonuses=_number(inputs.get("bonuses")),
+            base_pay=_number(inputs.get("base_pay")),
+            allowances=dict(inputs.get("allowances") or {}),
+            benefits_opt_in=dict(inputs.get("benefits_opt_in") or {}),
+            **identity,
+        )
+
+    def with_changes(self, **changes: Any) -> "CalcInput":
+        """Copy with some fields replaced (the original is never mutated)."""
+        return replace(self, **changes)
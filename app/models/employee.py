@@ -1,5 +1,6 @@
-from pydantic import BaseModel
-from typing import Optional, Dict
+from pydantic import BaseModel, ConfigDict
+from typing import Any, Optional, Dict, List
+from datetime import date
 
 class CompanyMetadata(BaseModel):
     company_name: str
@@ -14,6 +15,9 @@ class EmployeeMetadata(BaseModel):
     bank_account_last4: Optional[str] = None
 
 class BenefitsOptIn(BaseModel):
+    # Other keys opt into the country's optional_benefits by name (e.g. {"hsa": true})
+    model_config = ConfigDict(extra="allow")
+
     private_pension: Optional[bool] = False
     health_insurance_top_up: Optional[bool] = False
     meal_subsidy: Optional[bool] = False
@@ -34,4 +38,56 @@ class Employee(BaseModel):
 
 class PayrollRequest(BaseModel):
     employee: Employee
-    company: Optional[CompanyMetadata] = None
\ No newline at end of file
+    company: Optional[CompanyMetadata] = None
+
+class BatchPayrollRequest(BaseModel):
+    employees: List[Employee]
+    company: Optional[CompanyMetadata] = None
+
+class PayrunRequest(BaseModel):
+    employees: List[Employee]
+    company: Optional[CompanyMetadata] = None
+    chunk_size: Optional[int] = None        # defaults to settings.payrun_chunk_size
+    render_payslips: bool = True
+
+class PayrunRecalculateRequest(BaseModel):
+    employees: List[Employee]              # only the edited employees need to be posted
+    company: Optional[CompanyMetadata] = None
+    render_payslips: bool = True
+
+class GrossUpRequest(BaseModel):
+    employee: Employee
+    target_net: float                      # net pay the employee should receive this period
+    component: str = "base_pay"            # earnings input solved for: base_pay or bonuses
+
+class GrossUpItem(BaseModel):
+    employee: Employee
+    target_net: float
+
+class GrossUpBatchRequest(BaseModel):
+    items: List[GrossUpItem]
+    component: str = "base_pay"
+
+class SimulationRequest(BaseModel):
+    tenant_id: int
+    country: str
+    patch: Dict[str, Any]                  # statutory / income_tax_brackets / optional_benefits overrides
+    payrun_id: Optional[int] = None        # defaults to the tenant's latest payrun for the country
+    include_employees: bool = False        # per-employee deltas in the response
+
+class ForecastRequest(BaseModel):
+    tenant_id: int
+    periods: int = 12                      # pay periods to project
+    country: Optional[str] = None          # defaults to every country the tenant has payruns for
+    start_date: Optional[date] = None      # defaults to the day after the latest payrun's period_end
+    include_employees: bool = False        # per-employee projections in the response
+
+class RetroRequest(BaseModel):
+    tenant_id: int
+    country: str
+    effective_from: date                   # payruns whose period starts on/after this date are recomputed
+    employee_changes: Dict[str, Dict[str, Any]] = {}  # employee_id -> back-dated input changes (e.g. hourly_rate)
+    patch: Optional[Dict[str, Any]] = None # back-dated rule change (statutory / income_tax_brackets / optional_benefits)
+    reason: Optional[str] = None
+    company: Optional[CompanyMetadata] = None
+    render_payslips: bool = True
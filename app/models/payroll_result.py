@@ -0,0 +1,153 @@
+# app/models/payroll_result.py
+
+from collections.abc import Mapping
+from typing import Any, Dict, Iterator, List, Optional
+
+# Breakdown keys, in response order
+BREAKDOWN_KEYS = (
+    "base_pay", "overtime_pay", "bonuses", "allowances_breakdown", "gross_pay",
+    "taxable_income", "tax_exemptions_applied", "income_tax",
+    "total_deductions", "net_pay",
+    "employer_costs", "total_employer_cost",
+    "tax_bracket_details",
+    "benefits_deductions",
+    "social_security", "health_insurance", "solidarity_fund",
+    "pay_period", "pay_type",
+)
+_BREAKDOWN_KEY_SET = frozenset(BREAKDOWN_KEYS)
+
+# Top-level amounts kept exact; the breakdown shows them rounded to the currency's digits
+_EXACT_TOTALS = frozenset(("gross_pay", "net_pay", "total_employer_cost"))
+
+
+class PayrollResult(Mapping):
+    """
+    One gross-to-net calculation (see services/gross_to_net.py), without the nested dicts.
+
+    Attributes are the result:
+      - gross_pay, net_pay, total_employer_cost: exact amounts (the top level of the response)
+      - base_pay, overtime_pay, bonuses, taxable_income, income_tax, total_deductions,
+        total_pre_tax, total_post_tax, social_security, health_insurance, solidarity_fund:
+        rounded to the currency's digits
+      - pre_tax_breakdown, post_tax_breakdown, employer_costs, tax_exemptions_applied,
+        tax_bracket_details: the calculators' own dicts / lists (shared, never copied)
+      - trace: the explain-mode rule trace, or None when the calculation was not traced
+
+    As a read-only Mapping it is the breakdown: the same keys and values as the response's
+    "breakdown" dict, each computed when read (allowances are rounded, benefits_deductions
+    assembled on first access), so the DB rows, payslip and YTD increments read what they
+    need and the full dict is only built for the JSON response (to_dict()).
+    """
+
+    __slots__ = (
+        "gross_pay", "net_pay", "total_employer_cost", "digits",
+        "base_pay", "overtime_pay", "bonuses", "taxable_income", "income_tax", "total_deductions",
+        "total_pre_tax", "total_post_tax", "social_security", "health_insurance", "solidarity_fund",
+        "pre_tax_breakdown", "post_tax_breakdown", "employer_costs", "tax_exemptions_applied",
+        "tax_bracket_details", "pay_period", "pay_type", "trace", "_allowances", "_allowances_rounded",
+    )
+
+    def __init__(
+        self,
+        gross_pay: float,
+        net_pay: float,
+        total_employer_cost: float,
+        digits: int,
+        base_pay: float,
+        overtime_pay: float,
+        bonuses: float,
+        allowances: Dict[str, float],
+        deductions: Dict[str, Any],
+        employer_costs: Dict[str, float],
+        pay_period: str,
+        pay_type: str,
+        trace: Optional[List[dict]] = None,
+    ):
+        """
+        deductions: calculate_deductions' dict (amounts already rounded); employer_costs:
+        calculate_employer_costs' breakdown (already rounded); allowances: calculate_gross_pay's.
+        """
+        pre_tax, post_tax = deductions["pre_tax_breakdown"], deductions["post_tax_breakdown"]
+        self.gross_pay = gross_pay
+        self.net_pay = net_pay
+        self.total_employer_cost = total_employer_cost
+        self.digits = digits
+        self.base_pay = round(base_pay, digits)
+        self.overtime_pay = round(overtime_pay, digits)
+        self.bonuses = round(bonuses, digits)
+        self.taxable_income = deductions["taxable_income"]
+        self.income_tax = deductions["income_tax"]
+        self.total_deductions = round(float(deductions["total_deductions"]), digits)
+        self.total_pre_tax = deductions["total_pre_tax_deductions"]
+        self.total_post_tax = deductions["total_post_tax_deductions"]
+        # Legacy EmployeePay columns (zero unless the country names a deduction like this)
+        self.social_security = round(float(pre_tax.get("social_security", 0.0)) + float(post_tax.get("social_security", 0.0)), digits)
+        self.health_insurance = round(float(pre_tax.get("health_insurance", 0.0)) + float(post_tax.get("health_insurance", 0.0)), digits)
+        self.solidarity_fund = round(float(pre_tax.get("solidarity_fund", 0.0)) + float(post_tax.get("solidarity_fund", 0.0)), digits)
+        self.pre_tax_breakdown = pre_tax
+        self.post_tax_breakdown = post_tax
+        self.employer_costs = employer_costs
+        self.tax_exemptions_applied = deductions["tax_exemptions_applied"]
+        self.tax_bracket_details = deductions["tax_bracket_details"]
+        self.pay_period = pay_period
+        self.pay_type = pay_type
+        self.trace = trace
+        self._allowances = allowances
+        self._allowances_rounded = None
+
+    @property
+    def allowances_breakdown(self) -> Dict[str, float]:
+        if self._allowances_rounded is None:
+            digits = self.digits
+            self._allowances_rounded = {k: round(v, digits) for k, v in self._allowances.items()}
+        return self._allowances_rounded
+
+    @property
+    def benefits_deductions(self) -> Dict[str, Any]:
+        return {
+            "pre_tax": self.pre_tax_breakdown,
+            "post_tax": self.post_tax_breakdown,
+            "total_pre_tax": self.total_pre_tax,
+            "total_post_tax": self.total_post_tax,
+        }
+
+    # Mapping over the breakdown keys
+    def __getitem__(self, key: str) -> Any:
+        if key in _EXACT_TOTALS:
+            return round(getattr(self, key), self.digits)
+        if key in _BREAKDOWN_KEY_SET:
+            return getattr(self, key)
+        raise KeyError(key)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(BREAKDOWN_KEYS)
+
+    def __len__(self) -> int:
+        return len(BREAKDOWN_KEYS)
+
+    @property
+    def breakdown(self) -> Dict[str, Any]:
+        """The breakdown as a plain dict (response / JSON shape)."""
+        return {key: self[key] for key in BREAKDOWN_KEYS}
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Response shape: {"gross_pay", "net_pay", "total_employer_cost", "breakdown"} (+ "explain" when traced)."""
+        response = {
+            "gross_pay": self.gross_pay,
+            "net_pay": self.net_pay,
+            "total_employer_cost": self.total_employer_cost,
+            "breakdown": self.breakdown,
+        }
+        if self.trace is not None:
+            response["explain"] = self.trace
+        return response
+
+    def __eq__(self, other: Any) -> bool:
+        if isinstance(other, PayrollResult):
+            return self.to_dict() == other.to_dict()
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return f"PayrollResult(gross_pay={self.gross_pay!r}, net_pay={self.net_pay!r}, total_employer_cost={self.total_employer_cost!r})"
@@ -1,6 +1,6 @@
 # app/models/payrun.py
 from sqlalchemy import (
-    Column, Integer, String, Text, Date, Numeric, TIMESTAMP, ForeignKey, Boolean
+    Column, Integer, String, Text, Date, Numeric, TIMESTAMP, ForeignKey, Boolean, UniqueConstraint
 )
 from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.sql import func
@@ -76,6 +76,11 @@ class EmployeePay(Base):
     tax_bracket_details = Column(JSONB)
     tax_exemptions_applied = Column(JSONB)
     country_specific_benefits = Column(JSONB)
+    # Incremental recalculation: sha256 of normalized inputs + config version, and the inputs themselves
+    input_fingerprint = Column(String(64))
+    config_version = Column(String(64))
+    calc_inputs = Column(JSONB)
+    ytd_increments = Column(JSONB)  # amounts this row added to ytd_accumulator, by component
     created_at = Column(TIMESTAMP(timezone=True), server_default=func.now())
     issued_at = Column(TIMESTAMP, server_default=func.now())
     updated_at = Column(TIMESTAMP, server_default=func.now())
@@ -103,4 +108,31 @@ class EmployeeBenefitsDeductions(Base):
     deduction_type = Column(String(100))  # pre_tax / post_tax
     benefit_name = Column(String(100))
     amount = Column(Numeric(12, 2))
-    payer = Column(String(20))  # 'employee' or 'employer'
\ No newline at end of file
+    payer = Column(String(20))  # 'employee' or 'employer'
+
+class YtdAccumulator(Base):
+    __tablename__ = "ytd_accumulator"
+    __table_args__ = (
+        UniqueConstraint("tenant_id", "employee_id", "tax_year", "component", name="uq_ytd_accumulator_component"),
+    )
+    id = Column(Integer, primary_key=True)
+    tenant_id = Column(Integer, ForeignKey("tenant.id"))
+    employee_id = Column(String(50), ForeignKey("employee.id", ondelete="CASCADE"), nullable=False)
+    tax_year = Column(Integer, nullable=False)
+    component = Column(String(150), nullable=False)  # 'gross_pay', 'employee:401k', 'employer:Employer 401k', ...
+    amount = Column(Numeric(14, 2), nullable=False, default=0)
+    updated_at = Column(TIMESTAMP(timezone=True), server_default=func.now(), onupdate=func.now())
+
+class PayAdjustment(Base):
+    __tablename__ = "pay_adjustment"
+    id = Column(Integer, primary_key=True)
+    payrun_id = Column(Integer, ForeignKey("payrun.id", ondelete="CASCADE"), nullable=False)  # payrun that pays it
+    adjustment_set = Column(String(36), nullable=False)  # one id per retro run
+    tenant_id = Column(Integer, ForeignKey("tenant.id"))
+    employee_id = Column(String(50), ForeignKey("employee.id", ondelete="CASCADE"), nullable=False)
+    source_employee_pay_id = Column(Integer, ForeignKey("employee_pay.id", ondelete="SET NULL"))
+    source_pay_period = Column(String(50))
+    component = Column(String(150), nullable=False)  # 'gross_pay', 'income_tax', 'employee:401k', 'employer:FUTA', ...
+    amount = Column(Numeric(12, 2), nullable=False)  # new - originally paid
+    reason = Column(Text)
+    created_at = Column(TIMESTAMP(timezone=True), server_default=func.now())
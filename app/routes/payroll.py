@@ -1,39 +1,204 @@
-from fastapi import APIRouter, Depends, HTTPException
+import asyncio
+import os
+import uuid
+
+from fastapi import APIRouter, Body, Depends, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi.responses import FileResponse
-from sqlalchemy import select, and_
+from sqlalchemy import select, and_, delete, func
 from sqlalchemy.exc import DBAPIError
-from datetime import date
+from datetime import date, timedelta
+from typing import Any, Dict, List
 
+from app.models.calc_input import CalcInput
+from app.models.payroll_result import PayrollResult
 from app.models.payroll_record import PayrollRecord
-from app.models.employee import PayrollRequest
-from app.config.country_config import country_config
+from app.models.employee import (
+    PayrollRequest, BatchPayrollRequest, PayrunRequest, PayrunRecalculateRequest,
+    GrossUpRequest, GrossUpBatchRequest, SimulationRequest, ForecastRequest, RetroRequest,
+)
+from app.config.config_patch import merge_config_section
+from app.config.country_config import config_registry, tenant_overlays
+from app.config.rule_plan import compile_country_plan
+from app.config.settings import settings
 from app.database.session import get_async_db
-from app.services.deductions import calculate_deductions
-
-from app.services.employer_costs import calculate_employer_costs
-from app.services.gross_pay import calculate_gross_pay
-from app.services.payslip import generate_payslip
+from app.database.ytd_store import ytd_store
+from app.services.calc_cache import ResultCache, calculation_key, payslip_key, ytd_clamps
+from app.services.batch_engine import build_columns, calculate_batch, calculate_batch_minor
+from app.services.gross_to_net import ARITHMETIC_MINOR_UNITS, calculate_gross_to_net
+from app.services.forecast import MAX_FORECAST_PERIODS, forecast_costs, pay_period_starts
+from app.services.gross_up import gross_up
+from app.services.payrun_executor import PayrunExecutor
+from app.services.payrun_recalc import TOTAL_FIELDS, diff_fingerprints, input_fingerprint
+from app.services.payrun_store import (
+    PAY_PERIOD, PERIOD_START, TAX_YEAR, add_breakdown_rows, add_to_payrun_totals,
+    employee_pay_values, get_or_create_payrun, load_ytd, persist_results,
+)
+from app.services.payslip import generate_adjustment_payslip, generate_payslip
+from app.services.retro import (
+    EMPLOYER_COST_COMPONENT, RetroRow, adjustment_totals, compute_retro_adjustments, validate_input_changes,
+    version_plans,
+)
+from app.services.simulation import simulate_config_change
+from app.services.ytd import subtract_increments
+from app.utils.metrics import PAYRUN_CHUNK_SECONDS, PAYRUN_EMPLOYEES
 from app.utils.security import verify_api_key
 from app.models.payrun import (
     Payrun, EmployeePay, EmployeeAllowances,
-    EmployerContributions, EmployeeBenefitsDeductions
+    EmployerContributions, EmployeeBenefitsDeductions, PayAdjustment
 )
 from app.models.payrun import Employee as EmployeeORM
 
 router = APIRouter()
 
-def _pick_named_amount(name: str, pre_tax: dict, post_tax: dict) -> float:
+_payrun_executor = None
+
+# Content-addressed /calculate caches: identical re-posts skip the calculators (and the PDF)
+calculation_cache = ResultCache(settings.calc_cache_max_entries, settings.calc_cache_ttl_seconds, kind="calculation")
+payslip_cache = ResultCache(settings.calc_cache_max_entries, settings.calc_cache_ttl_seconds, kind="payslip")
+
+
+def _new_payrun_executor(snapshot) -> PayrunExecutor:
+    return PayrunExecutor(
+        snapshot.plans,
+        max_workers=settings.payrun_workers or None,
+        chunk_size=settings.payrun_chunk_size,
+        arithmetic=settings.payroll_arithmetic,
+        profile_curves=settings.payroll_profile_curves,
+        config_version=snapshot.version,
+        effective=snapshot.effective,
+    )
+
+
+def get_payrun_executor() -> PayrunExecutor:
+    """
+    Process pool shared by all /payrun requests; spawned on first use with the live config.
+    Callers persist with executor.country_plans, the plans its workers calculate with.
+    """
+    global _payrun_executor
+    if _payrun_executor is None:
+        _payrun_executor = _new_payrun_executor(config_registry.current)
+    return _payrun_executor
+
+
+def _reseed_payrun_executor(old, new) -> None:
     """
-    Helper to populate legacy columns like social_security/health_insurance/solidarity_fund
-    from the new deduction breakdowns (if present). Returns 0.0 if not found.
+    Config reload listener (runs on the reloading thread, off the request path): warm up a pool on
+    the new plans, then swap it in. The old pool finishes the chunks already submitted to it.
     """
-    return float(pre_tax.get(name, 0.0)) + float(post_tax.get(name, 0.0))
+    global _payrun_executor
+    previous = _payrun_executor
+    if previous is None:
+        return
+    executor = _new_payrun_executor(new)
+    executor.warm_up()
+    _payrun_executor = executor
+    previous.shutdown(wait=False, cancel_futures=False)
+
+
+config_registry.subscribe(_reseed_payrun_executor)
+
+
+def shutdown_payrun_executor() -> None:
+    global _payrun_executor
+    if _payrun_executor is not None:
+        _payrun_executor.shutdown()
+        _payrun_executor = None
+
+def _employee_pay_row(payrun: Payrun, calc_emp, result: PayrollResult, plan) -> EmployeePay:
+    return EmployeePay(payrun_id=payrun.id, **_employee_pay_values(calc_emp, result, plan))
+
+
+def _employee_pay_values(calc_emp, result: PayrollResult, plan) -> dict:
+    """EmployeePay columns; plan is the one result was calculated with (its config_version is recorded)."""
+    return employee_pay_values(calc_emp, result, plan, settings.payroll_arithmetic)
+
+
+def _tenant_plan(effective, tenant_id: int, country: str, period_start: date):
+    """The tenant's plan for a country and pay period: the base rules plus the tenant's overlay, if any."""
+    try:
+        plan = tenant_overlays.plan_for(effective, tenant_id, country, period_start)
+    except (ValueError, TypeError, KeyError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid tenant config overlay: {e}")
+    if not plan:
+        raise HTTPException(status_code=400, detail=f"Country configuration not found for {country}")
+    return plan
+
+
+def _tenant_plans(effective, tenant_ids, period_start: date) -> dict:
+    """tenant_id -> country -> plan for the tenants among tenant_ids that have overlays (see TenantOverlays)."""
+    try:
+        return tenant_overlays.tenant_plans(effective, tenant_ids, period_start)
+    except (ValueError, TypeError, KeyError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid tenant config overlay: {e}")
+
+
+def _tenant_timeline(effective, tenant_id: int, country: str):
+    try:
+        timeline = tenant_overlays.timeline(effective, tenant_id, country)
+    except (ValueError, TypeError, KeyError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid tenant config overlay: {e}")
+    if not timeline:
+        raise HTTPException(status_code=400, detail=f"Country configuration not found for {country}")
+    return timeline
+
+
+async def _tenant_payrun(db: AsyncSession, tenant_id: int, country: str, payrun_id: int = None):
+    """The tenant's payrun for a country: payrun_id if given (and owned), else the latest one."""
+    if payrun_id is not None:
+        payrun = await db.get(Payrun, payrun_id)
+        if payrun and (payrun.tenant_id != tenant_id or payrun.country != country):
+            return None
+        return payrun
+    result = await db.execute(
+        select(Payrun)
+        .where(and_(Payrun.tenant_id == tenant_id, Payrun.country == country))
+        .order_by(Payrun.id.desc())
+        .limit(1)
+    )
+    return result.scalars().first()
+
+
+async def _load_payrun_inputs(db: AsyncSession, payrun: Payrun):
+    """
+    Calculator inputs replayed from a payrun's stored calc_inputs (latest row per employee).
+    Returns (calc_emps, skipped); rows written before calc_inputs existed are skipped.
+    """
+    result = await db.execute(
+        select(EmployeePay.employee_id, EmployeePay.calc_inputs)
+        .where(EmployeePay.payrun_id == payrun.id)
+        .order_by(EmployeePay.id)
+    )
+    inputs = {row.employee_id: row.calc_inputs for row in result}
+    calc_emps = [CalcInput.from_inputs(emp_id, values) for emp_id, values in inputs.items() if values]
+    return calc_emps, len(inputs) - len(calc_emps)
+
+
+async def _latest_employee_pay(db: AsyncSession, payrun_id: int, employee_id: str):
+    """The employee's current EmployeePay row in a payrun (the latest one), or None."""
+    result = await db.execute(
+        select(EmployeePay)
+        .where(and_(EmployeePay.payrun_id == payrun_id, EmployeePay.employee_id == employee_id))
+        .order_by(EmployeePay.id.desc())
+        .limit(1)
+    )
+    return result.scalars().first()
+
+
+async def _load_employee_masters(db: AsyncSession, employee_ids: List[str]) -> dict:
+    """One query for all master records instead of one per employee; {(tenant_id, id): Employee}."""
+    try:
+        result = await db.execute(select(EmployeeORM).where(EmployeeORM.id.in_(employee_ids)))
+        return {(emp.tenant_id, emp.id): emp for emp in result.scalars()}
+    except Exception:
+        return {}
+
 
 @router.post("/calculate", dependencies=[Depends(verify_api_key)])
 async def calculate_payroll(
-    request: PayrollRequest, db: AsyncSession = Depends(get_async_db)
+    request: PayrollRequest, db: AsyncSession = Depends(get_async_db), explain: bool = False
 ):
+    # ?explain=true adds "explain": the rule-by-rule trace (see calculate_gross_to_net's trace)
     # IDs and period inputs come from the request
     req_emp = request.employee
     company = request.company
@@ -58,240 +223,711 @@ async def calculate_payroll(
     #if not employee_db:
     #   raise HTTPException(status_code=404, detail="Employee not found for tenant.")
 
-    # 1) Country config (you already have this above)
+    # 1) Country rule plan in effect for the pay period, from the live config snapshot (kept for the whole request),
+    #    with the tenant's overlay (compiled once, then cached)
     effective_country = (employee_db.country if (employee_db and getattr(employee_db, "country", None)) else req_emp.country)
     if not effective_country:
         raise HTTPException(status_code=400, detail="Country is required.")
 
-    config = country_config.get(effective_country)
-    if not config:
-        raise HTTPException(status_code=400, detail=f"Country configuration not found for {effective_country}")
+    plan = _tenant_plan(config_registry.current.effective, int(req_emp.tenant_id), effective_country, PERIOD_START)
 
     # 1a) Normalize IDs for later writes (INT/STR as per schema)
     tenant_int = int(req_emp.tenant_id)
     employee_id_str = str(req_emp.employee_id)
 
-    # 1b) Normalize dict-like fields defensively
-    allowances_map = dict(getattr(req_emp, "allowances", {}) or {})
+    # 2) Calculator input: request first, DB master record as fallback
+    calc_emp = CalcInput.from_employee(req_emp, employee_db)
 
-    raw_benefits = getattr(req_emp, "benefits_opt_in", {}) or {}
-    if hasattr(raw_benefits, "model_dump"):          # Pydantic v2
-        benefits_map = {k: v for k, v in raw_benefits.model_dump().items() if v is not None}
-    elif hasattr(raw_benefits, "dict"):               # Pydantic v1
-        benefits_map = {k: v for k, v in raw_benefits.dict().items() if v is not None}
-    elif isinstance(raw_benefits, dict):
-        benefits_map = raw_benefits
-    else:
-        benefits_map = {}
-
-    # 2) Build a lightweight object the calculators expect
-    class CalcEmployee:
-        # IDs & country
-        tenant_id = tenant_int
-        employee_id = employee_id_str
-        country = effective_country
-
-        # Prefer request → fallback to DB → else 0.0
-        hourly_rate = float(
-            req_emp.hourly_rate
-            if getattr(req_emp, "hourly_rate", None) is not None
-            else (float(getattr(employee_db, "hourly_rate", 0) or 0))
+    # 2a) Year-to-date totals (read-through cache) so annual limits/caps are enforced; a re-post is
+    #     calculated against YTD without the employee's previous calculation in this payrun
+    payrun = await get_or_create_payrun(db, calc_emp.tenant_id, calc_emp.country)
+    employee_pay = await _latest_employee_pay(db, payrun.id, employee_id_str)
+    previous_increments = employee_pay.ytd_increments if employee_pay is not None else None
+    ytd = subtract_increments(
+        (await ytd_store.load(db, tenant_int, TAX_YEAR, [employee_id_str]))[employee_id_str], previous_increments
+    )
+
+    # 3) Earnings -> deductions & tax -> net pay -> employer costs (cached by input + remaining annual
+    #    limits + config hash; explained calculations are always computed, and not cached, so cached
+    #    results stay trace-free)
+    cache_key = calculation_key(
+        calc_emp, plan, pay_period=PAY_PERIOD, arithmetic=settings.payroll_arithmetic, ytd=ytd_clamps(plan, ytd),
+    )
+    calculation = None if explain else calculation_cache.get(cache_key)
+    if calculation is None:
+        calculation = calculate_gross_to_net(
+            calc_emp, plan, pay_period=PAY_PERIOD, arithmetic=settings.payroll_arithmetic, ytd=ytd,
+            profile_curves=settings.payroll_profile_curves, trace=[] if explain else None,
         )
-        base_pay = float(
-            getattr(req_emp, "base_pay", None)
-            if getattr(req_emp, "base_pay", None) is not None
-            else (float(getattr(employee_db, "base_pay", 0) or 0))
+        if not explain:
+            calculation_cache.put(cache_key, calculation)
+
+    # 4) Generate Payslip (reused when the calculation, employee metadata and company all match)
+    payslip_path = None
+    if settings.calc_cache_reuse_payslips:
+        slip_key = payslip_key(cache_key, calc_emp, company)
+        payslip_path = payslip_cache.get(slip_key)
+        if payslip_path and not os.path.exists(payslip_path):
+            payslip_cache.invalidate(slip_key)
+            payslip_path = None
+    if payslip_path is None:
+        payslip_path = generate_payslip(
+            calc_emp, calculation, calculation.net_pay, {"total_employer_cost": calculation.total_employer_cost}, company
         )
+        if settings.calc_cache_reuse_payslips:
+            payslip_cache.put(slip_key, payslip_path)
+
+    # 5) Persist into Payrun / Payslip tables: one row per employee and payrun, so a re-post replaces
+    #    the employee's previous calculation and moves the totals and YTD by the difference
+    if employee_pay is None:
+        employee_pay = _employee_pay_row(payrun, calc_emp, calculation, plan)
+        db.add(employee_pay)
+        add_to_payrun_totals(payrun, calculation)
+    else:
+        previous = {name: getattr(employee_pay, name) for name in TOTAL_FIELDS.values()}
+        for child in (EmployeeAllowances, EmployerContributions, EmployeeBenefitsDeductions):
+            await db.execute(delete(child).where(child.payslip_id == employee_pay.id))
+        for column, value in _employee_pay_values(calc_emp, calculation, plan).items():
+            setattr(employee_pay, column, value)
+        employee_pay.updated_at = func.now()
+        add_to_payrun_totals(payrun, calculation, previous)
+    await db.flush()
+    add_breakdown_rows(db, employee_pay, calculation)
+    ytd_keys = await ytd_store.add(
+        db, TAX_YEAR, [((tenant_int, employee_id_str), subtract_increments(employee_pay.ytd_increments, previous_increments))]
+    )
 
-        # Period inputs (request driven)
-        hours_worked = float(getattr(req_emp, "hours_worked", 0.0) or 0.0)
-        overtime_hours = float(getattr(req_emp, "overtime_hours", 0.0) or 0.0)
-        bonuses = float(getattr(req_emp, "bonuses", 0.0) or 0.0)
-
-        allowances = allowances_map
-        benefits_opt_in = benefits_map
-
-        # Metadata: request first; else DB; else None
-        metadata = (
-            dict(req_emp.metadata)
-            if getattr(req_emp, "metadata", None)
-            else {
-                "full_name": getattr(employee_db, "full_name", None) if employee_db else None,
-                "job_title": getattr(employee_db, "job_title", None) if employee_db else None,
-                "department": getattr(employee_db, "department", None) if employee_db else None,
-                "tax_id": getattr(employee_db, "tax_id", None) if employee_db else None,
-                "bank_account_last4": getattr(employee_db, "bank_account_last4", None) if employee_db else None,
-            }
+    try:
+        await db.commit()
+    except DBAPIError:
+        await db.rollback()
+        raise HTTPException(status_code=500, detail="Database connection lost during commit.")
+    finally:
+        ytd_store.invalidate(ytd_keys)
+
+    response = {
+        "net_pay": calculation.net_pay,
+        "gross_pay": calculation.gross_pay,
+        "total_employer_cost": calculation.total_employer_cost,
+        "breakdown": calculation.breakdown,
+        "payslip_url": f"/payslip/{employee_pay.id}"
+    }
+    if explain:
+        response["explain"] = calculation.trace
+    return response
+
+
+@router.post("/calculate/batch", dependencies=[Depends(verify_api_key)])
+async def calculate_payroll_batch(request: BatchPayrollRequest, explain: bool = False):
+    """
+    Gross-to-net for many employees in one call through the vectorized batch engine.
+    Employees are grouped by country (and tenant, for tenants with config overlays) and each
+    cohort is computed as array operations.
+    Calculation only: no payslips are rendered and nothing is persisted.
+    ?explain=true walks each employee's rules one by one instead (same results, plus "explain").
+    """
+    effective = config_registry.current.effective
+    plans = effective.plans_for(PERIOD_START)
+    tenant_plans = _tenant_plans(effective, {req_emp.tenant_id for req_emp in request.employees}, PERIOD_START)
+    cohorts: Dict[tuple, List[int]] = {}
+    for idx, req_emp in enumerate(request.employees):
+        tenant = req_emp.tenant_id if req_emp.tenant_id in tenant_plans else None
+        cohorts.setdefault((tenant, req_emp.country), []).append(idx)
+
+    engine = calculate_batch_minor if settings.payroll_arithmetic == ARITHMETIC_MINOR_UNITS else calculate_batch
+    results: List[dict] = [None] * len(request.employees)
+    for (tenant, country), indexes in cohorts.items():
+        plan = tenant_plans.get(tenant, plans).get(country)
+        if not plan:
+            raise HTTPException(status_code=400, detail=f"Country configuration not found for {country}")
+
+        calc_emps = [CalcInput.from_employee(request.employees[idx]) for idx in indexes]
+        if explain:
+            records = [
+                calculate_gross_to_net(calc_emp, plan, arithmetic=settings.payroll_arithmetic, trace=[]).to_dict()
+                for calc_emp in calc_emps
+            ]
+        else:
+            records = engine(plan, build_columns(calc_emps, plan)).to_records()
+        for idx, record in zip(indexes, records):
+            record["employee_id"] = str(request.employees[idx].employee_id)
+            record["country"] = country
+            results[idx] = record
+
+    return {"count": len(results), "results": results}
+
+
+@router.post("/gross-up", dependencies=[Depends(verify_api_key)])
+async def calculate_gross_up(request: GrossUpRequest, db: AsyncSession = Depends(get_async_db)):
+    """
+    Net-to-gross: solve the base pay (or bonus) that yields request.target_net this period,
+    using the employee's opt-ins, allowances and YTD totals. Calculation only: nothing is persisted.
+    """
+    plan = _tenant_plan(
+        config_registry.current.effective, request.employee.tenant_id, request.employee.country, PERIOD_START
+    )
+
+    calc_emp = CalcInput.from_employee(request.employee)
+    ytd = (await load_ytd(db, [calc_emp]))[0]
+    try:
+        result = gross_up(
+            calc_emp, plan, request.target_net, request.component,
+            arithmetic=settings.payroll_arithmetic, ytd=ytd,
         )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return {"employee_id": calc_emp.employee_id, "country": calc_emp.country, **result}
+
+
+@router.post("/gross-up/batch", dependencies=[Depends(verify_api_key)])
+async def calculate_gross_up_batch(request: GrossUpBatchRequest, db: AsyncSession = Depends(get_async_db)):
+    """Net-to-gross for many employees; unreachable targets are reported per item instead of failing the call."""
+    calc_emps = [CalcInput.from_employee(item.employee) for item in request.items]
+    ytd = await load_ytd(db, calc_emps)
+
+    effective = config_registry.current.effective
+    plans = effective.plans_for(PERIOD_START)
+    tenant_plans = _tenant_plans(effective, {calc_emp.tenant_id for calc_emp in calc_emps}, PERIOD_START)
+    results, errors = [], []
+    for item, calc_emp, totals in zip(request.items, calc_emps, ytd):
+        plan = tenant_plans.get(calc_emp.tenant_id, plans).get(calc_emp.country)
+        if not plan:
+            errors.append({"employee_id": calc_emp.employee_id, "error": f"Country configuration not found for {calc_emp.country}"})
+            continue
+        try:
+            result = gross_up(
+                calc_emp, plan, item.target_net, request.component,
+                arithmetic=settings.payroll_arithmetic, ytd=totals,
+            )
+        except ValueError as e:
+            errors.append({"employee_id": calc_emp.employee_id, "error": str(e)})
+            continue
+        results.append({"employee_id": calc_emp.employee_id, "country": calc_emp.country, **result})
 
-    calc_emp = CalcEmployee()
+    return {"count": len(results), "results": results, "errors": errors}
 
-    # 3) Earnings
-    gross_pay, base_pay, overtime_pay, allowances_breakdown = calculate_gross_pay(calc_emp, config)
 
-    # 4) Employee-side deductions (statutory + optional benefits) & tax
-    deductions = calculate_deductions(calc_emp, gross_pay, config)
+@router.post("/simulate", dependencies=[Depends(verify_api_key)])
+async def simulate_payroll(request: SimulationRequest, db: AsyncSession = Depends(get_async_db)):
+    """
+    What-if simulation: recompute a tenant's payrun population under a patched country config
+    (statutory rates, income_tax_brackets, optional_benefits) and return the total deltas.
+    Inputs come from the stored calc_inputs of the payrun; nothing is written and no PDFs are rendered.
+    The patch applies to the tenant's rules in effect for the payrun's period.
+    """
+    timeline = _tenant_timeline(config_registry.current.effective, request.tenant_id, request.country)
 
-    # 5) Net pay
-    total_deductions = float(deductions["total_deductions"])
-    net_pay = gross_pay - total_deductions
+    payrun = await _tenant_payrun(db, request.tenant_id, request.country, request.payrun_id)
+    if not payrun:
+        raise HTTPException(status_code=404, detail="Payrun not found.")
+    plan = timeline.plan_at(payrun.period_start)
+    try:
+        scenario_plan = compile_country_plan(
+            request.country, merge_config_section(timeline.config_at(payrun.period_start), request.patch)
+        )
+    except (ValueError, TypeError, KeyError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid config patch: {e}")
+    calc_emps, skipped = await _load_payrun_inputs(db, payrun)
 
-    # 6) Employer-side costs (statutory employer contribs + employer match of optional benefits)
-    total_employer_cost, employer_contributions = calculate_employer_costs(calc_emp, gross_pay, config)
+    summary = simulate_config_change(
+        calc_emps, plan, scenario_plan,
+        arithmetic=settings.payroll_arithmetic, include_employees=request.include_employees,
+    )
+    return {"payrun_id": payrun.id, "skipped": skipped, **summary}
 
-    # Derive legacy fields if present in breakdowns (they may be absent; default to 0)
-    social_security = _pick_named_amount("social_security", deductions["pre_tax_breakdown"], deductions["post_tax_breakdown"])
-    health_insurance = _pick_named_amount("health_insurance", deductions["pre_tax_breakdown"], deductions["post_tax_breakdown"])
-    solidarity_fund = _pick_named_amount("solidarity_fund", deductions["pre_tax_breakdown"], deductions["post_tax_breakdown"])
 
-    breakdown = {
-        "base_pay": round(base_pay, 2),
-        "overtime_pay": round(overtime_pay, 2),
-        "bonuses": round(calc_emp.bonuses, 2),
-        "allowances_breakdown": {k: round(v, 2) for k, v in allowances_breakdown.items()},
-        "gross_pay": round(gross_pay, 2),
+@router.post("/forecast", dependencies=[Depends(verify_api_key)])
+async def forecast_payroll(request: ForecastRequest, db: AsyncSession = Depends(get_async_db)):
+    """
+    Employer cost / deduction forecast for the next request.periods pay periods of a tenant,
+    per country: the latest payrun's inputs are projected on the country's pay_frequency calendar,
+    starting from the employees' YTD, with annual caps/limits saturating and resetting per tax year.
+    """
+    if not 1 <= request.periods <= MAX_FORECAST_PERIODS:
+        raise HTTPException(status_code=400, detail=f"periods must be between 1 and {MAX_FORECAST_PERIODS}")
 
-        "taxable_income": deductions["taxable_income"],
-        "tax_exemptions_applied": deductions["tax_exemptions_applied"],
-        "income_tax": deductions["income_tax"],
+    if request.country:
+        countries = [request.country]
+    else:
+        result = await db.execute(select(Payrun.country).where(Payrun.tenant_id == request.tenant_id).distinct())
+        countries = sorted(result.scalars())
+
+    snapshot = config_registry.current
+    forecasts = []
+    for country in countries:
+        if country not in snapshot.plans:
+            raise HTTPException(status_code=400, detail=f"Country configuration not found for {country}")
+        payrun = await _tenant_payrun(db, request.tenant_id, country)
+        if not payrun:
+            continue
+        calc_emps, skipped = await _load_payrun_inputs(db, payrun)
+
+        first_start = request.start_date or payrun.period_end + timedelta(days=1)
+        # The rules in effect at the first forecast period are projected over the whole horizon
+        plan = _tenant_plan(snapshot.effective, request.tenant_id, country, first_start)
+        ytd = await ytd_store.load(db, request.tenant_id, first_start.year, [e.employee_id for e in calc_emps])
+        forecast = forecast_costs(
+            calc_emps, plan, pay_period_starts(first_start, plan.pay_frequency, request.periods),
+            ytd=[ytd[e.employee_id] for e in calc_emps],
+            arithmetic=settings.payroll_arithmetic, include_employees=request.include_employees,
+        )
+        forecasts.append({"country": country, "payrun_id": payrun.id, "skipped": skipped, **forecast})
 
-        "total_deductions": round(total_deductions, 2),
-        "net_pay": round(net_pay, 2),
+    if not forecasts:
+        raise HTTPException(status_code=404, detail="Payrun not found.")
+    return {"tenant_id": request.tenant_id, "forecasts": forecasts}
 
-        "employer_costs": {k: round(v, 2) for k, v in employer_contributions.items()},
-        "total_employer_cost": round(total_employer_cost, 2),
 
-        "tax_bracket_details": deductions["tax_bracket_details"],
+@router.post("/payrun", dependencies=[Depends(verify_api_key)])
+async def run_payrun(request: PayrunRequest, db: AsyncSession = Depends(get_async_db)):
+    """
+    Bulk payrun. Employees are sharded into chunks and calculated (plus payslip PDFs)
+    on the process-pool executor, so the event loop only does I/O. Chunks are persisted
+    as they complete, in completion order, and Payrun totals are accumulated.
+    """
+    employees_db = await _load_employee_masters(db, [str(e.employee_id) for e in request.employees])
+    calc_emps = [
+        CalcInput.from_employee(e, employees_db.get((int(e.tenant_id), str(e.employee_id))))
+        for e in request.employees
+    ]
+
+    ytd = await load_ytd(db, calc_emps)
+
+    executor = get_payrun_executor()
+    # Resolved once for the whole payrun; the workers resolve the same period to the same versions.
+    # Tenants with config overlays get their compiled plans sent along with their chunks.
+    plans = executor.plans_for(PERIOD_START)
+    tenant_plans = _tenant_plans(executor.effective, {calc_emp.tenant_id for calc_emp in calc_emps}, PERIOD_START)
+    futures = executor.submit(
+        calc_emps, request.company, request.render_payslips, request.chunk_size, ytd=ytd, period_start=PERIOD_START,
+        tenant_plans=tenant_plans,
+    )
+    ytd_keys = []
+
+    payruns: Dict[tuple, Payrun] = {}
+    chunks: List[dict] = []
+    errors: List[dict] = []
+    for next_chunk in asyncio.as_completed([asyncio.wrap_future(f) for f in futures]):
+        chunk = await next_chunk
+        PAYRUN_CHUNK_SECONDS.observe(chunk.elapsed)
+        PAYRUN_EMPLOYEES.labels(status="ok").inc(len(chunk.results))
+        PAYRUN_EMPLOYEES.labels(status="error").inc(len(chunk.errors))
+        errors.extend(chunk.errors)
+
+        # Persist the chunk as one batch: EmployeePay rows, one flush for ids, then child rows
+        ytd_keys += await persist_results(
+            db, [(calc_emps[item["index"]], item["result"]) for item in chunk.results],
+            plans, settings.payroll_arithmetic, payruns, tenant_plans=tenant_plans,
+        )
 
-        # keeps UI/DB compatibility for detailed benefits breakdowns
-        "benefits_deductions": {
-            "pre_tax": deductions["pre_tax_breakdown"],
-            "post_tax": deductions["post_tax_breakdown"],
-            "total_pre_tax": deductions["total_pre_tax_deductions"],
-            "total_post_tax": deductions["total_post_tax_deductions"],
-        },
+        chunks.append({
+            "chunk": chunk.chunk_index,
+            "employees": len(chunk.results) + len(chunk.errors),
+            "errors": len(chunk.errors),
+            "seconds": round(chunk.elapsed, 4),
+            "worker_pid": chunk.worker_pid,
+        })
 
-        # legacy fields for EmployeePay (derived above; may be zero if not configured)
-        "social_security": round(social_security, 2),
-        "health_insurance": round(health_insurance, 2),
-        "solidarity_fund": round(solidarity_fund, 2),
+    try:
+        await db.commit()
+    except DBAPIError:
+        await db.rollback()
+        raise HTTPException(status_code=500, detail="Database connection lost during commit.")
+    finally:
+        ytd_store.invalidate(ytd_keys)
 
-        # display metadata
-        "pay_period": "March 2025",
-        "pay_type": "Monthly",
+    return {
+        "employees": len(calc_emps),
+        "processed": len(calc_emps) - len(errors),
+        "errors": errors,
+        "payruns": [
+            {
+                "payrun_id": payrun.id,
+                "tenant_id": payrun.tenant_id,
+                "country": payrun.country,
+                "total_gross": float(payrun.total_gross or 0),
+                "total_net": float(payrun.total_net or 0),
+                "total_tax": float(payrun.total_tax or 0),
+                "total_employer_cost": float(payrun.total_employer_cost or 0),
+            }
+            for payrun in payruns.values()
+        ],
+        "chunks": chunks,
     }
 
-    # 7) Generate Payslip
-    payslip_path = generate_payslip(calc_emp, breakdown, net_pay, {"total_employer_cost": total_employer_cost}, company)
 
-    # 8) Persist into Payrun / Payslip tables
-    pay_period = "March 2025"
-    period_start = date(2025, 3, 1)
-    period_end = date(2025, 3, 31)
+@router.post("/payrun/{payrun_id}/recalculate", dependencies=[Depends(verify_api_key)])
+async def recalculate_payrun(
+    payrun_id: int, request: PayrunRecalculateRequest, db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Incremental recalculation of a draft payrun. Posted employees are fingerprinted and diffed
+    against their stored EmployeePay rows; only changed (or new) employees are recomputed,
+    re-rendered and rewritten in place, and the Payrun totals are adjusted by the delta.
+    Employees that are not posted are left untouched.
+    """
+    payrun = await db.get(Payrun, payrun_id)
+    if not payrun:
+        raise HTTPException(status_code=404, detail="Payrun not found.")
+    if payrun.status != "draft":
+        raise HTTPException(status_code=409, detail=f"Payrun is {payrun.status}; only draft payruns can be recalculated.")
+
+    employee_ids = [str(e.employee_id) for e in request.employees]
+    employees_db = await _load_employee_masters(db, employee_ids)
+    calc_emps = [
+        CalcInput.from_employee(e, employees_db.get((int(e.tenant_id), str(e.employee_id))))
+        for e in request.employees
+    ]
+
+    # 1) Fingerprint the posted employees (only those belonging to this payrun)
+    errors: List[dict] = []
+    candidates: List[int] = []
+    for index, calc_emp in enumerate(calc_emps):
+        if calc_emp.tenant_id != payrun.tenant_id or calc_emp.country != payrun.country:
+            errors.append({"index": index, "employee_id": calc_emp.employee_id, "detail": "Employee does not belong to this payrun."})
+        else:
+            candidates.append(index)
+
+    # 2) Stored fingerprints for just those employees (latest row per employee)
+    result = await db.execute(
+        select(EmployeePay.id, EmployeePay.employee_id, EmployeePay.input_fingerprint, EmployeePay.ytd_increments)
+        .where(and_(EmployeePay.payrun_id == payrun.id, EmployeePay.employee_id.in_(employee_ids)))
+        .order_by(EmployeePay.id)
+    )
+    stored_rows: Dict[str, int] = {}
+    stored_fingerprints: Dict[str, str] = {}
+    stored_increments: Dict[str, dict] = {}
+    for row in result:
+        stored_rows[row.employee_id] = row.id
+        stored_fingerprints[row.employee_id] = row.input_fingerprint
+        stored_increments[row.employee_id] = row.ytd_increments
+
+    # YTD of the payrun's tax year for every candidate (read-through cache), loaded before the diff
+    tax_year = payrun.period_start.year
+    candidate_ytd = dict(zip(candidates, await load_ytd(db, [calc_emps[i] for i in candidates], tax_year)))
+
+    # 3) No awaits from here to the submit: a config reload retires the executor taken here, and a
+    #    retired pool only finishes what was already submitted to it. The same executor (and the plans
+    #    in effect for the payrun's period) gives the fingerprints, the recalculation and the stored config_version
+    executor = get_payrun_executor()
+    plan = _tenant_plan(executor.effective, payrun.tenant_id, payrun.country, payrun.period_start)
+    tenant_plans = _tenant_plans(executor.effective, [payrun.tenant_id], payrun.period_start)
+    diff = diff_fingerprints(
+        stored_fingerprints,
+        [(calc_emps[i].employee_id, input_fingerprint(calc_emps[i], plan, settings.payroll_arithmetic)) for i in candidates],
+    )
+    to_compute = [candidates[i] for i in diff.to_compute]
+
+    # 4) Recompute (and re-render) only the changed employees, against YTD without their own old row
+    rows_by_id: Dict[int, EmployeePay] = {}
+    ytd_keys = []
+    if to_compute:
+        ytd = [subtract_increments(candidate_ytd[i], stored_increments.get(calc_emps[i].employee_id)) for i in to_compute]
+        futures = executor.submit(
+            [calc_emps[i] for i in to_compute], request.company, request.render_payslips, ytd=ytd,
+            period_start=payrun.period_start, tenant_plans=tenant_plans,
+        )
+        replaced = [stored_rows[calc_emps[i].employee_id] for i in to_compute if calc_emps[i].employee_id in stored_rows]
+        if replaced:
+            result = await db.execute(select(EmployeePay).where(EmployeePay.id.in_(replaced)))
+            rows_by_id = {row.id: row for row in result.scalars()}
+
+        rewritten = []
+        rewritten_ids = []
+        ytd_deltas = []
+        for next_chunk in asyncio.as_completed([asyncio.wrap_future(f) for f in futures]):
+            chunk = await next_chunk
+            PAYRUN_CHUNK_SECONDS.observe(chunk.elapsed)
+            PAYRUN_EMPLOYEES.labels(status="ok").inc(len(chunk.results))
+            PAYRUN_EMPLOYEES.labels(status="error").inc(len(chunk.errors))
+            errors.extend({**e, "index": to_compute[e["index"]]} for e in chunk.errors)
+
+            for item in chunk.results:
+                calc_emp = calc_emps[to_compute[item["index"]]]
+                calculation = item["result"]
+                employee_pay = rows_by_id.get(stored_rows.get(calc_emp.employee_id))
+                previous_increments = None
+                if employee_pay is None:
+                    employee_pay = _employee_pay_row(payrun, calc_emp, calculation, plan)
+                    db.add(employee_pay)
+                    add_to_payrun_totals(payrun, calculation)
+                else:
+                    previous = {name: getattr(employee_pay, name) for name in TOTAL_FIELDS.values()}
+                    previous_increments = employee_pay.ytd_increments
+                    rewritten_ids.append(employee_pay.id)
+                    for column, value in _employee_pay_values(calc_emp, calculation, plan).items():
+                        setattr(employee_pay, column, value)
+                    employee_pay.updated_at = func.now()
+                    add_to_payrun_totals(payrun, calculation, previous)
+                rewritten.append((employee_pay, calculation))
+                ytd_deltas.append((
+                    (calc_emp.tenant_id, calc_emp.employee_id),
+                    subtract_increments(employee_pay.ytd_increments, previous_increments),
+                ))
+
+        # Only rows that got a new calculation lose their old breakdown; a failed employee keeps theirs
+        if rewritten_ids:
+            for child in (EmployeeAllowances, EmployerContributions, EmployeeBenefitsDeductions):
+                await db.execute(delete(child).where(child.payslip_id.in_(rewritten_ids)))
+        await db.flush()
+        for employee_pay, calculation in rewritten:
+            add_breakdown_rows(db, employee_pay, calculation)
+        ytd_keys = await ytd_store.add(db, tax_year, ytd_deltas)
 
-    # a) Get or create Payrun for (tenant, country, period)
+    try:
+        await db.commit()
+    except DBAPIError:
+        await db.rollback()
+        raise HTTPException(status_code=500, detail="Database connection lost during commit.")
+    finally:
+        ytd_store.invalidate(ytd_keys)
+
+    return {
+        "payrun_id": payrun.id,
+        "employees": len(calc_emps),
+        "changed": len(diff.changed),
+        "added": len(diff.added),
+        "unchanged": len(diff.unchanged),
+        "errors": errors,
+        "totals": {total: float(getattr(payrun, total) or 0) for total in TOTAL_FIELDS},
+    }
+
+
+async def _ytd_before(db: AsyncSession, tenant_id: int, employee_ids: List[str], start: date, exclude_payrun_id: int) -> dict:
+    """YTD used before `start` in its tax year, rebuilt from stored rows: {(employee_id, year): totals}."""
     result = await db.execute(
-        select(Payrun).where(
-            and_(
-                Payrun.period_start == period_start,
-                Payrun.period_end == period_end,
-                Payrun.tenant_id == calc_emp.tenant_id,
-                Payrun.country == calc_emp.country,
-            )
+        select(EmployeePay.payrun_id, EmployeePay.employee_id, EmployeePay.ytd_increments, Payrun.period_start)
+        .join(Payrun, Payrun.id == EmployeePay.payrun_id)
+        .where(and_(
+            Payrun.tenant_id == tenant_id,
+            EmployeePay.employee_id.in_(employee_ids),
+            Payrun.period_start >= date(start.year, 1, 1),
+            Payrun.period_start < start,
+            Payrun.id != exclude_payrun_id,
+        ))
+        .order_by(EmployeePay.id)
+    )
+    latest = {(row.payrun_id, row.employee_id): row for row in result}
+    baseline: Dict[tuple, dict] = {}
+    for row in latest.values():
+        totals = baseline.setdefault((row.employee_id, row.period_start.year), {})
+        for key, amount in (row.ytd_increments or {}).items():
+            totals[key] = round(totals.get(key, 0.0) + float(amount), 2)
+    return baseline
+
+
+@router.post("/payrun/retro", dependencies=[Depends(verify_api_key)])
+async def retro_adjust_payrun(request: RetroRequest, db: AsyncSession = Depends(get_async_db)):
+    """
+    Retroactive adjustment: recompute the stored EmployeePay rows of past payruns (period starting
+    on/after effective_from) with back-dated input changes and/or a back-dated rule patch, and post
+    only the per-component differences as one adjustment set in the current draft payrun.
+    Past rows are not modified. Payrun totals and YTD move by the differences; one delta payslip
+    per adjusted employee. Each row is recomputed with the effective-dated version it was paid with
+    (including the tenant's config overlay).
+    """
+    effective = config_registry.current.effective
+    timeline = _tenant_timeline(effective, request.tenant_id, request.country)
+    if not request.employee_changes and not request.patch:
+        raise HTTPException(status_code=400, detail="Nothing to adjust: give employee_changes and/or a patch.")
+    try:
+        validate_input_changes(request.employee_changes)
+        if request.patch:
+            # Checked against the rules at effective_from before any row is loaded
+            compile_country_plan(request.country, merge_config_section(timeline.config_at(request.effective_from), request.patch))
+    except (ValueError, TypeError, KeyError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid retro request: {e}")
+
+    payrun = await get_or_create_payrun(db, request.tenant_id, request.country)
+    if payrun.status != "draft":
+        raise HTTPException(status_code=409, detail=f"Payrun is {payrun.status}; adjustments need a draft payrun.")
+
+    # 1) Stored rows in the retro window, in one query (latest row per payrun and employee)
+    query = (
+        select(
+            EmployeePay.id, EmployeePay.payrun_id, EmployeePay.employee_id, EmployeePay.pay_period,
+            EmployeePay.config_version, EmployeePay.calc_inputs, EmployeePay.ytd_increments,
+            EmployeePay.total_employer_cost, Payrun.period_start,
         )
+        .join(Payrun, Payrun.id == EmployeePay.payrun_id)
+        .where(and_(
+            Payrun.tenant_id == request.tenant_id,
+            Payrun.country == request.country,
+            Payrun.period_start >= request.effective_from,
+            Payrun.id != payrun.id,
+        ))
+        .order_by(EmployeePay.id)
     )
-    payrun = result.scalar_one_or_none()
-    if not payrun:
-        payrun = Payrun(
-            period_start=period_start,
-            period_end=period_end,
-            run_date=date.today(),
-            status='draft',
-            total_gross=0,
-            total_net=0,
-            total_tax=0,
-            total_employer_cost=0,
-            country=calc_emp.country,
-            tenant_id=calc_emp.tenant_id
+    if not request.patch:
+        query = query.where(EmployeePay.employee_id.in_(list(request.employee_changes)))
+    latest: Dict[tuple, RetroRow] = {}
+    for row in await db.execute(query):
+        latest[(row.payrun_id, row.employee_id)] = RetroRow(
+            employee_pay_id=row.id, payrun_id=row.payrun_id, employee_id=row.employee_id,
+            pay_period=row.pay_period, period_start=row.period_start, config_version=row.config_version,
+            calc_inputs=row.calc_inputs, ytd_increments=row.ytd_increments,
+            total_employer_cost=float(row.total_employer_cost or 0),
         )
-        db.add(payrun)
-        await db.flush()
+    rows = list(latest.values())
+    if not rows:
+        raise HTTPException(status_code=404, detail="No payroll rows found on or after effective_from.")
 
-    # b) Create EmployeePay
-    employee_pay = EmployeePay(
-        payrun_id=payrun.id,
-        tenant_id=calc_emp.tenant_id,         # ← use calc_emp
-        employee_id=calc_emp.employee_id,
-        country=calc_emp.country,
-        pay_period=pay_period,
-        pay_type=breakdown.get("pay_type", "Monthly"),
-        base_pay=breakdown["base_pay"],
-        overtime_pay=breakdown["overtime_pay"],
-        bonuses=breakdown["bonuses"],
-        hours_worked=calc_emp.hours_worked,       # ← add
-        overtime_hours=calc_emp.overtime_hours,   # ← add
-        gross_pay=breakdown["gross_pay"],
-
-        taxable_income=breakdown["taxable_income"],
-        income_tax=breakdown["income_tax"],
-
-        # legacy/statutory fields if your schema still has them
-        social_security=breakdown["social_security"],
-        health_insurance=breakdown["health_insurance"],
-        solidarity_fund=breakdown["solidarity_fund"],
-
-        total_deductions=breakdown["total_deductions"],
-        net_pay=breakdown["net_pay"],
-
-        total_employer_cost=breakdown["total_employer_cost"],
-
-        total_pre_tax=breakdown["benefits_deductions"]["total_pre_tax"],
-        total_post_tax=breakdown["benefits_deductions"]["total_post_tax"],
-
-        tax_bracket_details=breakdown["tax_bracket_details"],
-        tax_exemptions_applied=breakdown["tax_exemptions_applied"],
-
-        # optional: store entire breakdown of country-specific employer items if desired
-        country_specific_benefits=None,  # old field; no longer used since we unified logic
+    # 2) Recompute period by period through the batch engine, against the rules of the time
+    try:
+        config_versions = {row.config_version for row in rows}
+        plans = version_plans(timeline, config_versions, request.patch)
+        base = effective.timelines[request.country]
+        if timeline is not base:
+            # Rows paid before the tenant's overlay was set carry base config versions
+            plans = {**version_plans(base, config_versions, request.patch), **plans}
+    except (ValueError, TypeError, KeyError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid retro request: {e}")
+    employee_ids = sorted({row.employee_id for row in rows})
+    baseline = await _ytd_before(db, request.tenant_id, employee_ids, request.effective_from, payrun.id)
+    lines, errors = compute_retro_adjustments(
+        rows, plans, request.employee_changes, baseline, arithmetic=settings.payroll_arithmetic,
     )
-    db.add(employee_pay)
-    await db.flush()
 
-    # c) Allowances
-    for name, amount in breakdown["allowances_breakdown"].items():
-        db.add(EmployeeAllowances(payslip_id=employee_pay.id, name=name, amount=amount))
-
-    # d) Employer Contributions
-    for name, amount in breakdown["employer_costs"].items():
-        db.add(EmployerContributions(payslip_id=employee_pay.id, contribution_type=name, amount=amount))
-
-    # e) Benefits Deductions (pre/post tax): expand dicts into rows
-    for dtype in ["pre_tax", "post_tax"]:
-        for bname, amt in breakdown["benefits_deductions"].get(dtype, {}).items():
-            db.add(
-                EmployeeBenefitsDeductions(
-                    payslip_id=employee_pay.id,
-                    deduction_type=dtype,
-                    benefit_name=bname,
-                    amount=float(amt),
-                )
+    # 3) One adjustment set in the current payrun; totals and YTD move by the differences
+    adjustment_set = str(uuid.uuid4())
+    by_employee: Dict[str, list] = {}
+    for line in lines:
+        by_employee.setdefault(line.employee_id, []).append(line)
+        db.add(PayAdjustment(
+            payrun_id=payrun.id, adjustment_set=adjustment_set, tenant_id=request.tenant_id,
+            employee_id=line.employee_id, source_employee_pay_id=line.source_employee_pay_id,
+            source_pay_period=line.source_pay_period, component=line.component, amount=line.amount,
+            reason=request.reason,
+        ))
+    totals = adjustment_totals(lines)
+    for total, name in TOTAL_FIELDS.items():
+        setattr(payrun, total, round(float(getattr(payrun, total) or 0) + totals.get(name, 0.0), 2))
+
+    ytd_deltas = []
+    employees = []
+    masters = await _load_employee_masters(db, list(by_employee)) if request.render_payslips else {}
+    for employee_id, employee_lines in by_employee.items():
+        employee_totals = adjustment_totals(employee_lines)
+        ytd_deltas.append((
+            (request.tenant_id, employee_id),
+            {key: amount for key, amount in employee_totals.items() if key != EMPLOYER_COST_COMPONENT},
+        ))
+        payslip_path = None
+        if request.render_payslips:
+            master = masters.get((request.tenant_id, employee_id))
+            slip_employee = CalcInput(
+                employee_id=employee_id, country=request.country,
+                metadata={"full_name": getattr(master, "full_name", None)},
             )
+            payslip_path = generate_adjustment_payslip(slip_employee, employee_lines, request.company, request.reason)
+        employees.append({"employee_id": employee_id, "adjustments": employee_totals, "payslip_path": payslip_path})
 
+    ytd_keys = await ytd_store.add(db, TAX_YEAR, ytd_deltas)
     try:
         await db.commit()
     except DBAPIError:
         await db.rollback()
         raise HTTPException(status_code=500, detail="Database connection lost during commit.")
+    finally:
+        ytd_store.invalidate(ytd_keys)
 
     return {
-        "net_pay": net_pay,
-        "gross_pay": gross_pay,
-        "total_employer_cost": total_employer_cost,
-        "breakdown": breakdown,
-        "payslip_url": f"/payslip/{employee_pay.id}"
+        "adjustment_set": adjustment_set,
+        "payrun_id": payrun.id,
+        "rows": len(rows),
+        "lines": len(lines),
+        "errors": errors,
+        "totals": {total: totals.get(name, 0.0) for total, name in TOTAL_FIELDS.items()},
+        "employees": employees,
+    }
+
+
+def _config_summary(snapshot) -> dict:
+    return {
+        "version": snapshot.version,
+        "source": snapshot.source,
+        "loaded_at": snapshot.loaded_at,
+        "countries": {country: plan.config_version for country, plan in snapshot.plans_for(PERIOD_START).items()},
+        "effective_versions": {
+            country: snapshot.effective.versions(country)
+            for country, timeline in snapshot.effective.timelines.items() if len(timeline.starts) > 1
+        },
+    }
+
+
+@router.get("/config", dependencies=[Depends(verify_api_key)])
+async def get_config_version():
+    """Live country config version, and the per-country config_version recorded on EmployeePay rows."""
+    return _config_summary(config_registry.current)
+
+
+@router.post("/config/reload", dependencies=[Depends(verify_api_key)])
+async def reload_config():
+    """
+    Re-read the country config now instead of waiting for the watcher. Validation and compilation
+    run off the event loop; an invalid config is rejected and the current version stays live.
+    """
+    try:
+        reloaded = await asyncio.to_thread(config_registry.reload, True)
+    except (OSError, ValueError, TypeError, KeyError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid country config: {e}")
+    # Tenant overlays too, so overlays changed through another app process are picked up here
+    try:
+        await asyncio.to_thread(tenant_overlays.reload)
+    except (OSError, ValueError, TypeError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid tenant overlays: {e}")
+    return {"reloaded": reloaded, **_config_summary(config_registry.current)}
+
+
+def _tenant_config_summary(tenant_id: int) -> dict:
+    effective = config_registry.current.effective
+    overlays = tenant_overlays.get(tenant_id)
+    return {
+        "tenant_id": tenant_id,
+        "overlays": overlays,
+        "countries": {
+            country: _tenant_plan(effective, tenant_id, country, PERIOD_START).config_version
+            for country in overlays if country in effective.timelines
+        },
     }
 
 
+@router.get("/tenants/{tenant_id}/config", dependencies=[Depends(verify_api_key)])
+async def get_tenant_config(tenant_id: int):
+    """A tenant's config overlays, and the config_version its calculations record per overlaid country."""
+    return _tenant_config_summary(tenant_id)
+
+
+@router.put("/tenants/{tenant_id}/config/{country}", dependencies=[Depends(verify_api_key)])
+async def put_tenant_config(tenant_id: int, country: str, overlay: Dict[str, Any] = Body(...)):
+    """
+    Set a tenant's overlay of a country's optional_benefits / allowance_rules / overtime_multiplier
+    (merged like a config patch: a null removes a key, named rules are matched by name).
+    Validated and compiled against every effective-dated version off the event loop; an invalid
+    overlay is rejected and the previous one stays live.
+    """
+    try:
+        await asyncio.to_thread(tenant_overlays.set, config_registry.current.effective, tenant_id, country, overlay)
+    except OSError as e:
+        raise HTTPException(status_code=500, detail=f"Could not save tenant overlays: {e}")
+    except (ValueError, TypeError, KeyError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid tenant config overlay: {e}")
+    return _tenant_config_summary(tenant_id)
+
+
+@router.delete("/tenants/{tenant_id}/config/{country}", dependencies=[Depends(verify_api_key)])
+async def delete_tenant_config(tenant_id: int, country: str):
+    """Drop a tenant's overlay of a country; its calculations use the base country config again."""
+    try:
+        removed = await asyncio.to_thread(tenant_overlays.remove, tenant_id, country)
+    except OSError as e:
+        raise HTTPException(status_code=500, detail=f"Could not save tenant overlays: {e}")
+    if not removed:
+        raise HTTPException(status_code=404, detail="Tenant config overlay not found.")
+    return _tenant_config_summary(tenant_id)
+
+
 @router.get("/payslip/{record_id}", dependencies=[Depends(verify_api_key)])
 async def get_payslip(record_id: str, db: AsyncSession = Depends(get_async_db)):
     result = await db.execute(PayrollRecord.__table__.select().where(PayrollRecord.id == record_id))
@@ -0,0 +1,567 @@
+# app/services/batch_engine.py
+
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.config.rule_plan import CountryRulePlan, EmployerRule, TaxBracketTable, as_rule_plan
+from app.models.calc_input import CalcInput
+from app.services.ytd import ytd_key
+from app.utils.minor_units import round_units_array, to_minor
+
+
+@dataclass
+class PayrunColumns:
+    """
+    Column inputs for one country cohort (one entry per employee, same order everywhere).
+      - allowance_total:        sum of positive allowances (as in calculate_gross_pay)
+      - exempt_allowance_total: sum of positive allowances whose rule is tax-exempt
+      - opt_in:                 benefit / optional deduction name -> bool mask
+      - benefit_overrides:      benefit name -> (rate, amount, pre_tax) arrays for employees
+                                who opted in with a dict; NaN (or -1 for pre_tax) = no override
+      - *_minor:                allowance totals as int64 minor units (each allowance rounded once),
+                                used by calculate_batch_minor
+      - ytd_known / ytd:        employees with YTD data and their used amounts per ytd_key (missing
+                                key = 0); annual_limit / annual_cap are clamped to what is left for
+                                them, as the scalar calculators do when given ytd
+    """
+    hourly_rate: np.ndarray
+    hours_worked: np.ndarray
+    overtime_hours: np.ndarray
+    bonuses: np.ndarray
+    base_pay: np.ndarray
+    allowance_total: np.ndarray
+    exempt_allowance_total: np.ndarray
+    opt_in: Dict[str, np.ndarray] = field(default_factory=dict)
+    benefit_overrides: Dict[str, Tuple[np.ndarray, np.ndarray, np.ndarray]] = field(default_factory=dict)
+    allowance_total_minor: Optional[np.ndarray] = None
+    exempt_allowance_total_minor: Optional[np.ndarray] = None
+    ytd_known: Optional[np.ndarray] = None
+    ytd: Dict[str, np.ndarray] = field(default_factory=dict)
+
+    def __len__(self) -> int:
+        return len(self.hourly_rate)
+
+
+@dataclass
+class BatchResult:
+    """
+    Array outputs of calculate_batch. Totals follow the scalar path exactly:
+    gross/net are unrounded, the rest is rounded to cents like the calculators' dicts.
+    Components are rounded per-employee amounts, NaN where the scalar breakdown has no entry.
+
+    calculate_batch_minor fills the same fields with int64 minor units and sets minor_unit_scale;
+    its components are 0 where the scalar breakdown has no entry.
+    """
+    base_pay: np.ndarray
+    overtime_pay: np.ndarray
+    gross_pay: np.ndarray
+    taxable_income: np.ndarray
+    income_tax: np.ndarray
+    total_pre_tax: np.ndarray
+    total_post_tax: np.ndarray
+    total_deductions: np.ndarray
+    net_pay: np.ndarray
+    total_employer_cost: np.ndarray
+    pre_tax: Dict[str, np.ndarray]
+    post_tax: Dict[str, np.ndarray]
+    employer: Dict[str, np.ndarray]
+    minor_unit_scale: Optional[int] = None
+
+    def __len__(self) -> int:
+        return len(self.gross_pay)
+
+    def to_records(self) -> List[Dict[str, Any]]:
+        """Per-employee dicts shaped like the /calculate summary (no payslip, no bracket details)."""
+        scale = self.minor_unit_scale
+        if scale:
+            def value(values: np.ndarray, i: int) -> float:
+                return int(values[i]) / scale
+        else:
+            def value(values: np.ndarray, i: int) -> float:
+                return float(values[i])
+
+        records = []
+        for i in range(len(self)):
+            records.append({
+                "gross_pay": value(self.gross_pay, i),
+                "net_pay": value(self.net_pay, i),
+                "total_employer_cost": value(self.total_employer_cost, i),
+                "breakdown": {
+                    "base_pay": round(value(self.base_pay, i), 2),
+                    "overtime_pay": round(value(self.overtime_pay, i), 2),
+                    "gross_pay": round(value(self.gross_pay, i), 2),
+                    "taxable_income": value(self.taxable_income, i),
+                    "income_tax": value(self.income_tax, i),
+                    "total_deductions": value(self.total_deductions, i),
+                    "net_pay": round(value(self.net_pay, i), 2),
+                    "employer_costs": _row_map(self.employer, i, scale),
+                    "total_employer_cost": value(self.total_employer_cost, i),
+                    "benefits_deductions": {
+                        "pre_tax": _row_map(self.pre_tax, i, scale),
+                        "post_tax": _row_map(self.post_tax, i, scale),
+                        "total_pre_tax": value(self.total_pre_tax, i),
+                        "total_post_tax": value(self.total_post_tax, i),
+                    },
+                },
+            })
+        return records
+
+
+def _row_map(components: Dict[str, np.ndarray], i: int, scale: Optional[int] = None) -> Dict[str, float]:
+    if scale:
+        return {name: int(values[i]) / scale for name, values in components.items() if values[i] > 0}
+    return {name: float(values[i]) for name, values in components.items() if not np.isnan(values[i])}
+
+
+def round_cents(values: np.ndarray) -> np.ndarray:
+    """
+    np.round(x, 2) scales by 100 first, which can disagree with Python's round() right at
+    half-cent ties. Those few elements are re-rounded with round() so results match the
+    scalar calculators to the cent.
+    """
+    rounded = np.round(values, 2)
+    scaled = values * 100.0
+    ties = np.abs(np.abs(scaled - np.trunc(scaled)) - 0.5) < 1e-6
+    if ties.any():
+        rounded[ties] = [round(float(v), 2) for v in values[ties]]
+    return rounded
+
+
+def build_columns(
+    employees: Iterable[CalcInput], config: Any, ytd: Optional[Sequence[Optional[Mapping[str, float]]]] = None
+) -> PayrunColumns:
+    """
+    Turn calculator inputs (CalcInput: hourly_rate, hours_worked, overtime_hours, bonuses,
+    base_pay, allowances, benefits_opt_in) into PayrunColumns for one country.
+    ytd: optional YTD totals parallel to employees (None entries = no YTD for that employee).
+    """
+    plan = as_rule_plan(config)
+    employees = list(employees)
+    n = len(employees)
+    optional_names = [b.name for b in plan.optional_benefits] + [
+        d.name for d in plan.other_employee_deductions if d.optional
+    ]
+
+    numeric = np.zeros((7, n))
+    minor = np.zeros((2, n), dtype=np.int64)
+    scale, mode = plan.minor_unit_scale, plan.rounding_mode
+    opt_in = {name: np.zeros(n, dtype=bool) for name in optional_names}
+    overrides: Dict[str, Tuple[np.ndarray, np.ndarray, np.ndarray]] = {}
+
+    for i, emp in enumerate(employees):
+        numeric[0, i] = emp.hourly_rate
+        numeric[1, i] = emp.hours_worked
+        numeric[2, i] = emp.overtime_hours
+        numeric[3, i] = emp.bonuses
+        numeric[4, i] = emp.base_pay
+
+        # Same summation order as calculate_gross_pay / calculate_deductions
+        allowances = emp.allowances
+        total_allowances = 0.0
+        for amt in allowances.values():
+            try:
+                val = float(amt)
+            except (TypeError, ValueError):
+                continue
+            if val > 0:
+                total_allowances += val
+                minor[0, i] += to_minor(val, scale, mode)
+        exempt = 0.0
+        for name in plan.exempt_allowances:
+            if name in allowances:
+                val = float(allowances[name])
+                if val > 0:
+                    exempt += val
+                    minor[1, i] += to_minor(val, scale, mode)
+        numeric[5, i] = total_allowances
+        numeric[6, i] = exempt
+
+        optins = emp.benefits_opt_in
+        for name in optional_names:
+            value = optins.get(name)
+            if not value:
+                continue
+            opt_in[name][i] = True
+            if isinstance(value, dict):
+                if name not in overrides:
+                    overrides[name] = (np.full(n, np.nan), np.full(n, np.nan), np.full(n, -1, dtype=np.int8))
+                rate_o, amount_o, pre_tax_o = overrides[name]
+                if "rate" in value:
+                    rate_o[i] = float(value["rate"])
+                if "amount" in value:
+                    amount_o[i] = float(value["amount"])
+                if "pre_tax" in value:
+                    pre_tax_o[i] = int(bool(value["pre_tax"]))
+
+    ytd_known, ytd_columns = build_ytd_columns(ytd, n)
+
+    return PayrunColumns(
+        hourly_rate=numeric[0],
+        hours_worked=numeric[1],
+        overtime_hours=numeric[2],
+        bonuses=numeric[3],
+        base_pay=numeric[4],
+        allowance_total=numeric[5],
+        exempt_allowance_total=numeric[6],
+        opt_in=opt_in,
+        benefit_overrides=overrides,
+        allowance_total_minor=minor[0],
+        exempt_allowance_total_minor=minor[1],
+        ytd_known=ytd_known,
+        ytd=ytd_columns,
+    )
+
+
+def build_ytd_columns(
+    ytd: Optional[Sequence[Optional[Mapping[str, float]]]], n: int
+) -> Tuple[Optional[np.ndarray], Dict[str, np.ndarray]]:
+    """PayrunColumns.ytd_known / ytd from YTD totals parallel to the employees ((None, {}) without ytd)."""
+    if ytd is None:
+        return None, {}
+    ytd_known = np.array([totals is not None for totals in ytd], dtype=bool)
+    ytd_columns: Dict[str, np.ndarray] = {}
+    for i, totals in enumerate(ytd):
+        for key, used in (totals or {}).items():
+            if key not in ytd_columns:
+                ytd_columns[key] = np.zeros(n)
+            ytd_columns[key][i] = float(used or 0.0)
+    return ytd_known, ytd_columns
+
+
+def remaining_allowance_array(columns: PayrunColumns, limit: Optional[float], key: str) -> Optional[np.ndarray]:
+    """Vectorized ytd.remaining_allowance; None if nothing to clamp, NaN for employees without YTD."""
+    if limit is None or columns.ytd_known is None:
+        return None
+    used = columns.ytd.get(key)
+    if used is None:
+        used = np.zeros(len(columns))
+    return np.where(columns.ytd_known, np.maximum(limit - used, 0.0), np.nan)
+
+
+def batch_income_tax(table: TaxBracketTable, taxable: np.ndarray) -> np.ndarray:
+    """Vectorized calculate_income_tax: np.searchsorted over the cumulative bracket table."""
+    if not table.uppers:
+        return np.zeros_like(taxable)
+    uppers = np.asarray(table.uppers)
+    idx = np.searchsorted(uppers, taxable, side="left")
+    inside = idx < len(uppers)
+    safe = np.minimum(idx, len(uppers) - 1)
+    partial = (
+        np.asarray(table.cumulative)[safe]
+        + (taxable - np.asarray(table.lowers)[safe]) * np.asarray(table.rates)[safe]
+    )
+    tax = np.where(inside, partial, table.total)
+    return np.where(taxable > 0, tax, 0.0)
+
+
+def _batch_employer_amount(
+    gross: np.ndarray, rule: EmployerRule, periods_per_year: int, remaining: Optional[np.ndarray] = None
+) -> np.ndarray:
+    """Vectorized employer_costs._amount_from_rule_for_employer (incl. caps; remaining = annual_cap left)."""
+    if rule.amount is not None:
+        amt = np.full_like(gross, rule.amount)
+    elif rule.annualize:
+        amt = ((gross * float(periods_per_year)) * rule.rate) / float(periods_per_year)
+    else:
+        amt = gross * rule.rate
+
+    positive = amt > 0
+    if rule.max_amount is not None:
+        amt = np.minimum(amt, rule.max_amount)
+    if rule.annual_cap is not None:
+        annualized = amt * float(periods_per_year)
+        annualized = np.where(annualized > rule.annual_cap, rule.annual_cap, annualized)
+        prorated = annualized / float(periods_per_year)
+        amt = prorated if remaining is None else np.where(np.isnan(remaining), prorated, np.minimum(amt, remaining))
+    return np.where(positive, amt, 0.0)
+
+
+def _accumulate(
+    name: str,
+    amount: np.ndarray,
+    active: np.ndarray,
+    pre_tax: np.ndarray,
+    totals: List[np.ndarray],
+    breakdowns: Tuple[Dict[str, np.ndarray], Dict[str, np.ndarray]],
+) -> None:
+    """Add an employee-side amount to the pre/post-tax running totals and breakdowns."""
+    active = active & (amount > 0)
+    for slot, mask in ((0, active & pre_tax), (1, active & ~pre_tax)):
+        if not mask.any():
+            continue
+        totals[slot] = totals[slot] + np.where(mask, amount, 0.0)
+        previous = breakdowns[slot].get(name)
+        rounded = np.where(mask, round_cents(amount), np.nan)
+        breakdowns[slot][name] = rounded if previous is None else np.where(mask, rounded, previous)
+
+
+def calculate_batch(config: Any, columns: PayrunColumns) -> BatchResult:
+    """
+    Gross-to-net for a whole country cohort as array operations:
+    calculate_gross_pay -> calculate_deductions -> calculate_employer_costs, one pass each.
+    """
+    plan: CountryRulePlan = as_rule_plan(config)
+    n = len(columns)
+    ppy = plan.periods_per_year
+    everyone = np.ones(n, dtype=bool)
+
+    # 1) Earnings
+    base_pay = np.where(columns.base_pay > 0, columns.base_pay, columns.hourly_rate * columns.hours_worked)
+    overtime_pay = np.where(
+        (columns.hourly_rate > 0) & (columns.overtime_hours > 0),
+        columns.hourly_rate * columns.overtime_hours * plan.overtime_multiplier,
+        0.0,
+    )
+    gross = base_pay + overtime_pay + columns.bonuses + columns.allowance_total
+
+    # 2) Statutory employee contributions + other (optional) deductions
+    totals = [np.zeros(n), np.zeros(n)]
+    pre_tax: Dict[str, np.ndarray] = {}
+    post_tax: Dict[str, np.ndarray] = {}
+    for item in plan.employee_contributions + plan.other_employee_deductions:
+        active = everyone
+        if item.optional:
+            active = columns.opt_in.get(item.name, np.zeros(n, dtype=bool))
+        amount = np.full(n, item.amount) if item.amount is not None else gross * item.rate
+        _accumulate(item.name, amount, active, np.full(n, item.pre_tax), totals, (pre_tax, post_tax))
+
+    # 3) Taxable income and progressive tax
+    taxable = np.maximum(gross - columns.exempt_allowance_total - totals[0], 0.0)
+    income_tax = batch_income_tax(plan.tax_table, taxable)
+
+    # 4) Optional benefits (after tax, as in calculate_deductions)
+    for benefit in plan.optional_benefits:
+        active = columns.opt_in.get(benefit.name)
+        if active is None or not active.any():
+            continue
+        rate = np.full(n, np.nan if benefit.rate is None else benefit.rate)
+        amount = np.full(n, np.nan if benefit.amount is None else benefit.amount)
+        pre_flag = np.full(n, benefit.pre_tax)
+        if benefit.name in columns.benefit_overrides:
+            rate_o, amount_o, pre_tax_o = columns.benefit_overrides[benefit.name]
+            rate = np.where(np.isnan(rate_o), rate, rate_o)
+            amount = np.where(np.isnan(amount_o), amount, amount_o)
+            pre_flag = np.where(pre_tax_o >= 0, pre_tax_o == 1, pre_flag)
+
+        if benefit.basis == "annual":
+            fixed = amount / float(ppy)
+        else:
+            fixed = amount
+        if benefit.basis == "gross":
+            value = np.where(~np.isnan(rate), gross * rate, np.where(np.isnan(fixed), 0.0, fixed))
+        else:
+            value = np.where(np.isnan(fixed), 0.0, fixed)
+        remaining = remaining_allowance_array(columns, benefit.annual_limit, ytd_key("employee", benefit.name))
+        if remaining is not None:
+            value = np.where(np.isnan(remaining), value, np.minimum(value, remaining))
+        _accumulate(benefit.name, value, active, pre_flag, totals, (pre_tax, post_tax))
+
+    # 5) Totals (same rounding sequence as calculate_deductions + the route)
+    total_pre_tax = round_cents(totals[0])
+    total_post_tax = round_cents(totals[1])
+    total_deductions = round_cents(income_tax + total_post_tax + total_pre_tax)
+    net_pay = gross - total_deductions
+
+    # 6) Employer costs
+    employer: Dict[str, np.ndarray] = {}
+    employer_total = np.zeros(n)
+    employer_rules = [(rule, everyone) for rule in plan.employer_contributions] + [
+        (b.employer, columns.opt_in[b.name])
+        for b in plan.optional_benefits
+        if b.employer is not None and b.name in columns.opt_in
+    ]
+    for rule, active in employer_rules:
+        remaining = remaining_allowance_array(columns, rule.annual_cap, ytd_key("employer", rule.label))
+        amt = _batch_employer_amount(gross, rule, ppy, remaining)
+        mask = active & (amt > 0)
+        val = np.where(mask, round_cents(amt), 0.0)
+        employer_total = employer_total + val
+        previous = employer.get(rule.label)
+        component = np.where(mask, val, np.nan)
+        employer[rule.label] = component if previous is None else np.where(mask, val, previous)
+
+    return BatchResult(
+        base_pay=base_pay,
+        overtime_pay=overtime_pay,
+        gross_pay=gross,
+        taxable_income=round_cents(taxable),
+        income_tax=round_cents(income_tax),
+        total_pre_tax=total_pre_tax,
+        total_post_tax=total_post_tax,
+        total_deductions=total_deductions,
+        net_pay=net_pay,
+        total_employer_cost=round_cents(employer_total),
+        pre_tax=pre_tax,
+        post_tax=post_tax,
+        employer=employer,
+    )
+
+
+def batch_income_tax_minor(table: TaxBracketTable, taxable: np.ndarray, mode: str) -> np.ndarray:
+    """Vectorized calculate_income_tax over a minor-unit table (int64 in, int64 out)."""
+    if not table.uppers:
+        return np.zeros_like(taxable)
+    uppers = np.asarray(table.uppers)
+    idx = np.searchsorted(uppers, taxable, side="left")
+    inside = idx < len(uppers)
+    safe = np.minimum(idx, len(uppers) - 1)
+    marginal = round_units_array((taxable - np.asarray(table.lowers, dtype=np.int64)[safe]) * np.asarray(table.rates)[safe], mode)
+    tax = np.where(inside, np.asarray(table.cumulative, dtype=np.int64)[safe] + marginal, table.total)
+    return np.where(taxable > 0, tax, 0).astype(np.int64)
+
+
+def _remaining_minor(remaining: np.ndarray, scale: int, mode: str) -> np.ndarray:
+    """remaining_allowance_array in minor units (NaN entries become 0 and must be masked by the caller)."""
+    return round_units_array(np.where(np.isnan(remaining), 0.0, remaining) * scale, mode)
+
+
+def _batch_employer_amount_minor(
+    gross: np.ndarray, rule: EmployerRule, mode: str, scale: int = 100, remaining: Optional[np.ndarray] = None
+) -> np.ndarray:
+    """Vectorized employer_costs._amount_from_rule_for_employer_minor (remaining = annual_cap left)."""
+    if rule.amount_minor is not None:
+        amt = np.full(len(gross), rule.amount_minor, dtype=np.int64)
+    else:
+        amt = round_units_array(gross * rule.rate, mode)
+    if rule.max_amount_minor is not None:
+        amt = np.minimum(amt, rule.max_amount_minor)
+    if remaining is not None:
+        capped = np.minimum(amt, _remaining_minor(remaining, scale, mode))
+        period_capped = amt if rule.period_cap_minor is None else np.minimum(amt, rule.period_cap_minor)
+        amt = np.where(np.isnan(remaining), period_capped, capped)
+    elif rule.period_cap_minor is not None:
+        amt = np.minimum(amt, rule.period_cap_minor)
+    return np.maximum(amt, 0)
+
+
+def _accumulate_minor(
+    name: str,
+    amount: np.ndarray,
+    active: np.ndarray,
+    pre_tax: np.ndarray,
+    totals: List[np.ndarray],
+    breakdowns: Tuple[Dict[str, np.ndarray], Dict[str, np.ndarray]],
+) -> None:
+    """_accumulate for int64 minor units; 0 marks 'no breakdown entry'."""
+    active = active & (amount > 0)
+    for slot, mask in ((0, active & pre_tax), (1, active & ~pre_tax)):
+        if not mask.any():
+            continue
+        totals[slot] = totals[slot] + np.where(mask, amount, 0)
+        previous = breakdowns[slot].get(name, np.zeros(len(amount), dtype=np.int64))
+        breakdowns[slot][name] = np.where(mask, amount, previous)
+
+
+def calculate_batch_minor(config: Any, columns: PayrunColumns) -> BatchResult:
+    """
+    calculate_batch in integer minor units (the array form of the *_minor scalar calculators):
+    every amount is an int64 rounded once with plan.rounding_mode, so totals are exact sums.
+    Returns a BatchResult with minor_unit_scale set.
+    """
+    plan: CountryRulePlan = as_rule_plan(config)
+    n = len(columns)
+    scale, mode, ppy = plan.minor_unit_scale, plan.rounding_mode, plan.periods_per_year
+    everyone = np.ones(n, dtype=bool)
+    allowance_total = columns.allowance_total_minor
+    exempt_total = columns.exempt_allowance_total_minor
+    if allowance_total is None or exempt_total is None:
+        raise ValueError("PayrunColumns has no minor-unit allowance totals; build it with build_columns()")
+
+    # 1) Earnings: each component rounded once
+    base_pay = np.where(
+        columns.base_pay > 0,
+        round_units_array(columns.base_pay * scale, mode),
+        round_units_array(columns.hourly_rate * columns.hours_worked * scale, mode),
+    )
+    overtime_pay = np.where(
+        (columns.hourly_rate > 0) & (columns.overtime_hours > 0),
+        round_units_array(columns.hourly_rate * columns.overtime_hours * plan.overtime_multiplier * scale, mode),
+        0,
+    )
+    gross = base_pay + overtime_pay + round_units_array(columns.bonuses * scale, mode) + allowance_total
+
+    # 2) Statutory employee contributions + other (optional) deductions
+    totals = [np.zeros(n, dtype=np.int64), np.zeros(n, dtype=np.int64)]
+    pre_tax: Dict[str, np.ndarray] = {}
+    post_tax: Dict[str, np.ndarray] = {}
+    for item in plan.employee_contributions + plan.other_employee_deductions:
+        active = everyone
+        if item.optional:
+            active = columns.opt_in.get(item.name, np.zeros(n, dtype=bool))
+        if item.amount_minor is not None:
+            amount = np.full(n, item.amount_minor, dtype=np.int64)
+        else:
+            amount = round_units_array(gross * item.rate, mode)
+        _accumulate_minor(item.name, amount, active, np.full(n, item.pre_tax), totals, (pre_tax, post_tax))
+
+    # 3) Taxable income and progressive tax
+    taxable = np.maximum(gross - exempt_total - totals[0], 0)
+    income_tax = batch_income_tax_minor(plan.tax_table_minor, taxable, mode)
+
+    # 4) Optional benefits (after tax, as in calculate_deductions_minor)
+    for benefit in plan.optional_benefits:
+        active = columns.opt_in.get(benefit.name)
+        if active is None or not active.any():
+            continue
+        rate = np.full(n, np.nan if benefit.rate is None else benefit.rate)
+        has_amount = np.full(n, benefit.amount_minor is not None)
+        amount = np.full(n, benefit.amount_minor or 0, dtype=np.int64)
+        pre_flag = np.full(n, benefit.pre_tax)
+        if benefit.name in columns.benefit_overrides:
+            rate_o, amount_o, pre_tax_o = columns.benefit_overrides[benefit.name]
+            rate = np.where(np.isnan(rate_o), rate, rate_o)
+            overridden = ~np.isnan(amount_o)
+            per_period = amount_o * scale / ppy if benefit.basis == "annual" else amount_o * scale
+            amount = np.where(overridden, round_units_array(np.where(overridden, per_period, 0.0), mode), amount)
+            has_amount = has_amount | overridden
+            pre_flag = np.where(pre_tax_o >= 0, pre_tax_o == 1, pre_flag)
+
+        if benefit.basis == "gross":
+            by_rate = ~np.isnan(rate)
+            rated = round_units_array(np.where(by_rate, gross * np.where(by_rate, rate, 0.0), 0.0), mode)
+            value = np.where(by_rate, rated, np.where(has_amount, amount, 0))
+        else:
+            value = np.where(has_amount, amount, 0)
+        remaining = remaining_allowance_array(columns, benefit.annual_limit, ytd_key("employee", benefit.name))
+        if remaining is not None:
+            value = np.where(np.isnan(remaining), value, np.minimum(value, _remaining_minor(remaining, scale, mode)))
+        _accumulate_minor(benefit.name, value, active, pre_flag, totals, (pre_tax, post_tax))
+
+    # 5) Totals: exact integer sums
+    total_deductions = income_tax + totals[0] + totals[1]
+    net_pay = gross - total_deductions
+
+    # 6) Employer costs
+    employer: Dict[str, np.ndarray] = {}
+    employer_total = np.zeros(n, dtype=np.int64)
+    employer_rules = [(rule, everyone) for rule in plan.employer_contributions] + [
+        (b.employer, columns.opt_in[b.name])
+        for b in plan.optional_benefits
+        if b.employer is not None and b.name in columns.opt_in
+    ]
+    for rule, active in employer_rules:
+        remaining = remaining_allowance_array(columns, rule.annual_cap, ytd_key("employer", rule.label))
+        amt = _batch_employer_amount_minor(gross, rule, mode, scale, remaining)
+        mask = active & (amt > 0)
+        val = np.where(mask, amt, 0)
+        employer_total = employer_total + val
+        employer[rule.label] = np.where(mask, val, employer.get(rule.label, 0))
+
+    return BatchResult(
+        base_pay=base_pay,
+        overtime_pay=overtime_pay,
+        gross_pay=gross,
+        taxable_income=taxable,
+        income_tax=income_tax,
+        total_pre_tax=totals[0],
+        total_post_tax=totals[1],
+        total_deductions=total_deductions,
+        net_pay=net_pay,
+        total_employer_cost=employer_total,
+        pre_tax=pre_tax,
+        post_tax=post_tax,
+        employer=employer,
+        minor_unit_scale=scale,
+    )
@@ -0,0 +1,159 @@
+# app/services/calc_cache.py
+
+import copy
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Mapping, Optional
+
+from app.models.calc_input import CalcInput
+from app.services.ytd import remaining_allowance, ytd_key
+from app.utils.metrics import CALC_CACHE_EVICTIONS, CALC_CACHE_HITS, CALC_CACHE_MISSES
+
+_EARNING_FIELDS = ("hourly_rate", "hours_worked", "overtime_hours", "bonuses", "base_pay")
+
+
+def _normalize_value(value: Any) -> Any:
+    """Numbers -> float (so 100, 100.0 and "100" hash alike); dicts recursively; others as-is."""
+    if isinstance(value, bool) or value is None:
+        return value
+    if isinstance(value, dict):
+        return {str(k): _normalize_value(v) for k, v in value.items()}
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return str(value)
+
+
+def _digest(payload: Dict[str, Any]) -> str:
+    canonical = json.dumps(payload, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def normalized_inputs(calc_emp: CalcInput) -> Dict[str, Any]:
+    """
+    JSON-safe calculator inputs of calc_emp (earnings, allowances, benefit opt-ins).
+    Numbers become floats and falsy opt-ins are dropped (every calculator treats them as not opted in).
+    """
+    optins = calc_emp.benefits_opt_in
+    inputs = {name: float(getattr(calc_emp, name)) for name in _EARNING_FIELDS}
+    inputs["allowances"] = _normalize_value(dict(calc_emp.allowances))
+    inputs["benefits_opt_in"] = {str(k): _normalize_value(v) for k, v in optins.items() if v}
+    return inputs
+
+
+def calculation_key(calc_emp, plan, **context: Any) -> str:
+    """
+    Content address of one gross-to-net calculation:
+      - normalized_inputs(calc_emp)
+      - plan.config_version (hash of the country config section), so config edits never hit stale entries
+      - context: anything else that changes the result (arithmetic mode, pay period, ...)
+    Identity fields (employee_id, tenant_id, metadata) are deliberately excluded.
+    """
+    payload = normalized_inputs(calc_emp)
+    payload.update({
+        "country": plan.country,
+        "config_version": plan.config_version,
+        "context": _normalize_value(context),
+    })
+    return _digest(payload)
+
+
+def ytd_clamps(plan, ytd: Optional[Mapping[str, float]]) -> Optional[Dict[str, float]]:
+    """
+    The part of the YTD totals a calculation depends on, for calculation_key: what is left of each
+    benefit's annual_limit and each employer rule's annual_cap (by ytd_key). Running totals such as
+    gross_pay never clamp anything, so they stay out of the key. None without YTD (nothing clamps,
+    and employer annual caps are prorated per period instead).
+    """
+    if ytd is None:
+        return None
+    employer_rules = list(plan.employer_contributions) + [b.employer for b in plan.optional_benefits if b.employer is not None]
+    clamps = {
+        ytd_key("employee", benefit.name): remaining_allowance(benefit.annual_limit, ytd, ytd_key("employee", benefit.name))
+        for benefit in plan.optional_benefits if benefit.annual_limit is not None
+    }
+    clamps.update({
+        ytd_key("employer", rule.label): remaining_allowance(rule.annual_cap, ytd, ytd_key("employer", rule.label))
+        for rule in employer_rules if rule.annual_cap is not None
+    })
+    return clamps
+
+
+def payslip_key(calculation_cache_key: str, calc_emp, company: Any) -> str:
+    """Payslip content address: the calculation plus everything printed on the slip."""
+    if hasattr(company, "model_dump"):
+        company = company.model_dump()
+    elif hasattr(company, "dict"):
+        company = company.dict()
+    return _digest({
+        "calculation": calculation_cache_key,
+        "tenant_id": str(getattr(calc_emp, "tenant_id", "")),
+        "employee_id": str(getattr(calc_emp, "employee_id", "")),
+        "metadata": getattr(calc_emp, "metadata", None) or {},
+        "company": company or {},
+    })
+
+
+class ResultCache:
+    """
+    Thread-safe LRU cache with a per-entry TTL and a hard bound on the number of entries.
+    Values are deep-copied in and out so callers can never mutate a cached result.
+    max_entries <= 0 disables the cache (every get is a miss, put is a no-op).
+    Hits, misses and evictions are counted on /metrics under the cache's kind label.
+    """
+
+    def __init__(
+        self,
+        max_entries: int,
+        ttl_seconds: float,
+        kind: str = "calculation",
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.max_entries = int(max_entries)
+        self.ttl_seconds = float(ttl_seconds)
+        self.kind = kind
+        self._clock = clock
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        now = self._clock()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if self.ttl_seconds > 0 and expires_at <= now:
+                    del self._entries[key]
+                    CALC_CACHE_EVICTIONS.labels(kind=self.kind, reason="ttl").inc()
+                else:
+                    self._entries.move_to_end(key)
+                    CALC_CACHE_HITS.labels(kind=self.kind).inc()
+                    return copy.deepcopy(value)
+        CALC_CACHE_MISSES.labels(kind=self.kind).inc()
+        return None
+
+    def put(self, key: Hashable, value: Any) -> None:
+        if self.max_entries <= 0:
+            return
+        value = copy.deepcopy(value)
+        expires_at = self._clock() + self.ttl_seconds
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                CALC_CACHE_EVICTIONS.labels(kind=self.kind, reason="lru").inc()
+
+    def invalidate(self, key: Hashable) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
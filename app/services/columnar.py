@@ -0,0 +1,304 @@
+# app/services/columnar.py
+"""
+Arrow / Parquet in and out of the batch engine (services/batch_engine.py), without a
+CalcInput, Pydantic model or JSON document per employee.
+
+Input table, one row per employee:
+  - employee_id, country (required); tenant_id (optional, needed to persist)
+  - hourly_rate, hours_worked, overtime_hours, bonuses, base_pay: numeric, null/missing = 0.
+    float64 columns without nulls are read zero-copy (read-only NumPy views of the Arrow buffers)
+  - allowances: a map<string, number> column (added in each row's entry order, as the scalar
+    calculators iterate the dict) and/or one "allowances.<name>" numeric column each (column order)
+  - benefits_opt_in: a map<string, bool> column and/or "benefits_opt_in.<name>" columns, either bool
+    or struct<rate, amount, pre_tax> (a non-null struct opts in with those overrides)
+
+Results table (calculate_table), same row order: employee_id, tenant_id, country, hours_worked,
+overtime_hours, the amounts of BatchResult.to_records, then every component exploded into its
+own nullable float64 column: "allowances.<name>", "pre_tax.<name>", "post_tax.<name>",
+"employer.<label>". Result arrays are handed to Arrow without copying.
+services/payrun_store.bulk_load_table persists this table.
+
+pyarrow is an optional dependency, imported on first use.
+"""
+
+import os
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from app.config.rule_plan import as_rule_plan
+from app.services.batch_engine import (
+    BatchResult, PayrunColumns, build_ytd_columns, calculate_batch, calculate_batch_minor, round_cents,
+)
+from app.services.gross_to_net import ARITHMETIC_MINOR_UNITS, ARITHMETIC_FLOAT
+from app.utils.minor_units import round_units_array
+
+# Numeric input columns (PayrunColumns fields of the same name)
+INPUT_COLUMNS = ("hourly_rate", "hours_worked", "overtime_hours", "bonuses", "base_pay")
+# Identity columns copied unchanged from the input table to the results
+IDENTITY_COLUMNS = ("employee_id", "tenant_id", "country")
+# Amount columns of the results table, after identity / hours and before the components
+AMOUNT_COLUMNS = (
+    "base_pay", "overtime_pay", "bonuses", "gross_pay", "taxable_income", "income_tax",
+    "total_pre_tax", "total_post_tax", "total_deductions", "net_pay", "total_employer_cost",
+)
+# Exploded component column prefixes of the results table
+COMPONENT_GROUPS = ("allowances", "pre_tax", "post_tax", "employer")
+
+# (names, values) for one position of a mapping: names is one name for a "<group>.<name>"
+# column, or an object array (None = no entry) for the j-th entry of a map column's rows
+Slot = Tuple[Any, np.ndarray]
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.compute
+    except ImportError as exc:  # optional dependency
+        raise ImportError("Arrow / Parquet support needs the optional 'pyarrow' package") from exc
+    return pyarrow, pyarrow.compute
+
+
+def read_parquet(path: Union[str, os.PathLike], columns: Optional[List[str]] = None):
+    """Memory-mapped Parquet read -> pyarrow.Table."""
+    _pyarrow()
+    import pyarrow.parquet as pq
+
+    return pq.read_table(path, columns=columns, memory_map=True)
+
+
+def write_parquet(table, path: Union[str, os.PathLike]) -> None:
+    _pyarrow()
+    import pyarrow.parquet as pq
+
+    pq.write_table(table, path)
+
+
+def _to_numpy(column, dtype: str, fill: Any) -> np.ndarray:
+    """Arrow (chunked) array -> NumPy with nulls as fill; zero-copy for one null-free chunk of dtype."""
+    pa, pc = _pyarrow()
+    target = pa.float64() if dtype == "float64" else pa.bool_()
+    if column.type != target:
+        column = column.cast(target)
+    if column.null_count:
+        column = pc.fill_null(column, fill)
+    if isinstance(column, pa.ChunkedArray):
+        if column.num_chunks != 1:
+            return column.to_numpy()
+        column = column.chunk(0)
+    return column.to_numpy(zero_copy_only=False)
+
+
+def _map_slots(column, dtype: str, fill: Any) -> List[Slot]:
+    """
+    A map column as slots: slot j holds every row's j-th entry, so adding slot by slot
+    follows each row's own entry order (as the scalar calculators iterate a dict).
+    """
+    array = column.combine_chunks()
+    offsets = array.offsets.to_numpy()
+    lengths = np.where(array.is_null().to_numpy(zero_copy_only=False), 0, np.diff(offsets))
+    if not lengths.any():
+        return []
+    names = array.keys.to_numpy(zero_copy_only=False)
+    values = _to_numpy(array.items, dtype, fill)
+    slots = []
+    for j in range(int(lengths.max())):
+        has = lengths > j
+        position = np.where(has, offsets[:-1] + j, 0)
+        slots.append((np.where(has, names[position], None), np.where(has, values[position], fill)))
+    return slots
+
+
+def _allowance_slots(table) -> List[Slot]:
+    """Allowance slots: the map column's entries, then the "allowances.<name>" columns (NaN = none)."""
+    slots = _map_slots(table.column("allowances"), "float64", np.nan) if "allowances" in table.column_names else []
+    for column_name in table.column_names:
+        if column_name.startswith("allowances."):
+            slots.append((column_name[len("allowances."):], _to_numpy(table.column(column_name), "float64", np.nan)))
+    return slots
+
+
+def _opt_ins(table, optional_names: Sequence[str], n: int):
+    """PayrunColumns.opt_in / benefit_overrides from the benefits_opt_in map and columns."""
+    pa, _ = _pyarrow()
+    opt_in = {name: np.zeros(n, dtype=bool) for name in optional_names}
+    overrides: Dict[str, Tuple[np.ndarray, np.ndarray, np.ndarray]] = {}
+    if "benefits_opt_in" in table.column_names:
+        for names, values in _map_slots(table.column("benefits_opt_in"), "bool", False):
+            for name in optional_names:
+                opt_in[name] |= (names == name) & values
+
+    for column_name in table.column_names:
+        name = column_name[len("benefits_opt_in."):]
+        if not column_name.startswith("benefits_opt_in.") or name not in opt_in:
+            continue
+        column = table.column(column_name)
+        if not pa.types.is_struct(column.type):
+            opt_in[name] |= _to_numpy(column, "bool", False)
+            continue
+        array = column.combine_chunks()
+        opt_in[name] |= ~array.is_null().to_numpy(zero_copy_only=False)
+        # flatten(), unlike field(i), masks the children where the whole struct is null
+        fields = {array.type.field(i).name: child for i, child in enumerate(array.flatten())}
+        pre_tax = fields.get("pre_tax")
+        overrides[name] = (
+            _to_numpy(fields["rate"], "float64", np.nan) if "rate" in fields else np.full(n, np.nan),
+            _to_numpy(fields["amount"], "float64", np.nan) if "amount" in fields else np.full(n, np.nan),
+            (
+                np.where(pre_tax.is_null().to_numpy(zero_copy_only=False), -1, _to_numpy(pre_tax, "bool", False)).astype(np.int8)
+                if pre_tax is not None
+                else np.full(n, -1, dtype=np.int8)
+            ),
+        )
+    return opt_in, overrides
+
+
+def columns_from_arrow(
+    table, config: Any, ytd: Optional[Sequence[Optional[Mapping[str, float]]]] = None
+) -> PayrunColumns:
+    """
+    build_columns for an Arrow table of one country's employees (see the module docstring for
+    the columns). Allowances are summed in each row's own order and opt-ins resolved exactly as
+    build_columns does, so calculate_batch gives the same results as for the equivalent CalcInputs.
+    ytd: optional YTD totals parallel to the rows.
+    """
+    plan = as_rule_plan(config)
+    n = table.num_rows
+    scale, mode = plan.minor_unit_scale, plan.rounding_mode
+    numeric = {
+        name: _to_numpy(table.column(name), "float64", 0.0) if name in table.column_names else np.zeros(n)
+        for name in INPUT_COLUMNS
+    }
+
+    # Same summation order as calculate_gross_pay / calculate_deductions (see build_columns)
+    slots = _allowance_slots(table)
+    allowance_total, exempt_total = np.zeros(n), np.zeros(n)
+    allowance_minor, exempt_minor = np.zeros(n, dtype=np.int64), np.zeros(n, dtype=np.int64)
+    for _, values in slots:
+        positive = values > 0
+        amount = np.where(positive, values, 0.0)
+        allowance_total += amount
+        allowance_minor += round_units_array(amount * scale, mode)
+    for exempt_name in plan.exempt_allowances:
+        for names, values in slots:
+            amount = np.where((names == exempt_name) & (values > 0), values, 0.0)
+            exempt_total += amount
+            exempt_minor += round_units_array(amount * scale, mode)
+
+    optional_names = [b.name for b in plan.optional_benefits] + [
+        d.name for d in plan.other_employee_deductions if d.optional
+    ]
+    opt_in, overrides = _opt_ins(table, optional_names, n)
+    ytd_known, ytd_columns = build_ytd_columns(ytd, n)
+
+    return PayrunColumns(
+        allowance_total=allowance_total,
+        exempt_allowance_total=exempt_total,
+        opt_in=opt_in,
+        benefit_overrides=overrides,
+        allowance_total_minor=allowance_minor,
+        exempt_allowance_total_minor=exempt_minor,
+        ytd_known=ytd_known,
+        ytd=ytd_columns,
+        **numeric,
+    )
+
+
+def allowance_columns(table) -> Dict[str, np.ndarray]:
+    """Each allowance as a column of the table's rows (NaN where a row does not have it)."""
+    n = table.num_rows
+    columns: Dict[str, np.ndarray] = {}
+    for names, values in _allowance_slots(table):
+        if isinstance(names, str):
+            columns[names] = np.where(np.isnan(values), columns.get(names, np.nan), values)
+            continue
+        for name in dict.fromkeys(names[names != None]):  # noqa: E711 (elementwise)
+            match = names == name
+            columns[name] = np.where(match, values, columns.get(name, np.full(n, np.nan)))
+    return columns
+
+
+def result_arrays(batch: BatchResult, columns: PayrunColumns, allowances: Mapping[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    """
+    Results-table columns of one cohort as NumPy arrays: amounts as BatchResult.to_records
+    (minor units converted back to major), components NaN where to_records has no entry.
+    """
+    scale = batch.minor_unit_scale
+
+    def amount(values: np.ndarray) -> np.ndarray:
+        return values / scale if scale else values
+
+    def component(values: np.ndarray) -> np.ndarray:
+        return np.where(values > 0, values / scale, np.nan) if scale else values
+
+    arrays = {
+        "hours_worked": columns.hours_worked,
+        "overtime_hours": columns.overtime_hours,
+        "base_pay": round_cents(amount(batch.base_pay)),
+        "overtime_pay": round_cents(amount(batch.overtime_pay)),
+        "bonuses": round_cents(columns.bonuses),
+        "gross_pay": amount(batch.gross_pay),
+        "taxable_income": amount(batch.taxable_income),
+        "income_tax": amount(batch.income_tax),
+        "total_pre_tax": amount(batch.total_pre_tax),
+        "total_post_tax": amount(batch.total_post_tax),
+        "total_deductions": amount(batch.total_deductions),
+        "net_pay": amount(batch.net_pay),
+        "total_employer_cost": amount(batch.total_employer_cost),
+    }
+    for name, values in allowances.items():
+        arrays[f"allowances.{name}"] = round_cents(values)
+    for group, components in (("pre_tax", batch.pre_tax), ("post_tax", batch.post_tax), ("employer", batch.employer)):
+        for name, values in components.items():
+            arrays[f"{group}.{name}"] = component(values)
+    return arrays
+
+
+def calculate_table(
+    source,
+    country_plans: Mapping[str, Any],
+    arithmetic: str = ARITHMETIC_FLOAT,
+    ytd: Optional[Sequence[Optional[Mapping[str, float]]]] = None,
+):
+    """
+    Gross-to-net for an Arrow table (or a Parquet file path) of employees -> Arrow results table
+    in the same row order. Each country is one batch-engine cohort; a single-country table is
+    never copied. Raises ValueError for a country without configuration (as /calculate/batch).
+    ytd: optional YTD totals parallel to the rows.
+    """
+    pa, pc = _pyarrow()
+    table = read_parquet(source) if isinstance(source, (str, os.PathLike)) else source
+    engine = calculate_batch_minor if arithmetic == ARITHMETIC_MINOR_UNITS else calculate_batch
+    n = table.num_rows
+    countries = pc.unique(table.column("country")).to_pylist()
+
+    cohorts: List[Tuple[Optional[np.ndarray], Dict[str, np.ndarray]]] = []
+    for country in countries:
+        plan = country_plans.get(country)
+        if not plan:
+            raise ValueError(f"Country configuration not found for {country}")
+        if len(countries) == 1:
+            rows, cohort = None, table
+        else:
+            rows = pc.indices_nonzero(pc.equal(table.column("country"), country)).to_numpy()
+            cohort = table.take(rows)
+        cohort_ytd = ytd if ytd is None or rows is None else [ytd[i] for i in rows]
+        columns = columns_from_arrow(cohort, plan, ytd=cohort_ytd)
+        cohorts.append((rows, result_arrays(engine(plan, columns), columns, allowance_columns(cohort))))
+
+    names = ["hours_worked", "overtime_hours", *AMOUNT_COLUMNS]
+    for group in COMPONENT_GROUPS:
+        names += sorted({name for _, arrays in cohorts for name in arrays if name.startswith(f"{group}.")})
+
+    output = {name: table.column(name) for name in IDENTITY_COLUMNS if name in table.column_names}
+    for name in names:
+        if len(cohorts) == 1:
+            values = cohorts[0][1].get(name, np.full(n, np.nan))
+        else:
+            values = np.full(n, np.nan)
+            for rows, arrays in cohorts:
+                if name in arrays:
+                    values[rows] = arrays[name]
+        nulls = np.isnan(values)
+        output[name] = pa.array(values, mask=nulls) if nulls.any() else pa.array(values)
+    return pa.table(output)
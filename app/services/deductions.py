@@ -1,170 +1,209 @@
 # app/services/deductions.py
 
-from typing import Dict, Any
+from typing import Dict, Any, List, Mapping, Optional
+
+from app.config.rule_plan import DeductionRule, as_rule_plan, benefit_amount_minor
+from app.models.calc_input import CalcInput
+from app.services.income_tax import calculate_income_tax
+from app.services.profiles import RuleProfile
+from app.services.ytd import remaining_allowance, ytd_key
+from app.utils.minor_units import round_units, to_minor
 
 ENABLE_DEDUCTION_INTEGRITY_CHECK = True
 
 
-def _amount_from_rule(gross: float, rule: Dict[str, Any]) -> float:
+def _amount_from_rule(gross: float, rule: DeductionRule, trace: Optional[List[dict]] = None) -> float:
     """
-    Supports either percentage-based ('rate' + basis='gross') or fixed 'amount'.
-    If 'basis' == 'annual', caller should pass a periodized amount in rule['period_amount'].
+    Supports either percentage-based (rate on gross) or fixed per-period 'amount'.
+    Rates are always on gross: the config schema (DeductionRuleConfig) rejects any other basis.
+    trace: explain mode (see calculate_deductions); one entry per call.
     """
-    basis = rule.get("basis", "gross")
-    if "amount" in rule:
-        # fixed amount (per period by default)
-        return float(rule["amount"])
-    rate = float(rule.get("rate", 0.0))
-    if basis == "gross":
-        return gross * rate
-    # 'annual' and other bases can be extended here; fall back to 0
-    return 0.0
-
-def _resolve_benefit_amount(gross_pay: float, cfg: dict, periods_per_year: int) -> float:
+    amount = rule.amount if rule.amount is not None else gross * rule.rate
+    if trace is not None:
+        trace.append(_rule_entry(rule, amount))
+    return amount
+
+
+def _rule_entry(rule: DeductionRule, amount: float) -> dict:
+    fixed = rule.amount is not None
+    return {
+        "step": "deduction", "rule": rule.name, "basis": "amount" if fixed else "gross",
+        "rate": None if fixed else rule.rate, "pre_tax": rule.pre_tax, "amount": amount,
+    }
+
+def _resolve_benefit_amount(
+    gross_pay: float,
+    rate: Optional[float],
+    amount: Optional[float],
+    basis: str,
+    periods_per_year: int,
+    entry: Optional[dict] = None,
+) -> float:
     """
-    Compute a single optional benefit amount based on its config.
+    Compute a single optional benefit amount based on its (possibly overridden) rule.
     Supports:
-      - {"rate": 0.04, "basis": "gross"}
-      - {"amount": 100, "basis": "amount"}
-      - {"amount": 3000, "basis": "annual"}  # prorated
+      - rate=0.04, basis="gross"
+      - amount=100, basis="amount"
+      - amount=3000, basis="annual"  # prorated
+    entry: explain mode; the benefit's trace entry, completed with what was applied.
     """
-    basis = cfg.get("basis", "gross")
-    if "rate" in cfg and basis == "gross":
-        return gross_pay * float(cfg["rate"])
-    if "amount" in cfg:
-        amt = float(cfg["amount"])
-        if basis == "annual":
-            return amt / float(periods_per_year)
-        # default treat as per-period fixed amount
-        return amt
-    return 0.0
-
-def calculate_deductions(employee, gross_pay: float, config: Dict[str, Any]) -> dict:
+    if rate is not None and basis == "gross":
+        resolved = gross_pay * rate
+    elif amount is not None:
+        # "annual" is prorated; anything else is a per-period fixed amount
+        resolved = amount / float(periods_per_year) if basis == "annual" else amount
+        rate = None
+    else:
+        resolved, rate = 0.0, None
+    if entry is not None:
+        entry.update(basis=basis, rate=rate, configured_amount=amount if rate is None else None, amount=resolved)
+    return resolved
+
+
+def _benefit_entry(trace: List[dict], name: str, override: bool, pre_tax: bool, annual_limit: Optional[float]) -> dict:
+    """New "benefit" trace entry, appended to trace."""
+    entry = {"step": "benefit", "rule": name, "override": override, "pre_tax": pre_tax, "annual_limit": annual_limit}
+    trace.append(entry)
+    return entry
+
+
+def _limit_benefit(amount, remaining, entry: Optional[dict]):
+    """Clamp a benefit to what is left of its annual_limit (remaining=None: no clamp)."""
+    if remaining is not None and amount > remaining:
+        amount = remaining
+        if entry is not None:
+            entry["cap_hit"] = "annual_limit"
+    if entry is not None:
+        entry.update(remaining=remaining, amount=amount)
+    return amount
+
+def _amount_from_rule_minor(gross_minor: int, rule: DeductionRule, mode: str, trace: Optional[List[dict]] = None) -> int:
+    """Minor-unit _amount_from_rule: fixed amount_minor, or the rate on gross rounded once."""
+    amount = rule.amount_minor if rule.amount_minor is not None else round_units(gross_minor * rule.rate, mode)
+    if trace is not None:
+        trace.append(_rule_entry(rule, amount))
+    return amount
+
+def calculate_deductions(
+    employee: CalcInput,
+    gross_pay: float,
+    config: Any,
+    include_bracket_details: bool = True,
+    ytd: Optional[Mapping[str, float]] = None,
+    profile: Optional[RuleProfile] = None,
+    trace: Optional[List[dict]] = None,
+) -> dict:
     """
-    Reads the new schema:
-      - config["allowance_rules"][name] = { tax_treatment: "exempt"|"taxable"|..., basis: "amount" }
-      - config["statutory"]["employee_contributions"] = [ {name, rate|amount, basis, pre_tax: bool} ]
-      - config["statutory"]["other_employee_deductions"] = optional extras (pre/post-tax, optional)
-      - config["income_tax_brackets"] with last 'up_to' possibly null
+    Evaluates a compiled CountryRulePlan (raw country_config dicts are compiled on the fly):
+      - plan.exempt_allowances: allowance names whose tax_treatment is "exempt"
+      - plan.employee_contributions: statutory employee contributions (always applied)
+      - plan.other_employee_deductions: optional extras (pre/post-tax, optional)
+      - plan.tax_table: cumulative progressive tax table (see income_tax.py)
 
     Pre-tax items reduce taxable income. Post-tax items do not.
+    Pass include_bracket_details=False when only totals are needed; tax_bracket_details is then None.
+    ytd: year-to-date totals by component (see services/ytd.py); when given, optional benefits
+    are clamped to what is left of their annual_limit.
+    profile: the employee's RuleProfile from services/profiles.py (bulk runs); its pre-resolved
+    rules replace the walk over every rule with per-employee opt-in checks.
+    trace: explain mode. When a list is given, one entry per evaluated rule is appended, in order:
+      - {"step": "deduction", "rule", "basis": "amount" | "gross", "rate", "pre_tax", "amount"}
+      - {"step": "income_tax", ...}: the bracket walk (see calculate_income_tax)
+      - {"step": "benefit", "rule", "override", "pre_tax", "annual_limit", "basis", "rate",
+         "configured_amount", "remaining", "amount", ["cap_hit": "annual_limit"]}
+    When None (the default) nothing is recorded or allocated.
     """
-    allowances = employee.allowances or {}
+    plan = as_rule_plan(config)
+    allowances = employee.allowances
     pre_tax_deductions = 0.0
     post_tax_deductions = 0.0
     pre_tax_breakdown: Dict[str, float] = {}
     post_tax_breakdown: Dict[str, float] = {}
-    periods_per_year = int(config.get("periods_per_year", 12))
+    periods_per_year = plan.periods_per_year
 
     # 1) Allowance exemptions: treat tax_treatment == "exempt" as fully exempting the allowance amount
     tax_exempt_amount = 0.0
     tax_exemptions_applied: Dict[str, float] = {}
-    for name, rule in (config.get("allowance_rules") or {}).items():
-        if rule.get("tax_treatment") == "exempt" and name in allowances:
+    for name in (plan.exempt_allowances if profile is None else profile.exempt_allowances):
+        if name in allowances:
             exempt = float(allowances[name])
             if exempt > 0:
                 tax_exempt_amount += exempt
                 tax_exemptions_applied[name] = round(exempt, 2)
 
-    # 2) Statutory employee contributions (always applied)
-    statutory = config.get("statutory", {}) or {}
-    for item in statutory.get("employee_contributions", []):
-        amount = _amount_from_rule(gross_pay, item)
+    # 2) Statutory employee contributions (always applied); with a profile, also its opted-in optional ones
+    for item in (plan.employee_contributions if profile is None else profile.deductions):
+        amount = _amount_from_rule(gross_pay, item, trace)
         if amount <= 0:
             continue
-        if item.get("pre_tax", False):
+        if item.pre_tax:
             pre_tax_deductions += amount
-            pre_tax_breakdown[item["name"]] = round(amount, 2)
+            pre_tax_breakdown[item.name] = round(amount, 2)
         else:
             post_tax_deductions += amount
-            post_tax_breakdown[item["name"]] = round(amount, 2)
+            post_tax_breakdown[item.name] = round(amount, 2)
 
     # 3) Other employee deductions (may be optional)
-    opted = getattr(employee, "benefits_opt_in", {}) or {}
-    for item in statutory.get("other_employee_deductions", []):
+    opted = employee.benefits_opt_in
+    for item in (plan.other_employee_deductions if profile is None else ()):
         # If marked optional, only apply when employee opted in (by name)
-        if item.get("optional", False):
-            if not opted.get(item["name"], False):
+        if item.optional:
+            if not opted.get(item.name, False):
                 continue
-        amount = _amount_from_rule(gross_pay, item)
+        amount = _amount_from_rule(gross_pay, item, trace)
         if amount <= 0:
             continue
-        if item.get("pre_tax", False):
+        if item.pre_tax:
             pre_tax_deductions += amount
-            pre_tax_breakdown[item["name"]] = round(amount, 2)
+            pre_tax_breakdown[item.name] = round(amount, 2)
         else:
             post_tax_deductions += amount
-            post_tax_breakdown[item["name"]] = round(amount, 2)
+            post_tax_breakdown[item.name] = round(amount, 2)
 
     # 4) Taxable income: gross minus allowance exemptions and ALL pre-tax deductions
     taxable_income = max(gross_pay - tax_exempt_amount - pre_tax_deductions, 0.0)
 
-    # 5) Progressive income tax
-    #    Treat up_to: null as infinity
-    brackets = []
-    for b in config.get("income_tax_brackets", []):
-        up_to = float("inf") if b["up_to"] is None else float(b["up_to"])
-        brackets.append({"up_to": up_to, "rate": float(b["rate"])})
-    brackets.sort(key=lambda x: x["up_to"])
-
-    tax_bracket_details = []
-    income_tax = 0.0
-    last_threshold = 0.0
-    remaining = taxable_income
-
-    for b in brackets:
-        if remaining <= 0:
-            break
-        span = b["up_to"] - last_threshold
-        if span < 0:  # guard against badly ordered brackets
-            span = 0
-        taxable_at_this_rate = min(remaining, span)
-        if taxable_at_this_rate > 0:
-            tax_for_bracket = taxable_at_this_rate * b["rate"]
-            income_tax += tax_for_bracket
-            tax_bracket_details.append({
-                "up_to": None if b["up_to"] == float("inf") else b["up_to"],
-                "rate": b["rate"],
-                "amount": round(tax_for_bracket, 2),
-            })
-            remaining -= taxable_at_this_rate
-        last_threshold = b["up_to"]
-        
-    # 6) Optional benefits (NEW): read from config["optional_benefits"]
-    # Employee opt-ins come from employee.benefits_opt_in (preferred) or employee.opted_benefits (fallback)
-    optional_benefits_cfg: Dict[str, dict] = config.get("optional_benefits", {})
-    employee_optins: Dict[str, Any] = getattr(employee, "benefits_opt_in", None) or getattr(employee, "opted_benefits", {}) or {}
-
-    for benefit_name, benefit_cfg in optional_benefits_cfg.items():
+    # 5) Progressive income tax: O(log n) lookup in the plan's cumulative bracket table
+    income_tax, tax_bracket_details = calculate_income_tax(
+        plan.tax_table, taxable_income, with_details=include_bracket_details, trace=trace
+    )
+
+    # 6) Optional benefits: compiled from config["optional_benefits"]
+    employee_optins: Dict[str, Any] = employee.benefits_opt_in
+
+    for benefit in (plan.optional_benefits if profile is None else profile.benefits):
         # Skip if employee didn't opt in
-        opted_value = employee_optins.get(benefit_name)
+        opted_value = employee_optins.get(benefit.name)
         if not opted_value:
             continue
 
         # If employee provided a custom amount in opt-in, allow it to override config "amount"
         # Format supported:
         #   benefits_opt_in: { "RRSP_optional": {"amount": 200, "pre_tax": true} }  OR  true
-        effective_cfg = dict(benefit_cfg)
-        if isinstance(opted_value, dict):
+        rate, amount, pre_tax_flag = benefit.rate, benefit.amount, benefit.pre_tax
+        override = isinstance(opted_value, dict)
+        if override:
             if "amount" in opted_value:
-                effective_cfg["amount"] = opted_value["amount"]
+                amount = float(opted_value["amount"])
             if "rate" in opted_value:
-                effective_cfg["rate"] = opted_value["rate"]
+                rate = float(opted_value["rate"])
             # employee can override pre_tax flag; otherwise config governs
-            pre_tax_flag = bool(opted_value.get("pre_tax", effective_cfg.get("pre_tax", False)))
-        else:
-            pre_tax_flag = bool(effective_cfg.get("pre_tax", False))
+            pre_tax_flag = bool(opted_value.get("pre_tax", pre_tax_flag))
 
-        amount = _resolve_benefit_amount(gross_pay, effective_cfg, periods_per_year)
+        entry = None if trace is None else _benefit_entry(trace, benefit.name, override, pre_tax_flag, benefit.annual_limit)
+        amount = _resolve_benefit_amount(gross_pay, rate, amount, benefit.basis, periods_per_year, entry)
+        remaining = remaining_allowance(benefit.annual_limit, ytd, ytd_key("employee", benefit.name))
+        if remaining is not None or entry is not None:
+            amount = _limit_benefit(amount, remaining, entry)
         if amount <= 0:
             continue
 
         if pre_tax_flag:
             pre_tax_deductions += amount
-            pre_tax_breakdown[benefit_name] = round(amount, 2)
+            pre_tax_breakdown[benefit.name] = round(amount, 2)
         else:
             post_tax_deductions += amount
-            post_tax_breakdown[benefit_name] = round(amount, 2)
+            post_tax_breakdown[benefit.name] = round(amount, 2)
 
     # 7) Totals
     total_pre_tax_deductions = round(pre_tax_deductions, 2)
@@ -197,4 +236,116 @@ def calculate_deductions(employee, gross_pay: float, config: Dict[str, Any]) ->
         "total_post_tax_deductions": total_post_tax_deductions,
         "pre_tax_breakdown": pre_tax_breakdown,
         "post_tax_breakdown": post_tax_breakdown,
-    }
\ No newline at end of file
+    }
+
+def calculate_deductions_minor(
+    employee: CalcInput,
+    gross_pay: int,
+    config: Any,
+    include_bracket_details: bool = True,
+    ytd: Optional[Mapping[str, float]] = None,
+    profile: Optional[RuleProfile] = None,
+    trace: Optional[List[dict]] = None,
+) -> dict:
+    """
+    Integer minor-unit variant of calculate_deductions: same steps, same keys, but gross_pay and
+    every returned amount are ints (plan.minor_unit_scale units per major unit). Each component
+    is rounded once with plan.rounding_mode, so totals are exact sums and
+    total_deductions == income_tax + pre_tax + post_tax holds by construction (no integrity assert).
+    A component is listed in the breakdowns only when its rounded amount is positive.
+    ytd stays in major units and profile / trace apply, as for calculate_deductions
+    (trace amounts are minor units too).
+    """
+    plan = as_rule_plan(config)
+    scale, mode = plan.minor_unit_scale, plan.rounding_mode
+    allowances = employee.allowances
+    pre_tax_deductions = 0
+    post_tax_deductions = 0
+    pre_tax_breakdown: Dict[str, int] = {}
+    post_tax_breakdown: Dict[str, int] = {}
+
+    def _add(name: str, amount: int, pre_tax: bool) -> None:
+        nonlocal pre_tax_deductions, post_tax_deductions
+        if pre_tax:
+            pre_tax_deductions += amount
+            pre_tax_breakdown[name] = amount
+        else:
+            post_tax_deductions += amount
+            post_tax_breakdown[name] = amount
+
+    # 1) Allowance exemptions
+    tax_exempt_amount = 0
+    tax_exemptions_applied: Dict[str, int] = {}
+    for name in (plan.exempt_allowances if profile is None else profile.exempt_allowances):
+        if name in allowances:
+            exempt = float(allowances[name])
+            if exempt > 0:
+                units = to_minor(exempt, scale, mode)
+                tax_exempt_amount += units
+                tax_exemptions_applied[name] = units
+
+    # 2) Statutory employee contributions, 3) other employee deductions (may be optional)
+    opted = employee.benefits_opt_in
+    rules = plan.employee_contributions + plan.other_employee_deductions if profile is None else profile.deductions
+    for item in rules:
+        if item.optional and profile is None and not opted.get(item.name, False):
+            continue
+        amount = _amount_from_rule_minor(gross_pay, item, mode, trace)
+        if amount > 0:
+            _add(item.name, amount, item.pre_tax)
+
+    # 4) Taxable income, 5) progressive tax on the minor-unit bracket table
+    taxable_income = max(gross_pay - tax_exempt_amount - pre_tax_deductions, 0)
+    income_tax, tax_bracket_details = calculate_income_tax(
+        plan.tax_table_minor, taxable_income, with_details=include_bracket_details, rounding_mode=mode, trace=trace
+    )
+
+    # 6) Optional benefits (same opt-in / override rules as calculate_deductions)
+    employee_optins: Dict[str, Any] = employee.benefits_opt_in
+    for benefit in (plan.optional_benefits if profile is None else profile.benefits):
+        opted_value = employee_optins.get(benefit.name)
+        if not opted_value:
+            continue
+
+        rate, amount, pre_tax_flag = benefit.rate, benefit.amount_minor, benefit.pre_tax
+        override = isinstance(opted_value, dict)
+        if override:
+            if "amount" in opted_value:
+                amount = benefit_amount_minor(float(opted_value["amount"]), benefit.basis, plan.periods_per_year, scale, mode)
+            if "rate" in opted_value:
+                rate = float(opted_value["rate"])
+            pre_tax_flag = bool(opted_value.get("pre_tax", pre_tax_flag))
+
+        entry = None if trace is None else _benefit_entry(trace, benefit.name, override, pre_tax_flag, benefit.annual_limit)
+        if rate is not None and benefit.basis == "gross":
+            resolved = round_units(gross_pay * rate, mode)
+        else:
+            resolved, rate = (0 if amount is None else amount), None
+        if entry is not None:
+            entry.update(basis=benefit.basis, rate=rate, configured_amount=amount if rate is None else None)
+        amount = resolved
+        remaining = remaining_allowance(benefit.annual_limit, ytd, ytd_key("employee", benefit.name))
+        if remaining is not None or entry is not None:
+            amount = _limit_benefit(amount, None if remaining is None else to_minor(remaining, scale, mode), entry)
+        if amount > 0:
+            _add(benefit.name, amount, pre_tax_flag)
+
+    # 7) Totals (exact integer sums)
+    total_deductions = income_tax + pre_tax_deductions + post_tax_deductions
+
+    return {
+        "taxable_income": taxable_income,
+        "tax_exemptions_applied": tax_exemptions_applied,
+        "income_tax": income_tax,
+
+        "pre_tax_deductions": pre_tax_deductions,
+        "post_tax_deductions": post_tax_deductions,
+        "total_deductions": total_deductions,
+
+        "tax_bracket_details": tax_bracket_details,
+
+        "total_pre_tax_deductions": pre_tax_deductions,
+        "total_post_tax_deductions": post_tax_deductions,
+        "pre_tax_breakdown": pre_tax_breakdown,
+        "post_tax_breakdown": post_tax_breakdown,
+    }
@@ -1,93 +1,138 @@
 # app/services/employer_costs.py
 
-from typing import Dict, Any, Tuple
+from typing import Dict, Any, List, Mapping, Optional, Tuple
 
-
-def _prorate_if_annual(amount: float, basis: str, periods_per_year: int) -> float:
-    if basis == "annual":
-        return amount / float(periods_per_year)
-    return amount
+from app.config.rule_plan import EmployerRule, as_rule_plan
+from app.models.calc_input import CalcInput
+from app.services.profiles import RuleProfile
+from app.services.ytd import remaining_allowance, ytd_key
+from app.utils.minor_units import round_units, to_minor
 
 
-def _apply_caps(amount: float, rule: Dict[str, Any], periods_per_year: int) -> float:
+def _apply_caps(
+    amount: float,
+    rule: EmployerRule,
+    periods_per_year: int,
+    ytd: Optional[Mapping[str, float]] = None,
+    trace: Optional[List[dict]] = None,
+) -> float:
     """
     Supports:
       - max_amount: per-period cap
-      - annual_cap: cap for annualized amount (then prorated back to period)
+      - annual_cap: with ytd, clamp to what is left of the cap this tax year;
+                    without, cap the annualized amount (then prorate back to period)
+    Caps are parsed in rule_plan; unparsable caps are compiled to None and ignored.
+    trace: explain mode (see calculate_employer_costs); one entry per call, naming the cap hit.
     """
+    uncapped, cap = amount, None
     if amount <= 0:
-        return 0.0
-
-    # Per-period cap
-    if "max_amount" in rule:
-        try:
-            max_amt = float(rule["max_amount"])
-            amount = min(amount, max_amt)
-        except (TypeError, ValueError):
-            pass
-
-    # Annual cap -> convert amount to annual, cap, then prorate back to period
-    if "annual_cap" in rule:
-        try:
-            annual_cap = float(rule["annual_cap"])
+        amount = 0.0
+    else:
+        # Per-period cap
+        if rule.max_amount is not None and amount > rule.max_amount:
+            amount, cap = rule.max_amount, "max_amount"
+
+        remaining = remaining_allowance(rule.annual_cap, ytd, ytd_key("employer", rule.label))
+        if remaining is not None:
+            if amount > remaining:
+                amount, cap = remaining, "annual_cap"
+        # Annual cap -> convert amount to annual, cap, then prorate back to period
+        elif rule.annual_cap is not None:
             annualized = amount * float(periods_per_year)
-            if annualized > annual_cap:
-                annualized = annual_cap
+            if annualized > rule.annual_cap:
+                annualized, cap = rule.annual_cap, "annual_cap"
             amount = annualized / float(periods_per_year)
-        except (TypeError, ValueError):
-            pass
 
+    if trace is not None:
+        trace.append(_employer_entry(rule, uncapped, cap, amount))
     return amount
 
 
+def _employer_entry(rule: EmployerRule, uncapped: float, cap: Optional[str], amount: float) -> dict:
+    fixed = rule.amount is not None
+    return {
+        "step": "employer", "rule": rule.label,
+        "basis": "amount" if fixed else ("annual" if rule.annualize else "gross"),
+        "rate": None if fixed else rule.rate, "uncapped": uncapped, "cap_hit": cap, "amount": amount,
+    }
+
+
 def _amount_from_rule_for_employer(
     gross: float,
-    rule: Dict[str, Any],
+    rule: EmployerRule,
     periods_per_year: int,
+    ytd: Optional[Mapping[str, float]] = None,
+    trace: Optional[List[dict]] = None,
 ) -> float:
     """
     Employer-side calculator:
-      - Percentage: {"rate": 0.05, "basis": "gross"|"annual"}
-      - Fixed: {"amount": 100, "basis": "per_period"| "annual"}  # per_period is default if omitted
-      - Caps: "max_amount", "annual_cap"
+      - Percentage: rate on per-period gross, or on annualized gross when rule.annualize
+      - Fixed: rule.amount (annual amounts are already prorated at compile time)
+      - Caps: max_amount, annual_cap (see _apply_caps)
     """
-    basis = rule.get("basis", "gross")
-
-    if "amount" in rule:
-        try:
-            amt = float(rule["amount"])
-        except (TypeError, ValueError):
-            return 0.0
-        amt = _prorate_if_annual(amt, basis, periods_per_year)
-        return _apply_caps(amt, rule, periods_per_year)
-
-    # percentage path
-    try:
-        rate = float(rule.get("rate", 0.0))
-    except (TypeError, ValueError):
-        rate = 0.0
-
-    if basis == "annual":
+    if rule.amount is not None:
+        return _apply_caps(rule.amount, rule, periods_per_year, ytd, trace)
+
+    if rule.annualize:
         # rate applies to annualized gross, then prorate
-        amt = (gross * float(periods_per_year)) * rate
+        amt = (gross * float(periods_per_year)) * rule.rate
         amt = amt / float(periods_per_year)
     else:
         # default is rate on per-period gross
-        amt = gross * rate
+        amt = gross * rule.rate
 
-    return _apply_caps(amt, rule, periods_per_year)
+    return _apply_caps(amt, rule, periods_per_year, ytd, trace)
+
+
+def _amount_from_rule_for_employer_minor(
+    gross_minor: int,
+    rule: EmployerRule,
+    mode: str,
+    scale: int,
+    ytd: Optional[Mapping[str, float]] = None,
+    trace: Optional[List[dict]] = None,
+) -> int:
+    """
+    Minor-unit employer calculator: fixed amount_minor or the rate on gross rounded once
+    (annualize-then-prorate is the identity before rounding), then the per-period caps
+    max_amount_minor and period_cap_minor (annual_cap / periods, rounded at compile time).
+    With ytd, the annual cap is enforced on what is left this tax year instead of period_cap_minor.
+    """
+    if rule.amount_minor is not None:
+        amt = rule.amount_minor
+    else:
+        amt = round_units(gross_minor * rule.rate, mode)
+    uncapped, cap = amt, None
+    if amt <= 0:
+        amt = 0
+    else:
+        if rule.max_amount_minor is not None and amt > rule.max_amount_minor:
+            amt, cap = rule.max_amount_minor, "max_amount"
+        remaining = remaining_allowance(rule.annual_cap, ytd, ytd_key("employer", rule.label))
+        if remaining is not None:
+            remaining_minor = to_minor(remaining, scale, mode)
+            if amt > remaining_minor:
+                amt, cap = remaining_minor, "annual_cap"
+        elif rule.period_cap_minor is not None and amt > rule.period_cap_minor:
+            amt, cap = rule.period_cap_minor, "annual_cap"
+    if trace is not None:
+        trace.append(_employer_entry(rule, uncapped, cap, amt))
+    return amt
 
 
 def calculate_employer_costs(
-    employee,
+    employee: CalcInput,
     gross_pay: float,
-    config: Dict[str, Any],
+    config: Any,
+    ytd: Optional[Mapping[str, float]] = None,
+    profile: Optional[RuleProfile] = None,
+    trace: Optional[List[dict]] = None,
 ) -> Tuple[float, Dict[str, float]]:
     """
     Employer perspective only. Does not affect net pay.
 
-    Reads:
-      - config["statutory"]["employer_contributions"]:
+    Evaluates a compiled CountryRulePlan (raw country_config dicts are compiled on the fly):
+      - plan.employer_contributions, compiled from config["statutory"]["employer_contributions"]:
           [
             {
               "name": "Employer Social Security",
@@ -100,7 +145,7 @@ def calculate_employer_costs(
             ...
           ]
 
-      - config["optional_benefits"][<benefit>]:
+      - plan.optional_benefits[i].employer, compiled from config["optional_benefits"][<benefit>]:
           {
             # employer component is applied only if employee opted in
             "employer_rate": 0.04,                 # or "employer_amount": 50
@@ -110,59 +155,71 @@ def calculate_employer_costs(
             "employer_display_name": "Employer RRSP Match"  # optional label
           }
 
+    ytd: year-to-date totals by component (see services/ytd.py); when given, annual_cap
+    is enforced against the real running total instead of a single annualized period.
+    profile: the employee's RuleProfile (see services/profiles.py); profile.employer already holds
+    the statutory rules and the matches of the bucket's opted-in benefits, in the same order.
+    trace: explain mode. When a list is given, one entry per evaluated rule is appended:
+      {"step": "employer", "rule", "basis": "amount" | "annual" | "gross", "rate", "uncapped",
+       "cap_hit": None | "max_amount" | "annual_cap", "amount"}
+    When None (the default) nothing is recorded or allocated.
+
     Returns:
       total_employer_cost (float), breakdown (Dict[str, float])
     """
+    plan = as_rule_plan(config)
     breakdown: Dict[str, float] = {}
     total = 0.0
-    periods_per_year = int(config.get("periods_per_year", 12))
+    periods_per_year = plan.periods_per_year
 
-    # 1) Statutory employer contributions
-    statutory = (config.get("statutory") or {})
-    for item in statutory.get("employer_contributions", []):
-        amt = _amount_from_rule_for_employer(gross_pay, item, periods_per_year)
+    if profile is not None:
+        rules = profile.employer
+    else:
+        # 1) Statutory employer contributions
+        # 2) Employer component for optional benefits (only if employee opted in)
+        employee_optins: Dict[str, Any] = employee.benefits_opt_in
+        rules = list(plan.employer_contributions) + [
+            b.employer for b in plan.optional_benefits
+            if b.employer is not None and employee_optins.get(b.name)
+        ]
+
+    for rule in rules:
+        amt = _amount_from_rule_for_employer(gross_pay, rule, periods_per_year, ytd, trace)
         if amt > 0:
-            label = item.get("display_name") or item.get("name") or "Employer Contribution"
             val = round(amt, 2)
-            breakdown[label] = val
+            breakdown[rule.label] = val
             total += val
 
-    # 2) Employer component for optional benefits (only if employee opted in)
-    optional_cfg: Dict[str, Any] = config.get("optional_benefits", {}) or {}
-    employee_optins: Dict[str, Any] = (
-        getattr(employee, "benefits_opt_in", None)
-        or getattr(employee, "opted_benefits", {})
-        or {}
-    )
-
-    for benefit_name, cfg in optional_cfg.items():
-        if not employee_optins.get(benefit_name):
-            continue  # not opted in by the employee
-
-        # Build employer rule on the fly from employer_* keys
-        has_amount = "employer_amount" in cfg
-        has_rate = "employer_rate" in cfg
-        if not (has_amount or has_rate):
-            continue  # no employer side
-
-        emp_rule: Dict[str, Any] = {}
-        if has_amount:
-            emp_rule["amount"] = cfg["employer_amount"]
-        if has_rate:
-            emp_rule["rate"] = cfg["employer_rate"]
-        emp_rule["basis"] = cfg.get("employer_basis", "gross")
-
-        # Support caps on employer match
-        if "employer_max_amount" in cfg:
-            emp_rule["max_amount"] = cfg["employer_max_amount"]
-        if "employer_annual_cap" in cfg:
-            emp_rule["annual_cap"] = cfg["employer_annual_cap"]
-
-        amt = _amount_from_rule_for_employer(gross_pay, emp_rule, periods_per_year)
+    return round(total, 2), {k: round(v, 2) for k, v in breakdown.items()}
+
+
+def calculate_employer_costs_minor(
+    employee: CalcInput,
+    gross_pay: int,
+    config: Any,
+    ytd: Optional[Mapping[str, float]] = None,
+    profile: Optional[RuleProfile] = None,
+    trace: Optional[List[dict]] = None,
+) -> Tuple[int, Dict[str, int]]:
+    """
+    Integer minor-unit variant of calculate_employer_costs (gross_pay and results in
+    plan.minor_unit_scale units). The total is an exact integer sum; trace amounts are minor units.
+    """
+    plan = as_rule_plan(config)
+    breakdown: Dict[str, int] = {}
+    total = 0
+    if profile is not None:
+        rules = profile.employer
+    else:
+        employee_optins: Dict[str, Any] = employee.benefits_opt_in
+        rules = list(plan.employer_contributions) + [
+            b.employer for b in plan.optional_benefits
+            if b.employer is not None and employee_optins.get(b.name)
+        ]
+    for rule in rules:
+        amt = _amount_from_rule_for_employer_minor(gross_pay, rule, plan.rounding_mode, plan.minor_unit_scale, ytd, trace)
         if amt > 0:
-            label = cfg.get("employer_display_name") or f"Employer {benefit_name}"
-            val = round(amt, 2)
-            breakdown[label] = val
-            total += val
+            breakdown[rule.label] = amt
+            total += amt
 
-    return round(total, 2), {k: round(v, 2) for k, v in breakdown.items()}
\ No newline at end of file
+    return total, breakdown
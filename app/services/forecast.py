@@ -0,0 +1,189 @@
+# app/services/forecast.py
+
+import calendar
+from dataclasses import replace
+from datetime import date, timedelta
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.config.rule_plan import CountryRulePlan
+from app.services.batch_engine import BatchResult, PayrunColumns, build_columns, calculate_batch, calculate_batch_minor
+from app.services.gross_to_net import ARITHMETIC_FLOAT, ARITHMETIC_MINOR_UNITS
+from app.services.ytd import ytd_key
+
+# Upper bound on the horizon of one forecast (10 years of monthly periods)
+MAX_FORECAST_PERIODS = 120
+
+_PERIOD_TOTALS = {
+    "total_gross": "gross_pay",
+    "total_net": "net_pay",
+    "total_tax": "income_tax",
+    "total_deductions": "total_deductions",
+    "total_employer_cost": "total_employer_cost",
+}
+
+
+def _add_months(day: date, months: int) -> date:
+    month = day.month - 1 + months
+    year, month = day.year + month // 12, month % 12 + 1
+    return date(year, month, min(day.day, calendar.monthrange(year, month)[1]))
+
+
+def pay_period_starts(first_start: date, pay_frequency: str, count: int) -> List[date]:
+    """
+    Start dates of `count` consecutive pay periods from first_start:
+      - weekly / bi-weekly: every 7 / 14 days
+      - semi-monthly:       the 1st and 16th (first_start is moved to the next of those)
+      - monthly:            same day every month (clamped to the month's last day)
+    """
+    if pay_frequency in ("weekly", "bi-weekly"):
+        step = timedelta(days=7 if pay_frequency == "weekly" else 14)
+        return [first_start + step * i for i in range(count)]
+    if pay_frequency == "semi-monthly":
+        if first_start.day == 1 or first_start.day == 16:
+            start = first_start
+        elif first_start.day < 16:
+            start = first_start.replace(day=16)
+        else:
+            start = _add_months(first_start.replace(day=1), 1)
+        starts = []
+        for i in range(count):
+            starts.append(start)
+            start = start.replace(day=16) if start.day == 1 else _add_months(start.replace(day=1), 1)
+        return starts
+    return [_add_months(first_start, i) for i in range(count)]
+
+
+def _major(values: np.ndarray, scale: Optional[int]) -> np.ndarray:
+    """Engine output as float major units; NaN (float engine: no entry) becomes 0."""
+    values = values / scale if scale else values.astype(np.float64)
+    return np.nan_to_num(values, nan=0.0)
+
+
+def _limited_components(plan: CountryRulePlan) -> List[Tuple[str, str, str]]:
+    """(ytd key, BatchResult field, component name) of every rule with an annual limit or cap."""
+    components = []
+    for benefit in plan.optional_benefits:
+        if benefit.annual_limit is not None:
+            key = ytd_key("employee", benefit.name)
+            components += [(key, "pre_tax", benefit.name), (key, "post_tax", benefit.name)]
+        if benefit.employer is not None and benefit.employer.annual_cap is not None:
+            components.append((ytd_key("employer", benefit.employer.label), "employer", benefit.employer.label))
+    for rule in plan.employer_contributions:
+        if rule.annual_cap is not None:
+            components.append((ytd_key("employer", rule.label), "employer", rule.label))
+    return components
+
+
+def _repeat_columns(columns: PayrunColumns, times: int) -> PayrunColumns:
+    """Each employee's row repeated `times` times in a row (employee-major order)."""
+    def repeat(values):
+        return None if values is None else np.repeat(values, times)
+
+    return replace(
+        columns,
+        hourly_rate=repeat(columns.hourly_rate),
+        hours_worked=repeat(columns.hours_worked),
+        overtime_hours=repeat(columns.overtime_hours),
+        bonuses=repeat(columns.bonuses),
+        base_pay=repeat(columns.base_pay),
+        allowance_total=repeat(columns.allowance_total),
+        exempt_allowance_total=repeat(columns.exempt_allowance_total),
+        opt_in={name: repeat(mask) for name, mask in columns.opt_in.items()},
+        benefit_overrides={name: tuple(repeat(v) for v in values) for name, values in columns.benefit_overrides.items()},
+        allowance_total_minor=repeat(columns.allowance_total_minor),
+        exempt_allowance_total_minor=repeat(columns.exempt_allowance_total_minor),
+        ytd_known=None,
+        ytd={},
+    )
+
+
+def forecast_costs(
+    calc_emps: List[Any],
+    plan: CountryRulePlan,
+    period_starts: Sequence[date],
+    ytd: Optional[Sequence[Optional[Mapping[str, float]]]] = None,
+    arithmetic: str = ARITHMETIC_FLOAT,
+    include_employees: bool = False,
+) -> Dict[str, Any]:
+    """
+    Project deductions and employer costs of a population over the given pay periods, assuming
+    each employee keeps the same per-period inputs. Computed as one batch-engine pass over the
+    (employees x periods) matrix:
+
+      1) one pass per employee gives the per-period amount u of every component with an
+         annual_limit / annual_cap (before any YTD is used up)
+      2) YTD used before period j of a tax year is carried-in YTD (first tax year only) + k * u,
+         k = periods of that year already projected; the engine clamps each cell to what is left,
+         so limits saturate mid-year and reset on 1 January
+      3) the matrix rows (employee-major) run through the engine at once and are summed per period
+
+    ytd: YTD totals parallel to calc_emps for the tax year of period_starts[0] (None = nothing used).
+    """
+    n, periods = len(calc_emps), len(period_starts)
+    engine = calculate_batch_minor if arithmetic == ARITHMETIC_MINOR_UNITS else calculate_batch
+    columns = build_columns(calc_emps, plan, ytd=[{}] * n)
+
+    # 1) Per-period amount of each limited component, nothing used yet
+    first = engine(plan, columns)
+    per_period: Dict[str, np.ndarray] = {}
+    for key, field_name, name in _limited_components(plan):
+        values = getattr(first, field_name).get(name)
+        if values is not None:
+            per_period[key] = per_period.get(key, 0.0) + _major(values, first.minor_unit_scale)
+
+    # 2) YTD used before every (employee, period) cell
+    years = np.array([start.year for start in period_starts])
+    into_year = np.zeros(periods)
+    for j in range(1, periods):
+        into_year[j] = into_year[j - 1] + 1 if years[j] == years[j - 1] else 0
+    carried = years == years[0]
+    matrix = _repeat_columns(columns, periods)
+    matrix.ytd_known = np.ones(n * periods, dtype=bool)
+    for key, amount in per_period.items():
+        start = np.array([float((totals or {}).get(key, 0.0) or 0.0) for totals in (ytd or [None] * n)])
+        used = start[:, None] * carried[None, :] + into_year[None, :] * amount[:, None]
+        matrix.ytd[key] = used.ravel()
+
+    # 3) One engine pass over the matrix
+    result: BatchResult = engine(plan, matrix)
+    scale = result.minor_unit_scale
+
+    def grid(values: np.ndarray) -> np.ndarray:
+        return _major(values, scale).reshape(n, periods)
+
+    totals = {total: grid(getattr(result, name)) for total, name in _PERIOD_TOTALS.items()}
+    employer = {label: grid(values) for label, values in result.employer.items()}
+    deductions = {
+        dtype: {name: grid(values) for name, values in getattr(result, dtype).items()}
+        for dtype in ("pre_tax", "post_tax")
+    }
+
+    def period_sums(arrays: Mapping[str, np.ndarray], j: int) -> Dict[str, float]:
+        return {name: round(float(values[:, j].sum()), 2) for name, values in arrays.items()}
+
+    forecast = {
+        "employees": n,
+        "pay_frequency": plan.pay_frequency,
+        "periods": [
+            {
+                "period_start": start.isoformat(),
+                "tax_year": int(years[j]),
+                **period_sums(totals, j),
+                "employer_costs": period_sums(employer, j),
+                "deductions": {dtype: period_sums(parts, j) for dtype, parts in deductions.items()},
+            }
+            for j, start in enumerate(period_starts)
+        ],
+        "totals": {total: round(float(values.sum()), 2) for total, values in totals.items()},
+    }
+    if include_employees:
+        forecast["employee_forecasts"] = [
+            {
+                "employee_id": getattr(calc_emp, "employee_id", None),
+                **{total: [round(float(v), 2) for v in values[i]] for total, values in totals.items()},
+            }
+            for i, calc_emp in enumerate(calc_emps)
+        ]
+    return forecast
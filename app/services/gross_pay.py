@@ -1,6 +1,11 @@
 # app/services/gross_pay.py
 
-def calculate_gross_pay(employee, config: dict):
+from app.config.rule_plan import as_rule_plan
+from app.models.calc_input import CalcInput
+from app.utils.minor_units import round_units, to_minor
+
+
+def calculate_gross_pay(employee: CalcInput, config):
     """
     Calculates earnings only:
       base pay (prefer monthly base if provided, else hourly * hours_worked)
@@ -10,19 +15,19 @@ def calculate_gross_pay(employee, config: dict):
     Returns: gross_pay, base_pay, overtime_pay, allowances_breakdown
     """
     # Prefer a provided base salary for the period; else compute from hourly.
-    base_pay_val = float(getattr(employee, "base_pay", 0) or 0)
-    hourly_rate = float(getattr(employee, "hourly_rate", 0) or 0)
-    hours_worked = float(getattr(employee, "hours_worked", 0) or 0)
-    overtime_hours = float(getattr(employee, "overtime_hours", 0) or 0)
-    bonuses = float(getattr(employee, "bonuses", 0) or 0)
+    base_pay_val = employee.base_pay
+    hourly_rate = employee.hourly_rate
+    hours_worked = employee.hours_worked
+    overtime_hours = employee.overtime_hours
+    bonuses = employee.bonuses
 
     if base_pay_val > 0:
         base_pay = base_pay_val
     else:
         base_pay = hourly_rate * hours_worked
 
-    # Configurable OT multiplier; default to 1.25 if not present
-    ot_multiplier = float(config.get("overtime_multiplier", 1.25))
+    # Configurable OT multiplier; resolved (default 1.25) when the plan is compiled
+    ot_multiplier = as_rule_plan(config).overtime_multiplier
     overtime_pay = 0.0
     if hourly_rate > 0 and overtime_hours > 0:
         overtime_pay = hourly_rate * overtime_hours * ot_multiplier
@@ -30,7 +35,7 @@ def calculate_gross_pay(employee, config: dict):
     # Allowances: sum all positive amounts; tax treatment handled in deductions
     total_allowances = 0.0
     applicable_allowances = {}
-    allowances = getattr(employee, "allowances", {}) or {}
+    allowances = employee.allowances
     for name, amt in allowances.items():
         try:
             val = float(amt)
@@ -44,15 +49,55 @@ def calculate_gross_pay(employee, config: dict):
     return gross_pay, base_pay, overtime_pay, applicable_allowances
 
 
-def calculate_taxable_gross(gross: float, config: dict, employee):
+def calculate_gross_pay_minor(employee: CalcInput, config):
+    """
+    Integer minor-unit variant of calculate_gross_pay (plan.minor_unit_scale units per major unit).
+    Each earnings component is rounded exactly once with plan.rounding_mode; gross is their exact sum.
+    Returns: gross_pay, base_pay, overtime_pay, allowances_breakdown (all ints)
+    """
+    plan = as_rule_plan(config)
+    scale, mode = plan.minor_unit_scale, plan.rounding_mode
+    base_pay_val = employee.base_pay
+    hourly_rate = employee.hourly_rate
+    hours_worked = employee.hours_worked
+    overtime_hours = employee.overtime_hours
+    bonuses = to_minor(employee.bonuses, scale, mode)
+
+    if base_pay_val > 0:
+        base_pay = to_minor(base_pay_val, scale, mode)
+    else:
+        base_pay = round_units(hourly_rate * hours_worked * scale, mode)
+
+    overtime_pay = 0
+    if hourly_rate > 0 and overtime_hours > 0:
+        overtime_pay = round_units(hourly_rate * overtime_hours * plan.overtime_multiplier * scale, mode)
+
+    total_allowances = 0
+    applicable_allowances = {}
+    allowances = employee.allowances
+    for name, amt in allowances.items():
+        try:
+            val = float(amt)
+        except (TypeError, ValueError):
+            continue
+        if val > 0:
+            units = to_minor(val, scale, mode)
+            applicable_allowances[name] = units
+            total_allowances += units
+
+    gross_pay = base_pay + overtime_pay + bonuses + total_allowances
+    return gross_pay, base_pay, overtime_pay, applicable_allowances
+
+
+def calculate_taxable_gross(gross: float, config, employee: CalcInput):
     """
     Optional helper: if you still need a taxable-gross helper, align it to the new
     country config format that uses `allowance_rules` with tax_treatment.
-    Only excludes allowances whose tax_treatment == 'exempt'.
+    Only excludes allowances whose tax_treatment == 'exempt' (plan.exempt_allowances).
     (Most flows should now use deductions.py as the source of truth.)
     """
-    allowance_rules = config.get("allowance_rules", {}) or {}
-    allowances = getattr(employee, "allowances", {}) or {}
+    exempt_names = as_rule_plan(config).exempt_allowances
+    allowances = employee.allowances
 
     exempt_total = 0.0
     for name, amt in allowances.items():
@@ -60,8 +105,7 @@ def calculate_taxable_gross(gross: float, config: dict, employee):
             val = float(amt)
         except (TypeError, ValueError):
             continue
-        rule = allowance_rules.get(name, {})
-        if rule.get("tax_treatment") == "exempt" and val > 0:
+        if name in exempt_names and val > 0:
             exempt_total += val
 
     taxable = max(gross - exempt_total, 0.0)
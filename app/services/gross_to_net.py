@@ -0,0 +1,162 @@
+# app/services/gross_to_net.py
+
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+from app.models.calc_input import CalcInput
+from app.models.payroll_result import PayrollResult
+from app.services.deductions import calculate_deductions, calculate_deductions_minor
+from app.services.employer_costs import calculate_employer_costs, calculate_employer_costs_minor
+from app.services.gross_pay import calculate_gross_pay, calculate_gross_pay_minor
+from app.services.profile_curves import profile_curve_cache
+from app.services.profiles import RuleProfile
+from app.utils.minor_units import from_minor
+
+DEFAULT_PAY_PERIOD = "March 2025"
+DEFAULT_PAY_TYPE = "Monthly"
+
+# plan.pay_frequency -> pay_type label stored on EmployeePay
+PAY_TYPE_LABELS = {"weekly": "Weekly", "bi-weekly": "Bi-weekly", "semi-monthly": "Semi-monthly", "monthly": "Monthly"}
+
+# Arithmetic modes (settings.payroll_arithmetic / PAYROLL_ARITHMETIC)
+ARITHMETIC_FLOAT = "float"
+ARITHMETIC_MINOR_UNITS = "minor_units"
+ARITHMETIC_MODES = (ARITHMETIC_FLOAT, ARITHMETIC_MINOR_UNITS)
+
+# Explain-trace keys holding amounts (converted back from minor units like the rest of the result)
+_TRACE_AMOUNT_KEYS = ("taxable_income", "lower", "upper", "tax_below", "marginal", "uncapped", "configured_amount", "remaining", "amount")
+
+
+def _major(units: Any, scale: int) -> Any:
+    """Recursively convert minor-unit ints (and dicts of them) back to major-unit floats."""
+    if isinstance(units, dict):
+        return {k: _major(v, scale) for k, v in units.items()}
+    return from_minor(units, scale)
+
+
+def _calculate_minor(
+    calc_emp: CalcInput,
+    plan,
+    ytd: Optional[Mapping[str, float]] = None,
+    profile: Optional[RuleProfile] = None,
+    trace: Optional[List[dict]] = None,
+) -> Tuple[float, float, float, float, Dict[str, float], dict, float, float, Dict[str, float]]:
+    """
+    Integer minor-unit chain; converts the exact results back to major units only at the end,
+    in the same shapes calculate_gross_pay / calculate_deductions / calculate_employer_costs return.
+    Trace entries are converted in place.
+    """
+    scale = plan.minor_unit_scale
+    gross, base, overtime, allowances = calculate_gross_pay_minor(calc_emp, plan)
+    deductions = calculate_deductions_minor(calc_emp, gross, plan, ytd=ytd, profile=profile, trace=trace)
+    employer_total, employer = calculate_employer_costs_minor(calc_emp, gross, plan, ytd=ytd, profile=profile, trace=trace)
+    if trace is not None:
+        for entry in trace:
+            for key in _TRACE_AMOUNT_KEYS:
+                if entry.get(key) is not None:
+                    entry[key] = from_minor(entry[key], scale)
+    bonuses = gross - base - overtime - sum(allowances.values())
+
+    converted = {
+        key: (value if key == "tax_bracket_details" else _major(value, scale))
+        for key, value in deductions.items()
+    }
+    if deductions["tax_bracket_details"] is not None:
+        converted["tax_bracket_details"] = [
+            {
+                "up_to": None if d["up_to"] is None else from_minor(d["up_to"], scale),
+                "rate": d["rate"],
+                "amount": from_minor(d["amount"], scale),
+            }
+            for d in deductions["tax_bracket_details"]
+        ]
+    return (
+        from_minor(gross, scale), from_minor(base, scale), from_minor(overtime, scale),
+        from_minor(bonuses, scale), _major(allowances, scale),
+        converted, from_minor(gross - deductions["total_deductions"], scale),
+        from_minor(employer_total, scale), _major(employer, scale),
+    )
+
+
+def calculate_gross_to_net(
+    calc_emp: CalcInput,
+    plan,
+    pay_period: str = DEFAULT_PAY_PERIOD,
+    pay_type: Optional[str] = None,
+    arithmetic: str = ARITHMETIC_FLOAT,
+    ytd: Optional[Mapping[str, float]] = None,
+    profile_curves: bool = False,
+    profile: Optional[RuleProfile] = None,
+    trace: Optional[List[dict]] = None,
+) -> PayrollResult:
+    """
+    Full single-employee chain: calculate_gross_pay -> calculate_deductions -> calculate_employer_costs.
+    Shared by POST /calculate and the payrun executor workers.
+
+    arithmetic="minor_units" runs the *_minor calculators instead: every amount is an integer
+    number of minor units rounded once by the country's rounding rule, so net/total amounts are
+    exact sums. Results are converted back to major units, in the same shapes.
+
+    ytd (year-to-date totals by component, see services/ytd.py) clamps annual_limit / annual_cap.
+    pay_type defaults to the label of the plan's pay_frequency.
+
+    profile_curves=True (float arithmetic only) evaluates deductions and employer costs on the
+    cached closed-form curve of the employee's opt-in profile (see services/profile_curves.py)
+    instead of walking the rules; results are the same to the cent.
+    profile: the employee's pre-resolved RuleProfile in bulk runs (see services/profiles.py).
+
+    trace (explain mode): a list to record every evaluated rule in, in evaluation order (deduction
+    rules, the tax bracket, optional benefits, employer rules; entry shapes in calculate_deductions,
+    calculate_income_tax and calculate_employer_costs). It walks the rules, so profile_curves is
+    ignored, and the result carries it as result.trace / "explain". None (the default) costs nothing.
+
+    Returns a PayrollResult: exact gross_pay / net_pay / total_employer_cost as attributes,
+    and the breakdown read by the response, the payslip renderer and the EmployeePay columns
+    as a lazy read-only mapping (to_dict() gives the response shape).
+    """
+    if arithmetic not in ARITHMETIC_MODES:
+        raise ValueError(f"Unknown arithmetic mode {arithmetic!r}; expected one of {ARITHMETIC_MODES}")
+
+    if arithmetic == ARITHMETIC_MINOR_UNITS:
+        digits = plan.minor_unit_digits
+        (gross_pay, base_pay, overtime_pay, bonuses, allowances_breakdown,
+         deductions, net_pay, total_employer_cost, employer_contributions) = _calculate_minor(calc_emp, plan, ytd, profile, trace)
+        total_deductions = deductions["total_deductions"]
+    else:
+        digits = 2
+        # Earnings
+        gross_pay, base_pay, overtime_pay, allowances_breakdown = calculate_gross_pay(calc_emp, plan)
+        bonuses = calc_emp.bonuses
+
+        if profile_curves and trace is None:
+            # One bisect + multiply-adds on the profile's curve (built from the rules on first use)
+            deductions, total_employer_cost, employer_contributions = profile_curve_cache.curve_for(
+                calc_emp, plan, ytd
+            ).evaluate(gross_pay, ytd)
+        else:
+            # Employee-side deductions (statutory + optional benefits) & tax
+            deductions = calculate_deductions(calc_emp, gross_pay, plan, ytd=ytd, profile=profile, trace=trace)
+
+            # Employer-side costs (statutory employer contribs + employer match of optional benefits)
+            total_employer_cost, employer_contributions = calculate_employer_costs(
+                calc_emp, gross_pay, plan, ytd=ytd, profile=profile, trace=trace
+            )
+
+        # Net pay
+        total_deductions = float(deductions["total_deductions"])
+        net_pay = gross_pay - total_deductions
+
+    return PayrollResult(
+        gross_pay=gross_pay,
+        net_pay=net_pay,
+        total_employer_cost=total_employer_cost,
+        digits=digits,
+        base_pay=base_pay,
+        overtime_pay=overtime_pay,
+        bonuses=bonuses,
+        allowances=allowances_breakdown,
+        deductions=deductions,
+        employer_costs=employer_contributions,
+        pay_period=pay_period,
+        pay_type=pay_type or PAY_TYPE_LABELS.get(getattr(plan, "pay_frequency", None), DEFAULT_PAY_TYPE),
+        trace=trace,
+    )
@@ -0,0 +1,56 @@
+# app/services/gross_up.py
+
+from typing import Any, Dict, Mapping, Optional
+
+from app.config.rule_plan import CountryRulePlan
+from app.models.payroll_result import PayrollResult
+from app.services.gross_to_net import ARITHMETIC_FLOAT, calculate_gross_to_net
+from app.services.pay_curve import build_pay_curve, with_component
+
+# Cent steps allowed after the analytic solve (covers per-component rounding in the calculators)
+MAX_NUDGE_CENTS = 50
+
+
+def gross_up(
+    calc_emp,
+    plan: CountryRulePlan,
+    target_net: float,
+    component: str = "base_pay",
+    arithmetic: str = ARITHMETIC_FLOAT,
+    ytd: Optional[Mapping[str, float]] = None,
+) -> Dict[str, Any]:
+    """
+    Net-to-gross: the smallest amount (in cents) of `component` (base_pay or bonuses) for which
+    calculate_gross_to_net pays at least target_net, everything else in calc_emp unchanged.
+
+    1) build_pay_curve: net(gross) is piecewise linear for a fixed opt-in profile; its knots come
+       from the compiled rules (bracket thresholds, limits), so the inverse is solved analytically
+       on the one segment that contains target_net, with no iteration over the calculators
+    2) round to cents and nudge by single cents so the rounded breakdown meets the target
+
+    Returns the calculate_gross_to_net result (PayrollResult.to_dict()) plus "component", "amount"
+    and "target_net".
+    Raises ValueError if target_net cannot be reached.
+    """
+    target = round(float(target_net), 2)
+    curve = build_pay_curve(calc_emp, plan, component, arithmetic=arithmetic, ytd=ytd)
+    amount = max(round(curve.gross_for_net(target) - curve.fixed_gross, 2), 0.0)
+
+    def evaluate(value: float) -> PayrollResult:
+        return calculate_gross_to_net(with_component(calc_emp, component, value), plan, arithmetic=arithmetic, ytd=ytd)
+
+    result = evaluate(amount)
+    for _ in range(MAX_NUDGE_CENTS):
+        if round(result.net_pay, 2) >= target:
+            break
+        amount = round(amount + 0.01, 2)
+        result = evaluate(amount)
+    for _ in range(MAX_NUDGE_CENTS):
+        if amount < 0.01:
+            break
+        lower = evaluate(round(amount - 0.01, 2))
+        if round(lower.net_pay, 2) < target:
+            break
+        amount, result = round(amount - 0.01, 2), lower
+
+    return {**result.to_dict(), "component": component, "amount": amount, "target_net": target}
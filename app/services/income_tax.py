@@ -0,0 +1,95 @@
+# app/services/income_tax.py
+
+from bisect import bisect_left
+from typing import List, Optional, Tuple
+
+from app.config.rule_plan import TaxBracketTable
+from app.utils.minor_units import round_units
+
+
+def calculate_income_tax(
+    table: TaxBracketTable,
+    taxable_income: float,
+    with_details: bool = True,
+    rounding_mode: Optional[str] = None,
+    trace: Optional[List[dict]] = None,
+) -> Tuple[float, Optional[List[dict]]]:
+    """
+    Progressive income tax in O(log n): bisect to the marginal bracket, then
+    tax = cumulative tax at its lower threshold + (income - lower) * rate.
+
+    Returns (income_tax, tax_bracket_details). Details are only built when
+    with_details is True (otherwise None), in the same shape as before:
+      [{"up_to": 11000.0 | None, "rate": 0.12, "amount": 1320.0}, ...]
+
+    With rounding_mode, table is a minor-unit table (plan.tax_table_minor) and taxable_income
+    is an int: the marginal bracket is rounded once and tax/amounts come back as ints.
+
+    trace (explain mode): appends one entry for the bracket the income landed in:
+      {"step": "income_tax", "taxable_income", "bracket": index | None, "lower", "upper", "rate",
+       "tax_below": cumulative tax up to lower, "marginal", "amount"}
+    """
+    if taxable_income <= 0:
+        if trace is not None:
+            trace.append({"step": "income_tax", "taxable_income": taxable_income, "bracket": None, "amount": 0.0})
+        return (0 if rounding_mode else 0.0), ([] if with_details else None)
+
+    i = bisect_left(table.uppers, taxable_income)
+    return tax_in_bracket(table, i, taxable_income, with_details, rounding_mode, trace)
+
+
+def tax_in_bracket(
+    table: TaxBracketTable,
+    i: int,
+    taxable_income: float,
+    with_details: bool = True,
+    rounding_mode: Optional[str] = None,
+    trace: Optional[List[dict]] = None,
+) -> Tuple[float, Optional[List[dict]]]:
+    """
+    Tax of a positive taxable_income already known to fall in bracket i
+    (i == len(table.uppers): past the last finite threshold). Same returns as calculate_income_tax.
+    """
+    if i == len(table.uppers):
+        # Above the last finite threshold with no open-ended bracket: nothing more is taxed
+        income_tax = table.total
+        marginal = 0
+    else:
+        marginal = (taxable_income - table.lowers[i]) * table.rates[i]
+        if rounding_mode:
+            marginal = round_units(marginal, rounding_mode)
+        income_tax = table.cumulative[i] + marginal
+    if trace is not None:
+        trace.append(_bracket_entry(table, i, taxable_income, marginal, income_tax))
+
+    if not with_details:
+        return income_tax, None
+
+    details = [
+        {"up_to": table.uppers[j], "rate": table.rates[j], "amount": table.full_amounts[j]}
+        for j in range(min(i, len(table.full_amounts)))
+    ]
+    if i < len(table.uppers):
+        up_to = table.uppers[i]
+        details.append({
+            "up_to": None if up_to == float("inf") else up_to,
+            "rate": table.rates[i],
+            "amount": marginal if rounding_mode else round(marginal, 2),
+        })
+    return income_tax, details
+
+
+def _bracket_entry(table: TaxBracketTable, i: int, taxable_income: float, marginal: float, income_tax: float) -> dict:
+    """Explain-mode entry for the bracket walk (i == len(table.uppers): past the last threshold)."""
+    if i == len(table.uppers):
+        return {
+            "step": "income_tax", "taxable_income": taxable_income, "bracket": i,
+            "lower": table.uppers[-1] if table.uppers else 0.0,
+            "upper": None, "rate": 0.0, "tax_below": table.total, "marginal": marginal, "amount": income_tax,
+        }
+    upper = table.uppers[i]
+    return {
+        "step": "income_tax", "taxable_income": taxable_income, "bracket": i, "lower": table.lowers[i],
+        "upper": None if upper == float("inf") else upper, "rate": table.rates[i],
+        "tax_below": table.cumulative[i], "marginal": marginal, "amount": income_tax,
+    }
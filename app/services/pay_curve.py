@@ -0,0 +1,139 @@
+# app/services/pay_curve.py
+
+from bisect import bisect_right
+from dataclasses import dataclass
+from typing import List, Mapping, Optional, Tuple
+
+from app.config.rule_plan import CountryRulePlan
+from app.models.calc_input import CalcInput
+from app.services.gross_pay import calculate_gross_pay
+from app.services.gross_to_net import ARITHMETIC_FLOAT, calculate_gross_to_net
+from app.services.ytd import remaining_allowance, ytd_key
+
+# Earnings inputs a gross-up may solve for
+GROSS_UP_COMPONENTS = ("base_pay", "bonuses")
+
+# Minimum gross span the tail slope is measured over: cent rounding then moves it by < 1e-8 per unit
+TAIL_SLOPE_SPAN = 1_000_000.0
+
+
+def with_component(calc_emp: CalcInput, component: str, value: float) -> CalcInput:
+    """
+    Copy of calc_emp with one earnings input replaced. Solving for base_pay zeroes hours_worked,
+    so base pay 0 means 0 (instead of falling back to hourly * hours) and gross stays continuous.
+    """
+    if component == "base_pay":
+        return calc_emp.with_changes(base_pay=float(value), hours_worked=0.0)
+    return calc_emp.with_changes(**{component: float(value)})
+
+
+@dataclass(frozen=True)
+class PayCurve:
+    """
+    net(gross) for one employee profile (fixed opt-ins, allowances, YTD) as a continuous
+    piecewise-linear function: exact net at each knot, linear in between and past the last knot.
+      - knots:  gross values (ascending); knots[0] is the gross with the solved component at 0
+      - nets:   net pay at each knot, from calculate_gross_to_net (the country's compiled rules)
+      - tail_slope: d(net)/d(gross) after the last knot
+    """
+    component: str
+    fixed_gross: float
+    knots: Tuple[float, ...]
+    nets: Tuple[float, ...]
+    tail_slope: float
+
+    def net_at(self, gross: float) -> float:
+        """Net pay at gross, interpolated on the curve (exact at the knots, up to rounding in between)."""
+        i = bisect_right(self.knots, gross) - 1
+        if i < 0:
+            raise ValueError(f"gross {gross} is below the fixed earnings {self.fixed_gross}")
+        if i >= len(self.knots) - 1:
+            return self.nets[-1] + (gross - self.knots[-1]) * self.tail_slope
+        x0, x1, y0, y1 = self.knots[i], self.knots[i + 1], self.nets[i], self.nets[i + 1]
+        return y0 + (gross - x0) * (y1 - y0) / (x1 - x0)
+
+    def gross_for_net(self, target_net: float) -> float:
+        """
+        Invert the curve analytically: find the first segment whose net range contains target_net
+        and solve its line for gross. Raises ValueError when no gross >= fixed_gross pays target_net.
+        """
+        if target_net < self.nets[0]:
+            raise ValueError(
+                f"target net {target_net} is below the net already paid by the fixed earnings ({self.nets[0]:.2f})"
+            )
+        for i in range(len(self.knots) - 1):
+            y0, y1 = self.nets[i], self.nets[i + 1]
+            if y0 <= target_net <= y1 and y1 > y0:
+                return self.knots[i] + (target_net - y0) * (self.knots[i + 1] - self.knots[i]) / (y1 - y0)
+        if self.tail_slope <= 0 or target_net < self.nets[-1]:
+            raise ValueError(f"target net {target_net} is not reachable: net pay stops increasing with gross")
+        return self.knots[-1] + (target_net - self.nets[-1]) / self.tail_slope
+
+
+def _line_breakpoints(plan: CountryRulePlan, calc_emp, fixed_gross: float, ytd: Optional[Mapping[str, float]]) -> List[float]:
+    """
+    Gross values where the slope of net(gross) can change, derived from the compiled rules:
+      - taxable income reaches 0 and each bracket threshold; taxable = gross * (1 - p) - exempt - c,
+        with p / c the pre-tax rates / fixed amounts that reduce taxable income
+      - a rate-based benefit reaches what is left of its annual_limit (only when YTD is known)
+    """
+    allowances = calc_emp.allowances
+    opted = calc_emp.benefits_opt_in
+
+    exempt = 0.0
+    for name in plan.exempt_allowances:
+        if name in allowances and float(allowances[name]) > 0:
+            exempt += float(allowances[name])
+
+    pre_rate, pre_fixed = 0.0, 0.0
+    for item in plan.employee_contributions + plan.other_employee_deductions:
+        if not item.pre_tax or (item.optional and not opted.get(item.name, False)):
+            continue
+        if item.amount is not None:
+            pre_fixed += max(item.amount, 0.0)
+        else:
+            pre_rate += item.rate
+
+    points = []
+    if pre_rate < 1:
+        for threshold in (0.0,) + tuple(u for u in plan.tax_table.uppers if u != float("inf")):
+            points.append((threshold + exempt + pre_fixed) / (1 - pre_rate))
+
+    for benefit in plan.optional_benefits:
+        value = opted.get(benefit.name)
+        if not value or benefit.basis != "gross":
+            continue
+        rate = benefit.rate
+        if isinstance(value, dict) and "rate" in value:
+            rate = float(value["rate"])
+        remaining = remaining_allowance(benefit.annual_limit, ytd, ytd_key("employee", benefit.name))
+        if rate and rate > 0 and remaining is not None:
+            points.append(remaining / rate)
+
+    return sorted({round(p, 2) for p in points if p > fixed_gross})
+
+
+def build_pay_curve(
+    calc_emp,
+    plan: CountryRulePlan,
+    component: str = "base_pay",
+    arithmetic: str = ARITHMETIC_FLOAT,
+    ytd: Optional[Mapping[str, float]] = None,
+) -> PayCurve:
+    """Knots from the rule breakpoints, net at each knot from the real calculators."""
+    if component not in GROSS_UP_COMPONENTS:
+        raise ValueError(f"Unknown gross-up component {component!r}; expected one of {GROSS_UP_COMPONENTS}")
+
+    fixed_gross = calculate_gross_pay(with_component(calc_emp, component, 0.0), plan)[0]
+
+    def net_at(gross: float) -> float:
+        emp = with_component(calc_emp, component, gross - fixed_gross)
+        return calculate_gross_to_net(emp, plan, arithmetic=arithmetic, ytd=ytd).net_pay
+
+    knots = [fixed_gross] + _line_breakpoints(plan, calc_emp, fixed_gross, ytd)
+    nets = [net_at(g) for g in knots]
+
+    # Past the last breakpoint net is linear; measure its slope over a wide span so cent rounding is negligible
+    span = max(knots[-1], TAIL_SLOPE_SPAN)
+    tail_slope = (net_at(knots[-1] + span) - nets[-1]) / span
+    return PayCurve(component, fixed_gross, tuple(knots), tuple(nets), tail_slope)
@@ -0,0 +1,251 @@
+# app/services/payrun_executor.py
+
+import multiprocessing
+import os
+import time
+from concurrent.futures import Future, ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from datetime import date
+from typing import Any, Dict, Iterator, List, Mapping, Optional, Sequence
+
+from app.models.calc_input import CalcInput
+from app.services.gross_to_net import ARITHMETIC_FLOAT, calculate_gross_to_net
+from app.services.profiles import group_by_profile
+
+DEFAULT_CHUNK_SIZE = 250
+
+# Compiled country plans (and their effective-dated versions), installed once per worker process by _init_worker
+_worker_plans: Dict[str, Any] = {}
+_worker_effective = None
+
+
+@dataclass
+class ChunkResult:
+    """
+    Outcome of one chunk. results/errors carry the employee's position in the submitted list
+    under "index" so the caller can pair them with its own inputs; each result holds the
+    PayrollResult under "result" and the rendered PDF (or None) under "payslip_path".
+    """
+    chunk_index: int
+    results: List[Dict[str, Any]] = field(default_factory=list)
+    errors: List[Dict[str, Any]] = field(default_factory=list)
+    elapsed: float = 0.0
+    worker_pid: int = 0
+
+
+def _worker_pid(_: int) -> int:
+    return os.getpid()
+
+
+def _init_worker(country_plans: Dict[str, Any], effective: Any = None) -> None:
+    """Pool initializer: keep the parent's compiled plans so workers never re-read the JSON."""
+    global _worker_plans, _worker_effective
+    _worker_plans = country_plans
+    _worker_effective = effective
+
+
+def _worker_plans_for(period_start: Optional[date]) -> Dict[str, Any]:
+    if period_start is None:
+        return _worker_plans
+    if _worker_effective is None:
+        raise ValueError("period_start given, but the worker has no effective-dated plans")
+    return _worker_effective.plans_for(period_start)
+
+
+def calculate_chunk(
+    chunk_index: int,
+    start: int,
+    employees: Sequence[CalcInput],
+    company: Any = None,
+    render_payslips: bool = True,
+    country_plans: Optional[Dict[str, Any]] = None,
+    arithmetic: str = ARITHMETIC_FLOAT,
+    ytd: Optional[Sequence[Optional[Mapping[str, float]]]] = None,
+    profile_curves: bool = False,
+    companies: Optional[Sequence[Any]] = None,
+    explain: bool = False,
+    period_start: Optional[date] = None,
+    tenant_plans: Optional[Mapping[int, Dict[str, Any]]] = None,
+) -> ChunkResult:
+    """
+    Calculate (and optionally render payslips for) a slice of the payrun.
+    Runs in a worker process; can also be called in-process with explicit country_plans.
+    period_start: calculate with the worker's plans in effect for that pay period (resolved once
+    per chunk, see app/config/effective.py) instead of its base plans.
+    ytd, when given, is parallel to employees: each employee's year-to-date totals (or None).
+    companies, when given, is parallel to employees and replaces company on each payslip.
+    profile_curves: evaluate on the worker's cached per-profile curves (see calculate_gross_to_net).
+    explain: record each employee's rule trace on its result (result.trace).
+    tenant_plans: tenant_id -> country -> plan for tenants with config overlays (see
+    app/config/tenant_overlays.py); their employees are calculated with those plans instead.
+
+    Employees are first grouped by profile (country, opt-ins, exempt allowances; see
+    services/profiles.py) so each bucket's rules are resolved once; results and errors are
+    returned in employee order.
+    """
+    plans = country_plans if country_plans is not None else _worker_plans_for(period_start)
+    started = time.perf_counter()
+    chunk = ChunkResult(chunk_index=chunk_index, worker_pid=os.getpid())
+
+    for group_plans, offsets in _plan_groups(employees, plans, tenant_plans):
+        group = employees if offsets is None else [employees[offset] for offset in offsets]
+        for bucket in group_by_profile(group, group_plans):
+            for position in bucket.indexes:
+                offset = position if offsets is None else offsets[position]
+                calc_emp = employees[offset]
+                index = start + offset
+                if bucket.profile is None:
+                    chunk.errors.append({
+                        "index": index,
+                        "employee_id": calc_emp.employee_id,
+                        "detail": f"Country configuration not found for {calc_emp.country}",
+                    })
+                    continue
+                try:
+                    result = calculate_gross_to_net(
+                        calc_emp, group_plans[calc_emp.country], arithmetic=arithmetic,
+                        ytd=ytd[offset] if ytd is not None else None,
+                        profile_curves=profile_curves, profile=bucket.profile, trace=[] if explain else None,
+                    )
+                    payslip_path = None
+                    if render_payslips:
+                        # Imported lazily so calculation-only workers do not load the PDF stack
+                        from app.services.payslip import generate_payslip
+                        payslip_path = generate_payslip(
+                            calc_emp, result, result.net_pay, {"total_employer_cost": result.total_employer_cost},
+                            companies[offset] if companies is not None else company,
+                        )
+                except Exception as exc:  # one bad employee must not fail the whole chunk
+                    chunk.errors.append({"index": index, "employee_id": calc_emp.employee_id, "detail": str(exc)})
+                    continue
+                chunk.results.append({"index": index, "result": result, "payslip_path": payslip_path})
+
+    chunk.results.sort(key=lambda r: r["index"])
+    chunk.errors.sort(key=lambda e: e["index"])
+    chunk.elapsed = time.perf_counter() - started
+    return chunk
+
+
+def _plan_groups(
+    employees: Sequence[CalcInput], plans: Dict[str, Any], tenant_plans: Optional[Mapping[int, Dict[str, Any]]],
+) -> List[tuple]:
+    """[(plans, offsets)]: employees split by the plans they use; offsets None is the whole chunk."""
+    if not tenant_plans or not any(calc_emp.tenant_id in tenant_plans for calc_emp in employees):
+        return [(plans, None)]
+    groups: Dict[Any, List[int]] = {}
+    for offset, calc_emp in enumerate(employees):
+        groups.setdefault(calc_emp.tenant_id if calc_emp.tenant_id in tenant_plans else None, []).append(offset)
+    return [(plans if tenant is None else tenant_plans[tenant], offsets) for tenant, offsets in groups.items()]
+
+
+def _chunk_tenant_plans(
+    tenant_plans: Optional[Mapping[int, Dict[str, Any]]], employees: Sequence[CalcInput]
+) -> Optional[Dict[int, Dict[str, Any]]]:
+    if not tenant_plans:
+        return None
+    plans = {calc_emp.tenant_id: tenant_plans[calc_emp.tenant_id] for calc_emp in employees if calc_emp.tenant_id in tenant_plans}
+    return plans or None
+
+
+class PayrunExecutor:
+    """
+    Shards a payrun into chunks and calculates them on a ProcessPoolExecutor.
+    Workers are spawned once and pre-initialized with the compiled country plans (kept as
+    country_plans: the plans every result of this pool was calculated with, and config_version:
+    the ConfigSnapshot they came from); chunk results are yielded in completion order.
+    With effective (an EffectivePlans), a submit for a period_start calculates with the versions
+    in effect for that period; plans_for(period_start) returns the same plans in the parent.
+    """
+
+    def __init__(
+        self,
+        country_plans: Dict[str, Any],
+        max_workers: Optional[int] = None,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        arithmetic: str = ARITHMETIC_FLOAT,
+        profile_curves: bool = False,
+        config_version: Optional[str] = None,
+        effective: Any = None,
+    ):
+        self.country_plans = country_plans
+        self.config_version = config_version
+        self.effective = effective
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.chunk_size = max(int(chunk_size), 1)
+        self.arithmetic = arithmetic
+        self.profile_curves = profile_curves
+        self._pool = ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(country_plans, effective),
+        )
+
+    def plans_for(self, period_start: Optional[date] = None) -> Dict[str, Any]:
+        """The plans a submit(period_start=...) calculates with (country_plans when period_start is None)."""
+        if period_start is None:
+            return self.country_plans
+        if self.effective is None:
+            raise ValueError("period_start given, but the executor has no effective-dated plans")
+        return self.effective.plans_for(period_start)
+
+    def submit(
+        self,
+        employees: Sequence[CalcInput],
+        company: Any = None,
+        render_payslips: bool = True,
+        chunk_size: Optional[int] = None,
+        ytd: Optional[Sequence[Optional[Mapping[str, float]]]] = None,
+        companies: Optional[Sequence[Any]] = None,
+        explain: bool = False,
+        period_start: Optional[date] = None,
+        tenant_plans: Optional[Mapping[int, Dict[str, Any]]] = None,
+    ) -> List[Future]:
+        """
+        Submit every chunk; returns one Future[ChunkResult] per chunk. ytd / companies are parallel to employees.
+        period_start selects the effective-dated plans (see plans_for). tenant_plans (tenant_id -> country
+        -> plan) replaces them for tenants with config overlays; each chunk carries only its own tenants'.
+        """
+        self.plans_for(period_start)  # fail here, not in every chunk
+        size = max(int(chunk_size or self.chunk_size), 1)
+        return [
+            self._pool.submit(
+                calculate_chunk, chunk_index, start, list(employees[start:start + size]), company, render_payslips,
+                arithmetic=self.arithmetic,
+                profile_curves=self.profile_curves,
+                ytd=list(ytd[start:start + size]) if ytd is not None else None,
+                companies=list(companies[start:start + size]) if companies is not None else None,
+                explain=explain,
+                period_start=period_start,
+                tenant_plans=_chunk_tenant_plans(tenant_plans, employees[start:start + size]),
+            )
+            for chunk_index, start in enumerate(range(0, len(employees), size))
+        ]
+
+    def run(
+        self,
+        employees: Sequence[CalcInput],
+        company: Any = None,
+        render_payslips: bool = True,
+        chunk_size: Optional[int] = None,
+    ) -> Iterator[ChunkResult]:
+        """Blocking variant of submit(): yields ChunkResults as they complete."""
+        for future in as_completed(self.submit(employees, company, render_payslips, chunk_size)):
+            yield future.result()
+
+    def warm_up(self) -> None:
+        """Spawn every worker now (and wait for them) instead of on the first submit."""
+        list(self._pool.map(_worker_pid, range(self.max_workers)))
+
+    def shutdown(self, wait: bool = True, cancel_futures: Optional[bool] = None) -> None:
+        """
+        Stop the pool. By default wait=False also cancels chunks not started yet;
+        cancel_futures=False lets a retired pool finish everything already submitted in the background.
+        """
+        self._pool.shutdown(wait=wait, cancel_futures=(not wait) if cancel_futures is None else cancel_futures)
+
+    def __enter__(self) -> "PayrunExecutor":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.shutdown()
@@ -0,0 +1,68 @@
+# app/services/payrun_recalc.py
+
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from app.services.calc_cache import calculation_key
+
+# Payrun total -> breakdown / EmployeePay field it sums
+TOTAL_FIELDS = {
+    "total_gross": "gross_pay",
+    "total_net": "net_pay",
+    "total_tax": "income_tax",
+    "total_employer_cost": "total_employer_cost",
+}
+
+
+def input_fingerprint(calc_emp, plan, arithmetic: str) -> str:
+    """
+    Fingerprint stored on EmployeePay.input_fingerprint: hours, rates, bonuses, allowances,
+    opt-ins (normalized), the plan's config_version and the arithmetic mode.
+    """
+    return calculation_key(calc_emp, plan, arithmetic=arithmetic)
+
+
+@dataclass
+class RecalcDiff:
+    """
+    Result of diff_fingerprints, by position in the incoming list:
+      - changed:   a stored row exists but its fingerprint differs (or was never recorded)
+      - added:     no stored row for the employee in this payrun
+      - unchanged: fingerprint matches; nothing is recomputed, re-rendered or rewritten
+    """
+    changed: List[int] = field(default_factory=list)
+    added: List[int] = field(default_factory=list)
+    unchanged: List[int] = field(default_factory=list)
+
+    @property
+    def to_compute(self) -> List[int]:
+        return sorted(self.changed + self.added)
+
+
+def diff_fingerprints(stored: Dict[str, Optional[str]], incoming: List[tuple]) -> RecalcDiff:
+    """
+    stored:   employee_id -> fingerprint of the current EmployeePay row (None for legacy rows)
+    incoming: [(employee_id, fingerprint), ...] in request order
+    Cost is O(len(incoming)); the caller loads only the rows of the posted employees.
+    """
+    diff = RecalcDiff()
+    for index, (employee_id, fingerprint) in enumerate(incoming):
+        if employee_id not in stored:
+            diff.added.append(index)
+        elif stored[employee_id] != fingerprint:
+            diff.changed.append(index)
+        else:
+            diff.unchanged.append(index)
+    return diff
+
+
+def totals_delta(previous: Optional[Dict[str, Any]], breakdown: Dict[str, Any]) -> Dict[str, float]:
+    """
+    Payrun total adjustments for one recomputed employee: new breakdown minus the stored row
+    (previous=None for an added employee). Keys are the Payrun total columns.
+    """
+    delta = {}
+    for total, name in TOTAL_FIELDS.items():
+        old = float((previous or {}).get(name) or 0)
+        delta[total] = round(float(breakdown[name]) - old, 2)
+    return delta
@@ -0,0 +1,304 @@
+# app/services/payrun_store.py
+
+from collections import Counter
+from datetime import date
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple
+
+from sqlalchemy import and_, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database.ytd_store import ytd_store
+from app.models.calc_input import CalcInput
+from app.models.payroll_result import PayrollResult
+from app.models.payrun import (
+    EmployeeAllowances, EmployeeBenefitsDeductions, EmployeePay, EmployerContributions, Payrun,
+)
+from app.services.calc_cache import normalized_inputs
+from app.services.columnar import COMPONENT_GROUPS
+from app.services.gross_to_net import DEFAULT_PAY_TYPE, PAY_TYPE_LABELS
+from app.services.payrun_recalc import input_fingerprint, totals_delta
+from app.services.ytd import ytd_increments
+
+# Pay period currently used for every run
+PAY_PERIOD = "March 2025"
+PERIOD_START = date(2025, 3, 1)
+PERIOD_END = date(2025, 3, 31)
+TAX_YEAR = PERIOD_START.year
+
+
+async def get_or_create_payrun(db: AsyncSession, tenant_id: int, country: str) -> Payrun:
+    """Get or create the draft Payrun for (tenant, country, period)."""
+    result = await db.execute(
+        select(Payrun).where(
+            and_(
+                Payrun.period_start == PERIOD_START,
+                Payrun.period_end == PERIOD_END,
+                Payrun.tenant_id == tenant_id,
+                Payrun.country == country,
+            )
+        )
+    )
+    payrun = result.scalar_one_or_none()
+    if not payrun:
+        payrun = Payrun(
+            period_start=PERIOD_START,
+            period_end=PERIOD_END,
+            run_date=date.today(),
+            status='draft',
+            total_gross=0,
+            total_net=0,
+            total_tax=0,
+            total_employer_cost=0,
+            country=country,
+            tenant_id=tenant_id
+        )
+        db.add(payrun)
+        await db.flush()
+    return payrun
+
+
+def employee_pay_values(calc_emp: CalcInput, result: PayrollResult, plan, arithmetic: str) -> dict:
+    """EmployeePay column values for one calculation, including the recalculation fingerprint."""
+    return dict(
+        tenant_id=calc_emp.tenant_id,
+        employee_id=calc_emp.employee_id,
+        country=calc_emp.country,
+        pay_period=PAY_PERIOD,
+        pay_type=result.pay_type,
+        base_pay=result.base_pay,
+        overtime_pay=result.overtime_pay,
+        bonuses=result.bonuses,
+        hours_worked=calc_emp.hours_worked,
+        overtime_hours=calc_emp.overtime_hours,
+        gross_pay=result["gross_pay"],
+
+        taxable_income=result.taxable_income,
+        income_tax=result.income_tax,
+
+        # legacy/statutory fields if your schema still has them
+        social_security=result.social_security,
+        health_insurance=result.health_insurance,
+        solidarity_fund=result.solidarity_fund,
+
+        total_deductions=result.total_deductions,
+        net_pay=result["net_pay"],
+
+        total_employer_cost=result["total_employer_cost"],
+
+        total_pre_tax=result.total_pre_tax,
+        total_post_tax=result.total_post_tax,
+
+        tax_bracket_details=result.tax_bracket_details,
+        tax_exemptions_applied=result.tax_exemptions_applied,
+
+        # optional: store entire breakdown of country-specific employer items if desired
+        country_specific_benefits=None,  # old field; no longer used since we unified logic
+
+        # incremental recalculation (POST /payrun/{id}/recalculate)
+        input_fingerprint=input_fingerprint(calc_emp, plan, arithmetic),
+        config_version=plan.config_version,
+        calc_inputs=normalized_inputs(calc_emp),
+        ytd_increments=ytd_increments(result),
+    )
+
+
+def add_breakdown_rows(db: AsyncSession, employee_pay: EmployeePay, result: PayrollResult) -> None:
+    """Child rows of a flushed EmployeePay (needs employee_pay.id)."""
+    # a) Allowances
+    for name, amount in result.allowances_breakdown.items():
+        db.add(EmployeeAllowances(payslip_id=employee_pay.id, name=name, amount=amount))
+
+    # b) Employer Contributions
+    for name, amount in result.employer_costs.items():
+        db.add(EmployerContributions(payslip_id=employee_pay.id, contribution_type=name, amount=amount))
+
+    # c) Benefits Deductions (pre/post tax): expand dicts into rows
+    for dtype, deductions in (("pre_tax", result.pre_tax_breakdown), ("post_tax", result.post_tax_breakdown)):
+        for bname, amt in deductions.items():
+            db.add(
+                EmployeeBenefitsDeductions(
+                    payslip_id=employee_pay.id,
+                    deduction_type=dtype,
+                    benefit_name=bname,
+                    amount=float(amt),
+                )
+            )
+
+
+def add_to_payrun_totals(payrun: Payrun, result: PayrollResult, previous: dict = None) -> None:
+    """Add one employee's amounts to the Payrun totals; with previous (the replaced row), add the delta."""
+    for total, amount in totals_delta(previous, result).items():
+        setattr(payrun, total, round(float(getattr(payrun, total) or 0) + amount, 2))
+
+
+async def load_ytd(db: AsyncSession, calc_emps: List[CalcInput], tax_year: int = TAX_YEAR) -> List[dict]:
+    """YTD totals of tax_year parallel to calc_emps: one accumulator query per tenant (cached employees skip the DB)."""
+    by_tenant: Dict[int, List[str]] = {}
+    for calc_emp in calc_emps:
+        by_tenant.setdefault(calc_emp.tenant_id, []).append(calc_emp.employee_id)
+    loaded = {
+        tenant_id: await ytd_store.load(db, tenant_id, tax_year, employee_ids)
+        for tenant_id, employee_ids in by_tenant.items()
+    }
+    return [loaded[calc_emp.tenant_id][calc_emp.employee_id] for calc_emp in calc_emps]
+
+
+async def persist_results(
+    db: AsyncSession,
+    results: Iterable[Tuple[CalcInput, PayrollResult]],
+    plans: Mapping[str, Any],
+    arithmetic: str,
+    payruns: Optional[Dict[tuple, Payrun]] = None,
+    tenant_plans: Optional[Mapping[int, Mapping[str, Any]]] = None,
+) -> List[Tuple[int, str, int]]:
+    """
+    Persist a batch of calculations in the caller's session: EmployeePay rows, one flush for ids,
+    child rows, Payrun totals and YTD increments. payruns caches the draft Payrun per
+    (tenant_id, country) across batches. tenant_plans: the plans of tenants with config overlays
+    (as given to PayrunExecutor.submit). Returns the YTD cache keys to invalidate after commit.
+    """
+    tenant_plans = tenant_plans or {}
+    payruns = {} if payruns is None else payruns
+    rows = []
+    for calc_emp, result in results:
+        key = (calc_emp.tenant_id, calc_emp.country)
+        if key not in payruns:
+            payruns[key] = await get_or_create_payrun(db, calc_emp.tenant_id, calc_emp.country)
+        employee_pay = EmployeePay(
+            payrun_id=payruns[key].id,
+            **employee_pay_values(
+                calc_emp, result, tenant_plans.get(calc_emp.tenant_id, plans)[calc_emp.country], arithmetic
+            ),
+        )
+        add_to_payrun_totals(payruns[key], result)
+        db.add(employee_pay)
+        rows.append((employee_pay, result))
+    await db.flush()
+    for employee_pay, result in rows:
+        add_breakdown_rows(db, employee_pay, result)
+    ytd_keys = await ytd_store.add(
+        db, TAX_YEAR, [((row.tenant_id, row.employee_id), row.ytd_increments) for row, _ in rows]
+    )
+    await db.flush()
+    return ytd_keys
+
+
+def table_pay_rows(results, plans: Mapping[str, Any]) -> List[Tuple[Dict[str, Any], Dict[str, Dict[str, float]]]]:
+    """
+    (EmployeePay column values, components) for each row of a columnar results table
+    (services/columnar.calculate_table); components maps each group of COMPONENT_GROUPS to
+    {name: amount}. The batch engine keeps no per-employee inputs, so rows carry no
+    recalculation fingerprint: /payrun/{id}/recalculate treats them as changed.
+    """
+    groups = {
+        group: [(column, column[len(group) + 1:]) for column in results.column_names if column.startswith(f"{group}.")]
+        for group in COMPONENT_GROUPS
+    }
+    rows = []
+    for row in results.to_pylist():
+        components = {
+            group: {name: row[column] for column, name in columns if row[column] is not None}
+            for group, columns in groups.items()
+        }
+        pre_tax, post_tax = components["pre_tax"], components["post_tax"]
+        plan = plans[row["country"]]
+        values = dict(
+            tenant_id=row["tenant_id"],
+            employee_id=row["employee_id"],
+            country=row["country"],
+            pay_period=PAY_PERIOD,
+            pay_type=PAY_TYPE_LABELS.get(plan.pay_frequency, DEFAULT_PAY_TYPE),
+            base_pay=row["base_pay"],
+            overtime_pay=row["overtime_pay"],
+            bonuses=row["bonuses"],
+            hours_worked=row["hours_worked"],
+            overtime_hours=row["overtime_hours"],
+            gross_pay=round(row["gross_pay"], 2),
+            taxable_income=row["taxable_income"],
+            income_tax=row["income_tax"],
+            social_security=round(pre_tax.get("social_security", 0.0) + post_tax.get("social_security", 0.0), 2),
+            health_insurance=round(pre_tax.get("health_insurance", 0.0) + post_tax.get("health_insurance", 0.0), 2),
+            solidarity_fund=round(pre_tax.get("solidarity_fund", 0.0) + post_tax.get("solidarity_fund", 0.0), 2),
+            total_deductions=row["total_deductions"],
+            net_pay=round(row["net_pay"], 2),
+            total_employer_cost=row["total_employer_cost"],
+            total_pre_tax=row["total_pre_tax"],
+            total_post_tax=row["total_post_tax"],
+            config_version=plan.config_version,
+        )
+        values["ytd_increments"] = ytd_increments({
+            **values,
+            "benefits_deductions": {"pre_tax": pre_tax, "post_tax": post_tax},
+            "employer_costs": components["employer"],
+        })
+        rows.append((values, components))
+    return rows
+
+
+async def bulk_load_table(
+    db: AsyncSession,
+    results,
+    plans: Mapping[str, Any],
+    payruns: Optional[Dict[tuple, Payrun]] = None,
+) -> List[Tuple[int, str, int]]:
+    """
+    persist_results for a columnar results table: one multi-row INSERT ... RETURNING for
+    employee_pay, one INSERT per child table, Payrun totals and YTD increments, without an ORM
+    object per row. Needs tenant_id in the table. Returns the YTD cache keys to invalidate after commit.
+    Only loads employees new to their payrun: the table was calculated against YTD that already
+    holds an existing row, so replacing one is /payrun/{id}/recalculate's job. Raises ValueError
+    (before writing anything) for an employee already in the payrun or twice in the table.
+    Rows carry no calc_inputs, so /payrun/retro cannot recompute them ("No stored calc_inputs").
+    """
+    payruns = {} if payruns is None else payruns
+    rows = table_pay_rows(results, plans)
+    if not rows:
+        return []
+    by_payrun: Dict[tuple, List[str]] = {}
+    for values, _ in rows:
+        key = (values["tenant_id"], values["country"])
+        if key not in payruns:
+            payruns[key] = await get_or_create_payrun(db, values["tenant_id"], values["country"])
+        by_payrun.setdefault(key, []).append(values["employee_id"])
+    for key, employee_ids in by_payrun.items():
+        # The payrun's employee ids (not an IN over the table: it may exceed the driver's parameter limit)
+        in_payrun = await db.scalars(select(EmployeePay.employee_id).where(EmployeePay.payrun_id == payruns[key].id))
+        existing = sorted(set(in_payrun.all()).intersection(employee_ids))
+        duplicates = sorted(employee_id for employee_id, count in Counter(employee_ids).items() if count > 1)
+        if existing or duplicates:
+            raise ValueError(
+                f"Payrun {payruns[key].id}: employees already in the payrun {existing} or repeated in "
+                f"the table {duplicates}; recalculate existing employees with /payrun/{{id}}/recalculate"
+            )
+    pay_values = []
+    for values, _ in rows:
+        payrun = payruns[(values["tenant_id"], values["country"])]
+        add_to_payrun_totals(payrun, values)
+        pay_values.append({"payrun_id": payrun.id, **values})
+    payslip_ids = (
+        await db.scalars(insert(EmployeePay).returning(EmployeePay.id, sort_by_parameter_order=True), pay_values)
+    ).all()
+
+    allowances, contributions, deductions = [], [], []
+    for payslip_id, (_, components) in zip(payslip_ids, rows):
+        allowances += [{"payslip_id": payslip_id, "name": name, "amount": amount} for name, amount in components["allowances"].items()]
+        contributions += [
+            {"payslip_id": payslip_id, "contribution_type": name, "amount": amount}
+            for name, amount in components["employer"].items()
+        ]
+        for dtype in ("pre_tax", "post_tax"):
+            deductions += [
+                {"payslip_id": payslip_id, "deduction_type": dtype, "benefit_name": name, "amount": amount}
+                for name, amount in components[dtype].items()
+            ]
+    for model, child_rows in (
+        (EmployeeAllowances, allowances), (EmployerContributions, contributions), (EmployeeBenefitsDeductions, deductions),
+    ):
+        if child_rows:
+            await db.execute(insert(model), child_rows)
+
+    ytd_keys = await ytd_store.add(
+        db, TAX_YEAR, [((values["tenant_id"], values["employee_id"]), values["ytd_increments"]) for values, _ in rows]
+    )
+    await db.flush()
+    return ytd_keys
@@ -0,0 +1,302 @@
+# app/services/payrun_stream.py
+
+import csv
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import Future
+from dataclasses import dataclass
+from itertools import islice
+from typing import IO, Any, Callable, Dict, Iterable, Iterator, List, Mapping, Optional
+
+from app.models.calc_input import CalcInput
+from app.models.employee import CompanyMetadata, PayrollRequest
+from app.models.payroll_result import PayrollResult
+from app.services.gross_to_net import ARITHMETIC_FLOAT
+from app.services.payrun_executor import DEFAULT_CHUNK_SIZE, PayrunExecutor, calculate_chunk
+
+STREAM_FORMATS = ("jsonl", "csv")
+
+# Employee columns holding a {name: value} mapping (flattened in CSV as "<column>.<name>")
+_MAPPING_COLUMNS = ("allowances", "benefits_opt_in", "metadata")
+# Mapping columns whose cells are parsed as JSON (amounts, true/false, override objects)
+_JSON_VALUE_COLUMNS = ("allowances", "benefits_opt_in")
+
+# CSV output: identity, amounts, then the component breakdowns as JSON objects
+CSV_AMOUNT_COLUMNS = (
+    "gross_pay", "net_pay", "total_employer_cost",
+    "base_pay", "overtime_pay", "bonuses", "taxable_income", "income_tax",
+    "total_deductions", "total_pre_tax", "total_post_tax",
+)
+CSV_COLUMNS = (
+    ("index", "tenant_id", "employee_id", "country")
+    + CSV_AMOUNT_COLUMNS
+    + ("allowances", "pre_tax", "post_tax", "employer_costs", "payslip_path", "error")
+)
+
+
+@dataclass(slots=True)
+class StreamRecord:
+    """
+    One input line on its way through the pipeline. index is the record's position in the
+    input (data rows only, from 0); exactly one of result / error is set once calculated.
+    """
+    index: int
+    employee_id: str = ""
+    calc_emp: Optional[CalcInput] = None
+    company: Optional[CompanyMetadata] = None
+    result: Optional[PayrollResult] = None
+    payslip_path: Optional[str] = None
+    error: Optional[str] = None
+
+
+def stream_format(path: str, fmt: Optional[str] = None) -> str:
+    """The explicit format, else the one implied by the file extension (.jsonl/.ndjson, .csv)."""
+    if fmt:
+        if fmt not in STREAM_FORMATS:
+            raise ValueError(f"Unsupported format {fmt!r}; use one of {', '.join(STREAM_FORMATS)}")
+        return fmt
+    extension = os.path.splitext(path)[1].lower()
+    if extension in (".jsonl", ".ndjson"):
+        return "jsonl"
+    if extension == ".csv":
+        return "csv"
+    if extension == ".json":
+        raise ValueError("A JSON array cannot be streamed; write one record per line (JSONL) instead")
+    raise ValueError(f"Cannot tell the format of {path!r}; pass jsonl or csv explicitly")
+
+
+def unflatten_csv_row(row: Mapping[Optional[str], Any]) -> Dict[str, Any]:
+    """
+    CSV row -> bundle-shaped record ({"employee": {...}, "company": {...}}).
+    Supports:
+      - scalar columns: tenant_id, employee_id, country, hourly_rate, hours_worked, ...
+      - allowances.<name>, benefits_opt_in.<name>, metadata.<field>, company.<field>
+        (allowance and opt-in cells are read as JSON: numbers, true/false, override objects)
+      - allowances / benefits_opt_in / metadata / company: a whole JSON object in one cell
+    Empty cells count as missing.
+    """
+    employee: Dict[str, Any] = {}
+    company: Dict[str, Any] = {}
+    for column, value in row.items():
+        if column is None or value is None or value == "":
+            continue
+        group, dot, name = column.strip().partition(".")
+        if group == "company":
+            target = company
+        elif group in _MAPPING_COLUMNS:
+            target = employee.setdefault(group, {})
+        else:
+            employee[column.strip()] = value
+            continue
+        if dot:
+            target[name] = _json_cell(value) if group in _JSON_VALUE_COLUMNS else value
+        else:
+            target.update(json.loads(value))
+    return {"employee": employee, "company": company or None}
+
+
+def _json_cell(value: str) -> Any:
+    try:
+        return json.loads(value)
+    except ValueError:
+        return value
+
+
+def record_from_dict(index: int, record: Any) -> StreamRecord:
+    """
+    Bundle-shaped ({"employee", "company"}) or bare employee dict -> StreamRecord, validated with
+    the same request models as POST /calculate so both paths calculate the same inputs.
+    """
+    if not isinstance(record, dict):
+        raise ValueError("record is not a JSON object")
+    request = PayrollRequest.model_validate(record if "employee" in record else {"employee": record})
+    return StreamRecord(
+        index=index,
+        employee_id=request.employee.employee_id,
+        calc_emp=CalcInput.from_employee(request.employee),
+        company=request.company,
+    )
+
+
+def read_records(fh: IO[str], fmt: str) -> Iterator[StreamRecord]:
+    """
+    Lazily parse an open JSONL or CSV file, one record at a time (never the whole file).
+    A record that cannot be parsed comes back with error set instead of stopping the run.
+    """
+    if fmt == "jsonl":
+        rows, parse = (line for line in fh if line.strip()), json.loads
+    else:
+        rows, parse = csv.DictReader(fh), unflatten_csv_row
+    for index, row in enumerate(rows):
+        record = None
+        try:
+            record = parse(row)
+            yield record_from_dict(index, record)
+        except (ValueError, TypeError) as exc:  # includes pydantic's ValidationError
+            yield StreamRecord(index=index, employee_id=_employee_id(record), error=f"Invalid record: {exc}")
+
+
+def _employee_id(record: Any) -> str:
+    """Best-effort employee_id of a record that failed validation (for the error row)."""
+    employee = record.get("employee", record) if isinstance(record, dict) else None
+    return str(employee.get("employee_id") or "") if isinstance(employee, dict) else ""
+
+
+def _batched(records: Iterable[StreamRecord], size: int) -> Iterator[List[StreamRecord]]:
+    records = iter(records)
+    while batch := list(islice(records, size)):
+        yield batch
+
+
+def _complete(batch: List[StreamRecord], valid: List[StreamRecord], outcome: Any) -> List[StreamRecord]:
+    """Copy a ChunkResult (or its Future) back onto the batch's records."""
+    if outcome is None:
+        return batch
+    chunk = outcome.result() if isinstance(outcome, Future) else outcome
+    for item in chunk.results:
+        record = valid[item["index"]]
+        record.result, record.payslip_path = item["result"], item["payslip_path"]
+    for error in chunk.errors:
+        valid[error["index"]].error = error["detail"]
+    return batch
+
+
+def calculate_stream(
+    records: Iterable[StreamRecord],
+    country_plans: Optional[Dict[str, Any]] = None,
+    executor: Optional[PayrunExecutor] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    render_payslips: bool = False,
+    arithmetic: str = ARITHMETIC_FLOAT,
+    profile_curves: bool = False,
+    ytd_loader: Optional[Callable[[List[CalcInput]], List[Optional[Mapping[str, float]]]]] = None,
+    max_pending: Optional[int] = None,
+    explain: bool = False,
+    tenant_plans: Optional[Mapping[int, Dict[str, Any]]] = None,
+) -> Iterator[List[StreamRecord]]:
+    """
+    Calculate a stream of records in batches of chunk_size, yielding each batch (in input order)
+    with result / error filled in.
+
+    Supports:
+      - in-process calculation with country_plans (no executor)
+      - a PayrunExecutor: at most max_pending batches (default 2 per worker) are in flight, so
+        memory stays bounded by roughly (max_pending + 1) * chunk_size records whatever the input size;
+        arithmetic / profile_curves are then the executor's own
+      - ytd_loader: called with each batch's inputs before it is submitted, returns YTD totals
+        parallel to them (batches still in flight have not added their increments yet)
+      - explain: each result carries its rule trace ("explain" in the JSONL output)
+      - tenant_plans: tenant_id -> country -> plan for tenants with config overlays
+    """
+    if executor is None and country_plans is None:
+        raise ValueError("calculate_stream needs country_plans or an executor")
+    if max_pending is None:
+        max_pending = executor.max_workers * 2 if executor is not None else 0
+
+    pending = deque()
+    for batch in _batched(records, max(int(chunk_size), 1)):
+        valid = [record for record in batch if record.error is None]
+        employees = [record.calc_emp for record in valid]
+        outcome = None
+        if employees:
+            ytd = ytd_loader(employees) if ytd_loader is not None else None
+            companies = [record.company for record in valid]
+            if executor is not None:
+                outcome = executor.submit(
+                    employees, render_payslips=render_payslips, chunk_size=len(employees),
+                    ytd=ytd, companies=companies, explain=explain, tenant_plans=tenant_plans,
+                )[0]
+            else:
+                outcome = calculate_chunk(
+                    0, 0, employees, render_payslips=render_payslips, country_plans=country_plans,
+                    arithmetic=arithmetic, ytd=ytd, profile_curves=profile_curves, companies=companies,
+                    explain=explain, tenant_plans=tenant_plans,
+                )
+        pending.append((batch, valid, outcome))
+        while len(pending) > max_pending:
+            yield _complete(*pending.popleft())
+    while pending:
+        yield _complete(*pending.popleft())
+
+
+def result_row(record: StreamRecord) -> Dict[str, Any]:
+    """JSONL output: identity, then the /calculate response shape (or "error")."""
+    calc_emp = record.calc_emp
+    row = {
+        "index": record.index,
+        "tenant_id": calc_emp.tenant_id if calc_emp is not None else None,
+        "employee_id": record.employee_id,
+        "country": calc_emp.country if calc_emp is not None else None,
+    }
+    if record.result is None:
+        row["error"] = record.error
+        return row
+    row.update(record.result.to_dict())
+    if record.payslip_path:
+        row["payslip_path"] = record.payslip_path
+    return row
+
+
+def csv_row(record: StreamRecord) -> Dict[str, Any]:
+    """CSV output: one flat row per employee (see CSV_COLUMNS); components as JSON objects."""
+    row = result_row(record)
+    row.pop("breakdown", None)
+    row.pop("explain", None)  # the trace is JSONL-only
+    result = record.result
+    if result is not None:
+        for name in CSV_AMOUNT_COLUMNS:
+            row[name] = getattr(result, name)
+        row["allowances"] = json.dumps(result.allowances_breakdown, default=str)
+        row["pre_tax"] = json.dumps(result.pre_tax_breakdown, default=str)
+        row["post_tax"] = json.dumps(result.post_tax_breakdown, default=str)
+        row["employer_costs"] = json.dumps(result.employer_costs, default=str)
+    return row
+
+
+class ResultWriter:
+    """Writes calculated records to an open text file as JSONL or CSV (header first), one line per employee."""
+
+    def __init__(self, fh: IO[str], fmt: str):
+        self.fh = fh
+        self.fmt = fmt
+        self._csv = csv.DictWriter(fh, fieldnames=CSV_COLUMNS) if fmt == "csv" else None
+        if self._csv is not None:
+            self._csv.writeheader()
+
+    def write(self, records: Iterable[StreamRecord]) -> None:
+        for record in records:
+            if self._csv is not None:
+                self._csv.writerow(csv_row(record))
+            else:
+                self.fh.write(json.dumps(result_row(record), default=str))
+                self.fh.write("\n")
+
+
+class Throughput:
+    """Running counts for a streamed payrun; report() prints at most every `interval` seconds."""
+
+    def __init__(self, out: IO[str] = sys.stderr, interval: float = 5.0):
+        self.out = out
+        self.interval = interval
+        self.processed = 0
+        self.failed = 0
+        self.started = time.perf_counter()
+        self._last_report = self.started
+
+    def add(self, records: List[StreamRecord]) -> None:
+        self.processed += len(records)
+        self.failed += sum(1 for record in records if record.result is None)
+
+    def summary(self) -> str:
+        elapsed = time.perf_counter() - self.started
+        rate = self.processed / elapsed if elapsed > 0 else 0.0
+        return f"{self.processed} employees ({self.failed} errors) in {elapsed:.1f}s, {rate:.0f} employees/s"
+
+    def report(self, force: bool = False) -> None:
+        now = time.perf_counter()
+        if force or now - self._last_report >= self.interval:
+            self._last_report = now
+            print(self.summary(), file=self.out, flush=True)
@@ -1,10 +1,11 @@
 # app/services/payslip.py
 import os
 import uuid
-from typing import Any, Dict
+from typing import Any, Dict, Mapping
 from weasyprint import HTML
 
 from app.config.settings import settings  # if you use it elsewhere; ok to keep
+from app.models.calc_input import CalcInput
 
 def _to_dict(obj: Any) -> Dict[str, Any]:
     """Return a plain dict from Pydantic v2 (model_dump), v1 (dict), or already-dict; else {}."""
@@ -26,16 +27,16 @@ def _to_dict(obj: Any) -> Dict[str, Any]:
             pass
     return {}
 
-def generate_payslip(employee, breakdown: dict, net_pay: float, employer_cost: dict, company):
+def generate_payslip(employee: CalcInput, breakdown: Mapping[str, Any], net_pay: float, employer_cost: dict, company):
     # Currency symbols (fallback to $)
     currency_symbols = {
         "India": "₹", "USA": "$", "Canada": "$",
         "Spain": "€", "Ireland": "€", "Philippines": "₱", "Colombia": "$"
     }
-    symbol = currency_symbols.get(getattr(employee, "country", None) or "", "$")
+    symbol = currency_symbols.get(employee.country or "", "$")
 
     # Normalize metadata and company to dicts
-    meta = _to_dict(getattr(employee, "metadata", None))
+    meta = _to_dict(employee.metadata)
     comp = _to_dict(company)
 
     # Safe pulls
@@ -75,7 +76,7 @@ def generate_payslip(employee, breakdown: dict, net_pay: float, employer_cost: d
     <h3>Payslip for {breakdown.get("pay_period", "N/A")}</h3>
 
     <table>
-      <tr><td><strong>Name:</strong></td><td>{full_name}</td><td><strong>Employee ID:</strong></td><td>{getattr(employee, "employee_id", "N/A")}</td></tr>
+      <tr><td><strong>Name:</strong></td><td>{full_name}</td><td><strong>Employee ID:</strong></td><td>{employee.employee_id or "N/A"}</td></tr>
       <tr><td><strong>Job Title:</strong></td><td>{job_title}</td><td><strong>Department:</strong></td><td>{department}</td></tr>
       <tr><td><strong>Tax ID:</strong></td><td>{tax_id}</td><td><strong>Bank Account:</strong></td><td>****{bank_last4}</td></tr>
     </table>
@@ -193,4 +194,68 @@ def generate_payslip(employee, breakdown: dict, net_pay: float, employer_cost: d
     file_path = f"payslips/{uuid.uuid4()}.pdf"
     os.makedirs(os.path.dirname(file_path), exist_ok=True)
     HTML(string=html).write_pdf(file_path)
-    return file_path
\ No newline at end of file
+    return file_path
+
+def generate_adjustment_payslip(employee: CalcInput, lines, company, reason: str = None):
+    """
+    Delta payslip for retroactive adjustments: one row per past period and component
+    (recomputed minus originally paid), plus the net change paid with this payrun.
+    lines: RetroLine-like objects (source_pay_period, component, amount) for this employee.
+    """
+    currency_symbols = {
+        "India": "₹", "USA": "$", "Canada": "$",
+        "Spain": "€", "Ireland": "€", "Philippines": "₱", "Colombia": "$"
+    }
+    symbol = currency_symbols.get(employee.country or "", "$")
+    meta = _to_dict(employee.metadata)
+    comp = _to_dict(company)
+    company_name = comp.get("company_name") or "Company"
+    company_address = comp.get("address") or ""
+
+    def label(component: str) -> str:
+        side, _, name = component.partition(":")
+        if not name:
+            return component.replace("_", " ").title()
+        return f"{name} ({'Employer' if side == 'employer' else 'Deduction'})"
+
+    html = f"""
+    <html><head>
+    <style>
+        body {{ font-family: Arial, sans-serif; margin: 40px; }}
+        table {{ width: 100%; border-collapse: collapse; margin-bottom: 20px; }}
+        th, td {{ border: 1px solid #ccc; padding: 8px; }}
+        th {{ background-color: #f0f0f0; }}
+        .right {{ text-align: right; }}
+        .summary {{ font-weight: bold; background-color: #eee; }}
+        .footer {{ font-size: 12px; color: #666; margin-top: 40px; }}
+    </style>
+    </head><body>
+    <h2>{company_name}</h2>
+    <p>{company_address}</p>
+    <h3>Retroactive Adjustment</h3>
+    <p>{reason or ""}</p>
+
+    <table>
+      <tr><td><strong>Name:</strong></td><td>{meta.get("full_name") or "N/A"}</td><td><strong>Employee ID:</strong></td><td>{employee.employee_id or "N/A"}</td></tr>
+    </table>
+
+    <table>
+      <tr><th>Period</th><th>Component</th><th class="right">Difference</th></tr>
+    """
+    net_change = 0.0
+    for line in lines:
+        html += f"<tr><td>{line.source_pay_period}</td><td>{label(line.component)}</td><td class='right'>{symbol}{line.amount:,.2f}</td></tr>"
+        if line.component == "net_pay":
+            net_change += line.amount
+    html += f"""
+      <tr class="summary"><td colspan="2">Net Pay Adjustment</td><td class="right">{symbol}{net_change:,.2f}</td></tr>
+    </table>
+
+    <div class="footer">This is a computer-generated adjustment payslip.</div>
+    </body></html>
+    """
+
+    file_path = f"payslips/{uuid.uuid4()}.pdf"
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    HTML(string=html).write_pdf(file_path)
+    return file_path
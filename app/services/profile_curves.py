@@ -0,0 +1,330 @@
+# app/services/profile_curves.py
+
+import threading
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Hashable, List, Mapping, Optional, Tuple
+
+from app.config.rule_plan import CountryRulePlan, EmployerRule, TaxBracketTable
+from app.models.calc_input import CalcInput
+from app.services.deductions import _resolve_benefit_amount
+from app.services.income_tax import tax_in_bracket
+from app.services.ytd import remaining_allowance, ytd_key
+from app.utils.metrics import CALC_CACHE_EVICTIONS, CALC_CACHE_MISSES
+
+# Curves kept per process (one per config version x opt-in profile x exempt allowances x YTD mode)
+PROFILE_CURVE_CACHE_MAX_ENTRIES = 1024
+
+# Coefficients (intercept, slope) of one component on one segment: amount = intercept + gross * slope
+Piece = Tuple[float, float]
+
+
+@dataclass(frozen=True, slots=True)
+class CurveRule:
+    """
+    One output component of a profile curve, in the order the calculators walk the rules.
+      - pre_tax: goes to the pre-tax breakdown (employee side)
+      - limit / limit_key: annual_limit / annual_cap and its ytd_key, clamped after evaluation
+        when YTD totals are known (None otherwise)
+    """
+    name: str
+    pre_tax: bool = False
+    limit: Optional[float] = None
+    limit_key: Optional[str] = None
+
+
+@dataclass(frozen=True)
+class ProfileCurve:
+    """
+    Closed-form gross-to-net for one (country rules, opt-in profile): every output component is
+    piecewise linear in gross, with the slope changes at `knots` (ascending, knots[0] = 0).
+      - deductions / benefits: statutory + optional deductions and opted-in benefits; their pieces
+        do not depend on the segment (a fixed amount or a rate on gross)
+      - employer:  employer contributions + matches, one piece per segment (max_amount and the
+                   annualized annual_cap turn a rate into a constant past their knot)
+      - brackets:  tax bracket of taxable income on each segment (see income_tax.tax_in_bracket)
+    Evaluating an employee is one bisect over the knots and a multiply-add per component;
+    the rule walk in deductions.py / employer_costs.py only runs when the curve is built.
+    """
+    knots: Tuple[float, ...]
+    brackets: Tuple[int, ...]
+    exemptions: Tuple[Tuple[str, float], ...]
+    exempt_total: float
+    deductions: Tuple[CurveRule, ...]
+    deduction_pieces: Tuple[Piece, ...]
+    benefits: Tuple[CurveRule, ...]
+    benefit_pieces: Tuple[Piece, ...]
+    employer: Tuple[CurveRule, ...]
+    employer_pieces: Tuple[Tuple[Piece, ...], ...]
+    tax_table: TaxBracketTable
+
+    def evaluate(
+        self,
+        gross_pay: float,
+        ytd: Optional[Mapping[str, float]] = None,
+        include_bracket_details: bool = True,
+    ) -> Tuple[dict, float, Dict[str, float]]:
+        """
+        Deductions and employer costs at gross_pay, in the shapes calculate_deductions and
+        calculate_employer_costs return: (deductions, total_employer_cost, employer_breakdown).
+        ytd clamps annual_limit / annual_cap as in the calculators (curves built with ytd_known).
+        """
+        i = max(bisect_right(self.knots, gross_pay) - 1, 0)
+        pre_tax_deductions = 0.0
+        post_tax_deductions = 0.0
+        pre_tax_breakdown: Dict[str, float] = {}
+        post_tax_breakdown: Dict[str, float] = {}
+
+        for rule, (intercept, slope) in zip(self.deductions, self.deduction_pieces):
+            amount = intercept + gross_pay * slope
+            if amount <= 0:
+                continue
+            if rule.pre_tax:
+                pre_tax_deductions += amount
+                pre_tax_breakdown[rule.name] = round(amount, 2)
+            else:
+                post_tax_deductions += amount
+                post_tax_breakdown[rule.name] = round(amount, 2)
+
+        taxable_income = max(gross_pay - self.exempt_total - pre_tax_deductions, 0.0)
+
+        if taxable_income <= 0:
+            income_tax, tax_bracket_details = 0.0, ([] if include_bracket_details else None)
+        else:
+            uppers = self.tax_table.uppers
+            j = self.brackets[i]
+            # Right at a knot rounding can put taxable income across the threshold: search the table then
+            if (j < len(uppers) and taxable_income > uppers[j]) or (j > 0 and taxable_income <= uppers[j - 1]):
+                j = bisect_left(uppers, taxable_income)
+            income_tax, tax_bracket_details = tax_in_bracket(
+                self.tax_table, j, taxable_income, with_details=include_bracket_details
+            )
+
+        for rule, (intercept, slope) in zip(self.benefits, self.benefit_pieces):
+            amount = intercept + gross_pay * slope
+            if rule.limit is not None and ytd is not None:
+                amount = min(amount, remaining_allowance(rule.limit, ytd, rule.limit_key))
+            if amount <= 0:
+                continue
+            if rule.pre_tax:
+                pre_tax_deductions += amount
+                pre_tax_breakdown[rule.name] = round(amount, 2)
+            else:
+                post_tax_deductions += amount
+                post_tax_breakdown[rule.name] = round(amount, 2)
+
+        total_pre_tax_deductions = round(pre_tax_deductions, 2)
+        total_post_tax_deductions = round(post_tax_deductions, 2)
+        total_deductions = income_tax + total_post_tax_deductions + total_pre_tax_deductions
+        deductions = {
+            "taxable_income": round(taxable_income, 2),
+            "tax_exemptions_applied": {name: round(exempt, 2) for name, exempt in self.exemptions},
+            "income_tax": round(income_tax, 2),
+            "pre_tax_deductions": total_pre_tax_deductions,
+            "post_tax_deductions": total_post_tax_deductions,
+            "total_deductions": round(total_deductions, 2),
+            "tax_bracket_details": tax_bracket_details,
+            "total_pre_tax_deductions": total_pre_tax_deductions,
+            "total_post_tax_deductions": total_post_tax_deductions,
+            "pre_tax_breakdown": pre_tax_breakdown,
+            "post_tax_breakdown": post_tax_breakdown,
+        }
+
+        employer: Dict[str, float] = {}
+        employer_total = 0.0
+        for rule, (intercept, slope) in zip(self.employer, self.employer_pieces[i]):
+            amount = intercept + gross_pay * slope
+            if rule.limit is not None and ytd is not None:
+                amount = min(amount, remaining_allowance(rule.limit, ytd, rule.limit_key))
+            if amount > 0:
+                value = round(amount, 2)
+                employer[rule.name] = value
+                employer_total += value
+
+        return deductions, round(employer_total, 2), employer
+
+
+def _benefit_override(value: Dict[str, Any]) -> Tuple[Optional[float], Optional[float], Optional[bool]]:
+    """(amount, rate, pre_tax) a dict opt-in overrides (None where it keeps the rule's value)."""
+    return (
+        float(value["amount"]) if "amount" in value else None,
+        float(value["rate"]) if "rate" in value else None,
+        bool(value["pre_tax"]) if "pre_tax" in value else None,
+    )
+
+
+def profile_key(calc_emp: CalcInput, plan: CountryRulePlan, ytd_known: bool = False) -> Tuple[Hashable, ...]:
+    """
+    Everything besides gross that the calculators read from an employee: the optional deductions
+    and benefits opted into (with any dict override), and the tax-exempt allowances. Employees
+    with the same key share one curve. Opt-in lookups follow calculate_deductions exactly.
+    """
+    optins = calc_emp.benefits_opt_in
+    allowances = calc_emp.allowances
+
+    exemptions = []
+    if allowances:
+        for name in plan.exempt_allowances:
+            if name in allowances:
+                exempt = float(allowances[name])
+                if exempt > 0:
+                    exemptions.append((name, exempt))
+    deductions = tuple(
+        item.name for item in plan.other_employee_deductions if item.optional and optins.get(item.name, False)
+    ) if optins else ()
+    benefits = []
+    for benefit in plan.optional_benefits if optins else ():
+        value = optins.get(benefit.name)
+        if value:
+            benefits.append((benefit.name, _benefit_override(value) if isinstance(value, dict) else None))
+    return (plan.config_version, tuple(exemptions), deductions, tuple(benefits), bool(ytd_known))
+
+
+def _employer_piece(rule: EmployerRule, gross: float, periods_per_year: int, ytd_known: bool) -> Piece:
+    """Piece of employer_costs._amount_from_rule_for_employer on the segment containing gross."""
+    intercept, slope = (rule.amount, 0.0) if rule.amount is not None else (0.0, rule.rate)
+    amount = intercept + gross * slope
+    if amount <= 0:
+        return 0.0, 0.0
+    if rule.max_amount is not None and amount > rule.max_amount:
+        intercept, slope, amount = rule.max_amount, 0.0, rule.max_amount
+    # Without YTD the annual cap is approximated per period; with YTD it is clamped after evaluation
+    if not ytd_known and rule.annual_cap is not None and amount * float(periods_per_year) > rule.annual_cap:
+        intercept, slope = rule.annual_cap / float(periods_per_year), 0.0
+    return intercept, slope
+
+
+def build_profile_curve(calc_emp, plan: CountryRulePlan, ytd_known: bool = False) -> ProfileCurve:
+    """
+    Derive the curve of calc_emp's profile from the compiled rules:
+      1) knots: taxable income reaching 0 and each bracket threshold
+         (taxable = gross * (1 - p) - exempt - c, p / c the pre-tax rates / fixed amounts),
+         and rate-based employer rules reaching max_amount or the per-period annual_cap
+      2) on every segment, the tax bracket and the employer pieces, read at the segment's midpoint
+    """
+    _, exemptions, opted_deductions, opted_benefits, _ = profile_key(calc_emp, plan, ytd_known)
+    ppy = plan.periods_per_year
+
+    deductions: List[CurveRule] = []
+    deduction_pieces: List[Piece] = []
+    for item in plan.employee_contributions + plan.other_employee_deductions:
+        if item.optional and item.name not in opted_deductions:
+            continue
+        deductions.append(CurveRule(item.name, item.pre_tax))
+        deduction_pieces.append((item.amount, 0.0) if item.amount is not None else (0.0, item.rate))
+
+    benefits: List[CurveRule] = []
+    benefit_pieces: List[Piece] = []
+    employer_rules: List[EmployerRule] = list(plan.employer_contributions)
+    overrides = dict(opted_benefits)
+    for benefit in plan.optional_benefits:
+        if benefit.name not in overrides:
+            continue
+        rate, amount, pre_tax = benefit.rate, benefit.amount, benefit.pre_tax
+        override = overrides[benefit.name]
+        if override is not None:
+            amount = amount if override[0] is None else override[0]
+            rate = rate if override[1] is None else override[1]
+            pre_tax = pre_tax if override[2] is None else override[2]
+        benefits.append(CurveRule(
+            benefit.name, pre_tax, benefit.annual_limit, ytd_key("employee", benefit.name)
+        ))
+        slope = rate if rate is not None and benefit.basis == "gross" else 0.0
+        benefit_pieces.append((_resolve_benefit_amount(0.0, rate, amount, benefit.basis, ppy), slope))
+        if benefit.employer is not None:
+            employer_rules.append(benefit.employer)
+    employer = tuple(
+        CurveRule(rule.label, limit=rule.annual_cap, limit_key=ytd_key("employer", rule.label))
+        for rule in employer_rules
+    )
+
+    # 1) Knots (exempt summed in the calculators' order, so taxable income matches to the last bit)
+    exempt = 0.0
+    for _, amount in exemptions:
+        exempt += amount
+    pre_rate = sum(s for rule, (_, s) in zip(deductions, deduction_pieces) if rule.pre_tax and s > 0)
+    pre_fixed = sum(a for rule, (a, _) in zip(deductions, deduction_pieces) if rule.pre_tax and a > 0)
+    points = {0.0}
+    if pre_rate < 1:
+        for threshold in (0.0,) + tuple(u for u in plan.tax_table.uppers if u != float("inf")):
+            points.add((threshold + exempt + pre_fixed) / (1 - pre_rate))
+    for rule in employer_rules:
+        if rule.amount is not None or rule.rate <= 0:
+            continue
+        if rule.max_amount is not None:
+            points.add(rule.max_amount / rule.rate)
+        if not ytd_known and rule.annual_cap is not None:
+            points.add(rule.annual_cap / float(ppy) / rule.rate)
+    knots = sorted(p for p in points if p >= 0)
+
+    # 2) Segment pieces, read at each segment's midpoint (past the last knot: any larger gross)
+    brackets, employer_pieces = [], []
+    for i, knot in enumerate(knots):
+        gross = (knot + knots[i + 1]) / 2 if i + 1 < len(knots) else knot * 2 + 1.0
+        pre_tax = sum(a + gross * s for rule, (a, s) in zip(deductions, deduction_pieces) if rule.pre_tax and a + gross * s > 0)
+        brackets.append(bisect_left(plan.tax_table.uppers, max(gross - exempt - pre_tax, 0.0)))
+        employer_pieces.append(tuple(_employer_piece(rule, gross, ppy, ytd_known) for rule in employer_rules))
+
+    return ProfileCurve(
+        knots=tuple(knots),
+        brackets=tuple(brackets),
+        exemptions=exemptions,
+        exempt_total=exempt,
+        deductions=tuple(deductions),
+        deduction_pieces=tuple(deduction_pieces),
+        benefits=tuple(benefits),
+        benefit_pieces=tuple(benefit_pieces),
+        employer=employer,
+        employer_pieces=tuple(employer_pieces),
+        tax_table=plan.tax_table,
+    )
+
+
+class ProfileCurveCache:
+    """
+    Thread-safe LRU of built curves by profile_key. Curves are immutable, so they are shared
+    without copying. Misses and evictions are counted on /metrics under kind="profile_curve";
+    hits (one per evaluated employee) are only counted on the instance, to keep the hot path cheap.
+    max_entries <= 0 disables caching (every lookup builds a curve).
+    """
+
+    def __init__(self, max_entries: int = PROFILE_CURVE_CACHE_MAX_ENTRIES, kind: str = "profile_curve"):
+        self.max_entries = int(max_entries)
+        self.hits = 0
+        self._entries: "OrderedDict[Hashable, ProfileCurve]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._misses = CALC_CACHE_MISSES.labels(kind=kind)
+        self._evictions = CALC_CACHE_EVICTIONS.labels(kind=kind, reason="lru")
+
+    def curve_for(self, calc_emp, plan: CountryRulePlan, ytd: Optional[Mapping[str, float]] = None) -> ProfileCurve:
+        """The curve of calc_emp's profile under plan (built on first use)."""
+        ytd_known = ytd is not None
+        key = profile_key(calc_emp, plan, ytd_known)
+        with self._lock:
+            curve = self._entries.get(key)
+            if curve is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return curve
+
+        self._misses.inc()
+        curve = build_profile_curve(calc_emp, plan, ytd_known)
+        if self.max_entries > 0:
+            with self._lock:
+                self._entries[key] = curve
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+                    self._evictions.inc()
+        return curve
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+# Shared by calculate_gross_to_net(profile_curves=True) in the API process and each payrun worker
+profile_curve_cache = ProfileCurveCache()
@@ -0,0 +1,82 @@
+# app/services/profiles.py
+
+from dataclasses import dataclass
+from typing import Any, Dict, FrozenSet, List, Mapping, Optional, Sequence, Tuple
+
+from app.config.rule_plan import BenefitRule, CountryRulePlan, DeductionRule, EmployerRule
+from app.models.calc_input import CalcInput
+
+# (country, opted-in names, exempt allowance names)
+ProfileKey = Tuple[Optional[str], FrozenSet[str], FrozenSet[str]]
+
+
+@dataclass(frozen=True)
+class RuleProfile:
+    """
+    The rules of one country plan that apply to every employee of a profile bucket, resolved once.
+    Passed to the calculators (profile=...) in place of the per-employee opt-in checks:
+      - deductions:        statutory contributions + opted-in optional deductions, in plan order
+      - benefits:          opted-in optional benefits, in plan order (dict opt-in overrides are
+                           still read per employee)
+      - employer:          statutory employer contributions + employer side of opted-in benefits
+      - exempt_allowances: tax-exempt allowance names the bucket's employees carry
+    """
+    key: ProfileKey
+    deductions: Tuple[DeductionRule, ...]
+    benefits: Tuple[BenefitRule, ...]
+    employer: Tuple[EmployerRule, ...]
+    exempt_allowances: Tuple[str, ...]
+
+
+@dataclass
+class ProfileBucket:
+    """Employees (by position in the grouped list) sharing one RuleProfile; profile is None for an unknown country."""
+    profile: Optional[RuleProfile]
+    indexes: List[int]
+
+
+def _opted_names(opt_ins: Mapping[str, Any]) -> FrozenSet[str]:
+    return frozenset(name for name, value in opt_ins.items() if value)
+
+
+def profile_key(calc_emp: CalcInput, plan: Optional[CountryRulePlan]) -> ProfileKey:
+    """Bucket key of an employee: country, opted-in names, and the plan's exempt allowances it carries."""
+    allowances = calc_emp.allowances
+    exempt = frozenset(name for name in allowances if plan is not None and name in plan.exempt_allowances)
+    return calc_emp.country, _opted_names(calc_emp.benefits_opt_in), exempt
+
+
+def resolve_profile(plan: CountryRulePlan, key: ProfileKey) -> RuleProfile:
+    """Walk the plan's rules once for a bucket: filter everything by the bucket's opt-ins."""
+    _, opted_names, exempt = key
+    deductions = plan.employee_contributions + tuple(
+        item for item in plan.other_employee_deductions if not item.optional or item.name in opted_names
+    )
+    benefits = tuple(benefit for benefit in plan.optional_benefits if benefit.name in opted_names)
+    employer = plan.employer_contributions + tuple(
+        benefit.employer for benefit in benefits if benefit.employer is not None
+    )
+    return RuleProfile(
+        key=key,
+        deductions=tuple(deductions),
+        benefits=benefits,
+        employer=tuple(employer),
+        exempt_allowances=tuple(name for name in plan.exempt_allowances if name in exempt),
+    )
+
+
+def group_by_profile(employees: Sequence[CalcInput], plans: Mapping[str, CountryRulePlan]) -> List[ProfileBucket]:
+    """
+    Grouping stage of a bulk run: bucket employees by (country, opted-in names, exempt allowance
+    names) and resolve each bucket's rules once. Buckets come in order of first appearance;
+    employees without a country plan share a bucket per country with profile None.
+    """
+    buckets: Dict[ProfileKey, ProfileBucket] = {}
+    for index, calc_emp in enumerate(employees):
+        plan = plans.get(calc_emp.country)
+        key = profile_key(calc_emp, plan) if plan is not None else (calc_emp.country, frozenset(), frozenset())
+        bucket = buckets.get(key)
+        if bucket is None:
+            bucket = buckets[key] = ProfileBucket(resolve_profile(plan, key) if plan is not None else None, [])
+        bucket.indexes.append(index)
+    return list(buckets.values())
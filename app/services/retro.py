@@ -0,0 +1,156 @@
+# app/services/retro.py
+
+from dataclasses import dataclass
+from datetime import date
+from itertools import groupby
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple
+
+from app.config.config_patch import merge_config_section
+from app.config.effective import PlanTimeline
+from app.config.rule_plan import CountryRulePlan, compile_country_plan
+from app.models.calc_input import CalcInput
+from app.services.batch_engine import build_columns, calculate_batch, calculate_batch_minor
+from app.services.gross_to_net import ARITHMETIC_FLOAT, ARITHMETIC_MINOR_UNITS
+from app.services.ytd import ytd_increments
+
+# Stored calculator inputs a back-dated change may override (see calc_cache.normalized_inputs)
+RETRO_INPUT_FIELDS = (
+    "hourly_rate", "hours_worked", "overtime_hours", "bonuses", "base_pay", "allowances", "benefits_opt_in",
+)
+# Adjustment component for the employer cost total (the other components are YTD keys)
+EMPLOYER_COST_COMPONENT = "total_employer_cost"
+
+
+@dataclass
+class RetroRow:
+    """One stored EmployeePay row in the retro window (what was originally paid)."""
+    employee_pay_id: int
+    payrun_id: int
+    employee_id: str
+    pay_period: str
+    period_start: date
+    config_version: Optional[str]
+    calc_inputs: Optional[Dict[str, Any]]
+    ytd_increments: Optional[Dict[str, float]]
+    total_employer_cost: float
+
+
+@dataclass
+class RetroLine:
+    """One adjustment line: recomputed minus originally paid, for one component of one past row."""
+    employee_id: str
+    source_employee_pay_id: int
+    source_pay_period: str
+    component: str
+    amount: float
+
+
+def validate_input_changes(changes: Mapping[str, Mapping[str, Any]]) -> None:
+    """Raise ValueError if a change touches anything but the stored calculator inputs."""
+    for employee_id, fields in changes.items():
+        unknown = sorted(set(fields) - set(RETRO_INPUT_FIELDS))
+        if unknown:
+            raise ValueError(f"{employee_id}: cannot change {unknown}; allowed fields are {list(RETRO_INPUT_FIELDS)}")
+
+
+def version_plans(
+    timeline: PlanTimeline, config_versions: Iterable[Optional[str]], patch: Optional[Mapping[str, Any]] = None
+) -> Dict[str, CountryRulePlan]:
+    """
+    compute_retro_adjustments plans for rows paid with config_versions: every effective-dated
+    version of the country among them, with the back-dated patch (if any) applied to that version.
+    Versions no longer in the config are left out (their rows are reported).
+    """
+    wanted = set(config_versions)
+    plans: Dict[str, CountryRulePlan] = {}
+    for config, plan in zip(timeline.configs, timeline.plans):
+        if plan.config_version in wanted:
+            plans[plan.config_version] = (
+                compile_country_plan(timeline.country, merge_config_section(config, patch)) if patch else plan
+            )
+    return plans
+
+
+def _components(increments: Mapping[str, float], total_employer_cost: float) -> Dict[str, float]:
+    components = {key: float(amount) for key, amount in (increments or {}).items()}
+    components[EMPLOYER_COST_COMPONENT] = round(float(total_employer_cost or 0.0), 2)
+    return components
+
+
+def compute_retro_adjustments(
+    rows: Iterable[RetroRow],
+    plans: Mapping[str, CountryRulePlan],
+    changes: Optional[Mapping[str, Mapping[str, Any]]] = None,
+    baseline_ytd: Optional[Mapping[Tuple[str, int], Mapping[str, float]]] = None,
+    arithmetic: str = ARITHMETIC_FLOAT,
+) -> Tuple[List[RetroLine], List[Dict[str, Any]]]:
+    """
+    Recompute past rows and return the per-component differences against what was paid.
+
+      - plans: config_version -> plan to recompute with (the rules that applied at the time,
+        with any back-dated rule change already applied); rows whose version is missing are reported,
+        as are rows without calc_inputs (e.g. payrun_store.bulk_load_table rows): they cannot be recomputed
+      - changes: employee_id -> calculator input overrides (e.g. a back-dated hourly_rate)
+      - baseline_ytd: (employee_id, tax_year) -> YTD used before the first row of the window
+
+    Rows are processed period by period (oldest first), one batch-engine pass per period, with YTD
+    rebuilt from the recomputed rows, so annual limits/caps see the corrected history.
+    Returns (lines, errors); zero differences produce no line.
+    """
+    changes = changes or {}
+    engine = calculate_batch_minor if arithmetic == ARITHMETIC_MINOR_UNITS else calculate_batch
+    running: Dict[Tuple[str, int], Dict[str, float]] = {
+        key: dict(totals) for key, totals in (baseline_ytd or {}).items()
+    }
+
+    def add_to_running(employee_id: str, year: int, increments: Optional[Mapping[str, float]]) -> None:
+        totals = running.setdefault((employee_id, year), {})
+        for key, amount in (increments or {}).items():
+            totals[key] = round(totals.get(key, 0.0) + float(amount), 2)
+
+    lines: List[RetroLine] = []
+    errors: List[Dict[str, Any]] = []
+    ordered = sorted(rows, key=lambda r: (r.period_start, r.payrun_id, r.employee_pay_id))
+    for (period_start, _payrun_id), group in groupby(ordered, key=lambda r: (r.period_start, r.payrun_id)):
+        year = period_start.year
+        by_plan: Dict[str, List[RetroRow]] = {}
+        for row in group:
+            plan = plans.get(row.config_version)
+            if plan is None or not row.calc_inputs:
+                detail = (
+                    "No stored calc_inputs for this row." if not row.calc_inputs
+                    else f"Rules for config_version {row.config_version} are not available."
+                )
+                errors.append({"employee_id": row.employee_id, "employee_pay_id": row.employee_pay_id, "detail": detail})
+                add_to_running(row.employee_id, year, row.ytd_increments)  # keep what was paid in YTD
+                continue
+            by_plan.setdefault(row.config_version, []).append(row)
+
+        for version, plan_rows in by_plan.items():
+            plan = plans[version]
+            calc_emps = [
+                CalcInput.from_inputs(row.employee_id, {**row.calc_inputs, **changes.get(row.employee_id, {})})
+                for row in plan_rows
+            ]
+            ytd = [dict(running.get((row.employee_id, year), {})) for row in plan_rows]
+            records = engine(plan, build_columns(calc_emps, plan, ytd=ytd)).to_records()
+
+            for row, record in zip(plan_rows, records):
+                increments = ytd_increments(record["breakdown"])
+                recomputed = _components(increments, record["total_employer_cost"])
+                paid = _components(row.ytd_increments, row.total_employer_cost)
+                for component in sorted(set(recomputed) | set(paid)):
+                    amount = round(recomputed.get(component, 0.0) - paid.get(component, 0.0), 2)
+                    if amount:
+                        lines.append(RetroLine(row.employee_id, row.employee_pay_id, row.pay_period, component, amount))
+                add_to_running(row.employee_id, year, increments)
+
+    return lines, errors
+
+
+def adjustment_totals(lines: Iterable[RetroLine]) -> Dict[str, float]:
+    """Sum of adjustment lines by component."""
+    totals: Dict[str, float] = {}
+    for line in lines:
+        totals[line.component] = round(totals.get(line.component, 0.0) + line.amount, 2)
+    return totals
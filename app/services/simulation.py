@@ -0,0 +1,59 @@
+# app/services/simulation.py
+
+from typing import Any, Dict, List
+
+import numpy as np
+
+from app.config.rule_plan import CountryRulePlan
+from app.services.batch_engine import BatchResult, build_columns, calculate_batch, calculate_batch_minor
+from app.services.gross_to_net import ARITHMETIC_FLOAT, ARITHMETIC_MINOR_UNITS
+from app.services.payrun_recalc import TOTAL_FIELDS
+
+
+def _totals_arrays(result: BatchResult) -> Dict[str, np.ndarray]:
+    """Per-employee payrun-total fields as float arrays in major units (either engine)."""
+    arrays = {}
+    for total, name in TOTAL_FIELDS.items():
+        values = getattr(result, name)
+        arrays[total] = values / result.minor_unit_scale if result.minor_unit_scale else values.astype(np.float64)
+    return arrays
+
+
+def simulate_config_change(
+    calc_emps: List[Any],
+    plan: CountryRulePlan,
+    scenario_plan: CountryRulePlan,
+    arithmetic: str = ARITHMETIC_FLOAT,
+    include_employees: bool = False,
+) -> Dict[str, Any]:
+    """
+    What-if comparison of one population under the current and a patched country plan.
+    Both sides run through the vectorized batch engine (no per-employee calculators, nothing
+    persisted, no payslips), so cost is a few array passes per plan even for 100k employees.
+
+    Returns payrun-style totals for both plans and their delta; with include_employees also the
+    per-employee deltas (gross_pay, net_pay, income_tax, total_employer_cost).
+    YTD accumulators are not applied: annual limits/caps use the per-period approximation.
+    """
+    engine = calculate_batch_minor if arithmetic == ARITHMETIC_MINOR_UNITS else calculate_batch
+    baseline = _totals_arrays(engine(plan, build_columns(calc_emps, plan)))
+    scenario = _totals_arrays(engine(scenario_plan, build_columns(calc_emps, scenario_plan)))
+
+    summary = {
+        "employees": len(calc_emps),
+        "baseline_config_version": plan.config_version,
+        "scenario_config_version": scenario_plan.config_version,
+        "baseline": {total: round(float(values.sum()), 2) for total, values in baseline.items()},
+        "scenario": {total: round(float(values.sum()), 2) for total, values in scenario.items()},
+    }
+    summary["delta"] = {
+        total: round(summary["scenario"][total] - summary["baseline"][total], 2) for total in TOTAL_FIELDS
+    }
+
+    if include_employees:
+        deltas = {name: np.round(scenario[total] - baseline[total], 2) for total, name in TOTAL_FIELDS.items()}
+        summary["employee_deltas"] = [
+            {"employee_id": calc_emp.employee_id, **{name: float(values[i]) for name, values in deltas.items()}}
+            for i, calc_emp in enumerate(calc_emps)
+        ]
+    return summary
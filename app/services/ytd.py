@@ -0,0 +1,43 @@
+# app/services/ytd.py
+
+from typing import Any, Dict, Mapping, Optional
+
+# Running totals kept for every employee besides the per-component ones
+YTD_TOTALS = ("gross_pay", "income_tax", "net_pay")
+
+
+def ytd_key(side: str, name: str) -> str:
+    """Component key in the accumulator: 'employee:<deduction/benefit name>' or 'employer:<label>'."""
+    return f"{side}:{name}"
+
+
+def remaining_allowance(limit: Optional[float], ytd: Optional[Mapping[str, float]], key: str) -> Optional[float]:
+    """
+    How much of an annual limit is still available this tax year (never negative).
+    None when there is no limit or no YTD data was supplied (nothing to clamp against).
+    """
+    if limit is None or ytd is None:
+        return None
+    return max(limit - float(ytd.get(key, 0.0) or 0.0), 0.0)
+
+
+def ytd_increments(breakdown: Dict[str, Any]) -> Dict[str, float]:
+    """Amounts one calculation adds to the accumulators, by component key."""
+    increments = {name: float(breakdown[name]) for name in YTD_TOTALS}
+    benefits = breakdown["benefits_deductions"]
+    for dtype in ("pre_tax", "post_tax"):
+        for name, amount in benefits.get(dtype, {}).items():
+            key = ytd_key("employee", name)
+            increments[key] = increments.get(key, 0.0) + float(amount)
+    for label, amount in breakdown["employer_costs"].items():
+        key = ytd_key("employer", label)
+        increments[key] = increments.get(key, 0.0) + float(amount)
+    return {key: round(amount, 2) for key, amount in increments.items()}
+
+
+def subtract_increments(ytd: Mapping[str, float], previous: Optional[Mapping[str, float]]) -> Dict[str, float]:
+    """YTD as it was before a row being recalculated was added (ytd - previous increments)."""
+    result = dict(ytd)
+    for key, amount in (previous or {}).items():
+        result[key] = round(result.get(key, 0.0) - float(amount), 2)
+    return result
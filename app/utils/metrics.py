@@ -0,0 +1,47 @@
+# app/utils/metrics.py
+# Custom Prometheus metrics; exposed on /metrics together with the Instrumentator defaults.
+
+from prometheus_client import Counter, Histogram
+
+PAYRUN_CHUNK_SECONDS = Histogram(
+    "payroll_payrun_chunk_seconds",
+    "Time spent calculating one payrun chunk inside a worker process",
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120),
+)
+PAYRUN_EMPLOYEES = Counter(
+    "payroll_payrun_employees_total",
+    "Employees processed by the payrun executor",
+    ["status"],  # 'ok' / 'error'
+)
+
+CALC_CACHE_HITS = Counter(
+    "payroll_calc_cache_hits_total",
+    "Result cache hits on POST /calculate",
+    ["kind"],  # 'calculation' / 'payslip'
+)
+CALC_CACHE_MISSES = Counter(
+    "payroll_calc_cache_misses_total",
+    "Result cache misses on POST /calculate",
+    ["kind"],
+)
+CALC_CACHE_EVICTIONS = Counter(
+    "payroll_calc_cache_evictions_total",
+    "Entries dropped from the result cache",
+    ["kind", "reason"],  # reason: 'lru' / 'ttl'
+)
+
+CONFIG_RELOADS = Counter(
+    "payroll_config_reloads_total",
+    "Country config reload attempts",
+    ["status"],  # 'ok' / 'unchanged' / 'error'
+)
+CONFIG_CACHE = Counter(
+    "payroll_config_cache_total",
+    "Compiled country config cache lookups at load / reload",
+    ["result"],  # 'hit' / 'miss' / 'stale' / 'error'
+)
+TENANT_PLAN_CACHE = Counter(
+    "payroll_tenant_plan_cache_total",
+    "Lookups of compiled tenant-overlay views",
+    ["result"],  # 'hit' / 'miss' / 'evicted'
+)
@@ -0,0 +1,35 @@
+# app/utils/minor_units.py
+# Rounding primitives for integer minor-unit (e.g. cents) arithmetic.
+# Scalar and array versions apply the exact same float -> int rule so both paths agree.
+
+import math
+
+import numpy as np
+
+ROUNDING_MODES = ("half_up", "half_even")
+
+
+def round_units(value: float, mode: str = "half_up") -> int:
+    """Round a value already expressed in minor units to an int (half_up rounds ties away from zero)."""
+    if mode == "half_even":
+        return int(round(value))
+    if value >= 0:
+        return int(math.floor(value + 0.5))
+    return -int(math.floor(-value + 0.5))
+
+
+def round_units_array(values: np.ndarray, mode: str = "half_up") -> np.ndarray:
+    """Vectorized round_units -> int64 array."""
+    if mode == "half_even":
+        return np.rint(values).astype(np.int64)
+    return (np.sign(values) * np.floor(np.abs(values) + 0.5)).astype(np.int64)
+
+
+def to_minor(amount: float, scale: int, mode: str = "half_up") -> int:
+    """Major-unit amount (e.g. 12.34) -> minor units (1234)."""
+    return round_units(float(amount) * scale, mode)
+
+
+def from_minor(units: int, scale: int) -> float:
+    """Minor units (1234) -> major-unit float for responses and DB columns (12.34)."""
+    return int(units) / scale
@@ -0,0 +1,75 @@
+# benchmarks/bench_config_cache.py
+"""
+Cold-start cost of loading the country config: JSON parse + schema validation + compilation
+(a cache miss) against loading the compiled-config cache (a hit). The shipped config is scaled
+to `copies` renamed copies of every country, each with `versions` effective-dated changes,
+to stand in for a larger deployment. Best of several repeats.
+
+    python -m benchmarks.bench_config_cache [copies] [versions] [repeats]
+"""
+
+import json
+import os
+import sys
+import tempfile
+import time
+
+from app.config.compiled_cache import CompiledConfigCache
+from app.config.country_config import CONFIG_PATH
+from app.config.registry import JsonFileSource, load_snapshot
+
+
+def _scaled_config(copies: int, versions: int) -> dict:
+    with open(CONFIG_PATH, "r", encoding="utf-8") as f:
+        base = json.load(f)
+    config = {}
+    for i in range(copies):
+        for country, section in base.items():
+            brackets = section.get("income_tax_brackets") or []
+            changes = [
+                {
+                    "effective_from": f"{2026 + v}-01-01",
+                    "changes": {"income_tax_brackets": [
+                        {"up_to": None if b["up_to"] is None else round(b["up_to"] * (1.03 ** (v + 1)), 2), "rate": b["rate"]}
+                        for b in brackets
+                    ]},
+                }
+                for v in range(versions)
+            ] if brackets else []
+            config[f"{country} {i}"] = {**section, "effective_versions": changes} if changes else section
+    return config
+
+
+def _best(fn, repeats: int) -> float:
+    best = float("inf")
+    for _ in range(repeats):
+        started = time.perf_counter()
+        loaded = fn()
+        best = min(best, time.perf_counter() - started)
+        del loaded  # freeing the snapshot is not part of a cold start
+    return best
+
+
+def main(copies: int = 20, versions: int = 3, repeats: int = 5) -> None:
+    with tempfile.TemporaryDirectory() as workdir:
+        path = os.path.join(workdir, "country_config.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(_scaled_config(copies, versions), f)
+        source = JsonFileSource(path)
+        cache = CompiledConfigCache(os.path.join(workdir, "cache"))
+
+        miss = _best(lambda: load_snapshot(source), repeats)
+        load_snapshot(source, cache)  # write the cache file
+        hit = _best(lambda: load_snapshot(source, cache), repeats)
+        snapshot = load_snapshot(source, cache)
+        plans = sum(len(t.plans) for t in snapshot.effective.timelines.values())
+        json_size, cache_size = os.path.getsize(path), os.path.getsize(cache.path(cache.key(source.read_bytes())))
+
+    print(f"{len(snapshot.plans)} countries, {plans} compiled versions, "
+          f"JSON {json_size / 1024:.0f} KiB, cache file {cache_size / 1024:.0f} KiB, best of {repeats}")
+    print(f"  compile (miss) {miss * 1000:8.1f} ms")
+    print(f"  cache   (hit)  {hit * 1000:8.1f} ms  ({miss / hit:.1f}x faster)")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:4]))
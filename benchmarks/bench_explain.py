@@ -0,0 +1,66 @@
+# benchmarks/bench_explain.py
+"""
+Per-employee cost of calculate_gross_to_net with explain mode off (the default, trace=None)
+and on (trace=[]), in both arithmetic modes, on a synthetic population with random opt-ins.
+Best of several repeats, so run it on two checkouts to compare the disabled path across a change.
+
+    python -m benchmarks.bench_explain [employees_per_country] [repeats]
+"""
+
+import inspect
+import random
+import sys
+import time
+from typing import List, Tuple
+
+from app.config.country_config import country_plans
+from app.models.calc_input import CalcInput
+from app.services.gross_to_net import ARITHMETIC_MODES, calculate_gross_to_net
+
+
+def _population(employees_per_country: int, seed: int = 42) -> List[Tuple[CalcInput, object]]:
+    rng = random.Random(seed)
+    population = []
+    for country, plan in country_plans.items():
+        names = [b.name for b in plan.optional_benefits] + [d.name for d in plan.other_employee_deductions if d.optional]
+        for i in range(employees_per_country):
+            employee = CalcInput(
+                employee_id=f"{country}-{i}", country=country,
+                hourly_rate=0.0, hours_worked=0.0, overtime_hours=0.0,
+                bonuses=rng.choice([0.0, 0.0, 0.0, 500.0]),
+                base_pay=round(rng.uniform(1_000, 250_000), 2),
+                allowances={}, benefits_opt_in={name: True for name in rng.sample(names, rng.randint(0, len(names)))},
+            )
+            population.append((employee, plan))
+    return population
+
+
+def _chain_us(population, arithmetic: str, explain: bool, repeats: int) -> float:
+    best = float("inf")
+    for _ in range(repeats):
+        started = time.perf_counter()
+        if explain:
+            for employee, plan in population:
+                calculate_gross_to_net(employee, plan, arithmetic=arithmetic, ytd={}, trace=[])
+        else:
+            for employee, plan in population:
+                calculate_gross_to_net(employee, plan, arithmetic=arithmetic, ytd={})
+        best = min(best, time.perf_counter() - started)
+    return best / len(population) * 1e6
+
+
+def main(employees_per_country: int = 10_000, repeats: int = 5) -> None:
+    population = _population(employees_per_country)
+    traced = "trace" in inspect.signature(calculate_gross_to_net).parameters
+    print(f"{len(population)} employees, {len(country_plans)} countries, best of {repeats}")
+    for arithmetic in ARITHMETIC_MODES:
+        off = _chain_us(population, arithmetic, False, repeats)
+        line = f"  {arithmetic:12s} explain off {off:6.2f} us/employee"
+        if traced:
+            on = _chain_us(population, arithmetic, True, repeats)
+            line += f" | explain on {on:6.2f} us ({on / off:.2f}x)"
+        print(line)
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:3]))
@@ -0,0 +1,81 @@
+# benchmarks/bench_profile_curves.py
+"""
+Per-employee cost of deductions + employer costs with the rule walk (before) and on the cached
+per-profile curves (after), alone and inside the full calculate_gross_to_net chain, on a
+synthetic population that shares a handful of opt-in profiles.
+
+    python -m benchmarks.bench_profile_curves [employees_per_country] [profiles]
+"""
+
+import random
+import sys
+import time
+from typing import List, Tuple
+
+from app.config.country_config import country_plans
+from app.models.calc_input import CalcInput
+from app.services.deductions import calculate_deductions
+from app.services.employer_costs import calculate_employer_costs
+from app.services.gross_pay import calculate_gross_pay
+from app.services.gross_to_net import calculate_gross_to_net
+from app.services.profile_curves import profile_curve_cache
+
+
+def _population(employees_per_country: int, profiles: int, seed: int = 42) -> List[Tuple[CalcInput, object]]:
+    rng = random.Random(seed)
+    population = []
+    for country, plan in country_plans.items():
+        names = [b.name for b in plan.optional_benefits] + [d.name for d in plan.other_employee_deductions if d.optional]
+        choices = [
+            {name: True for name in rng.sample(names, rng.randint(0, len(names)))}
+            for _ in range(profiles)
+        ]
+        for i in range(employees_per_country):
+            employee = CalcInput(
+                employee_id=f"{country}-{i}", country=country,
+                hourly_rate=0.0, hours_worked=0.0, overtime_hours=0.0,
+                bonuses=rng.choice([0.0, 0.0, 0.0, 500.0]),
+                base_pay=round(rng.uniform(1_000, 250_000), 2),
+                allowances={}, benefits_opt_in=rng.choice(choices),
+            )
+            population.append((employee, plan))
+    return population
+
+
+def _stage_us(population, profile_curves: bool, ytd) -> float:
+    """Deductions + employer costs only (gross pay computed up front)."""
+    grosses = [calculate_gross_pay(employee, plan)[0] for employee, plan in population]
+    started = time.perf_counter()
+    for (employee, plan), gross in zip(population, grosses):
+        if profile_curves:
+            profile_curve_cache.curve_for(employee, plan, ytd).evaluate(gross, ytd)
+        else:
+            calculate_deductions(employee, gross, plan, ytd=ytd)
+            calculate_employer_costs(employee, gross, plan, ytd=ytd)
+    return (time.perf_counter() - started) / len(population) * 1e6
+
+
+def _chain_us(population, profile_curves: bool, ytd) -> float:
+    started = time.perf_counter()
+    for employee, plan in population:
+        calculate_gross_to_net(employee, plan, ytd=ytd, profile_curves=profile_curves)
+    return (time.perf_counter() - started) / len(population) * 1e6
+
+
+def main(employees_per_country: int = 20_000, profiles: int = 4) -> None:
+    population = _population(employees_per_country, profiles)
+    print(f"{len(population)} employees, {len(country_plans)} countries, {profiles} opt-in profiles per country")
+    for label, ytd in (("no YTD", None), ("with YTD", {})):
+        profile_curve_cache.clear()
+        for stage, measure in (("deductions + employer", _stage_us), ("gross_to_net chain", _chain_us)):
+            before = measure(population, False, ytd)
+            after = measure(population, True, ytd)
+            print(
+                f"  {label:8s} {stage:22s} rule walk {before:6.2f} us/employee"
+                f" | curves {after:6.2f} us ({before / after:.1f}x)"
+            )
+        print(f"  {len(profile_curve_cache)} curves built")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:3]))
@@ -1,9 +1,60 @@
 import pytest
 from app.main import app
-from app.database.connection import AsyncSessionLocal
+from app.database.connection import AsyncSessionLocal, Base
+from app.models.calc_input import CalcInput
+from app.models import payrun as payrun_models
 from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import Session, sessionmaker
+
+
+@compiles(JSONB, "sqlite")
+def _jsonb_on_sqlite(type_, compiler, **kw):
+    return "JSON"
+
+
+# Calculator inputs of CalcInput.from_inputs (everything else is identity: employee_id, country, ...)
+CALC_INPUT_FIELDS = ("hourly_rate", "hours_worked", "overtime_hours", "bonuses", "base_pay", "allowances", "benefits_opt_in")
+
+
+@pytest.fixture
+def calc_employee():
+    """
+    Builds a CalcInput with CalcInput.from_inputs: calc_employee(inputs=None, **overrides)
+      - inputs: an employee dict (bundle / request employee or stored calc_inputs); missing
+        numbers are 0 and missing allowances / opt-ins empty, other keys are ignored
+      - overrides: input fields replacing those of inputs, or identity (employee_id, country, tenant_id, metadata)
+    """
+    def build(inputs=None, employee_id="", **overrides):
+        identity = {name: overrides.pop(name) for name in list(overrides) if name not in CALC_INPUT_FIELDS}
+        return CalcInput.from_inputs(employee_id, {**(inputs or {}), **overrides}, **identity)
+    return build
+
 
 @pytest.fixture
 async def async_db_session():
     async with AsyncSessionLocal() as session:
-        yield session
\ No newline at end of file
+        yield session
+
+
+@pytest.fixture
+def payroll_db(tmp_path):
+    """
+    Async session factory on a fresh SQLite file database with every table created, tenant 1
+    and its USA employees e1 and e2 (a file, so any event loop can open connections to it).
+    """
+    path = tmp_path / "payroll.db"
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine)
+    payrun_models.Base.metadata.create_all(engine)
+    with Session(engine) as session:
+        session.add(payrun_models.Tenant(id=1, name="Acme"))
+        session.add_all([payrun_models.Employee(id=e, tenant_id=1, full_name=e, country="USA") for e in ("e1", "e2")])
+        session.commit()
+    engine.dispose()
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    yield sessionmaker(bind=async_engine, class_=AsyncSession, expire_on_commit=False)
+    async_engine.sync_engine.dispose()
@@ -0,0 +1,46 @@
+import json
+
+import pytest
+
+from app.config.country_config import country_plans
+from app.services.batch_engine import build_columns, calculate_batch
+from app.services.deductions import calculate_deductions
+from app.services.employer_costs import calculate_employer_costs
+from app.services.gross_pay import calculate_gross_pay
+
+with open("tests/test_employees_bundle.json") as f:
+    test_employees = json.load(f)
+
+
+@pytest.mark.parametrize("country", sorted({e["employee"]["country"] for e in test_employees}))
+def test_batch_matches_scalar_to_the_cent(country, calc_employee):
+    plan = country_plans[country]
+    benefit_names = [b.name for b in plan.optional_benefits]
+    cohort = []
+    for payload in test_employees:
+        emp = payload["employee"]
+        if emp["country"] != country:
+            continue
+        # Spread each bundle employee over a range of rates and opt-in profiles
+        for i, scale in enumerate((0.0, 0.37, 1.0, 2.5, 40.0)):
+            opt_ins = dict(emp.get("benefits_opt_in") or {})
+            if benefit_names:
+                opt_ins[benefit_names[i % len(benefit_names)]] = {"amount": 35.5} if i % 2 else True
+            cohort.append(calc_employee(emp, hourly_rate=emp["hourly_rate"] * scale, benefits_opt_in=opt_ins))
+
+    result = calculate_batch(plan, build_columns(cohort, plan))
+
+    for calc_emp, record in zip(cohort, result.to_records()):
+        gross, _, _, _ = calculate_gross_pay(calc_emp, plan)
+        deductions = calculate_deductions(calc_emp, gross, plan)
+        total_employer_cost, employer_costs = calculate_employer_costs(calc_emp, gross, plan)
+        breakdown = record["breakdown"]
+
+        assert record["gross_pay"] == gross
+        assert record["net_pay"] == gross - float(deductions["total_deductions"])
+        assert breakdown["income_tax"] == deductions["income_tax"]
+        assert breakdown["taxable_income"] == deductions["taxable_income"]
+        assert breakdown["benefits_deductions"]["pre_tax"] == deductions["pre_tax_breakdown"]
+        assert breakdown["benefits_deductions"]["post_tax"] == deductions["post_tax_breakdown"]
+        assert record["total_employer_cost"] == total_employer_cost
+        assert breakdown["employer_costs"] == employer_costs
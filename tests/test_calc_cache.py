@@ -0,0 +1,94 @@
+from functools import partial
+
+import pytest
+
+from app.config.country_config import country_config, country_plans
+from app.config.rule_plan import compile_country_plan
+from app.services.calc_cache import ResultCache, calculation_key, payslip_key, ytd_clamps
+from app.services.gross_to_net import calculate_gross_to_net
+
+INPUTS = {"hourly_rate": 25, "hours_worked": 160, "allowances": {"Transport": 100, "Meal": 50}, "benefits_opt_in": {"RRSP_optional": True}}
+
+
+@pytest.fixture
+def employee(calc_employee):
+    """calc_employee with this module's inputs and identity (keyword arguments override them)."""
+    return partial(calc_employee, INPUTS, tenant_id=1, employee_id="emp-001", metadata={"full_name": "A. Tester"})
+
+
+def test_key_ignores_formatting_and_identity_but_not_inputs(employee):
+    plan = country_plans["Canada"]
+    key = calculation_key(employee(), plan, arithmetic="float")
+
+    same = employee(
+        hourly_rate=25.0,
+        allowances={"Meal": "50", "Transport": 100.0},
+        benefits_opt_in={"RRSP_optional": True, "Unused": False},
+        employee_id="emp-002",
+        metadata={},
+    )
+    assert calculation_key(same, plan, arithmetic="float") == key
+
+    assert calculation_key(employee(bonuses=1), plan, arithmetic="float") != key
+    assert calculation_key(employee(), plan, arithmetic="minor_units") != key
+    assert calculation_key(employee(), country_plans["Spain"], arithmetic="float") != key
+
+
+def test_config_change_changes_key(employee):
+    edited = dict(country_config["Canada"], overtime_multiplier=2.0)
+    plan = compile_country_plan("Canada", edited)
+    assert plan.config_version != country_plans["Canada"].config_version
+    assert calculation_key(employee(), plan) != calculation_key(employee(), country_plans["Canada"])
+
+
+def test_ytd_in_the_key_is_only_what_is_left_of_annual_limits(employee):
+    plan = country_plans["Canada"]
+    calc_emp = employee(benefits_opt_in={"rrsp": True})
+    first = {"gross_pay": 4000.0, "net_pay": 3000.0, "employee:rrsp": 200.0}
+    second = {"gross_pay": 8000.0, "net_pay": 6000.0, "employee:rrsp": 200.0, "employee:dental": 50.0}
+
+    def key(ytd):
+        return calculation_key(calc_emp, plan, arithmetic="float", ytd=ytd_clamps(plan, ytd))
+
+    assert key(first) == key(second)
+    assert calculate_gross_to_net(calc_emp, plan, ytd=first) == calculate_gross_to_net(calc_emp, plan, ytd=second)
+    assert key({**first, "employee:rrsp": 300.0}) != key(first)
+    assert key(None) != key({})  # without YTD nothing clamps
+
+
+def test_payslip_key_includes_metadata_and_company(employee):
+    calc_emp = employee()
+    key = payslip_key("abc", calc_emp, {"company_name": "Acme"})
+    assert payslip_key("abc", calc_emp, {"company_name": "Acme"}) == key
+    assert payslip_key("abc", calc_emp, {"company_name": "Other"}) != key
+    assert payslip_key("abc", employee(metadata={"full_name": "B"}), {"company_name": "Acme"}) != key
+
+
+def test_lru_eviction_and_ttl():
+    now = [0.0]
+    cache = ResultCache(max_entries=2, ttl_seconds=10, clock=lambda: now[0])
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1  # "a" is now most recently used
+    cache.put("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    assert len(cache) == 2
+
+    now[0] = 10.0
+    assert cache.get("a") is None
+    assert len(cache) == 1
+
+
+def test_cached_values_are_isolated_and_disabled_cache_stores_nothing():
+    cache = ResultCache(max_entries=4, ttl_seconds=60)
+    result = {"breakdown": {"net_pay": 100.0}}
+    cache.put("k", result)
+    result["breakdown"]["net_pay"] = 0.0
+    hit = cache.get("k")
+    hit["breakdown"]["net_pay"] = -1.0
+    assert cache.get("k") == {"breakdown": {"net_pay": 100.0}}
+
+    disabled = ResultCache(max_entries=0, ttl_seconds=60)
+    disabled.put("k", 1)
+    assert disabled.get("k") is None and len(disabled) == 0
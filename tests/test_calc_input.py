@@ -0,0 +1,59 @@
+import dataclasses
+import pickle
+from decimal import Decimal
+
+import pytest
+
+from app.models.calc_input import CalcInput
+from app.models.employee import Employee
+from app.models.payrun import Employee as EmployeeORM
+
+
+def _request_employee(**overrides):
+    values = dict(
+        tenant_id=7, employee_id="emp-001", country="Canada", gross_salary=0, hourly_rate=25, hours_worked=160,
+        allowances={"Meal": 50}, benefits_opt_in={"private_pension": True, "meal_subsidy": None},
+    )
+    values.update(overrides)
+    return Employee(**values)
+
+
+def test_request_values_win_and_master_record_fills_the_gaps():
+    master = EmployeeORM(
+        id="emp-001", tenant_id=7, full_name="A. Tester", job_title="Engineer", country="USA",
+        base_pay=Decimal("4200.50"), hourly_rate=Decimal("30"),
+    )
+    calc_emp = CalcInput.from_employee(_request_employee(), master)
+
+    assert calc_emp.country == "USA"  # master record is the source of truth
+    assert calc_emp.hourly_rate == 25.0 and calc_emp.base_pay == 4200.5
+    assert calc_emp.hours_worked == 160.0 and calc_emp.overtime_hours == 0.0 and calc_emp.bonuses == 0.0
+    assert calc_emp.tenant_id == 7 and calc_emp.employee_id == "emp-001"
+    assert calc_emp.allowances == {"Meal": 50.0}
+    assert calc_emp.benefits_opt_in == {"private_pension": True, "health_insurance_top_up": False}
+    assert calc_emp.metadata["full_name"] == "A. Tester" and calc_emp.metadata["tax_id"] is None
+
+    with_metadata = CalcInput.from_employee(_request_employee(metadata={"full_name": "B. Tester"}), master)
+    assert with_metadata.metadata["full_name"] == "B. Tester"
+
+
+def test_without_master_record():
+    calc_emp = CalcInput.from_employee(_request_employee())
+    assert calc_emp.country == "Canada" and calc_emp.base_pay == 0.0
+    assert set(calc_emp.metadata.values()) == {None}
+
+
+def test_from_stored_inputs():
+    calc_emp = CalcInput.from_inputs("e1", {"hourly_rate": "30", "bonuses": None, "allowances": {"Meal": 10}}, country="Canada")
+    assert calc_emp == CalcInput(employee_id="e1", country="Canada", hourly_rate=30.0, allowances={"Meal": 10})
+
+
+def test_input_is_frozen_slotted_and_picklable():
+    calc_emp = CalcInput.from_employee(_request_employee())
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        calc_emp.bonuses = 100.0
+    assert not hasattr(calc_emp, "__dict__")
+    assert pickle.loads(pickle.dumps(calc_emp)) == calc_emp
+
+    changed = calc_emp.with_changes(bonuses=100.0)
+    assert changed.bonuses == 100.0 and calc_emp.bonuses == 0.0
@@ -0,0 +1,141 @@
+import json
+
+import pytest
+
+pa = pytest.importorskip("pyarrow")
+
+from sqlalchemy import select  # noqa: E402
+
+from app.config.country_config import country_plans  # noqa: E402
+from app.models.payrun import EmployeePay, Payrun, YtdAccumulator  # noqa: E402
+from app.services.batch_engine import build_columns, calculate_batch, calculate_batch_minor  # noqa: E402
+from app.services.columnar import calculate_table, read_parquet, write_parquet  # noqa: E402
+from app.services.payrun_store import bulk_load_table, table_pay_rows  # noqa: E402
+from app.services.ytd import ytd_increments  # noqa: E402
+
+with open("tests/test_employees_bundle.json") as f:
+    test_employees = json.load(f)
+
+OVERRIDE = pa.struct([("rate", pa.float64()), ("amount", pa.float64()), ("pre_tax", pa.bool_())])
+
+
+def _cohort(calc_employee):
+    """Bundle employees over a few rates, each with its first optional benefit opted in (some with overrides)."""
+    cohort = []
+    for i, payload in enumerate(test_employees * 4):
+        emp = payload["employee"]
+        opt_ins = {k: v for k, v in (emp.get("benefits_opt_in") or {}).items() if v}
+        benefits = [b.name for b in country_plans[emp["country"]].optional_benefits]
+        if benefits:
+            opt_ins[benefits[0]] = {"amount": 35.5, "pre_tax": True} if i % 3 == 0 else True
+        cohort.append(calc_employee(
+            emp, employee_id=f"{emp['employee_id']}-{i}", tenant_id=int(emp["tenant_id"]), country=emp["country"],
+            hourly_rate=emp["hourly_rate"] * (0.5 + i % 4), benefits_opt_in=opt_ins,
+        ))
+    return cohort
+
+
+def _table(cohort, wide=False):
+    columns = {
+        "employee_id": [c.employee_id for c in cohort],
+        "tenant_id": [c.tenant_id for c in cohort],
+        "country": [c.country for c in cohort],
+        "hourly_rate": [c.hourly_rate for c in cohort],
+        "hours_worked": [c.hours_worked for c in cohort],
+        "overtime_hours": pa.array([c.overtime_hours or None for c in cohort], pa.float64()),  # nulls count as 0
+        "bonuses": [c.bonuses for c in cohort],
+    }
+    if not wide:
+        columns["allowances"] = pa.array([list(c.allowances.items()) for c in cohort], pa.map_(pa.string(), pa.float64()))
+        columns["benefits_opt_in"] = pa.array(
+            [[(k, True) for k, v in c.benefits_opt_in.items() if v is True] for c in cohort], pa.map_(pa.string(), pa.bool_())
+        )
+        overridden = sorted({k for c in cohort for k, v in c.benefits_opt_in.items() if isinstance(v, dict)})
+    else:
+        for name in dict.fromkeys(k for c in cohort for k in c.allowances):
+            columns[f"allowances.{name}"] = pa.array([c.allowances.get(name) for c in cohort], pa.float64())
+        overridden = sorted({k for c in cohort for k in c.benefits_opt_in})
+    for name in overridden:
+        structs = []
+        for c in cohort:
+            value = c.benefits_opt_in.get(name)
+            if isinstance(value, dict):
+                structs.append(value)
+            else:
+                structs.append({} if value and wide else None)  # {}: opted in without overrides
+        columns[f"benefits_opt_in.{name}"] = pa.array(structs, OVERRIDE)
+    return pa.table(columns)
+
+
+def _expected(cohort, engine):
+    records = [None] * len(cohort)
+    for country in {c.country for c in cohort}:
+        indexes = [i for i, c in enumerate(cohort) if c.country == country]
+        plan = country_plans[country]
+        for i, record in zip(indexes, engine(plan, build_columns([cohort[i] for i in indexes], plan)).to_records()):
+            records[i] = record
+    return records
+
+
+def _components(row, group):
+    return {k[len(group) + 1:]: v for k, v in row.items() if k.startswith(f"{group}.") and v is not None}
+
+
+@pytest.mark.parametrize("wide", [False, True])
+@pytest.mark.parametrize("arithmetic,engine", [("float", calculate_batch), ("minor_units", calculate_batch_minor)])
+def test_table_matches_the_batch_engine_on_calc_inputs(wide, arithmetic, engine, calc_employee):
+    cohort = _cohort(calc_employee)
+    rows = calculate_table(_table(cohort, wide), country_plans, arithmetic=arithmetic).to_pylist()
+
+    for calc_emp, row, record in zip(cohort, rows, _expected(cohort, engine)):
+        breakdown = record["breakdown"]
+        assert row["employee_id"] == calc_emp.employee_id and row["country"] == calc_emp.country
+        assert (row["gross_pay"], row["net_pay"], row["total_employer_cost"]) == (
+            record["gross_pay"], record["net_pay"], record["total_employer_cost"]
+        )
+        assert row["income_tax"] == breakdown["income_tax"] and row["taxable_income"] == breakdown["taxable_income"]
+        assert _components(row, "pre_tax") == breakdown["benefits_deductions"]["pre_tax"]
+        assert _components(row, "post_tax") == breakdown["benefits_deductions"]["post_tax"]
+        assert _components(row, "employer") == breakdown["employer_costs"]
+        assert _components(row, "allowances") == {k: round(v, 2) for k, v in calc_emp.allowances.items()}
+
+
+def test_parquet_round_trip_and_bulk_load_rows(tmp_path, calc_employee):
+    cohort = _cohort(calc_employee)
+    write_parquet(_table(cohort), tmp_path / "employees.parquet")
+    results = calculate_table(str(tmp_path / "employees.parquet"), country_plans)
+    write_parquet(results, tmp_path / "results.parquet")
+    assert read_parquet(tmp_path / "results.parquet").equals(results)
+
+    (values, components), record = table_pay_rows(results, country_plans)[0], _expected(cohort, calculate_batch)[0]
+    assert values["employee_id"] == cohort[0].employee_id and values["tenant_id"] == cohort[0].tenant_id
+    assert values["gross_pay"] == round(record["gross_pay"], 2) and values["config_version"] == country_plans[cohort[0].country].config_version
+    assert components["employer"] == record["breakdown"]["employer_costs"]
+    assert values["ytd_increments"] == ytd_increments(record["breakdown"])
+
+
+def test_unknown_country_is_rejected():
+    with pytest.raises(ValueError, match="Atlantis"):
+        calculate_table(pa.table({"employee_id": ["e1"], "country": ["Atlantis"]}), country_plans)
+
+
+async def test_bulk_load_only_adds_employees_new_to_the_payrun(payroll_db):
+    table = pa.table({
+        "employee_id": ["e1", "e2"], "tenant_id": [1, 1], "country": ["USA", "USA"],
+        "hourly_rate": [60.0, 40.0], "hours_worked": [160.0, 160.0],
+    })
+    results = calculate_table(table, country_plans)
+    async with payroll_db() as db:
+        await bulk_load_table(db, results.slice(0, 1), country_plans)
+        await db.commit()
+        with pytest.raises(ValueError, match=r"already in the payrun \['e1'\]"):
+            await bulk_load_table(db, results, country_plans)
+        with pytest.raises(ValueError, match=r"repeated in the table \['e2'\]"):
+            await bulk_load_table(db, pa.concat_tables([results.slice(1), results.slice(1)]), country_plans)
+        await db.rollback()
+
+        rows = (await db.scalars(select(EmployeePay))).all()
+        payrun = (await db.scalars(select(Payrun))).one()
+        ytd = (await db.scalars(select(YtdAccumulator).where(YtdAccumulator.component == "gross_pay"))).all()
+    assert [row.employee_id for row in rows] == ["e1"]
+    assert payrun.total_gross == rows[0].gross_pay == ytd[0].amount and len(ytd) == 1
@@ -0,0 +1,83 @@
+import json
+import os
+import pickle
+from datetime import date
+
+import pytest
+
+import app.config.registry as registry_module
+from app.config.compiled_cache import CompiledConfigCache
+from app.config.country_config import country_config
+from app.config.registry import ConfigRegistry, JsonFileSource, load_snapshot
+from app.models.calc_input import CalcInput
+from app.services.gross_to_net import calculate_gross_to_net
+
+DATED = {
+    **country_config["Canada"],
+    "effective_versions": [{"effective_from": "2026-01-01", "changes": {"overtime_multiplier": 2.0}}],
+}
+
+
+@pytest.fixture
+def source(tmp_path):
+    path = tmp_path / "country_config.json"
+    path.write_text(json.dumps({"Canada": DATED, "USA": country_config["USA"]}))
+    return JsonFileSource(str(path))
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return CompiledConfigCache(str(tmp_path / "cache"))
+
+
+def _no_compile(monkeypatch):
+    def fail(config):
+        raise AssertionError("compiled instead of loading the cache")
+    monkeypatch.setattr(registry_module, "compile_country_timelines", fail)
+
+
+def test_unchanged_file_loads_the_compiled_cache(source, cache, monkeypatch):
+    compiled = load_snapshot(source, cache)
+    assert os.path.exists(cache.path(cache.key(source.read_bytes())))
+
+    _no_compile(monkeypatch)
+    cached = ConfigRegistry(source, cache=cache).current
+    assert (cached.version, cached.config, cached.plans) == (compiled.version, compiled.config, compiled.plans)
+    assert cached.effective.timelines == compiled.effective.timelines
+    employee = CalcInput(hourly_rate=40, hours_worked=160, overtime_hours=10, bonuses=0, allowances={}, benefits_opt_in={})
+    for period in ("2025-03-01", "2026-03-01"):
+        plan, expected = cached.plans_for(date.fromisoformat(period))["Canada"], compiled.plans_for(date.fromisoformat(period))["Canada"]
+        assert calculate_gross_to_net(employee, plan) == calculate_gross_to_net(employee, expected)
+
+
+def test_edited_file_is_recompiled(source, cache):
+    first = load_snapshot(source, cache)
+    config = json.loads(source.read_bytes())
+    config["USA"]["overtime_multiplier"] = 1.75
+    with open(source.path, "w") as f:
+        json.dump(config, f)
+
+    second = load_snapshot(source, cache)
+    assert second.version != first.version and second.plans["USA"].overtime_multiplier == 1.75
+    assert len(os.listdir(cache.directory)) == 2  # one file per key
+
+
+def test_stale_corrupt_or_shared_cache_files_are_not_trusted(source, cache):
+    expected = load_snapshot(source, cache)
+    path = cache.path(cache.key(source.read_bytes()))
+    with open(path, "rb") as f:
+        header = f.read(38)
+
+    # A file whose header names another key (e.g. copied over) is never unpickled
+    with open(path, "wb") as f:
+        f.write(header[:-1] + bytes([header[-1] ^ 1]) + pickle.dumps({"version": "forged"}))
+    assert load_snapshot(source, cache).version == expected.version
+    # Truncated: recompiled and rewritten
+    with open(path, "r+b") as f:
+        f.truncate(100)
+    assert load_snapshot(source, cache).version == expected.version
+    assert cache.load(source.read_bytes())["version"] == expected.version
+
+    # A directory other users can write to is ignored
+    os.chmod(cache.directory, 0o777)
+    assert cache.load(source.read_bytes()) is None
@@ -0,0 +1,93 @@
+import json
+import os
+import time
+
+import pytest
+
+from app.config.country_config import country_config
+from app.config.registry import ConfigRegistry, JsonFileSource
+from app.models.calc_input import CalcInput
+from app.services.gross_to_net import calculate_gross_to_net
+
+
+def _write(path, config, bump=0):
+    path.write_text(json.dumps(config))
+    # Distinct mtimes even on coarse-grained filesystems
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + bump * 1_000_000_000))
+
+
+def _raise_rate(config, country, rate):
+    edited = json.loads(json.dumps(config))
+    edited[country]["statutory"]["employee_contributions"][0]["rate"] = rate
+    return edited
+
+
+@pytest.fixture
+def source(tmp_path):
+    path = tmp_path / "country_config.json"
+    _write(path, {country: country_config[country] for country in ("Canada", "USA")})
+    return path
+
+
+def test_reload_swaps_in_a_new_snapshot_and_leaves_the_old_one_intact(source):
+    registry = ConfigRegistry(JsonFileSource(str(source)))
+    swaps = []
+    registry.subscribe(lambda old, new: swaps.append((old.version, new.version)))
+    before = registry.current
+    employee = CalcInput(hourly_rate=40, hours_worked=160, overtime_hours=0, bonuses=0, allowances={}, benefits_opt_in={})
+    net_before = calculate_gross_to_net(employee, before.plans["Canada"]).net_pay
+
+    assert registry.reload() is False  # nothing changed on disk
+    _write(source, _raise_rate(json.loads(source.read_text()), "Canada", 0.2), bump=1)
+    assert registry.reload() is True
+
+    after = registry.current
+    assert swaps == [(before.version, after.version)] and after.version != before.version
+    assert after.plans["Canada"].config_version != before.plans["Canada"].config_version
+    assert after.plans["USA"].config_version == before.plans["USA"].config_version
+    # A calculation holding the old snapshot still sees the old rules
+    assert calculate_gross_to_net(employee, before.plans["Canada"]).net_pay == net_before
+    assert calculate_gross_to_net(employee, after.plans["Canada"]).net_pay < net_before
+
+
+def test_invalid_config_keeps_the_current_version(source):
+    registry = ConfigRegistry(JsonFileSource(str(source)))
+    current = registry.current
+
+    source.write_text('{"Canada": ')
+    with pytest.raises(ValueError):
+        registry.reload(force=True)
+    _write(source, {"Canada": {"pay_frequency": "fortnightly"}}, bump=2)
+    with pytest.raises(ValueError, match="pay_frequency"):
+        registry.reload()
+    assert registry.current is current
+
+
+def test_watcher_picks_up_changes(source):
+    registry = ConfigRegistry(JsonFileSource(str(source)))
+    version = registry.current.version
+    registry.watch(interval=0.02)
+    try:
+        _write(source, _raise_rate(json.loads(source.read_text()), "USA", 0.09), bump=3)
+        deadline = time.monotonic() + 5
+        while registry.current.version == version and time.monotonic() < deadline:
+            time.sleep(0.02)
+    finally:
+        registry.stop()
+    assert registry.current.version != version
+    assert registry.current.config["USA"]["statutory"]["employee_contributions"][0]["rate"] == 0.09
+
+
+def test_app_startup_starts_the_watcher_and_shutdown_stops_it(monkeypatch):
+    from fastapi.testclient import TestClient
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    import app.main as main
+
+    monkeypatch.setattr(main, "async_engine", create_async_engine("sqlite+aiosqlite:///:memory:"))
+    monkeypatch.setattr(main.settings, "country_config_reload_seconds", 30.0)
+    with TestClient(main.app):
+        watcher = main.config_registry._watcher
+        assert watcher is not None and watcher.is_alive()
+    assert main.config_registry._watcher is None and not watcher.is_alive()
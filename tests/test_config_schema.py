@@ -0,0 +1,61 @@
+import json
+
+import pytest
+
+from app.config.country_config import country_config, country_plans
+from app.config.rule_plan import compile_country_config, compile_country_plan
+from app.config.schema import ConfigValidationError
+
+
+def _edited(country, edit):
+    section = json.loads(json.dumps(country_config[country]))
+    edit(section)
+    return section
+
+
+def test_key_variants_are_normalized_once():
+    plan = compile_country_plan("Testland", {
+        "optional_benefits": {
+            "private_health": {"employee_fixed": 60, "pre_tax": False, "basis": "amount"},
+            "pension_top_up": {"employee_rate": 0.02, "employer_match_rate": 0.01, "employer_match_amount": None},
+        },
+    })
+    health, pension = plan.optional_benefits
+    assert (health.amount, health.rate, health.basis, health.amount_minor) == (60.0, None, "amount", 6000)
+    assert (pension.rate, pension.basis, pension.employer.rate, pension.employer.label) == (0.02, "gross", 0.01, "Employer pension_top_up")
+
+    with pytest.raises(ConfigValidationError, match="'employee_rate' and 'rate' both set"):
+        compile_country_plan("Testland", {"optional_benefits": {"x": {"rate": 0.01, "employee_rate": 0.02}}})
+
+
+def test_annual_deduction_amounts_are_prorated():
+    (hsa,) = [rule for rule in country_plans["USA"].other_employee_deductions if rule.name == "HSA"]
+    periods = country_plans["USA"].periods_per_year
+    assert hsa.amount == pytest.approx(3000 / periods) and hsa.amount_minor == round(300000 / periods)
+
+
+def test_every_invalid_section_is_reported_at_compile_time():
+    config = dict(country_config)
+    config["Canada"] = _edited("Canada", lambda c: c["statutory"]["employee_contributions"][0].update(rtae=0.05))
+    config["USA"] = _edited("USA", lambda c: c["optional_benefits"].update(typo={"amount": "sixty"}))
+    config["Spain"] = _edited("Spain", lambda c: c.update(rounding_mode="bankers", minor_unit_digits=-1))
+
+    with pytest.raises(ConfigValidationError) as excinfo:
+        compile_country_config(config)
+    errors = excinfo.value.errors
+    assert any(e.startswith("Canada: statutory.employee_contributions.0.rtae: Extra inputs") for e in errors)
+    assert any(e.startswith("USA: optional_benefits.typo.amount:") for e in errors)
+    assert any(e.startswith("Spain: rounding_mode: unknown rounding_mode 'bankers'") for e in errors)
+    assert any(e.startswith("Spain: minor_unit_digits:") for e in errors)
+
+
+@pytest.mark.parametrize("brackets,message", [
+    ([{"up_to": 0, "rate": 0.0}, {"up_to": None, "rate": 0.1}], "greater than 0"),
+    ([{"up_to": 10000, "rate": 0.1}, {"up_to": 50000, "rate": 0.2}], "be open-ended"),
+    ([{"up_to": None, "rate": 0.1}, {"up_to": None, "rate": 0.2}], "be open-ended"),
+    ([{"up_to": 50000, "rate": 0.1}, {"up_to": 10000, "rate": 0.2}, {"up_to": None, "rate": 0.3}], "strictly increasing"),
+    ([{"up_to": None, "rate": 20}], "less than or equal to 1"),
+])
+def test_malformed_brackets_fail(brackets, message):
+    with pytest.raises(ConfigValidationError, match=message):
+        compile_country_plan("Testland", {"income_tax_brackets": brackets})
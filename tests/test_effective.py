@@ -0,0 +1,100 @@
+from datetime import date
+
+import pytest
+
+from app.config.effective import EffectivePlans, compile_country_timeline, compile_country_timelines
+from app.config.rule_plan import compile_country_plan
+from app.config.schema import ConfigValidationError
+from app.models.calc_input import CalcInput
+from app.services.gross_to_net import calculate_gross_to_net
+from app.services.payrun_executor import _init_worker, calculate_chunk
+from app.services.retro import RetroRow, compute_retro_adjustments, version_plans
+from app.services.ytd import ytd_increments, ytd_key
+
+BASE = {
+    "statutory": {
+        "employee_contributions": [{"name": "Pension", "rate": 0.05, "pre_tax": True}],
+        "employer_contributions": [{"name": "Employer Levy", "rate": 0.10, "display_name": "Levy"}],
+    },
+    "income_tax_brackets": [{"up_to": 12000, "rate": 0.0}, {"up_to": None, "rate": 0.2}],
+}
+VERSIONS = [
+    {"effective_from": "2026-01-01", "changes": {"income_tax_brackets": [{"up_to": 24000, "rate": 0.0}, {"up_to": None, "rate": 0.25}]}},
+    {"effective_from": "2026-07-01", "changes": {"statutory": {"employee_contributions": [{"name": "Pension", "rate": 0.06}]}}},
+]
+CONFIG = {**BASE, "effective_versions": VERSIONS}
+INPUTS = {"hourly_rate": 40.0, "hours_worked": 160.0, "benefits_opt_in": {}}
+
+
+def _employee(employee_id="e1"):
+    return CalcInput.from_inputs(employee_id, INPUTS).with_changes(country="Testland")
+
+
+def test_versions_are_resolved_by_period_start():
+    timeline = compile_country_timeline("Testland", CONFIG)
+    base, january, july = timeline.plans
+
+    assert timeline.starts == (date.min, date(2026, 1, 1), date(2026, 7, 1))
+    assert [timeline.plan_at(day) for day in (date(2025, 12, 31), date(2026, 1, 1), date(2026, 6, 30), date(2026, 7, 1))] == [
+        base, january, january, july,
+    ]
+    # Every version carries the changes before it: July keeps January's brackets
+    assert july.income_tax_brackets == january.income_tax_brackets == ((24000.0, 0.0), (float("inf"), 0.25))
+    assert [rule.rate for rule in july.employee_contributions] == [0.06]
+    assert july.employee_contributions[0].pre_tax and base.employee_contributions[0].rate == 0.05
+    # The base version is hashed without its effective_versions: appending one does not re-version it
+    assert base.config_version == compile_country_plan("Testland", BASE).config_version
+    assert len({plan.config_version for plan in timeline.plans}) == 3
+
+
+def test_plans_for_memoizes_per_period_and_runs_side_by_side():
+    effective = EffectivePlans(compile_country_timelines({"Testland": CONFIG, "Flatland": BASE}))
+    current, previous = effective.plans_for(date(2026, 8, 1)), effective.plans_for(date(2025, 8, 1))
+
+    assert effective.plans_for(date(2026, 8, 1)) is current
+    assert current["Flatland"] is previous["Flatland"] is effective.base["Flatland"]
+    assert effective.plan_for("Testland", date(2025, 8, 1)) is effective.base["Testland"]
+    assert calculate_gross_to_net(_employee(), current["Testland"]).net_pay != calculate_gross_to_net(_employee(), previous["Testland"]).net_pay
+
+    # Workers seeded with the timelines resolve a chunk's period the same way
+    _init_worker(effective.base, effective)
+    try:
+        chunk = calculate_chunk(0, 0, [_employee()], render_payslips=False, period_start=date(2026, 8, 1))
+    finally:
+        _init_worker({}, None)
+    assert chunk.results[0]["result"] == calculate_gross_to_net(_employee(), current["Testland"])
+
+
+@pytest.mark.parametrize("versions,message", [
+    ([VERSIONS[1], VERSIONS[0]], "strictly increasing"),
+    ([{"effective_from": "2026-01-01", "changes": {"rounding_mode": "bankers"}}], "Testland from 2026-01-01: rounding_mode"),
+    ([{"effective_from": "2026-01-01", "changes": {}}], "effective_versions.0.changes"),
+])
+def test_invalid_versions_fail_to_compile(versions, message):
+    with pytest.raises(ConfigValidationError, match=message):
+        compile_country_timeline("Testland", {**BASE, "effective_versions": versions})
+
+
+def test_retro_recomputes_each_row_with_the_version_it_was_paid_with():
+    timeline = compile_country_timeline("Testland", CONFIG)
+    rows = []
+    for i, month in enumerate((12, 1)):
+        period_start = date(2025 + (month == 1), month, 1)
+        plan = timeline.plan_at(period_start)
+        result = calculate_gross_to_net(_employee(), plan)
+        rows.append(RetroRow(
+            employee_pay_id=i + 1, payrun_id=i + 1, employee_id="e1", pay_period=period_start.isoformat(),
+            period_start=period_start, config_version=plan.config_version, calc_inputs=INPUTS,
+            ytd_increments=ytd_increments(result), total_employer_cost=result.total_employer_cost,
+        ))
+
+    plans = version_plans(timeline, {row.config_version for row in rows})
+    assert compute_retro_adjustments(rows, plans) == ([], [])
+
+    patched = version_plans(timeline, {row.config_version for row in rows}, {"statutory": {"employer_contributions": [
+        {"name": "Employer Levy", "rate": 0.12},
+    ]}})
+    lines, errors = compute_retro_adjustments(rows, patched)
+    levy = {line.source_pay_period: line.amount for line in lines if line.component == ytd_key("employer", "Levy")}
+    assert errors == [] and levy == {"2025-12-01": 128.0, "2026-01-01": 128.0}
+    assert set(patched) == {timeline.plans[0].config_version, timeline.plans[1].config_version}
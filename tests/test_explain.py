@@ -0,0 +1,78 @@
+import json
+
+import pytest
+
+from app.config.country_config import country_plans
+from app.config.rule_plan import compile_country_plan
+from app.models.calc_input import CalcInput
+from app.models.employee import PayrollRequest
+from app.services.gross_to_net import ARITHMETIC_MODES, calculate_gross_to_net
+from app.services.ytd import ytd_key
+
+with open("tests/test_employees_bundle.json") as f:
+    test_employees = json.load(f)
+
+CONFIG = {
+    "statutory": {
+        "employee_contributions": [{"name": "Pension", "rate": 0.05, "pre_tax": True}],
+        "employer_contributions": [
+            {"name": "Employer Levy", "rate": 0.10, "annual_cap": 6000, "display_name": "Levy"},
+            {"name": "Employer Fund", "rate": 0.02, "max_amount": 50, "display_name": "Fund"},
+        ],
+    },
+    "income_tax_brackets": [{"up_to": 12000, "rate": 0.0}, {"up_to": 36000, "rate": 0.1}, {"up_to": None, "rate": 0.2}],
+    "optional_benefits": {
+        "hsa": {"amount": 400, "pre_tax": True, "basis": "amount", "annual_limit": 4150},
+    },
+}
+PLAN = compile_country_plan("Testland", CONFIG)
+SALARIED = {"base_pay": 5000.0, "benefits_opt_in": {"hsa": True}}
+
+
+def _steps(trace, step):
+    return {entry["rule"]: entry for entry in trace if entry["step"] == step}
+
+
+@pytest.mark.parametrize("arithmetic", ARITHMETIC_MODES)
+def test_trace_does_not_change_the_result(arithmetic):
+    for payload in test_employees:
+        calc_emp = CalcInput.from_employee(PayrollRequest(**payload).employee)
+        plan = country_plans[calc_emp.country]
+        plain = calculate_gross_to_net(calc_emp, plan, arithmetic=arithmetic, ytd={})
+        explained = calculate_gross_to_net(calc_emp, plan, arithmetic=arithmetic, ytd={}, trace=[])
+
+        assert plain.trace is None and "explain" not in plain.to_dict()
+        response = explained.to_dict()
+        assert response.pop("explain") == explained.trace and response == plain.to_dict()
+
+        employer = _steps(explained.trace, "employer")
+        assert {label: round(employer[label]["amount"], 2) for label in plain.employer_costs} == plain.employer_costs
+        (tax,) = [entry for entry in explained.trace if entry["step"] == "income_tax"]
+        assert round(tax["amount"], 2) == plain.income_tax
+
+
+@pytest.mark.parametrize("arithmetic", ARITHMETIC_MODES)
+def test_trace_names_rules_brackets_and_caps(arithmetic, calc_employee):
+    ytd = {ytd_key("employee", "hsa"): 4000.0, ytd_key("employer", "Levy"): 5800.0}
+    trace = calculate_gross_to_net(calc_employee(SALARIED), PLAN, arithmetic=arithmetic, ytd=ytd, trace=[]).trace
+
+    assert [entry["step"] for entry in trace] == ["deduction", "income_tax", "benefit", "employer", "employer"]
+    assert _steps(trace, "deduction")["Pension"] == {
+        "step": "deduction", "rule": "Pension", "basis": "gross", "rate": 0.05, "pre_tax": True, "amount": 250.0,
+    }
+    # Monthly brackets (annual / 12): taxable 5000 - 250 = 4750 lands in (3000, inf)
+    tax = trace[1]
+    assert (tax["bracket"], tax["lower"], tax["upper"], tax["rate"]) == (2, 3000, None, 0.2)
+    assert (tax["tax_below"], tax["marginal"], tax["amount"]) == (200.0, 350.0, 550.0)
+
+    hsa = _steps(trace, "benefit")["hsa"]
+    assert (hsa["basis"], hsa["configured_amount"], hsa["cap_hit"], hsa["amount"]) == ("amount", 400.0, "annual_limit", 150.0)
+    employer = _steps(trace, "employer")
+    assert (employer["Levy"]["uncapped"], employer["Levy"]["cap_hit"], employer["Levy"]["amount"]) == (500.0, "annual_cap", 200.0)
+    assert (employer["Fund"]["uncapped"], employer["Fund"]["cap_hit"], employer["Fund"]["amount"]) == (100.0, "max_amount", 50.0)
+
+
+def test_traced_calculation_skips_profile_curves(calc_employee):
+    result = calculate_gross_to_net(calc_employee(SALARIED), PLAN, profile_curves=True, trace=[])
+    assert result.breakdown == calculate_gross_to_net(calc_employee(SALARIED), PLAN).breakdown
+    assert {entry["step"] for entry in result.trace} == {"deduction", "income_tax", "benefit", "employer"}
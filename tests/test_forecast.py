@@ -0,0 +1,64 @@
+from datetime import date
+
+import pytest
+
+from app.config.rule_plan import compile_country_plan
+from app.services.batch_engine import build_columns, calculate_batch
+from app.services.forecast import forecast_costs, pay_period_starts
+from app.services.gross_to_net import calculate_gross_to_net
+from app.services.ytd import ytd_increments, ytd_key
+
+CONFIG = {
+    "pay_frequency": "monthly",
+    "statutory": {
+        "employee_contributions": [{"name": "Pension", "rate": 0.05, "pre_tax": True}],
+        "employer_contributions": [
+            {"name": "Employer Levy", "rate": 0.10, "annual_cap": 6000, "display_name": "Levy"},
+        ],
+    },
+    "income_tax_brackets": [{"up_to": 1000, "rate": 0.0}, {"up_to": None, "rate": 0.2}],
+    "optional_benefits": {
+        "hsa": {"amount": 400, "pre_tax": True, "basis": "amount", "annual_limit": 4150},
+    },
+}
+PLAN = compile_country_plan("Testland", CONFIG)
+HSA = {"benefits_opt_in": {"hsa": True}}
+
+
+def test_pay_period_calendars():
+    assert pay_period_starts(date(2025, 12, 20), "bi-weekly", 2) == [date(2025, 12, 20), date(2026, 1, 3)]
+    assert pay_period_starts(date(2025, 1, 31), "monthly", 2) == [date(2025, 1, 31), date(2025, 2, 28)]
+    assert pay_period_starts(date(2025, 3, 20), "semi-monthly", 3) == [date(2025, 4, 1), date(2025, 4, 16), date(2025, 5, 1)]
+
+
+def test_batch_engine_clamps_with_ytd_like_scalar(calc_employee):
+    emps = [calc_employee(HSA, employee_id=f"e{pay}", base_pay=pay) for pay in (3000, 5000, 8000)]
+    ytd = [None, {}, {ytd_key("employee", "hsa"): 4000, ytd_key("employer", "Levy"): 5500}]
+    records = calculate_batch(PLAN, build_columns(emps, PLAN, ytd=ytd)).to_records()
+    for emp, totals, record in zip(emps, ytd, records):
+        scalar = calculate_gross_to_net(emp, PLAN, ytd=totals).breakdown
+        assert record["breakdown"]["employer_costs"] == scalar["employer_costs"]
+        assert record["breakdown"]["benefits_deductions"]["pre_tax"] == scalar["benefits_deductions"]["pre_tax"]
+
+
+@pytest.mark.parametrize("arithmetic", ["float", "minor_units"])
+def test_forecast_matches_period_by_period_scalar_run(arithmetic, calc_employee):
+    emps = [calc_employee(HSA, employee_id=f"e{pay}", base_pay=pay) for pay in (3000, 7000, 9000)]
+    ytd = [{}, {ytd_key("employee", "hsa"): 2800.0}, {ytd_key("employer", "Levy"): 5200.0}]
+    starts = pay_period_starts(date(2025, 9, 1), "monthly", 8)  # crosses into 2026
+    forecast = forecast_costs(emps, PLAN, starts, ytd=ytd, arithmetic=arithmetic, include_employees=True)
+
+    for emp, totals, projected in zip(emps, ytd, forecast["employee_forecasts"]):
+        running, year = dict(totals), starts[0].year
+        for j, start in enumerate(starts):
+            if start.year != year:
+                running, year = {}, start.year
+            result = calculate_gross_to_net(emp, PLAN, arithmetic=arithmetic, ytd=running)
+            for key, amount in ytd_increments(result).items():
+                running[key] = running.get(key, 0.0) + amount
+            assert projected["total_employer_cost"][j] == round(result.total_employer_cost, 2)
+            assert projected["total_net"][j] == round(result.net_pay, 2)
+
+    # The 9000 earner's Levy hits the 6000 cap in September (800 left) and restarts in January
+    levy = [period["employer_costs"].get("Levy", 0.0) for period in forecast["periods"]]
+    assert levy[:5] == [300 + 700 + 800, 300 + 700, 300 + 700, 300 + 700, 300 + 700 + 900]
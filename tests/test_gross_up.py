@@ -0,0 +1,34 @@
+import json
+from pathlib import Path
+
+import pytest
+
+from app.config.country_config import country_plans
+from app.services.gross_to_net import calculate_gross_to_net
+from app.services.gross_up import gross_up
+from app.services.pay_curve import build_pay_curve, with_component
+
+BUNDLE = json.loads((Path(__file__).parent / "test_employees_bundle.json").read_text())
+
+
+@pytest.mark.parametrize("component", ["base_pay", "bonuses"])
+@pytest.mark.parametrize("target", [2500.0, 9876.54, 150000.0])
+def test_gross_up_hits_target_with_smallest_cent_amount(component, target, calc_employee):
+    for payload in BUNDLE:
+        calc_emp = calc_employee(payload["employee"], benefits_opt_in={})
+        plan = country_plans[payload["employee"]["country"]]
+        if target < build_pay_curve(calc_emp, plan, component).nets[0]:
+            continue
+        result = gross_up(calc_emp, plan, target, component)
+        assert round(result["net_pay"], 2) >= target
+        below = calculate_gross_to_net(with_component(calc_emp, component, result["amount"] - 0.01), plan)
+        assert round(below.net_pay, 2) < target
+
+
+def test_gross_up_rejects_target_below_fixed_net(calc_employee):
+    calc_emp = calc_employee(BUNDLE[0]["employee"], benefits_opt_in={})
+    plan = country_plans[BUNDLE[0]["employee"]["country"]]
+    with pytest.raises(ValueError):
+        gross_up(calc_emp, plan, 0.0, "bonuses")
+    with pytest.raises(ValueError):
+        gross_up(calc_emp, plan, 1000.0, "overtime_hours")
@@ -0,0 +1,69 @@
+import json
+
+import numpy as np
+import pytest
+
+from app.config.country_config import country_plans
+from app.services.batch_engine import build_columns, calculate_batch_minor
+from app.services.deductions import calculate_deductions_minor
+from app.services.employer_costs import calculate_employer_costs_minor
+from app.services.gross_pay import calculate_gross_pay_minor
+from app.services.gross_to_net import calculate_gross_to_net
+from app.utils.minor_units import round_units, round_units_array
+
+with open("tests/test_employees_bundle.json") as f:
+    test_employees = json.load(f)
+
+
+@pytest.mark.parametrize("mode", ["half_up", "half_even"])
+def test_scalar_and_array_rounding_agree(mode):
+    values = np.array([0.5, 1.5, 2.5, -0.5, -2.5, 1234.4999, 1234.5, 7.0, -3.49])
+    assert round_units_array(values, mode).tolist() == [round_units(float(v), mode) for v in values]
+    assert round_units(2.5, "half_up") == 3 and round_units(2.5, "half_even") == 2
+
+
+@pytest.mark.parametrize("country", sorted({e["employee"]["country"] for e in test_employees}))
+def test_batch_minor_matches_scalar_minor_exactly(country, calc_employee):
+    plan = country_plans[country]
+    cohort = []
+    for payload in test_employees:
+        emp = payload["employee"]
+        if emp["country"] != country:
+            continue
+        for scale in (0.0, 0.37, 1.0, 2.5, 40.0):
+            cohort.append(calc_employee(emp, hourly_rate=emp["hourly_rate"] * scale, bonuses=12.345 * scale))
+
+    result = calculate_batch_minor(plan, build_columns(cohort, plan))
+
+    for i, calc_emp in enumerate(cohort):
+        gross, _, _, _ = calculate_gross_pay_minor(calc_emp, plan)
+        deductions = calculate_deductions_minor(calc_emp, gross, plan)
+        total_employer_cost, employer_costs = calculate_employer_costs_minor(calc_emp, gross, plan)
+
+        assert int(result.gross_pay[i]) == gross
+        assert int(result.income_tax[i]) == deductions["income_tax"]
+        assert int(result.taxable_income[i]) == deductions["taxable_income"]
+        assert int(result.net_pay[i]) == gross - deductions["total_deductions"]
+        assert int(result.total_employer_cost[i]) == total_employer_cost
+        assert {k: int(v[i]) for k, v in result.employer.items() if v[i] > 0} == employer_costs
+
+        # Totals are exact integer sums of their components
+        assert deductions["total_deductions"] == (
+            deductions["income_tax"]
+            + sum(deductions["pre_tax_breakdown"].values())
+            + sum(deductions["post_tax_breakdown"].values())
+        )
+        assert total_employer_cost == sum(employer_costs.values())
+
+
+@pytest.mark.parametrize("employee_data", test_employees)
+def test_minor_units_gross_to_net_is_within_a_cent_of_float(employee_data, calc_employee):
+    emp = employee_data["employee"]
+    calc_emp = calc_employee(emp)
+    plan = country_plans[emp["country"]]
+
+    exact = calculate_gross_to_net(calc_emp, plan, arithmetic="minor_units").breakdown
+    approx = calculate_gross_to_net(calc_emp, plan).breakdown
+
+    assert exact["net_pay"] == round(exact["gross_pay"] - exact["total_deductions"], 2)
+    assert abs(exact["net_pay"] - approx["net_pay"]) <= 0.05
@@ -0,0 +1,50 @@
+import json
+import pickle
+
+from app.config.rule_plan import compile_country_plan
+from app.models.calc_input import CalcInput
+from app.models.payroll_result import BREAKDOWN_KEYS
+from app.services.calc_cache import ResultCache
+from app.services.gross_to_net import calculate_gross_to_net
+from app.services.ytd import ytd_increments
+
+CONFIG = {
+    "statutory": {
+        "employee_contributions": [{"name": "social_security", "rate": 0.05, "pre_tax": True}],
+        "employer_contributions": [{"name": "Employer Levy", "rate": 0.10}],
+    },
+    "allowance_rules": {"Meal": {"tax_treatment": "exempt"}},
+    "income_tax_brackets": [{"up_to": 12000, "rate": 0.0}, {"up_to": None, "rate": 0.2}],
+    "optional_benefits": {"hsa": {"amount": 400, "pre_tax": True, "basis": "amount"}},
+}
+PLAN = compile_country_plan("Testland", CONFIG)
+CALC_EMP = CalcInput(
+    employee_id="e1", country="Testland", base_pay=5000.0, bonuses=100.004,
+    allowances={"Meal": 80.126, "Housing": 300}, benefits_opt_in={"hsa": True},
+)
+
+
+def test_result_reads_as_the_breakdown():
+    result = calculate_gross_to_net(CALC_EMP, PLAN)
+    response = result.to_dict()
+
+    assert list(result) == list(BREAKDOWN_KEYS) == list(response["breakdown"])
+    assert dict(result) == response["breakdown"]
+    assert result["allowances_breakdown"] == {"Meal": 80.13, "Housing": 300}
+    assert result["gross_pay"] == round(result.gross_pay, 2) and response["gross_pay"] == result.gross_pay
+    assert result["benefits_deductions"] == {
+        "pre_tax": {"social_security": result.social_security, "hsa": 400.0}, "post_tax": {},
+        "total_pre_tax": result.total_pre_tax, "total_post_tax": 0.0,
+    }
+    assert json.loads(json.dumps(response)) == response
+    assert ytd_increments(result) == ytd_increments(response["breakdown"])
+
+
+def test_result_survives_the_cache_and_the_worker_pickle():
+    result = calculate_gross_to_net(CALC_EMP, PLAN, arithmetic="minor_units")
+    cache = ResultCache(max_entries=4, ttl_seconds=60)
+    cache.put("k", result)
+
+    assert cache.get("k") == result and cache.get("k") is not result
+    assert pickle.loads(pickle.dumps(result)) == result
+    assert not hasattr(result, "__dict__")
@@ -0,0 +1,187 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import select
+
+import app.services.payrun_executor as payrun_executor
+from app.config.country_config import config_registry
+from app.database.session import get_async_db
+from app.database.ytd_store import ytd_store
+from app.models import payrun as models
+from app.routes import payroll
+
+HEADERS = {"x-api-key": "supersecretkey"}
+
+
+def _thread_pool(max_workers=None, mp_context=None, initializer=None, initargs=()):
+    """The payrun pool on threads: same submit/shutdown contract, and faults can be injected in-process."""
+    return ThreadPoolExecutor(max_workers=max_workers, initializer=initializer, initargs=initargs)
+
+
+def _employee(employee_id="e1", **overrides):
+    values = {
+        "tenant_id": 1, "employee_id": employee_id, "country": "USA", "gross_salary": 0,
+        "hourly_rate": 60, "hours_worked": 160, "benefits_opt_in": {},
+    }
+    values.update(overrides)
+    return values
+
+
+@pytest.fixture
+def client(monkeypatch, tmp_path, payroll_db):
+    monkeypatch.chdir(tmp_path)  # payslips/
+    monkeypatch.setattr(payrun_executor, "ProcessPoolExecutor", _thread_pool)
+    monkeypatch.setattr(payroll.settings, "payrun_workers", 2)
+    monkeypatch.setattr(payroll, "_payrun_executor", None)
+    for cache in (payroll.calculation_cache, payroll.payslip_cache, ytd_store):
+        cache.clear()
+
+    async def db():
+        async with payroll_db() as session:
+            yield session
+
+    api = FastAPI()
+    api.include_router(payroll.router)
+    api.dependency_overrides[get_async_db] = db
+    api.state.sessions = payroll_db
+    with TestClient(api, headers=HEADERS) as test_client:
+        yield test_client
+    payroll.shutdown_payrun_executor()
+    ytd_store.clear()
+
+
+def _rows(client, statement):
+    async def fetch():
+        async with client.app.state.sessions() as session:
+            return (await session.execute(statement)).scalars().all()
+    return client.portal.call(fetch)
+
+
+def _add(client, *objects):
+    async def add():
+        async with client.app.state.sessions() as session:
+            session.add_all(objects)
+            await session.commit()
+    client.portal.call(add)
+    return objects
+
+
+def _calculate(client, **employee):
+    response = client.post("/calculate", json={"employee": _employee(**employee)})
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def _recalculate(client, payrun_id, *employees):
+    response = client.post(
+        f"/payrun/{payrun_id}/recalculate", json={"employees": list(employees), "render_payslips": False}
+    )
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def test_recalculate_survives_a_config_reload_before_its_submit(client, monkeypatch):
+    _calculate(client)
+    (payrun,) = _rows(client, select(models.Payrun))
+    before = payroll.get_payrun_executor()
+
+    load_ytd = payroll.load_ytd
+
+    async def reload_then_load_ytd(*args, **kwargs):
+        # A reload lands while the request awaits the database: the live pool is retired
+        payroll._reseed_payrun_executor(config_registry.current, config_registry.current)
+        return await load_ytd(*args, **kwargs)
+
+    monkeypatch.setattr(payroll, "load_ytd", reload_then_load_ytd)
+    body = _recalculate(client, payrun.id, _employee(hours_worked=170))
+
+    assert payroll.get_payrun_executor() is not before
+    assert body["errors"] == [] and body["changed"] == 1
+    assert body["totals"]["total_gross"] == 60 * 170
+
+
+def _children(client, employee_pay_id):
+    return {
+        child.__tablename__: sorted(row.id for row in _rows(client, select(child).where(child.payslip_id == employee_pay_id)))
+        for child in (models.EmployeeAllowances, models.EmployerContributions, models.EmployeeBenefitsDeductions)
+    }
+
+
+def test_calculate_repost_replaces_the_row_and_moves_totals_by_the_delta(client):
+    _calculate(client)
+    (first,) = _rows(client, select(models.EmployeePay))
+    second = _calculate(client, hours_worked=170)
+
+    (row,) = _rows(client, select(models.EmployeePay))
+    (payrun,) = _rows(client, select(models.Payrun))
+    assert row.id == first.id and float(row.gross_pay) == second["gross_pay"] == 60 * 170
+    assert float(payrun.total_gross) == second["gross_pay"] and float(payrun.total_net) == pytest.approx(second["net_pay"])
+    assert len(_children(client, row.id)["employer_contributions"]) == len(second["breakdown"]["employer_costs"])
+
+
+def test_recalculate_failure_keeps_the_employees_breakdown(client, monkeypatch):
+    _calculate(client, employee_id="e1")
+    _calculate(client, employee_id="e2")
+    rows = {row.employee_id: row for row in _rows(client, select(models.EmployeePay))}
+    before = {employee_id: _children(client, row.id) for employee_id, row in rows.items()}
+
+    calculate = payrun_executor.calculate_gross_to_net
+
+    def fail_e2(calc_emp, *args, **kwargs):
+        if calc_emp.employee_id == "e2":
+            raise ValueError("bad inputs")
+        return calculate(calc_emp, *args, **kwargs)
+
+    monkeypatch.setattr(payrun_executor, "calculate_gross_to_net", fail_e2)
+    body = _recalculate(client, rows["e1"].payrun_id, _employee("e1", hours_worked=170), _employee("e2", hours_worked=170))
+
+    assert [(e["employee_id"], e["detail"]) for e in body["errors"]] == [("e2", "bad inputs")]
+    assert _children(client, rows["e2"].id) == before["e2"]
+    after = _children(client, rows["e1"].id)
+    assert after["employer_contributions"] and after["employer_contributions"] != before["e1"]["employer_contributions"]
+
+
+def test_recalculate_reads_and_writes_the_ytd_of_the_payruns_year(client):
+    (payrun, _) = _add(
+        client,
+        models.Payrun(
+            tenant_id=1, country="USA", period_start=date(2024, 3, 1), period_end=date(2024, 3, 31),
+            status="draft", total_gross=0, total_net=0, total_tax=0, total_employer_cost=0,
+        ),
+        # 100 left of the 2024 HSA limit; 2025 has no YTD yet
+        models.YtdAccumulator(tenant_id=1, employee_id="e1", tax_year=2024, component="employee:hsa", amount=4050),
+    )
+    _recalculate(client, payrun.id, _employee(benefits_opt_in={"hsa": True}))
+
+    (row,) = _rows(client, select(models.EmployeePay))
+    assert row.ytd_increments["employee:hsa"] == 100  # clamped by the 2024 YTD (250 unclamped)
+    ytd = {(r.tax_year, r.component): float(r.amount) for r in _rows(client, select(models.YtdAccumulator))}
+    assert {year for year, _ in ytd} == {2024}
+    assert ytd[(2024, "gross_pay")] == float(row.gross_pay) and ytd[(2024, "employee:hsa")] == 4150
+
+
+def _ytd(client):
+    return {r.component: float(r.amount) for r in _rows(client, select(models.YtdAccumulator).where(models.YtdAccumulator.tax_year == 2025))}
+
+
+def test_calculate_repost_counts_the_period_in_ytd_once(client):
+    _calculate(client)
+    _calculate(client)
+
+    (row,) = _rows(client, select(models.EmployeePay))
+    assert _ytd(client) == pytest.approx(row.ytd_increments)
+
+
+def test_calculate_repost_is_not_clamped_by_its_own_previous_post(client):
+    # One period of HSA (250) left before the annual_limit of 4150
+    _add(client, models.YtdAccumulator(tenant_id=1, employee_id="e1", tax_year=2025, component="employee:hsa", amount=3900))
+    first = _calculate(client, benefits_opt_in={"hsa": True})
+    second = _calculate(client, benefits_opt_in={"hsa": True})
+
+    (row,) = _rows(client, select(models.EmployeePay))
+    assert row.ytd_increments["employee:hsa"] == 250
+    assert second["net_pay"] == first["net_pay"]
+    assert _ytd(client)["employee:hsa"] == 4150
@@ -0,0 +1,46 @@
+import json
+
+from app.config.country_config import country_plans
+from app.services.gross_to_net import calculate_gross_to_net
+from app.services.payrun_executor import PayrunExecutor, calculate_chunk
+
+with open("tests/test_employees_bundle.json") as f:
+    test_employees = json.load(f)
+
+
+def _calc_employees(calc_employee):
+    return [
+        calc_employee(
+            emp, employee_id=emp["employee_id"], tenant_id=int(emp["tenant_id"]), country=emp["country"],
+            metadata=emp.get("metadata") or {},
+        )
+        for emp in (payload["employee"] for payload in test_employees)
+    ]
+
+
+def test_chunk_reports_unknown_country_without_failing_the_rest(calc_employee):
+    employees = _calc_employees(calc_employee)
+    employees[1] = employees[1].with_changes(country="Atlantis")
+
+    chunk = calculate_chunk(0, 100, employees, render_payslips=False, country_plans=country_plans)
+
+    assert [e["index"] for e in chunk.errors] == [101]
+    assert len(chunk.results) == len(employees) - 1
+    assert chunk.elapsed > 0
+
+
+def test_process_pool_matches_in_process_calculation(calc_employee):
+    employees = _calc_employees(calc_employee) * 3
+    seen = {}
+    with PayrunExecutor(country_plans, max_workers=2, chunk_size=7) as executor:
+        chunks = list(executor.run(employees, render_payslips=False))
+
+    assert sorted(c.chunk_index for c in chunks) == list(range(6))
+    for chunk in chunks:
+        for result in chunk.results:
+            seen[result["index"]] = result
+
+    assert sorted(seen) == list(range(len(employees)))
+    for index, calc_emp in enumerate(employees):
+        expected = calculate_gross_to_net(calc_emp, country_plans[calc_emp.country])
+        assert seen[index]["result"] == expected
@@ -0,0 +1,33 @@
+from app.config.country_config import country_plans
+from app.services.payrun_recalc import diff_fingerprints, input_fingerprint, totals_delta
+
+HOURLY = {"hourly_rate": 30, "hours_worked": 160}
+
+
+def test_fingerprint_tracks_inputs_and_arithmetic(calc_employee):
+    plan = country_plans["Canada"]
+    fingerprint = input_fingerprint(calc_employee(HOURLY), plan, "float")
+    assert input_fingerprint(calc_employee(HOURLY, hourly_rate=30.0), plan, "float") == fingerprint
+    assert input_fingerprint(calc_employee(HOURLY, hours_worked=161), plan, "float") != fingerprint
+    assert input_fingerprint(calc_employee(HOURLY), plan, "minor_units") != fingerprint
+
+
+def test_diff_only_flags_changed_and_new_employees():
+    stored = {"a": "fa", "b": "fb", "c": None, "d": "fd"}
+    incoming = [("a", "fa"), ("b", "fb2"), ("c", "fc"), ("e", "fe")]
+    diff = diff_fingerprints(stored, incoming)
+    assert diff.unchanged == [0]
+    assert diff.changed == [1, 2]  # legacy rows without a fingerprint are recomputed
+    assert diff.added == [3]
+    assert diff.to_compute == [1, 2, 3]
+
+
+def test_totals_delta():
+    breakdown = {"gross_pay": 5000.0, "net_pay": 3900.5, "income_tax": 800.25, "total_employer_cost": 410.0}
+    assert totals_delta(None, breakdown) == {
+        "total_gross": 5000.0, "total_net": 3900.5, "total_tax": 800.25, "total_employer_cost": 410.0,
+    }
+    previous = {"gross_pay": 4800.0, "net_pay": 3800.0, "income_tax": 760.5, "total_employer_cost": 410.0}
+    assert totals_delta(previous, breakdown) == {
+        "total_gross": 200.0, "total_net": 100.5, "total_tax": 39.75, "total_employer_cost": 0.0,
+    }
@@ -0,0 +1,97 @@
+import csv
+import io
+import json
+
+import pytest
+
+from app.cli import main
+from app.config.country_config import country_plans
+from app.models.calc_input import CalcInput
+from app.models.employee import PayrollRequest
+from app.services.gross_to_net import calculate_gross_to_net
+from app.services.payrun_stream import (
+    CSV_COLUMNS, ResultWriter, calculate_stream, read_records, stream_format, unflatten_csv_row,
+)
+
+with open("tests/test_employees_bundle.json") as f:
+    test_employees = json.load(f)
+
+
+def _expected(payload):
+    calc_emp = CalcInput.from_employee(PayrollRequest(**payload).employee)
+    return calculate_gross_to_net(calc_emp, country_plans[calc_emp.country]).to_dict()
+
+
+def test_jsonl_stream_matches_the_api_calculation_and_keeps_bad_lines():
+    lines = [json.dumps(payload) for payload in test_employees]
+    lines.insert(1, "{not json")
+    lines.append(json.dumps({"employee": dict(test_employees[0]["employee"], country="Atlantis")}))
+
+    batches = list(calculate_stream(read_records(io.StringIO("\n".join(lines)), "jsonl"), country_plans, chunk_size=2))
+    records = [record for batch in batches for record in batch]
+
+    assert [record.index for record in records] == list(range(len(lines)))
+    assert records[1].error.startswith("Invalid record")
+    assert records[-1].error == "Country configuration not found for Atlantis"
+    calculated = [record for record in records if record.result is not None]
+    assert [record.result.to_dict() for record in calculated] == [_expected(payload) for payload in test_employees]
+    assert calculated[0].company.company_name == test_employees[0]["company"]["company_name"]
+
+
+def test_csv_columns_unflatten_into_a_bundle_record():
+    row = {
+        "tenant_id": "1", "employee_id": "e1", "country": "Canada", "gross_salary": "0",
+        "hourly_rate": "25", "hours_worked": "160", "bonuses": "",
+        "allowances.Meal": "50", "benefits_opt_in.private_pension": "true",
+        "metadata.full_name": "A. Tester", "metadata.bank_account_last4": "0042",
+        "company": '{"company_name": "Acme"}', None: ["stray cell"],
+    }
+    assert unflatten_csv_row(row) == {
+        "employee": {
+            "tenant_id": "1", "employee_id": "e1", "country": "Canada", "gross_salary": "0",
+            "hourly_rate": "25", "hours_worked": "160", "allowances": {"Meal": 50},
+            "benefits_opt_in": {"private_pension": True},
+            "metadata": {"full_name": "A. Tester", "bank_account_last4": "0042"},
+        },
+        "company": {"company_name": "Acme"},
+    }
+
+
+def test_csv_round_trip_through_the_cli(tmp_path):
+    source = tmp_path / "employees.csv"
+    with open(source, "w", newline="") as fh:
+        writer = csv.writer(fh)
+        writer.writerow(["tenant_id", "employee_id", "country", "gross_salary", "hourly_rate", "hours_worked", "allowances.housing_allowance"])
+        writer.writerow(["1", "e1", "Canada", "0", "30", "160", "300"])
+        writer.writerow(["1", "e2", "Canada", "0", "not a number", "160", ""])
+    target = tmp_path / "results.jsonl"
+
+    assert main(["payrun", str(source), str(target), "--chunk-size", "1"]) == 0
+    assert main(["payrun", str(source), str(tmp_path / "strict.jsonl"), "--strict"]) == 1
+
+    first, second = [json.loads(line) for line in target.read_text().splitlines()]
+    expected = _expected({"employee": {
+        "tenant_id": 1, "employee_id": "e1", "country": "Canada", "gross_salary": 0,
+        "hourly_rate": 30, "hours_worked": 160, "allowances": {"housing_allowance": 300},
+    }})
+    assert {key: first[key] for key in expected} == expected
+    assert first["employee_id"] == "e1" and second["employee_id"] == "e2" and "hourly_rate" in second["error"]
+
+
+def test_csv_writer_flattens_results():
+    records = [record for batch in calculate_stream(
+        read_records(io.StringIO(json.dumps(test_employees[0])), "jsonl"), country_plans,
+    ) for record in batch]
+    out = io.StringIO()
+    ResultWriter(out, "csv").write(records)
+
+    (row,) = csv.DictReader(io.StringIO(out.getvalue()))
+    assert tuple(row) == CSV_COLUMNS
+    assert float(row["net_pay"]) == records[0].result.net_pay
+    assert json.loads(row["employer_costs"]) == records[0].result.employer_costs
+
+
+def test_stream_format():
+    assert stream_format("a.ndjson") == "jsonl" and stream_format("-", "csv") == "csv"
+    with pytest.raises(ValueError, match="JSON array"):
+        stream_format("tests/test_employees_bundle.json")
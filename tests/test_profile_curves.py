@@ -0,0 +1,83 @@
+import json
+
+import pytest
+
+from app.config.country_config import country_plans
+from app.config.rule_plan import compile_country_plan
+from app.services.gross_to_net import calculate_gross_to_net
+from app.services.profile_curves import ProfileCurveCache, build_profile_curve
+from app.services.ytd import ytd_key
+
+with open("tests/test_employees_bundle.json") as f:
+    test_employees = json.load(f)
+
+CONFIG = {
+    "statutory": {
+        "employee_contributions": [{"name": "Pension", "rate": 0.05, "pre_tax": True}],
+        "employer_contributions": [
+            {"name": "Employer Levy", "rate": 0.10, "max_amount": 700},
+            {"name": "Employer Fund", "rate": 0.02, "annual_cap": 600},
+        ],
+    },
+    "income_tax_brackets": [{"up_to": 12000, "rate": 0.0}, {"up_to": 60000, "rate": 0.2}, {"up_to": None, "rate": 0.4}],
+    "optional_benefits": {
+        "hsa": {"amount": 400, "pre_tax": True, "basis": "amount", "annual_limit": 4150},
+        "gym": {"rate": 0.01, "pre_tax": False, "basis": "gross"},
+    },
+}
+PLAN = compile_country_plan("Testland", CONFIG)
+SALARIED = {"base_pay": 5000.0, "benefits_opt_in": {"hsa": True}}
+
+
+@pytest.mark.parametrize("ytd", [None, {}], ids=["no-ytd", "ytd"])
+@pytest.mark.parametrize("country", sorted({e["employee"]["country"] for e in test_employees}))
+def test_curves_match_the_calculators_to_the_cent(country, ytd, calc_employee):
+    plan = country_plans[country]
+    benefit_names = [b.name for b in plan.optional_benefits]
+    for payload in test_employees:
+        emp = payload["employee"]
+        if emp["country"] != country:
+            continue
+        for i, scale in enumerate((0.0, 0.37, 1.0, 2.5, 40.0)):
+            opt_ins = dict(emp.get("benefits_opt_in") or {})
+            if benefit_names:
+                opt_ins[benefit_names[i % len(benefit_names)]] = {"amount": 35.5} if i % 2 else True
+            calc_emp = calc_employee(emp, hourly_rate=emp.get("hourly_rate", 0) * scale, benefits_opt_in=opt_ins)
+            expected = calculate_gross_to_net(calc_emp, plan, ytd=ytd)
+            assert calculate_gross_to_net(calc_emp, plan, ytd=ytd, profile_curves=True) == expected
+
+
+def test_knots_sit_on_the_rule_breakpoints(calc_employee):
+    curve = build_profile_curve(calc_employee(SALARIED), PLAN)
+    # taxable = 0.95 * gross against the monthly thresholds 1000 / 5000; Levy hits max_amount
+    # at 7000, Fund hits its per-period annual cap (600 / 12 = 50) at 2500
+    assert curve.knots == (0.0, 1000 / 0.95, 2500.0, 5000 / 0.95, 7000.0)
+    assert curve.brackets == (0, 1, 1, 2, 2)
+    assert curve.employer_pieces[0] == ((0.0, 0.10), (0.0, 0.02))
+    assert curve.employer_pieces[-1] == ((700, 0.0), (50.0, 0.0))
+
+    # With YTD the annual cap is clamped after evaluation, so it is no knot
+    assert 2500.0 not in build_profile_curve(calc_employee(SALARIED), PLAN, ytd_known=True).knots
+
+
+@pytest.mark.parametrize("base_pay", [0.0, 1052.63, 2499.99, 2500.0, 5263.16, 7000.0, 40000.0, 250000.0])
+@pytest.mark.parametrize("opt_ins", [{}, {"hsa": True, "gym": True}, {"gym": {"rate": 0.03, "pre_tax": True}}])
+def test_evaluation_matches_on_every_segment(base_pay, opt_ins, calc_employee):
+    for ytd in (None, {}, {ytd_key("employee", "hsa"): 4000, ytd_key("employer", "Fund"): 580}):
+        calc_emp = calc_employee(SALARIED, base_pay=base_pay, benefits_opt_in=opt_ins, allowances={"Meal": 120})
+        assert calculate_gross_to_net(calc_emp, PLAN, ytd=ytd, profile_curves=True) == calculate_gross_to_net(
+            calc_emp, PLAN, ytd=ytd
+        )
+
+
+def test_employees_with_the_same_profile_share_one_curve(calc_employee):
+    cache = ProfileCurveCache(max_entries=2)
+    first = cache.curve_for(calc_employee(SALARIED, base_pay=3000.0), PLAN)
+    assert cache.curve_for(calc_employee(SALARIED, base_pay=91000.0), PLAN) is first
+    assert cache.hits == 1
+
+    # Opt-ins, dict overrides and YTD mode are part of the profile
+    assert cache.curve_for(calc_employee(SALARIED, benefits_opt_in={"hsa": {"amount": 100}}), PLAN) is not first
+    assert cache.curve_for(calc_employee(SALARIED), PLAN, ytd={}) is not first
+    assert len(cache) == 2  # least recently used profile evicted
+    assert cache.curve_for(calc_employee(SALARIED), PLAN) is not first
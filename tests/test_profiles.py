@@ -0,0 +1,75 @@
+import pytest
+
+from app.config.rule_plan import compile_country_plan
+from app.models.calc_input import CalcInput
+from app.services.gross_to_net import calculate_gross_to_net
+from app.services.payrun_executor import calculate_chunk
+from app.services.profiles import group_by_profile
+
+CONFIG = {
+    "statutory": {
+        "employee_contributions": [{"name": "Pension", "rate": 0.05, "pre_tax": True}],
+        "employer_contributions": [{"name": "Employer Levy", "rate": 0.10}],
+        "other_employee_deductions": [{"name": "Union", "amount": 25, "optional": True}],
+    },
+    "allowance_rules": {"Meal": {"tax_treatment": "exempt"}, "Housing": {"tax_treatment": "taxable"}},
+    "income_tax_brackets": [{"up_to": 12000, "rate": 0.0}, {"up_to": None, "rate": 0.2}],
+    "optional_benefits": {
+        "hsa": {"amount": 400, "pre_tax": True, "basis": "amount", "employer_amount": 100},
+        "gym": {"rate": 0.01, "pre_tax": False, "basis": "gross"},
+    },
+}
+PLANS = {"Testland": compile_country_plan("Testland", CONFIG)}
+
+
+def _calc_employee(employee_id, opt_ins=None, allowances=None, country="Testland", base_pay=5000.0):
+    return CalcInput(
+        employee_id=employee_id, country=country, hourly_rate=0, hours_worked=0, overtime_hours=0, bonuses=0,
+        base_pay=base_pay, allowances=allowances or {}, benefits_opt_in=opt_ins or {},
+    )
+
+
+EMPLOYEES = [
+    _calc_employee("a", {"hsa": True}),
+    _calc_employee("b", {"hsa": {"amount": 250}, "gym": False}, base_pay=9100.0),  # same opted-in names as "a"
+    _calc_employee("c", {"hsa": True, "Union": True}, {"Meal": 80}),
+    _calc_employee("d", {}, {"Housing": 300}),  # taxable allowance: no rule difference
+    _calc_employee("e", {"gym": True}, country="Atlantis"),
+    _calc_employee("f", {"hsa": True, "Union": True}, {"Meal": 120}, base_pay=14000.0),
+]
+
+
+def test_employees_are_bucketed_by_opt_ins_and_exempt_allowances():
+    buckets = group_by_profile(EMPLOYEES, PLANS)
+
+    assert [bucket.indexes for bucket in buckets] == [[0, 1], [2, 5], [3], [4]]
+    assert buckets[3].profile is None  # unknown country
+
+    profile = buckets[1].profile
+    assert [rule.name for rule in profile.deductions] == ["Pension", "Union"]
+    assert [benefit.name for benefit in profile.benefits] == ["hsa"]
+    assert [rule.label for rule in profile.employer] == ["Employer Levy", "Employer hsa"]
+    assert profile.exempt_allowances == ("Meal",)
+    assert buckets[2].profile.benefits == () and buckets[2].profile.exempt_allowances == ()
+
+
+@pytest.mark.parametrize("arithmetic", ["float", "minor_units"])
+def test_resolved_profile_gives_the_same_results(arithmetic):
+    for bucket in group_by_profile(EMPLOYEES, PLANS):
+        for index in bucket.indexes:
+            calc_emp = EMPLOYEES[index]
+            plan = PLANS.get(calc_emp.country)
+            if plan is None:
+                continue
+            for ytd in (None, {}):
+                expected = calculate_gross_to_net(calc_emp, plan, arithmetic=arithmetic, ytd=ytd)
+                grouped = calculate_gross_to_net(calc_emp, plan, arithmetic=arithmetic, ytd=ytd, profile=bucket.profile)
+                assert grouped == expected
+
+
+def test_chunk_returns_grouped_results_in_employee_order():
+    chunk = calculate_chunk(0, 10, EMPLOYEES, render_payslips=False, country_plans=PLANS)
+
+    assert [e["index"] for e in chunk.errors] == [14]
+    assert [r["index"] for r in chunk.results] == [10, 11, 12, 13, 15]
+    assert chunk.results[2]["result"] == calculate_gross_to_net(EMPLOYEES[2], PLANS["Testland"])
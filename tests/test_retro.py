@@ -0,0 +1,66 @@
+from datetime import date
+
+import pytest
+
+from app.config.rule_plan import compile_country_plan
+from app.models.calc_input import CalcInput
+from app.services.gross_to_net import calculate_gross_to_net
+from app.services.retro import RetroRow, adjustment_totals, compute_retro_adjustments, validate_input_changes
+from app.services.ytd import ytd_increments, ytd_key
+
+CONFIG = {
+    "statutory": {
+        "employee_contributions": [{"name": "Pension", "rate": 0.05, "pre_tax": True}],
+        "employer_contributions": [
+            {"name": "Employer Levy", "rate": 0.10, "annual_cap": 1500, "display_name": "Levy"},
+        ],
+    },
+    "income_tax_brackets": [{"up_to": 1000, "rate": 0.0}, {"up_to": None, "rate": 0.2}],
+}
+PLAN = compile_country_plan("Testland", CONFIG)
+INPUTS = {"hourly_rate": 40.0, "hours_worked": 160.0, "benefits_opt_in": {}}
+
+
+def _paid_rows(months):
+    """Rows as the payrun endpoints store them: scalar results with YTD carried month to month."""
+    rows, ytd = [], {}
+    for i, month in enumerate(months):
+        result = calculate_gross_to_net(CalcInput.from_inputs("e1", INPUTS), PLAN, ytd=ytd)
+        increments = ytd_increments(result)
+        for key, amount in increments.items():
+            ytd[key] = round(ytd.get(key, 0.0) + amount, 2)
+        rows.append(RetroRow(
+            employee_pay_id=i + 1, payrun_id=i + 1, employee_id="e1", pay_period=f"2025-{month:02d}",
+            period_start=date(2025, month, 1), config_version=PLAN.config_version, calc_inputs=INPUTS,
+            ytd_increments=increments, total_employer_cost=result.total_employer_cost,
+        ))
+    return rows
+
+
+def test_unchanged_inputs_produce_no_lines():
+    lines, errors = compute_retro_adjustments(_paid_rows([1, 2, 3]), {PLAN.config_version: PLAN})
+    assert lines == [] and errors == []
+
+
+def test_backdated_rate_change_respects_annual_cap():
+    # Levy was 640 a month (cap 1500 reached in March); at 50/h it is 800, so the cap is hit in February
+    lines, _ = compute_retro_adjustments(
+        _paid_rows([1, 2, 3]), {PLAN.config_version: PLAN}, changes={"e1": {"hourly_rate": 50.0}},
+    )
+    levy = {line.source_pay_period: line.amount for line in lines if line.component == ytd_key("employer", "Levy")}
+    assert levy == {"2025-01": 160.0, "2025-02": 60.0, "2025-03": -220.0}
+
+    totals = adjustment_totals(lines)
+    assert totals["gross_pay"] == 3 * 1600.0
+    assert totals["total_employer_cost"] == 0.0  # the annual cap absorbs the raise
+    assert totals["net_pay"] == round(totals["gross_pay"] - totals["income_tax"] - totals[ytd_key("employee", "Pension")], 2)
+
+
+def test_rows_without_their_rules_are_reported():
+    lines, errors = compute_retro_adjustments(_paid_rows([1]), {"other-version": PLAN}, changes={"e1": {"bonuses": 10}})
+    assert lines == [] and len(errors) == 1
+
+
+def test_only_calculator_inputs_can_change():
+    with pytest.raises(ValueError):
+        validate_input_changes({"e1": {"country": "Spain"}})
@@ -0,0 +1,71 @@
+import json
+
+import pytest
+
+from app.config.country_config import country_config, country_plans
+from app.config.rule_plan import PAY_FREQUENCY_PERIODS, compile_country_plan, periodize_brackets
+from app.services.deductions import calculate_deductions
+from app.services.employer_costs import calculate_employer_costs
+from app.services.gross_pay import calculate_gross_pay
+from app.services.income_tax import calculate_income_tax
+
+with open("tests/test_employees_bundle.json") as f:
+    test_employees = json.load(f)
+
+
+def test_brackets_are_sorted_with_open_ended_infinity():
+    for plan in country_plans.values():
+        thresholds = [up_to for up_to, _ in plan.income_tax_brackets]
+        assert thresholds == sorted(thresholds)
+    assert country_plans["Spain"].income_tax_brackets[-1] == (float("inf"), 0.47)
+
+
+@pytest.mark.parametrize("employee_data", test_employees)
+def test_plan_matches_raw_config(employee_data, calc_employee):
+    country = employee_data["employee"]["country"]
+    calc_emp = calc_employee(employee_data["employee"])
+    plan, raw = country_plans[country], country_config[country]
+
+    gross = calculate_gross_pay(calc_emp, plan)
+    assert gross == calculate_gross_pay(calc_emp, raw)
+    assert calculate_deductions(calc_emp, gross[0], plan) == calculate_deductions(calc_emp, gross[0], raw)
+    assert calculate_employer_costs(calc_emp, gross[0], plan) == calculate_employer_costs(calc_emp, gross[0], raw)
+
+
+@pytest.mark.parametrize("country", sorted(country_plans))
+def test_bisect_tax_matches_linear_bracket_walk(country):
+    plan = country_plans[country]
+    for taxable in (0.0, 1.0, 999.99, 15600.0, 48000.0, 250000.0, 5e6, 3e7):
+        expected_tax, expected_details, last, remaining = 0.0, [], 0.0, taxable
+        for up_to, rate in periodize_brackets(plan.income_tax_brackets, plan.periods_per_year):
+            if remaining <= 0:
+                break
+            portion = min(remaining, max(up_to - last, 0))
+            if portion > 0:
+                expected_tax += portion * rate
+                expected_details.append({
+                    "up_to": None if up_to == float("inf") else up_to,
+                    "rate": rate,
+                    "amount": round(portion * rate, 2),
+                })
+                remaining -= portion
+            last = up_to
+
+        tax, details = calculate_income_tax(plan.tax_table, taxable)
+        assert round(tax, 2) == round(expected_tax, 2)
+        assert details == expected_details
+        assert calculate_income_tax(plan.tax_table, taxable, with_details=False) == (tax, None)
+
+
+@pytest.mark.parametrize("country", sorted(country_plans))
+def test_periodized_tables_tax_annual_income_like_the_annual_brackets(country):
+    plan = country_plans[country]
+    annual_table = compile_country_plan(country, {**country_config[country], "periods_per_year": 1}).tax_table
+    assert plan.periods_per_year == PAY_FREQUENCY_PERIODS[plan.pay_frequency]
+    assert plan.tax_table_for() is plan.tax_table
+    for frequency, periods in PAY_FREQUENCY_PERIODS.items():
+        table = plan.tax_table_for(frequency)
+        for annual_income in (5000.0, 48000.0, 250000.0, 3e7):
+            per_period, _ = calculate_income_tax(table, annual_income / periods, with_details=False)
+            expected, _ = calculate_income_tax(annual_table, annual_income, with_details=False)
+            assert per_period * periods == pytest.approx(expected)
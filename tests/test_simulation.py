@@ -0,0 +1,50 @@
+import pytest
+
+from app.config.config_patch import merge_config_section
+from app.config.country_config import country_config, country_plans
+from app.config.rule_plan import compile_country_plan
+from app.models.calc_input import CalcInput
+from app.services.gross_to_net import calculate_gross_to_net
+from app.services.simulation import simulate_config_change
+
+USA = country_config["USA"]
+
+
+def test_named_rules_are_merged_by_name():
+    patch = {"statutory": {"employer_contributions": [
+        {"name": "SUTA", "rate": 0.054},
+        {"name": "Pension Match", "rate": 0.02, "basis": "gross"},
+        {"name": "FUTA", "remove": True},
+    ]}}
+    merged = merge_config_section(USA, patch)
+    rules = {rule["name"]: rule for rule in merged["statutory"]["employer_contributions"]}
+    assert rules["SUTA"] == {"name": "SUTA", "rate": 0.054, "basis": "gross"}
+    assert rules["Pension Match"]["rate"] == 0.02
+    assert "FUTA" not in rules
+    assert merged["statutory"]["employee_contributions"] == USA["statutory"]["employee_contributions"]
+    assert {rule["name"] for rule in USA["statutory"]["employer_contributions"]} >= {"FUTA"}  # base untouched
+
+
+def test_brackets_are_replaced_and_other_sections_rejected():
+    merged = merge_config_section(USA, {"income_tax_brackets": [{"up_to": None, "rate": 0.1}]})
+    assert merged["income_tax_brackets"] == [{"up_to": None, "rate": 0.1}]
+    with pytest.raises(ValueError):
+        merge_config_section(USA, {"currency": "EUR"})
+
+
+def test_simulation_matches_scalar_calculators():
+    emps = [
+        CalcInput.from_inputs(f"e{i}", {"hourly_rate": 20 + i * 7.5, "hours_worked": 160, "bonuses": 50 * i})
+        for i in range(10)
+    ]
+    patch = {"statutory": {"employer_contributions": [{"name": "SUTA", "rate": 0.054}]}}
+    scenario_plan = compile_country_plan("USA", merge_config_section(USA, patch))
+    summary = simulate_config_change(emps, country_plans["USA"], scenario_plan, include_employees=True)
+
+    for emp, delta in zip(emps, summary["employee_deltas"]):
+        before = calculate_gross_to_net(emp, country_plans["USA"])
+        after = calculate_gross_to_net(emp, scenario_plan)
+        assert delta["total_employer_cost"] == round(after.total_employer_cost - before.total_employer_cost, 2)
+        assert delta["net_pay"] == 0.0
+    assert summary["delta"]["total_gross"] == 0.0
+    assert summary["delta"]["total_employer_cost"] > 0
@@ -0,0 +1,107 @@
+import json
+from datetime import date
+
+import pytest
+
+from app.config.effective import EffectivePlans, compile_country_timelines
+from app.config.schema import ConfigValidationError
+from app.config.tenant_overlays import TenantOverlays
+from app.models.calc_input import CalcInput
+from app.services.gross_to_net import calculate_gross_to_net
+from app.services.payrun_executor import calculate_chunk
+
+BASE = {
+    "statutory": {"employee_contributions": [{"name": "Pension", "rate": 0.05, "pre_tax": True}]},
+    "income_tax_brackets": [{"up_to": 12000, "rate": 0.0}, {"up_to": None, "rate": 0.2}],
+    "optional_benefits": {"pension_top_up": {"employee_rate": 0.02, "employer_match_rate": 0.01}},
+    "effective_versions": [
+        {"effective_from": "2026-01-01", "changes": {"income_tax_brackets": [{"up_to": None, "rate": 0.25}]}},
+    ],
+}
+OVERLAY = {
+    "optional_benefits": {"pension_top_up": {"employer_match_rate": 0.04}, "private_plan": {"employee_fixed": 50}},
+    "overtime_multiplier": 2.0,
+}
+INPUTS = {"hourly_rate": 40.0, "hours_worked": 160.0, "overtime_hours": 10.0,
+          "benefits_opt_in": {"pension_top_up": True, "private_plan": True}}
+PERIODS = (date(2025, 6, 1), date(2026, 6, 1))
+
+
+def _effective(config=BASE):
+    return EffectivePlans(compile_country_timelines({"Testland": config, "Flatland": BASE}))
+
+
+def _employee(tenant_id, employee_id="e1"):
+    return CalcInput.from_inputs(employee_id, INPUTS, country="Testland", tenant_id=tenant_id)
+
+
+def test_overlay_applies_to_its_tenant_on_every_dated_version():
+    effective, overlays = _effective(), TenantOverlays()
+    overlays.set(effective, 7, "Testland", OVERLAY)
+
+    for period in PERIODS:
+        base, tenant = effective.plan_for("Testland", period), overlays.plan_for(effective, 7, "Testland", period)
+        assert overlays.plan_for(effective, 8, "Testland", period) is base
+        assert tenant.income_tax_brackets == base.income_tax_brackets  # dated base changes still apply
+        assert tenant.config_version != base.config_version and tenant.overtime_multiplier == 2.0
+        base_result = calculate_gross_to_net(_employee(8), base)
+        tenant_result = calculate_gross_to_net(_employee(7), tenant)
+        assert tenant_result.gross_pay > base_result.gross_pay  # overtime at 2.0
+        assert tenant_result.breakdown["benefits_deductions"]["post_tax"]["private_plan"] == 50
+        assert "private_plan" not in base_result.breakdown["benefits_deductions"]["post_tax"]
+        assert tenant_result.total_employer_cost > base_result.total_employer_cost
+
+    # Compiled once: later lookups are the cached view
+    assert overlays.timeline(effective, 7, "Testland") is overlays.timeline(effective, 7, "Testland")
+    assert set(overlays.tenant_plans(effective, [7, 8], PERIODS[1])) == {7}
+
+
+def test_changing_an_overlay_or_the_base_config_recompiles_the_view(tmp_path):
+    path = str(tmp_path / "tenant_overlays.json")
+    effective, overlays = _effective(), TenantOverlays(path)
+    first = overlays.set(effective, 7, "Testland", OVERLAY)
+    assert overlays.timeline(effective, 7, "Testland") is first
+
+    overlays.set(effective, 7, "Testland", {"overtime_multiplier": 1.75})
+    assert overlays.plan_for(effective, 7, "Testland", PERIODS[0]).overtime_multiplier == 1.75
+
+    reloaded = _effective({**BASE, "overtime_multiplier": 1.25, "allowance_rules": {"meal": {"tax_treatment": "exempt"}}})
+    view = overlays.timeline(reloaded, 7, "Testland")
+    assert view is not overlays.timeline(effective, 7, "Testland")
+    assert view.plans[0].exempt_allowances == ("meal",) and view.plans[0].overtime_multiplier == 1.75
+
+    # Persisted: another process loads the same overlays
+    assert json.load(open(path)) == {"7": {"Testland": {"overtime_multiplier": 1.75}}}
+    assert TenantOverlays(path).get(7) == {"Testland": {"overtime_multiplier": 1.75}}
+    assert overlays.remove(7, "Testland") and not overlays.remove(7, "Testland")
+    assert overlays.plan_for(effective, 7, "Testland", PERIODS[0]) is effective.plan_for("Testland", PERIODS[0])
+    assert TenantOverlays(path).get(7) == {}
+
+
+def test_invalid_overlays_are_rejected_and_the_previous_one_stays():
+    effective, overlays = _effective(), TenantOverlays()
+    overlays.set(effective, 7, "Testland", OVERLAY)
+    view = overlays.timeline(effective, 7, "Testland")
+
+    with pytest.raises(ValueError, match="may only change"):
+        overlays.set(effective, 7, "Testland", {"income_tax_brackets": []})
+    with pytest.raises(ConfigValidationError, match=r"Testland \(tenant 7\)"):
+        overlays.set(effective, 7, "Testland", {"optional_benefits": {"private_plan": {"employee_rate": -1}}})
+    with pytest.raises(ValueError, match="not found"):
+        overlays.set(effective, 7, "Atlantis", OVERLAY)
+    assert overlays.timeline(effective, 7, "Testland") is view
+
+
+def test_payrun_chunks_use_tenant_plans_for_their_employees():
+    effective, overlays = _effective(), TenantOverlays()
+    overlays.set(effective, 7, "Testland", OVERLAY)
+    plans = effective.plans_for(PERIODS[1])
+    tenant_plans = overlays.tenant_plans(effective, None, PERIODS[1])
+    employees = [_employee(8, "a"), _employee(7, "b"), _employee(8, "c"), _employee(7, "d")]
+
+    chunk = calculate_chunk(0, 10, employees, render_payslips=False, country_plans=plans, tenant_plans=tenant_plans)
+    assert [item["index"] for item in chunk.results] == [10, 11, 12, 13] and not chunk.errors
+    for item, calc_emp in zip(chunk.results, employees):
+        plan = tenant_plans.get(calc_emp.tenant_id, plans)["Testland"]
+        assert item["result"] == calculate_gross_to_net(calc_emp, plan)
+    assert chunk.results[0]["result"] != chunk.results[1]["result"]
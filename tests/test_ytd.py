@@ -0,0 +1,54 @@
+import pytest
+
+from app.config.rule_plan import compile_country_plan
+from app.services.deductions import calculate_deductions, calculate_deductions_minor
+from app.services.employer_costs import calculate_employer_costs
+from app.services.gross_to_net import calculate_gross_to_net
+from app.services.ytd import subtract_increments, ytd_increments, ytd_key
+
+CONFIG = {
+    "statutory": {
+        "employee_contributions": [{"name": "Pension", "rate": 0.05, "pre_tax": True}],
+        "employer_contributions": [
+            {"name": "Employer Levy", "rate": 0.10, "annual_cap": 6000, "display_name": "Levy"},
+        ],
+    },
+    "income_tax_brackets": [{"up_to": 1000, "rate": 0.0}, {"up_to": None, "rate": 0.2}],
+    "optional_benefits": {
+        "hsa": {"amount": 400, "pre_tax": True, "basis": "amount", "annual_limit": 4150},
+    },
+}
+PLAN = compile_country_plan("Testland", CONFIG)
+SALARIED = {"base_pay": 5000.0, "benefits_opt_in": {"hsa": True}}
+
+
+@pytest.mark.parametrize("used, expected", [(None, 400.0), (0.0, 400.0), (4000.0, 150.0), (4150.0, None), (5000.0, None)])
+def test_annual_limit_clamps_optional_benefit(used, expected, calc_employee):
+    ytd = None if used is None else {ytd_key("employee", "hsa"): used}
+    deductions = calculate_deductions(calc_employee(SALARIED), 5000.0, PLAN, ytd=ytd)
+    assert deductions["pre_tax_breakdown"].get("hsa") == expected
+
+    minor = calculate_deductions_minor(calc_employee(SALARIED), 500000, PLAN, ytd=ytd)
+    assert minor["pre_tax_breakdown"].get("hsa") == (None if expected is None else round(expected * 100))
+
+
+def test_annual_cap_uses_real_running_total_when_ytd_is_known(calc_employee):
+    # Without YTD the cap is only approximated per period (6000 / 12 = 500)
+    assert calculate_employer_costs(calc_employee(SALARIED), 5000.0, PLAN)[1] == {"Levy": 500.0}
+    # With YTD the full period amount is allowed until the annual cap is reached
+    assert calculate_employer_costs(calc_employee(SALARIED), 5000.0, PLAN, ytd={})[1] == {"Levy": 500.0}
+    assert calculate_employer_costs(calc_employee(SALARIED), 8000.0, PLAN, ytd={})[1] == {"Levy": 800.0}
+    assert calculate_employer_costs(calc_employee(SALARIED), 8000.0, PLAN, ytd={ytd_key("employer", "Levy"): 5500})[1] == {"Levy": 500.0}
+    assert calculate_employer_costs(calc_employee(SALARIED), 8000.0, PLAN, ytd={ytd_key("employer", "Levy"): 6000})[1] == {}
+
+
+def test_increments_round_trip(calc_employee):
+    breakdown = calculate_gross_to_net(calc_employee(SALARIED), PLAN, ytd={}).breakdown
+    increments = ytd_increments(breakdown)
+    assert increments["gross_pay"] == breakdown["gross_pay"]
+    assert increments[ytd_key("employee", "hsa")] == 400.0
+    assert increments[ytd_key("employee", "Pension")] == 250.0
+    assert increments[ytd_key("employer", "Levy")] == 500.0
+
+    ytd = {key: amount * 3 for key, amount in increments.items()}
+    assert subtract_increments(ytd, increments) == {key: round(amount * 2, 2) for key, amount in increments.items()}